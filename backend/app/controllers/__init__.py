@@ -11,11 +11,13 @@ from .achievements import router as achievements_router
 from .maps import router as maps_router
 from .health import router as health_router
 from .ml_worker import router as ml_worker_router
+from .routes import router as routes_router
 __all__ = [
 	"users_router",
 	"sightings_router",
 	"achievements_router",
 	"maps_router",
 	"ml_worker_router",
+	"routes_router",
 	"health_router",
 ]
@@ -1,6 +1,6 @@
 import os
 from typing import Optional
-from fastapi import APIRouter, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 import httpx
 
 from ..schemas import HeatmapResponse, BirdIdentificationResponse
@@ -12,28 +12,27 @@ ML_WORKER_URL = os.getenv("ML_WORKER_URL", "http://ml_worker:8003")
 
 @router.post("/identify-bird", response_model=BirdIdentificationResponse)
 async def identify_bird(
-	audio: UploadFile = File(...),
+	request: Request,
 	user_id: Optional[int] = Query(None),
 	latitude: Optional[float] = Query(None),
 	longitude: Optional[float] = Query(None),
 ):
-	"""Proxy endpoint: forward uploaded audio and params to the ML worker service
+	"""Proxy endpoint: stream uploaded audio and params to the ML worker service
 
 	Accepts multipart/form-data with field `audio` (file) and optional query
 	params `user_id`, `latitude`, `longitude`. Returns the ML worker's
 	identification response.
+
+	The request body is relayed chunk by chunk as it arrives instead of being
+	parsed and buffered here; the ML worker validates the upload.
 	"""
-	# Basic validation of uploaded file
-	if not audio.filename:
+	content_type = request.headers.get("content-type", "")
+	if not content_type.startswith("multipart/form-data"):
 		raise HTTPException(status_code=400, detail="Missing audio file")
 
-	try:
-		file_bytes = await audio.read()
-	except Exception:
-		raise HTTPException(status_code=400, detail="Unable to read uploaded file")
-
-	# Forward to ML worker service as multipart/form-data
-	files = {"audio": (audio.filename, file_bytes, audio.content_type or "application/octet-stream")}
+	headers = {"content-type": content_type}
+	if "content-length" in request.headers:
+		headers["content-length"] = request.headers["content-length"]
 	params = {}
 	if user_id is not None:
 		params["user_id"] = str(user_id)
@@ -44,7 +43,7 @@ async def identify_bird(
 
 	async with httpx.AsyncClient(timeout=30.0) as client:
 		try:
-			resp = await client.post(f"{ML_WORKER_URL}/identify-bird", files=files, params=params)
+			resp = await client.post(f"{ML_WORKER_URL}/identify-bird", content=request.stream(), headers=headers, params=params)
 		except httpx.RequestError:
 			raise HTTPException(status_code=503, detail="ML worker service unavailable")
 
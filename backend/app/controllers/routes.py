@@ -0,0 +1,72 @@
+import os
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+import httpx
+
+router = APIRouter(prefix="/routes", tags=["routes"])
+
+ROUTES_URL = os.getenv("ROUTES_URL", "http://routes:8005")
+
+
+async def _forward(method: str, path: str, timeout: float, **kwargs):
+    """Send a request to the routes service and return its JSON as-is.
+
+    Upstream errors are propagated with their status code; connection
+    problems become 503 and non-JSON bodies 502.
+    """
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        try:
+            resp = await client.request(method, f"{ROUTES_URL}{path}", **kwargs)
+        except httpx.RequestError as e:
+            raise HTTPException(status_code=503, detail=f"Routes service unavailable: {e}")
+
+    if resp.status_code >= 400:
+        try:
+            detail = resp.json()
+        except Exception:
+            detail = resp.text
+        raise HTTPException(status_code=resp.status_code, detail=detail)
+
+    try:
+        body = resp.json()
+    except Exception:
+        raise HTTPException(status_code=502, detail="Routes service returned invalid JSON")
+
+    # Keep the upstream cache marker so clients can see isochrone cache hits
+    headers = {"X-Cache": resp.headers["X-Cache"]} if "X-Cache" in resp.headers else None
+    return JSONResponse(content=body, status_code=resp.status_code, headers=headers)
+
+
+@router.post("/optimize")
+async def optimize_route(payload: dict):
+    """Proxy to the routes service species-weighted route optimizer."""
+    return await _forward("POST", "/routes/optimize", timeout=60.0, json=payload)
+
+
+@router.get("/isochrone")
+async def isochrone(lat: float, lon: float, minutes: int = Query(..., ge=1, le=180)):
+    """Proxy returning the GeoJSON area reachable on foot in `minutes`.
+
+    The mobile app can use it to restrict `/maps/distribution-zone` and
+    hotspot queries to reachable areas.
+    """
+    params = {"lat": lat, "lon": lon, "minutes": minutes}
+    return await _forward("GET", "/isochrone", timeout=20.0, params=params)
+
+
+@router.post("/batch")
+async def batch_routes(payload: dict):
+    """Proxy planning routes for several start points at once (e.g. a school group)."""
+    return await _forward("POST", "/routes/batch", timeout=180.0, json=payload)
+
+
+@router.get("/suggested")
+async def list_suggested_routes():
+    """Proxy listing the nightly precomputed suggested route of every zone."""
+    return await _forward("GET", "/routes/suggested", timeout=10.0)
+
+
+@router.get("/suggested/{zone}")
+async def get_suggested_route(zone: str):
+    """Proxy returning the precomputed suggested route of one zone."""
+    return await _forward("GET", f"/routes/suggested/{zone}", timeout=10.0)
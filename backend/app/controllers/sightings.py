@@ -1,6 +1,8 @@
 import os
-from fastapi import APIRouter, HTTPException, Depends
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 import httpx
 from ..schemas import SightingRequest, SightingResponse
 from .users import get_current_user, get_user
@@ -95,6 +97,53 @@ async def create_sighting(sighting: SightingRequest, current_user: dict = Depend
     return sighting_resp
 
 
+@router.get("/stream")
+async def stream_sightings(bbox: Optional[str] = None, species: List[str] = Query([]),
+                           current_user: dict = Depends(get_current_user)):
+    """Relay the live sightings feed (Server-Sent Events) from the sightings service.
+
+    Bytes are passed through as they arrive; the upstream connection is
+    closed when the client disconnects. Declared before ``/{sighting_id}``
+    so "stream" is not parsed as an id.
+    """
+    params = {"species": species}
+    if bbox:
+        params["bbox"] = bbox
+
+    # The upstream sends a keep-alive comment every 15 s, so a minute without
+    # bytes means the connection is dead
+    client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=60.0))
+    try:
+        upstream = await client.send(
+            client.build_request("GET", f"{SIGHTINGS_URL}/sightings/stream", params=params), stream=True,
+        )
+    except httpx.RequestError as e:
+        await client.aclose()
+        raise HTTPException(status_code=502, detail=str(e))
+
+    if upstream.status_code >= 400:
+        body = await upstream.aread()
+        await upstream.aclose()
+        await client.aclose()
+        raise HTTPException(status_code=upstream.status_code, detail=body.decode(errors="replace"))
+
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        except httpx.HTTPError:
+            pass
+        finally:
+            await upstream.aclose()
+            await client.aclose()
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{sighting_id}", response_model=SightingResponse)
 async def get_sighting(sighting_id: int, current_user: dict = Depends(get_current_user)):
     """Retrieve a specific sighting and ensure it's owned by the authenticated user.
@@ -153,8 +202,12 @@ async def get_sighting(sighting_id: int, current_user: dict = Depends(get_curren
     return sighting
 
 @router.get("/{user_id}/sightings")
-async def get_user_sightings(user_id: int, limit: int = 50, current_user: dict = Depends(get_current_user)):
-        """Get sightings for a specific user, ensuring it matches the authenticated user."""
+async def get_user_sightings(user_id: int, limit: int = 50, cursor: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+        """Get sightings for a specific user, ensuring it matches the authenticated user.
+
+        Results are newest first; pass the returned ``next_cursor`` back as
+        ``cursor`` to fetch the next page.
+        """
         # Ensure the requested user_id matches the authenticated user's id
         current_user_id = current_user.get("user_id")
         if int(user_id) != int(current_user_id):
@@ -162,7 +215,10 @@ async def get_user_sightings(user_id: int, limit: int = 50, current_user: dict =
     
         async with httpx.AsyncClient() as client:
             try:
-                resp = await client.get(f"{SIGHTINGS_URL}/users/{user_id}/sightings", params={"limit": limit})
+                params = {"limit": limit}
+                if cursor:
+                    params["cursor"] = cursor
+                resp = await client.get(f"{SIGHTINGS_URL}/users/{user_id}/sightings", params=params)
             except Exception as e:
                 raise HTTPException(status_code=502, detail=str(e))
     
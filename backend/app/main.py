@@ -21,6 +21,7 @@ from .controllers import (
     achievements_router,
     maps_router,
     ml_worker_router,
+    routes_router,
     health_router,
 )
 
@@ -30,5 +31,6 @@ app.include_router(sightings_router)
 app.include_router(achievements_router)
 app.include_router(maps_router)
 app.include_router(ml_worker_router)
+app.include_router(routes_router)
 app.include_router(health_router)
 
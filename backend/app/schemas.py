@@ -275,4 +275,10 @@ class BirdIdentificationResponse(BaseModel):
     scientific_name: Optional[str] = None
     achievements_triggered: List[str] = []
     sighting_created: bool = False
+    windows_analyzed: int = 0
+    windows_skipped: int = 0
+    stopped_early: bool = False
+    cached: bool = False
+    model_version: Optional[str] = None
+    detections: List[Dict[str, Any]] = []
 
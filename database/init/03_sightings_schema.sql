@@ -0,0 +1,68 @@
+-- Conectar a la base de datos de avistamientos
+\c winged_sightings;
+
+-- Crear tabla de avistamientos (ids generados por la base de datos)
+CREATE TABLE IF NOT EXISTS sightings (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    species_name VARCHAR(255) NOT NULL,
+    common_name VARCHAR(255),
+    timestamp TIMESTAMPTZ NOT NULL,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    location GEOGRAPHY(POINT, 4326)
+        GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography) STORED,
+    status VARCHAR(32) NOT NULL DEFAULT 'processed',
+    achievements_unlocked JSONB NOT NULL DEFAULT '[]'::jsonb,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Crear índices
+CREATE INDEX IF NOT EXISTS idx_sightings_user_timestamp ON sightings (user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_sightings_species ON sightings (species_name);
+CREATE INDEX IF NOT EXISTS idx_sightings_location ON sightings USING GIST (location);
+CREATE INDEX IF NOT EXISTS idx_sightings_timestamp ON sightings (timestamp DESC, id DESC);
+
+-- Outbox de eventos pendientes para el servicio de logros
+CREATE TABLE IF NOT EXISTS achievements_outbox (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    sighting_id BIGINT NOT NULL REFERENCES sightings (id) ON DELETE CASCADE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    event_key UUID NOT NULL DEFAULT gen_random_uuid()
+);
+ALTER TABLE achievements_outbox ADD COLUMN IF NOT EXISTS event_key UUID NOT NULL DEFAULT gen_random_uuid();
+
+CREATE INDEX IF NOT EXISTS idx_achievements_outbox_due ON achievements_outbox (next_attempt_at, id);
+
+-- Conteos diarios mantenidos en cada inserción (endpoints /stats)
+CREATE TABLE IF NOT EXISTS sightings_daily_zone_species (
+    zone VARCHAR(255) NOT NULL,
+    species_name VARCHAR(255) NOT NULL,
+    day DATE NOT NULL,
+    sightings INTEGER NOT NULL,
+    PRIMARY KEY (zone, species_name, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sightings_daily_zone_species_day ON sightings_daily_zone_species (day);
+
+CREATE TABLE IF NOT EXISTS sightings_daily_user (
+    user_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    sightings INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sightings_daily_user_day ON sightings_daily_user (day, user_id);
+
+-- Fotos de avistamientos (archivos direccionados por SHA-256)
+CREATE TABLE IF NOT EXISTS sighting_photos (
+    sighting_id BIGINT NOT NULL REFERENCES sightings (id) ON DELETE CASCADE,
+    sha256 CHAR(64) NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (sighting_id, sha256)
+);
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import ContextManager, List, Optional
 from ...domain.entities.achievement import Achievement
 from ...domain.entities.user_achievement import UserAchievement
 from ...domain.entities.bird_collection import BirdCollection
@@ -114,4 +114,28 @@ class UserStatsRepository(ABC):
     @abstractmethod
     def get_leaderboard_by_xp(self, limit: int = 10) -> List[UserStats]:
         """Get leaderboard ordered by total XP"""
-        pass
\ No newline at end of file
+        pass
+
+
+class ProcessedEventRepository(ABC):
+    """Repository interface for sighting events that have already been processed"""
+    
+    @abstractmethod
+    def atomic(self) -> ContextManager[None]:
+        """Context in which the writes of all repositories commit together, or not at all"""
+        pass
+    
+    @abstractmethod
+    def claim(self, event_id: str, user_id: int, sighting_id: Optional[int]) -> bool:
+        """Record that an event is being processed; False if it was processed before"""
+        pass
+    
+    @abstractmethod
+    def get_result(self, event_id: str) -> Optional[List[int]]:
+        """Ids of the user achievements the event unlocked"""
+        pass
+    
+    @abstractmethod
+    def complete(self, event_id: str, unlocked_achievement_ids: List[int]) -> None:
+        """Store the outcome of a processed event"""
+        pass
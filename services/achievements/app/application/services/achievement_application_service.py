@@ -3,11 +3,12 @@ from ..interfaces.repositories import (
     AchievementRepository,
     UserAchievementRepository,
     BirdCollectionRepository,
-    UserStatsRepository
+    UserStatsRepository,
+    ProcessedEventRepository
 )
 from ..interfaces.external_services import NotificationService, EventPublisher
 from ..use_cases.get_user_collection import GetUserCollectionUseCase, GetUserCollectionRequest
-from ..use_cases.process_sighting import ProcessSightingUseCase, ProcessSightingRequest
+from ..use_cases.process_sighting import ProcessSightingUseCase, ProcessSightingRequest, ProcessSightingResponse
 from ..use_cases.get_achievement_progress import GetAchievementProgressUseCase, GetAchievementProgressRequest
 from ..use_cases.manage_achievements import ManageAchievementsUseCase, CreateAchievementRequest, GetAchievementRequest, GetAllAchievementsRequest
 from ...domain.services.achievement_domain_service import AchievementDomainService
@@ -27,7 +28,8 @@ class AchievementApplicationService:
                  user_stats_repo: UserStatsRepository,
                  achievement_domain_service: AchievementDomainService,
                  notification_service: Optional[NotificationService] = None,
-                 event_publisher: Optional[EventPublisher] = None):
+                 event_publisher: Optional[EventPublisher] = None,
+                 processed_event_repo: Optional[ProcessedEventRepository] = None):
         self.achievement_repo = achievement_repo
         self.user_achievement_repo = user_achievement_repo
         self.bird_collection_repo = bird_collection_repo
@@ -35,6 +37,7 @@ class AchievementApplicationService:
         self.achievement_domain_service = achievement_domain_service
         self.notification_service = notification_service
         self.event_publisher = event_publisher
+        self.processed_event_repo = processed_event_repo
         
         # Initialize use cases
         self._get_user_collection_use_case = GetUserCollectionUseCase(
@@ -76,6 +79,25 @@ class AchievementApplicationService:
         request = ProcessSightingRequest(sighting_event=sighting_event)
         return await self._process_sighting_use_case.execute(request)
     
+    async def process_sighting_event(self, event_id: Optional[str], sighting_event: SightingEvent,
+                                     sighting_id: Optional[int] = None) -> ProcessSightingResponse:
+        """Process a delivered sighting event at most once per event_id"""
+        if not event_id or self.processed_event_repo is None:
+            return await self.process_sighting(sighting_event)
+        
+        # The event row commits together with the collection and stats it
+        # changes: after a crash neither exists and the redelivery starts over
+        with self.processed_event_repo.atomic():
+            if not self.processed_event_repo.claim(event_id, sighting_event.user_id, sighting_id):
+                unlocked_ids = set(self.processed_event_repo.get_result(event_id) or [])
+                unlocked = [ua for ua in self.user_achievement_repo.get_by_user_id(sighting_event.user_id)
+                            if ua.id in unlocked_ids]
+                return ProcessSightingResponse(newly_unlocked_achievements=unlocked, duplicate=True)
+            
+            result = await self.process_sighting(sighting_event)
+            self.processed_event_repo.complete(event_id, [ua.id for ua in result.newly_unlocked_achievements])
+        return result
+    
     def get_all_achievements(self) -> List[Achievement]:
         """Get all available achievements"""
         request = GetAllAchievementsRequest()
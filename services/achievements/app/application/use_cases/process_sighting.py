@@ -20,6 +20,7 @@ class ProcessSightingRequest:
 @dataclass
 class ProcessSightingResponse:
     newly_unlocked_achievements: List[UserAchievement]
+    duplicate: bool = False
 
 
 class ProcessSightingUseCase:
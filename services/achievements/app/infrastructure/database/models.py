@@ -65,4 +65,16 @@ class UserStatsModel(Base):
     last_sighting_date = Column(DateTime(timezone=True))
     longest_streak = Column(Integer, default=0)
     current_streak = Column(Integer, default=0)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ProcessedSightingEventModel(Base):
+    __tablename__ = "processed_sighting_events"
+    
+    # Sightings outbox events are delivered at least once; the primary key makes processing idempotent.
+    # Written in the same transaction as the stats the event changes.
+    event_id = Column(String, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    sighting_id = Column(Integer)
+    unlocked_achievement_ids = Column(Text)  # JSON list of user_achievements ids
+    processed_at = Column(DateTime(timezone=True), server_default=func.now())
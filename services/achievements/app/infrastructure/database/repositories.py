@@ -1,11 +1,15 @@
-from typing import List, Optional
+import json
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
 from ...application.interfaces.repositories import (
     AchievementRepository,
     UserAchievementRepository,
     BirdCollectionRepository,
-    UserStatsRepository
+    UserStatsRepository,
+    ProcessedEventRepository
 )
 from ...domain.entities.achievement import Achievement
 from ...domain.entities.user_achievement import UserAchievement
@@ -13,7 +17,20 @@ from ...domain.entities.bird_collection import BirdCollection
 from ...domain.entities.user_stats import UserStats
 from ...domain.value_objects.achievement_criteria import AchievementCriteria
 from ...domain.value_objects.location import Location
-from .models import AchievementModel, UserAchievementModel, BirdCollectionModel, UserStatsModel
+from .models import (
+    AchievementModel, UserAchievementModel, BirdCollectionModel, UserStatsModel, ProcessedSightingEventModel
+)
+
+# Session.info flag set inside ProcessedEventRepository.atomic()
+UNIT_OF_WORK = "unit_of_work"
+
+
+def _commit(db: Session) -> None:
+    """Commit, or only flush while a unit of work will commit everything at its end"""
+    if db.info.get(UNIT_OF_WORK):
+        db.flush()
+    else:
+        db.commit()
 
 
 class SQLAlchemyAchievementRepository(AchievementRepository):
@@ -36,7 +53,7 @@ class SQLAlchemyAchievementRepository(AchievementRepository):
         """Create a new achievement"""
         model = self._entity_to_model(achievement)
         self.db.add(model)
-        self.db.commit()
+        _commit(self.db)
         self.db.refresh(model)
         return self._model_to_entity(model)
     
@@ -51,7 +68,7 @@ class SQLAlchemyAchievementRepository(AchievementRepository):
             model.xp_reward = achievement.xp_reward
             model.icon = achievement.icon
             model.is_active = achievement.is_active
-            self.db.commit()
+            _commit(self.db)
             self.db.refresh(model)
             return self._model_to_entity(model)
         raise ValueError(f"Achievement with id {achievement.id} not found")
@@ -113,7 +130,7 @@ class SQLAlchemyUserAchievementRepository(UserAchievementRepository):
         """Create a new user achievement"""
         model = self._entity_to_model(user_achievement)
         self.db.add(model)
-        self.db.commit()
+        _commit(self.db)
         self.db.refresh(model)
         return self._model_to_entity(model)
     
@@ -124,7 +141,7 @@ class SQLAlchemyUserAchievementRepository(UserAchievementRepository):
         ).first()
         if model:
             model.progress = user_achievement.progress
-            self.db.commit()
+            _commit(self.db)
             self.db.refresh(model)
             return self._model_to_entity(model)
         raise ValueError(f"UserAchievement with id {user_achievement.id} not found")
@@ -193,7 +210,7 @@ class SQLAlchemyBirdCollectionRepository(BirdCollectionRepository):
         """Create a new bird collection entry"""
         model = self._entity_to_model(bird_collection)
         self.db.add(model)
-        self.db.commit()
+        _commit(self.db)
         self.db.refresh(model)
         return self._model_to_entity(model)
     
@@ -209,7 +226,7 @@ class SQLAlchemyBirdCollectionRepository(BirdCollectionRepository):
             if bird_collection.location:
                 model.location_lat = bird_collection.location.latitude
                 model.location_lon = bird_collection.location.longitude
-            self.db.commit()
+            _commit(self.db)
             self.db.refresh(model)
             return self._model_to_entity(model)
         raise ValueError(f"BirdCollection with id {bird_collection.id} not found")
@@ -278,7 +295,7 @@ class SQLAlchemyUserStatsRepository(UserStatsRepository):
         """Create new user statistics"""
         model = self._entity_to_model(user_stats)
         self.db.add(model)
-        self.db.commit()
+        _commit(self.db)
         self.db.refresh(model)
         return self._model_to_entity(model)
     
@@ -296,7 +313,7 @@ class SQLAlchemyUserStatsRepository(UserStatsRepository):
             model.longest_streak = user_stats.longest_streak
             model.current_streak = user_stats.current_streak
             model.updated_at = user_stats.updated_at
-            self.db.commit()
+            _commit(self.db)
             self.db.refresh(model)
             return self._model_to_entity(model)
         raise ValueError(f"UserStats for user {user_stats.user_id} not found")
@@ -347,4 +364,51 @@ class SQLAlchemyUserStatsRepository(UserStatsRepository):
             longest_streak=entity.longest_streak,
             current_streak=entity.current_streak,
             updated_at=entity.updated_at
-        )
\ No newline at end of file
+        )
+
+
+class SQLAlchemyProcessedEventRepository(ProcessedEventRepository):
+    """SQLAlchemy implementation of ProcessedEventRepository"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        """Defer the commits of every repository on this session to the end of the block"""
+        self.db.info[UNIT_OF_WORK] = True
+        try:
+            yield
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            self.db.info.pop(UNIT_OF_WORK, None)
+    
+    def claim(self, event_id: str, user_id: int, sighting_id: Optional[int]) -> bool:
+        """Insert the event row; the primary key rejects an event processed before"""
+        self.db.add(ProcessedSightingEventModel(event_id=event_id, user_id=user_id, sighting_id=sighting_id))
+        try:
+            # A concurrent delivery of the same event blocks here until the first one commits
+            self.db.flush()
+            return True
+        except IntegrityError:
+            self.db.rollback()
+            return False
+    
+    def get_result(self, event_id: str) -> Optional[List[int]]:
+        """Ids of the user achievements the event unlocked"""
+        model = self.db.query(ProcessedSightingEventModel).filter(
+            ProcessedSightingEventModel.event_id == event_id
+        ).first()
+        if not model:
+            return None
+        return json.loads(model.unlocked_achievement_ids or "[]")
+    
+    def complete(self, event_id: str, unlocked_achievement_ids: List[int]) -> None:
+        """Store the outcome of a processed event"""
+        self.db.query(ProcessedSightingEventModel).filter(
+            ProcessedSightingEventModel.event_id == event_id
+        ).update({"unlocked_achievement_ids": json.dumps(unlocked_achievement_ids)}, synchronize_session=False)
+        _commit(self.db)
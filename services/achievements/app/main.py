@@ -223,10 +223,11 @@ async def process_batch_species_detection(
         # Process each detection
         for detection in request.detections:
             try:
-                # Create location and sighting event
+                # Create location and sighting event (detections without coordinates have no location)
+                coordinates = detection.location or {}
                 location = Location(
-                    latitude=detection.location.get('latitude', detection.location.get('lat', 0.0)),
-                    longitude=detection.location.get('longitude', detection.location.get('lon', 0.0))
+                    latitude=coordinates.get('latitude', coordinates.get('lat', 0.0)),
+                    longitude=coordinates.get('longitude', coordinates.get('lon', 0.0))
                 )
                 
                 sighting_event = SightingEvent(
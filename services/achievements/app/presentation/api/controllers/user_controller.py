@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 from ....application.services.achievement_application_service import AchievementApplicationService
-from ..schemas.requests import SightingEventRequest
+from ..schemas.requests import SightingEventRequest, SightingEventBatchRequest
 from ..schemas.responses import (
     UserCollectionResponse, UserStatsResponse, UserAchievementResponse,
     AchievementProgressResponse, LeaderboardEntryResponse, BirdCollectionResponse
@@ -105,6 +105,47 @@ async def process_sighting(
     }
 
 
+@router.post("/sightings/batch")
+async def process_sightings_batch(
+    request: SightingEventBatchRequest,
+    service: AchievementApplicationService = Depends(get_achievement_service)
+):
+    """Process several sighting events in order, with one result per event
+
+    Events carrying an event_id are processed once: a redelivered event
+    returns the achievements it unlocked the first time, with duplicate set.
+    """
+    results = []
+    for event in request.events:
+        sighting_event = SightingEvent(
+            user_id=event.user_id,
+            species_name=event.species_name,
+            common_name=event.common_name,
+            confidence_score=1.0,
+            location=Location(latitude=0.0, longitude=0.0),
+            timestamp=event.timestamp
+        )
+        try:
+            result = await service.process_sighting_event(event.event_id, sighting_event, event.sighting_id)
+        except Exception as e:
+            # A failing event must not hide the results of the others
+            results.append({"event_id": event.event_id, "user_id": event.user_id,
+                            "newly_unlocked_achievements": [], "error": str(e)})
+            continue
+        results.append({
+            "event_id": event.event_id,
+            "user_id": event.user_id,
+            "duplicate": result.duplicate,
+            "newly_unlocked_achievements": [
+                _user_achievement_entity_to_response(ua)
+                for ua in result.newly_unlocked_achievements
+            ],
+            "error": None
+        })
+
+    return {"message": f"Processed {len(results)} sightings", "results": results}
+
+
 def _bird_entity_to_response(bird) -> BirdCollectionResponse:
     """Convert bird collection entity to response schema"""
     return BirdCollectionResponse(
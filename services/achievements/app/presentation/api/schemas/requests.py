@@ -9,6 +9,13 @@ class SightingEventRequest(BaseModel):
     species_name: str  # Scientific name
     common_name: Optional[str] = None  # Common name
     timestamp: datetime
+    event_id: Optional[str] = None  # Delivery key; a repeated event_id is not processed twice
+    sighting_id: Optional[int] = None
+
+
+class SightingEventBatchRequest(BaseModel):
+    """Request schema for a batch of sighting events, processed in order"""
+    events: List[SightingEventRequest]
 
 
 class CreateAchievementRequest(BaseModel):
@@ -5,7 +5,8 @@ from ..infrastructure.database.repositories import (
     SQLAlchemyAchievementRepository,
     SQLAlchemyUserAchievementRepository,
     SQLAlchemyBirdCollectionRepository,
-    SQLAlchemyUserStatsRepository
+    SQLAlchemyUserStatsRepository,
+    SQLAlchemyProcessedEventRepository
 )
 from ..infrastructure.external.notification_service import (
     LoggingNotificationService,
@@ -35,6 +36,11 @@ def get_user_stats_repository(db: Session = Depends(get_db)):
     return SQLAlchemyUserStatsRepository(db)
 
 
+def get_processed_event_repository(db: Session = Depends(get_db)):
+    """Get processed sighting event repository instance"""
+    return SQLAlchemyProcessedEventRepository(db)
+
+
 def get_achievement_domain_service():
     """Get achievement domain service instance"""
     return AchievementDomainService()
@@ -57,7 +63,8 @@ def get_achievement_service(
     user_stats_repo=Depends(get_user_stats_repository),
     domain_service=Depends(get_achievement_domain_service),
     notification_service=Depends(get_notification_service),
-    event_publisher=Depends(get_event_publisher)
+    event_publisher=Depends(get_event_publisher),
+    processed_event_repo=Depends(get_processed_event_repository)
 ):
     """Get achievement application service instance with all dependencies"""
     return AchievementApplicationService(
@@ -67,5 +74,6 @@ def get_achievement_service(
         user_stats_repo=user_stats_repo,
         achievement_domain_service=domain_service,
         notification_service=notification_service,
-        event_publisher=event_publisher
+        event_publisher=event_publisher,
+        processed_event_repo=processed_event_repo
     )
\ No newline at end of file
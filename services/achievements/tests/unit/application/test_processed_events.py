@@ -0,0 +1,96 @@
+"""
+Unit tests for idempotent processing of delivered sighting events
+"""
+
+import asyncio
+import pytest
+from contextlib import contextmanager
+from unittest.mock import Mock, AsyncMock
+from datetime import datetime
+
+from ....app.application.services.achievement_application_service import AchievementApplicationService
+from ....app.application.use_cases.process_sighting import ProcessSightingResponse
+from ....app.domain.entities.user_achievement import UserAchievement
+from ....app.domain.value_objects.location import Location
+from ....app.domain.value_objects.sighting_event import SightingEvent
+
+
+class _ProcessedEvents:
+    """In-memory stand-in for the processed_sighting_events table"""
+
+    def __init__(self):
+        self.rows = {}
+
+    @contextmanager
+    def atomic(self):
+        committed = dict(self.rows)
+        try:
+            yield
+        except Exception:
+            self.rows = committed
+            raise
+
+    def claim(self, event_id, user_id, sighting_id):
+        if event_id in self.rows:
+            return False
+        self.rows[event_id] = []
+        return True
+
+    def get_result(self, event_id):
+        return self.rows.get(event_id)
+
+    def complete(self, event_id, unlocked_achievement_ids):
+        self.rows[event_id] = unlocked_achievement_ids
+
+
+class TestProcessSightingEvent:
+    """Test cases for redelivered sighting events"""
+
+    @pytest.fixture
+    def unlocked(self):
+        return UserAchievement(id=7, user_id=1, achievement_id=1, unlocked_at=datetime.utcnow(), progress=1.0)
+
+    @pytest.fixture
+    def service(self, unlocked):
+        user_achievement_repo = Mock()
+        user_achievement_repo.get_by_user_id.return_value = [unlocked]
+        service = AchievementApplicationService(
+            Mock(), user_achievement_repo, Mock(), Mock(), Mock(), processed_event_repo=_ProcessedEvents()
+        )
+        service._process_sighting_use_case.execute = AsyncMock(
+            return_value=ProcessSightingResponse(newly_unlocked_achievements=[unlocked])
+        )
+        return service
+
+    @pytest.fixture
+    def sighting_event(self):
+        return SightingEvent(
+            user_id=1, species_name="Turdus fuscater", common_name="Great Thrush",
+            confidence_score=1.0, location=Location(latitude=0.0, longitude=0.0), timestamp=datetime.utcnow()
+        )
+
+    def test_redelivered_event_is_processed_once(self, service, sighting_event, unlocked):
+        first = asyncio.run(service.process_sighting_event("evt-1", sighting_event, sighting_id=3))
+        again = asyncio.run(service.process_sighting_event("evt-1", sighting_event, sighting_id=3))
+
+        assert service._process_sighting_use_case.execute.await_count == 1
+        assert first.duplicate is False
+        assert again.duplicate is True
+        assert again.newly_unlocked_achievements == [unlocked]
+
+    def test_failed_event_can_be_retried(self, service, sighting_event):
+        service._process_sighting_use_case.execute.side_effect = [RuntimeError("db down"),
+                                                                  ProcessSightingResponse(newly_unlocked_achievements=[])]
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(service.process_sighting_event("evt-2", sighting_event))
+        result = asyncio.run(service.process_sighting_event("evt-2", sighting_event))
+
+        assert result.duplicate is False
+        assert service._process_sighting_use_case.execute.await_count == 2
+
+    def test_events_without_an_id_are_always_processed(self, service, sighting_event):
+        asyncio.run(service.process_sighting_event(None, sighting_event))
+        asyncio.run(service.process_sighting_event(None, sighting_event))
+
+        assert service._process_sighting_use_case.execute.await_count == 2
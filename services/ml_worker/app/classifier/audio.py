@@ -0,0 +1,185 @@
+"""
+Audio decoding and log-mel features for the bird classifier.
+
+Everything after decoding is vectorised NumPy: the signal is cut into
+``WINDOW_S`` windows at its own sample rate, each window is resampled to
+``SAMPLE_RATE`` and every window of a batch is turned into a log-mel
+spectrogram with one framed FFT and one matrix product against the mel
+filterbank. Working window by window lets streamed uploads
+(``app.classifier.stream``) produce exactly the same features as whole files.
+"""
+
+import io
+import wave
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 32000
+WINDOW_S = 3.0
+# A trailing partial window shorter than this is dropped; longer ones are zero-padded
+MIN_WINDOW_S = 1.0
+N_FFT = 1024
+HOP_LENGTH = 320          # 10 ms
+N_MELS = 64
+FMIN = 150.0
+FMAX = 15000.0
+LOG_EPS = 1e-6
+
+WINDOW_SAMPLES = int(SAMPLE_RATE * WINDOW_S)
+N_FRAMES = 1 + (WINDOW_SAMPLES - N_FFT) // HOP_LENGTH
+
+
+class UnsupportedAudio(ValueError):
+    """The audio could not be decoded"""
+
+
+class EmptyAudio(UnsupportedAudio):
+    """The upload has no bytes at all"""
+
+
+def pcm_samples(raw: bytes, width: int, is_float: bool = False) -> np.ndarray:
+    """Interleaved little-endian PCM (or IEEE float) frames to float32 in [-1, 1]"""
+    if is_float:
+        return np.frombuffer(raw, dtype="<f4" if width == 4 else "<f8").astype(np.float32)
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise UnsupportedAudio(f"unsupported WAV sample width {width}")
+    return samples
+
+
+def _decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """PCM WAV through the standard library"""
+    with wave.open(io.BytesIO(data)) as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    return pcm_samples(raw, width).reshape(-1, channels).mean(axis=1), rate
+
+
+def _decode_soundfile(data: bytes) -> Tuple[np.ndarray, int]:
+    """FLAC (and float/extensible WAV) through libsndfile"""
+    try:
+        import soundfile
+    except ImportError:
+        raise UnsupportedAudio("FLAC decoding needs the 'soundfile' package")
+    try:
+        samples, rate = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except RuntimeError as e:
+        raise UnsupportedAudio(f"cannot decode audio: {e}")
+    return samples.mean(axis=1), rate
+
+
+def decode(data: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Decode WAV or FLAC bytes to mono float32 samples in [-1, 1]
+
+    Returns:
+        (samples, sample_rate)
+
+    Raises:
+        UnsupportedAudio: the bytes are not a supported audio file
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            samples, rate = _decode_wav(data)
+        except wave.Error:
+            # Float or WAVE_FORMAT_EXTENSIBLE files
+            samples, rate = _decode_soundfile(data)
+    elif data[:4] == b"fLaC":
+        samples, rate = _decode_soundfile(data)
+    else:
+        raise UnsupportedAudio("audio must be WAV or FLAC")
+
+    if samples.size == 0 or rate <= 0:
+        raise UnsupportedAudio("audio contains no samples")
+    return samples, rate
+
+
+def resample(samples: np.ndarray, rate: int, target: int = SAMPLE_RATE) -> np.ndarray:
+    """Band-limited resampling in the frequency domain"""
+    if rate == target:
+        return samples.astype(np.float32, copy=False)
+    n_out = max(1, int(round(len(samples) * target / rate)))
+    spectrum = np.fft.rfft(samples)
+    out = np.zeros(n_out // 2 + 1, dtype=spectrum.dtype)
+    keep = min(len(spectrum), len(out))
+    out[:keep] = spectrum[:keep]
+    return (np.fft.irfft(out, n_out) * (n_out / len(samples))).astype(np.float32)
+
+
+def window_length(rate: int) -> int:
+    """Samples per window at ``rate``"""
+    return int(round(WINDOW_S * rate))
+
+
+def keep_partial(rest: int, rate: int, n_full: int) -> bool:
+    """Whether a trailing partial window of ``rest`` samples is analysed (zero-padded)"""
+    return rest >= MIN_WINDOW_S * rate or (n_full == 0 and rest > 0)
+
+
+def split_windows(samples: np.ndarray, rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Non-overlapping windows at ``rate``, shape ``(n_windows, window_length(rate))``"""
+    window = window_length(rate)
+    n_full, rest = divmod(len(samples), window)
+    n = n_full + (1 if keep_partial(rest, rate, n_full) else 0)
+    padded = np.zeros(n * window, dtype=np.float32)
+    used = min(len(samples), n * window)
+    padded[:used] = samples[:used]
+    return padded.reshape(n, window)
+
+
+def resample_windows(windows: np.ndarray, rate: int, target: int = SAMPLE_RATE) -> np.ndarray:
+    """``resample`` applied to every row of a batch of windows at once"""
+    if rate == target:
+        return windows.astype(np.float32, copy=False)
+    n_in, n_out = windows.shape[1], window_length(target)
+    spectrum = np.fft.rfft(windows, axis=1)
+    out = np.zeros((len(windows), n_out // 2 + 1), dtype=spectrum.dtype)
+    keep = min(spectrum.shape[1], out.shape[1])
+    out[:, :keep] = spectrum[:, :keep]
+    return (np.fft.irfft(out, n_out, axis=1) * (n_out / n_in)).astype(np.float32)
+
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + np.asarray(hz) / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10.0 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+
+@lru_cache(maxsize=4)
+def mel_filterbank(sample_rate: int = SAMPLE_RATE, n_fft: int = N_FFT, n_mels: int = N_MELS,
+                   fmin: float = FMIN, fmax: float = FMAX) -> np.ndarray:
+    """Triangular filters, shape ``(n_fft // 2 + 1, n_mels)``, area-normalised"""
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    edges = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs[None, :] - lower) / (center - lower)
+    falling = (upper - freqs[None, :]) / (upper - center)
+    weights = np.maximum(0.0, np.minimum(rising, falling))
+    weights *= (2.0 / (upper - lower))
+    return weights.T.astype(np.float32)
+
+
+def mel_center_frequencies(n_mels: int = N_MELS, fmin: float = FMIN, fmax: float = FMAX) -> np.ndarray:
+    return _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))[1:-1]
+
+
+def log_mel(windows: np.ndarray) -> np.ndarray:
+    """Log-mel spectrograms of a batch of windows, shape ``(n, N_MELS, N_FRAMES)``"""
+    frames = np.lib.stride_tricks.sliding_window_view(windows, N_FFT, axis=-1)[:, ::HOP_LENGTH, :]
+    power = np.abs(np.fft.rfft(frames * np.hanning(N_FFT).astype(np.float32), axis=-1)) ** 2
+    mel = power.astype(np.float32) @ mel_filterbank()
+    return np.log(mel + LOG_EPS).transpose(0, 2, 1)
@@ -0,0 +1,187 @@
+"""
+Micro-batching of model calls across concurrent requests.
+
+Requests submit their spectrogram windows and wait. A single runner task
+takes the first waiting submission, keeps collecting more for up to
+``max_wait_ms`` or until ``max_batch`` windows are gathered, runs one
+forward pass on a dedicated worker thread and hands each request its slice
+of the scores. One thread means one forward pass at a time, which also keeps
+runtimes that are not thread-safe (TFLite interpreters) correct.
+
+Batch sizes and queue waits are recorded in histograms served by
+``GET /classifier/stats``.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_MAX_WAIT_MS = float(os.getenv("CLASSIFIER_MAX_WAIT_MS", "10"))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """Cumulative bucket counts, Prometheus style"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, []
+        for bound, n in zip(self.bounds + ["+Inf"], self.counts):
+            cumulative += n
+            buckets.append({"le": bound, "count": cumulative})
+        return {
+            "buckets": buckets,
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 3) if self.count else None,
+        }
+
+
+@dataclass
+class _Submission:
+    features: np.ndarray
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """Coalesces concurrent ``predict`` calls into batched calls of ``model_predict``"""
+
+    def __init__(self, model_predict: Callable[[np.ndarray], np.ndarray], max_batch: int = 32,
+                 max_wait_ms: float = CLASSIFIER_MAX_WAIT_MS):
+        self.model_predict = model_predict
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self._queue: Optional[asyncio.Queue] = None
+        self._carry: Optional[_Submission] = None
+        self._inflight: List[_Submission] = []
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the runner; requests still queued or in flight fail instead of waiting forever"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        pending = self._inflight + ([self._carry] if self._carry is not None else [])
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._inflight, self._carry = [], None
+        for s in pending:
+            if not s.future.done():
+                s.future.set_exception(RuntimeError("Inference batcher stopped"))
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def predict(self, features: np.ndarray) -> np.ndarray:
+        """Scores for ``features`` (n windows), computed together with other requests' windows"""
+        if self._task is None:
+            raise RuntimeError("Inference batcher is not running")
+        loop = asyncio.get_running_loop()
+        submissions = []
+        for start in range(0, len(features), self.max_batch):
+            submission = _Submission(features[start:start + self.max_batch], loop.create_future())
+            self._queue.put_nowait(submission)
+            submissions.append(submission)
+        results = await asyncio.gather(*(s.future for s in submissions))
+        return np.concatenate(results) if results else np.empty((0, 0), dtype=np.float32)
+
+    async def _next_batch(self) -> List[_Submission]:
+        first = self._carry or await self._queue.get()
+        self._carry = None
+        batch, windows = [first], len(first.features)
+        deadline = time.perf_counter() + self.max_wait_s
+        while windows < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                submission = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._queue.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if windows + len(submission.features) > self.max_batch:
+                # Starts the next batch instead of being split
+                self._carry = submission
+                break
+            batch.append(submission)
+            windows += len(submission.features)
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            batch = [s for s in batch if not s.future.done()]   # requests cancelled while queued
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for s in batch:
+                self.queue_wait_ms.observe((started - s.enqueued_at) * 1000.0)
+            features = np.concatenate([s.features for s in batch])
+            self.batch_sizes.observe(len(features))
+
+            # Left set if the runner is cancelled mid-pass, so stop() fails these too
+            self._inflight = batch
+            try:
+                scores = await loop.run_in_executor(self._executor, self.model_predict, features)
+            except Exception as e:
+                self._inflight = []
+                logger.exception("Batched inference failed")
+                for s in batch:
+                    if not s.future.done():
+                        s.future.set_exception(e)
+                continue
+            self._inflight = []
+
+            offset = 0
+            for s in batch:
+                n = len(s.features)
+                if not s.future.done():
+                    s.future.set_result(scores[offset:offset + n])
+                offset += n
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_s * 1000.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
@@ -0,0 +1,47 @@
+"""
+Build the bundled test model (``data/test_model.npz``).
+
+Each ``SPECIES_MAPPING`` code gets a characteristic frequency, log-spaced
+between ``LOW_HZ`` and ``HIGH_HZ`` in code order, and the linear model
+responds to energy concentrated around it. It has no ornithological value:
+it exists so the full pipeline (decoding, features, batching, label
+mapping) runs and can be tested without a trained model. Rebuild with::
+
+    python -m app.classifier.build_test_model
+"""
+
+import numpy as np
+
+from .audio import mel_center_frequencies
+from .models import BUNDLED_MODEL
+from ..models.species_mapping import SPECIES_MAPPING
+
+LOW_HZ = 1000.0
+HIGH_HZ = 9000.0
+VERSION = "test-linear-1"
+
+
+def characteristic_frequencies() -> dict:
+    codes = sorted(SPECIES_MAPPING)
+    freqs = np.geomspace(LOW_HZ, HIGH_HZ, len(codes))
+    return dict(zip(codes, freqs))
+
+
+def build(path: str = BUNDLED_MODEL) -> None:
+    centers = mel_center_frequencies()
+    freqs = characteristic_frequencies()
+    codes = list(freqs)
+
+    weights = np.zeros((len(centers), len(codes)), dtype=np.float32)
+    for j, code in enumerate(codes):
+        k = int(np.argmin(np.abs(centers - freqs[code])))
+        distance = np.arange(len(centers)) - k
+        weights[:, j] = 3.0 * np.exp(-0.5 * (distance / 0.6) ** 2) - 0.25
+    bias = np.full(len(codes), -12.0, dtype=np.float32)
+
+    np.savez(path, weights=weights, bias=bias, labels=np.array(codes), version=np.array(VERSION))
+
+
+if __name__ == "__main__":
+    build()
+    print(f"Wrote {BUNDLED_MODEL}")
@@ -0,0 +1,210 @@
+"""
+Identification results cached by audio content.
+
+The mobile app retries uploads and users resubmit the same clip, so results
+are kept in a bounded LRU keyed by (SHA-256 of the upload, model version,
+location bucket). A hit skips decoding and inference entirely; sighting and
+achievement side effects are not part of the cached value and still run for
+every request.
+
+Keys also carry the SHA-256 of the upload's first chunk (its "head"), so a
+request can tell from that chunk alone whether it may be a resubmission.
+Only then is the whole upload hashed before classifying; every other upload
+is classified right away and hashed in the same pass.
+
+With ``CLASSIFIER_CACHE_PATH`` set, entries are also written to a SQLite
+file and the most recently used ones are loaded back on startup. Evicted
+entries are deleted from the file too, so it stays as bounded as the LRU.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .stream import STREAM_CHUNK_BYTES, read_upload
+
+logger = logging.getLogger(__name__)
+
+# 0 disables the cache
+CLASSIFIER_CACHE_SIZE = int(os.getenv("CLASSIFIER_CACHE_SIZE", "1024"))
+CLASSIFIER_CACHE_PATH = os.getenv("CLASSIFIER_CACHE_PATH") or None
+# Coordinates are bucketed to this many degrees (0.1° is about 11 km)
+CLASSIFIER_CACHE_LOCATION_DEG = float(os.getenv("CLASSIFIER_CACHE_LOCATION_DEG", "0.1"))
+
+
+def location_bucket(latitude: Optional[float], longitude: Optional[float],
+                    degrees: float = CLASSIFIER_CACHE_LOCATION_DEG) -> str:
+    if latitude is None or longitude is None:
+        return "-"
+    return f"{math.floor(latitude / degrees)},{math.floor(longitude / degrees)}"
+
+
+async def sha256_upload(upload) -> Tuple[str, int]:
+    """Streaming SHA-256 and size of an upload (``UploadFile``), rewound afterwards"""
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in read_upload(upload):
+        digest.update(chunk)
+        size += len(chunk)
+    await upload.seek(0)
+    return digest.hexdigest(), size
+
+
+class ContentDigest:
+    """SHA-256 of an upload and of its first ``head_bytes`` (the cache head), fed chunk by chunk"""
+
+    def __init__(self, head_bytes: int = STREAM_CHUNK_BYTES):
+        self._full = hashlib.sha256()
+        self._head = hashlib.sha256()
+        self._head_left = head_bytes
+
+    def update(self, chunk: bytes) -> None:
+        self._full.update(chunk)
+        if self._head_left > 0:
+            part = chunk[:self._head_left]
+            self._head.update(part)
+            self._head_left -= len(part)
+
+    @property
+    def sha256(self) -> str:
+        return self._full.hexdigest()
+
+    @property
+    def head(self) -> str:
+        return self._head.hexdigest()
+
+
+class ResultCache:
+    """Bounded LRU of identification results with optional SQLite persistence"""
+
+    def __init__(self, max_entries: int = CLASSIFIER_CACHE_SIZE, path: Optional[str] = CLASSIFIER_CACHE_PATH,
+                 location_deg: float = CLASSIFIER_CACHE_LOCATION_DEG):
+        self.max_entries = max_entries
+        self.path = path
+        self.location_deg = location_deg
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        # (head, model version, location bucket) -> key of an entry with that head
+        self._heads: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, sha256: str, model_version: str, latitude: Optional[float] = None,
+            longitude: Optional[float] = None, head: str = "") -> str:
+        return f"{head}/{sha256}:{model_version}:{location_bucket(latitude, longitude, self.location_deg)}"
+
+    def has_head(self, head: str, model_version: str, latitude: Optional[float] = None,
+                 longitude: Optional[float] = None) -> bool:
+        """Whether some cached upload starts with the chunk hashing to ``head``; counts a miss if not"""
+        found = self._head_key(self.key("", model_version, latitude, longitude, head)) in self._heads
+        if not found:
+            self.misses += 1
+        return found
+
+    @staticmethod
+    def _head_key(key: str) -> str:
+        head, _, rest = key.partition("/")
+        return head + rest[rest.find(":"):]
+
+    def _evict(self, key: str) -> None:
+        head_key = self._head_key(key)
+        if self._heads.get(head_key) == key:
+            del self._heads[head_key]
+
+    async def open(self) -> None:
+        """Load the most recently used persisted entries"""
+        if self.path and self.enabled:
+            await asyncio.to_thread(self._open_db)
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await asyncio.to_thread(self._db.close)
+            self._db = None
+
+    def get(self, key: str) -> Optional[Dict]:
+        """A copy of the cached result, or None"""
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        if self._db is not None:
+            asyncio.get_running_loop().run_in_executor(None, self._touch, key)
+        return copy.deepcopy(result)
+
+    async def put(self, key: str, result: Dict) -> None:
+        if not self.enabled:
+            return
+        self.entries[key] = copy.deepcopy(result)
+        self.entries.move_to_end(key)
+        self._heads[self._head_key(key)] = key
+        evicted = []
+        while len(self.entries) > self.max_entries:
+            evicted.append(self.entries.popitem(last=False)[0])
+            self._evict(evicted[-1])
+        if self._db is not None:
+            await asyncio.to_thread(self._store, key, result, evicted)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "persistent": self._db is not None,
+        }
+
+    def _open_db(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db_lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL, used_at REAL NOT NULL)"
+            )
+            rows = self._db.execute(
+                "SELECT key, result FROM results ORDER BY used_at DESC LIMIT ?", (self.max_entries,)
+            ).fetchall()
+            # Keep the file as bounded as the LRU
+            self._db.execute(
+                "DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        for key, result in reversed(rows):
+            self.entries[key] = json.loads(result)
+            self._heads[self._head_key(key)] = key
+        logger.info(f"Loaded {len(rows)} cached identifications from {self.path}")
+
+    def _store(self, key: str, result: Dict, evicted) -> None:
+        if self._db is None:
+            return
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, result, used_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time()),
+            )
+            self._db.executemany("DELETE FROM results WHERE key = ?", [(k,) for k in evicted])
+
+    def _touch(self, key: str) -> None:
+        if self._db is None:
+            return
+        with self._db_lock, self._db:
+            self._db.execute("UPDATE results SET used_at = ? WHERE key = ?", (time.time(), key))
@@ -0,0 +1,220 @@
+"""
+In-process bird identification from an audio clip.
+
+The clip is decoded, split into 3 s windows and each window resampled;
+windows are featurised in chunks of ``batch_size`` so memory stays bounded for long
+recordings. Feature extraction runs in a worker thread, off the event loop.
+Once ``start()`` has been awaited, the model is called through a
+``MicroBatcher`` that merges the windows of concurrent requests into shared
+forward passes; without it (scripts, tests) each clip is scored on its own.
+A ``WindowGate`` drops silent, clipped and noise-only windows before they
+reach the model; they are reported as ``windows_skipped``.
+Uploads can also be identified while they arrive, see ``stream``.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import audio
+from .batcher import MicroBatcher
+from .gate import CLASSIFIER_GATE, WindowGate
+from .models import AudioModel, load_model
+from ..models.species_mapping import SPECIES_MAPPING, get_species_info
+
+logger = logging.getLogger(__name__)
+
+# No default: the bundled model is a test fixture that would turn noise into
+# sightings. Unset, identification answers 503; set it to BUNDLED_MODEL to try
+# the pipeline locally.
+CLASSIFIER_MODEL = os.getenv("CLASSIFIER_MODEL", "")
+CLASSIFIER_LABELS = os.getenv("CLASSIFIER_LABELS") or None
+CLASSIFIER_LOGITS = os.getenv("CLASSIFIER_LOGITS", "false").lower() == "true"
+CLASSIFIER_THREADS = int(os.getenv("CLASSIFIER_THREADS", "0"))
+CLASSIFIER_BATCH_SIZE = int(os.getenv("CLASSIFIER_BATCH_SIZE", "32"))
+# Windows whose best score is below this are not listed as detections
+CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.25"))
+
+
+def window_features(windows: np.ndarray, rate: int) -> np.ndarray:
+    """Log-mel features of windows cut at ``rate``"""
+    return audio.log_mel(audio.resample_windows(windows, rate))
+
+
+class AudioClassifier:
+    """Scores audio windows with an ``AudioModel`` and maps labels to ``SPECIES_MAPPING``"""
+
+    def __init__(self, model: AudioModel, batch_size: int = CLASSIFIER_BATCH_SIZE,
+                 min_confidence: float = CLASSIFIER_MIN_CONFIDENCE, gate: Optional[WindowGate] = None):
+        self.model = model
+        self.batch_size = batch_size
+        self.min_confidence = min_confidence
+        self.gate = gate
+        # Labels without a SPECIES_MAPPING entry are never reported
+        self.known = np.array([label in SPECIES_MAPPING for label in model.labels])
+        unknown = [label for label, ok in zip(model.labels, self.known) if not ok]
+        if unknown:
+            logger.warning(f"Ignoring {len(unknown)} model labels missing from SPECIES_MAPPING: {unknown[:10]}")
+        if not self.known.any():
+            raise ValueError("No model label is a SPECIES_MAPPING code")
+        self.batcher: Optional[MicroBatcher] = None
+
+    async def start(self) -> None:
+        """Route model calls through a shared micro-batcher"""
+        self.batcher = MicroBatcher(self.model.predict, max_batch=self.batch_size)
+        await self.batcher.start()
+
+    async def stop(self) -> None:
+        if self.batcher is not None:
+            await self.batcher.stop()
+            self.batcher = None
+
+    def prepare(self, windows: np.ndarray, rate: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Log-mel spectrograms of the windows that pass the gate (blocking)
+
+        Returns:
+            (features of the kept windows, boolean mask of the kept windows)
+        """
+        keep = np.ones(len(windows), dtype=bool)
+        if self.gate is not None:
+            keep = self.gate.check_samples(windows, rate)
+        if not keep.any():
+            return np.empty((0, audio.N_MELS, audio.N_FRAMES), dtype=np.float32), keep
+
+        features = window_features(windows[keep], rate)
+        if self.gate is not None:
+            tonal = self.gate.check_features(features)
+            keep[np.flatnonzero(keep)[~tonal]] = False
+            features = features[tonal]
+        return features, keep
+
+    def expand(self, scores: np.ndarray, keep: np.ndarray) -> np.ndarray:
+        """Scores of the kept windows back in window order, zero for skipped windows"""
+        full = np.zeros((len(keep), len(self.model.labels)), dtype=np.float32)
+        full[keep] = scores
+        return full
+
+    def featurize(self, data: bytes) -> Tuple[np.ndarray, np.ndarray, float]:
+        """
+        Log-mel spectrograms of the windows of a clip that pass the gate (blocking)
+
+        Returns:
+            (features shaped (n_kept, N_MELS, N_FRAMES), mask of the kept
+            windows, duration in seconds)
+
+        Raises:
+            UnsupportedAudio: the bytes are not WAV/FLAC audio
+        """
+        samples, rate = audio.decode(data)
+        windows = audio.split_windows(samples, rate)
+        if len(windows) == 0:
+            raise audio.UnsupportedAudio("audio is too short")
+
+        features, keep = [], []
+        for start in range(0, len(windows), self.batch_size):
+            batch_features, batch_keep = self.prepare(windows[start:start + self.batch_size], rate)
+            features.append(batch_features)
+            keep.append(batch_keep)
+        return np.concatenate(features), np.concatenate(keep), len(samples) / rate
+
+    def score_features(self, features: np.ndarray) -> np.ndarray:
+        """Model scores ``(n_windows, n_labels)`` in batches of ``batch_size`` (blocking)"""
+        scores = np.empty((len(features), len(self.model.labels)), dtype=np.float32)
+        for start in range(0, len(features), self.batch_size):
+            batch = features[start:start + self.batch_size]
+            scores[start:start + len(batch)] = self.model.predict(batch)
+        return scores
+
+    def classify(self, data: bytes) -> Dict:
+        """
+        Identify the most likely species in an audio clip (blocking, unbatched)
+
+        Returns:
+            Dictionary with the best species (code, names, confidence), the
+            number of windows analysed and the per-window detections
+
+        Raises:
+            UnsupportedAudio: the bytes are not WAV/FLAC audio
+        """
+        features, keep, duration_s = self.featurize(data)
+        return self.summarize(self.expand(self.score_features(features), keep), duration_s, int((~keep).sum()))
+
+    def summarize(self, scores: np.ndarray, duration_s: float, windows_skipped: int = 0) -> Dict:
+        """
+        Best species over all windows plus the per-window detections
+
+        When no window reaches ``min_confidence`` (silence, noise, every
+        window gated) nothing is identified: ``species_code`` and the names
+        are None and ``confidence`` is 0.
+        """
+        labels = self.model.labels
+        # Labels without a SPECIES_MAPPING entry never win
+        scores = np.where(self.known, scores, 0.0)
+        best_per_label = scores.max(axis=0) if len(scores) else np.zeros(len(labels), dtype=np.float32)
+        best = int(np.argmax(best_per_label))
+        if best_per_label[best] >= self.min_confidence:
+            code = labels[best]
+            info = get_species_info(code)
+            species = {
+                "species_code": code,
+                "common_name": info.get("common_name", code),
+                "scientific_name": info.get("scientific_name", "Unknown"),
+                "confidence": float(best_per_label[best]),
+            }
+        else:
+            species = {"species_code": None, "common_name": None, "scientific_name": None, "confidence": 0.0}
+
+        detections: List[Dict] = []
+        for i, window_scores in enumerate(scores):
+            top = int(np.argmax(window_scores))
+            if window_scores[top] >= self.min_confidence:
+                detections.append({
+                    "start_s": i * audio.WINDOW_S,
+                    "end_s": min((i + 1) * audio.WINDOW_S, duration_s),
+                    "species_code": labels[top],
+                    "confidence": float(window_scores[top]),
+                })
+
+        return {
+            **species,
+            "windows": len(scores),
+            "windows_skipped": windows_skipped,
+            "duration_s": round(duration_s, 3),
+            "model_version": self.model.version,
+            "detections": detections,
+        }
+
+    async def score(self, features: np.ndarray) -> np.ndarray:
+        """``score_features`` off the event loop, through the micro-batcher once started"""
+        if len(features) == 0:
+            return np.empty((0, len(self.model.labels)), dtype=np.float32)
+        if self.batcher is not None:
+            return await self.batcher.predict(features)
+        return await asyncio.to_thread(self.score_features, features)
+
+    async def identify(self, data: bytes) -> Dict:
+        """``classify`` without blocking the event loop, batched with concurrent requests"""
+        features, keep, duration_s = await asyncio.to_thread(self.featurize, data)
+        scores = self.expand(await self.score(features), keep)
+        return self.summarize(scores, duration_s, int((~keep).sum()))
+
+    def stats(self) -> Dict:
+        return {
+            "model_version": self.model.version,
+            "labels": len(self.model.labels),
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+            "gate": self.gate.stats() if self.gate is not None else None,
+        }
+
+
+def load_classifier(path: Optional[str] = None) -> AudioClassifier:
+    """Classifier for ``path``, or for ``CLASSIFIER_MODEL``, which must then be set"""
+    path = path or CLASSIFIER_MODEL
+    if not path:
+        raise RuntimeError("CLASSIFIER_MODEL is not set")
+    model = load_model(path, CLASSIFIER_LABELS, CLASSIFIER_LOGITS, CLASSIFIER_THREADS)
+    return AudioClassifier(model, gate=WindowGate() if CLASSIFIER_GATE else None)
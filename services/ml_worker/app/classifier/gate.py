@@ -0,0 +1,91 @@
+"""
+Silence and noise gate in front of the classifier.
+
+Field recordings are mostly background, and a window that cannot contain a
+call does not need a forward pass. Windows are checked in two vectorised
+stages:
+
+- on the raw samples (``check_samples``), before any feature is computed:
+  silent windows (RMS below ``min_dbfs``), clipped windows (more than
+  ``max_clipped`` of the samples at full scale) and wind-only windows (more
+  than ``max_low_ratio`` of the power below ``low_hz``, where wind rumble
+  lives and bird song does not);
+- on the log-mel spectrogram (``check_features``), before inference:
+  broadband noise such as rain or hiss. Every frame of noise is spectrally
+  flat while a call makes at least some frames peaky, so a window is noise
+  when even its ``FLATNESS_PERCENTILE`` percentile frame flatness is above
+  ``max_flatness``.
+
+Skipped windows get all-zero scores, so they never produce detections.
+Gating runs on executor threads, so the counters are updated under a lock.
+"""
+
+import os
+import threading
+from collections import Counter
+from typing import Dict
+
+import numpy as np
+
+CLASSIFIER_GATE = os.getenv("CLASSIFIER_GATE", "true").lower() == "true"
+GATE_MIN_DBFS = float(os.getenv("CLASSIFIER_GATE_MIN_DBFS", "-60"))
+GATE_MAX_CLIPPED = float(os.getenv("CLASSIFIER_GATE_MAX_CLIPPED", "0.01"))
+GATE_LOW_HZ = float(os.getenv("CLASSIFIER_GATE_LOW_HZ", "250"))
+GATE_MAX_LOW_RATIO = float(os.getenv("CLASSIFIER_GATE_MAX_LOW_RATIO", "0.95"))
+GATE_MAX_FLATNESS = float(os.getenv("CLASSIFIER_GATE_MAX_FLATNESS", "0.8"))
+
+CLIP_LEVEL = 0.999
+FLATNESS_PERCENTILE = 10
+POWER_EPS = 1e-12
+
+
+class WindowGate:
+    """Decides which windows are worth classifying and counts the others by reason"""
+
+    def __init__(self, min_dbfs: float = GATE_MIN_DBFS, max_clipped: float = GATE_MAX_CLIPPED,
+                 low_hz: float = GATE_LOW_HZ, max_low_ratio: float = GATE_MAX_LOW_RATIO,
+                 max_flatness: float = GATE_MAX_FLATNESS):
+        self.min_dbfs = min_dbfs
+        self.max_clipped = max_clipped
+        self.low_hz = low_hz
+        self.max_low_ratio = max_low_ratio
+        self.max_flatness = max_flatness
+        self.checked = 0
+        self.skipped: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def check_samples(self, windows: np.ndarray, rate: int) -> np.ndarray:
+        """Mask of the windows (n, samples) at ``rate`` that are not silent, clipped or wind-only"""
+        power = np.mean(np.square(windows, dtype=np.float64), axis=1)
+        silent = 10.0 * np.log10(power + POWER_EPS) < self.min_dbfs
+        clipped = np.mean(np.abs(windows) >= CLIP_LEVEL, axis=1) > self.max_clipped
+
+        spectrum = np.square(np.abs(np.fft.rfft(windows, axis=1)))
+        low_bins = int(self.low_hz * windows.shape[1] / rate) + 1
+        low_ratio = spectrum[:, :low_bins].sum(axis=1) / (spectrum.sum(axis=1) + POWER_EPS)
+        wind = (low_ratio > self.max_low_ratio) & ~silent
+
+        clipped &= ~silent
+        wind &= ~clipped
+        with self._lock:
+            self.checked += len(windows)
+            self.skipped.update(silent=int(silent.sum()), clipped=int(clipped.sum()), wind=int(wind.sum()))
+        return ~(silent | clipped | wind)
+
+    def check_features(self, features: np.ndarray) -> np.ndarray:
+        """Mask of the log-mel windows (n, N_MELS, N_FRAMES) that are not broadband noise"""
+        # Spectral flatness per frame: geometric over arithmetic mean of the mel powers
+        flatness = np.exp(features.mean(axis=1)) / np.exp(features).mean(axis=1)
+        noise = np.percentile(flatness, FLATNESS_PERCENTILE, axis=1) > self.max_flatness \
+            if len(features) else np.zeros(0, dtype=bool)
+        with self._lock:
+            self.skipped.update(noise=int(noise.sum()))
+        return ~noise
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "windows_checked": self.checked,
+                "windows_skipped": sum(self.skipped.values()),
+                "skipped_by_reason": dict(self.skipped),
+            }
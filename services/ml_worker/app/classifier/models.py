@@ -0,0 +1,129 @@
+"""
+Model backends for the bird classifier.
+
+Every backend takes a batch of log-mel spectrograms shaped
+``(batch, N_MELS, N_FRAMES)`` (float32) and returns one score per label in
+[0, 1], shaped ``(batch, n_labels)``. Labels are species codes from
+``SPECIES_MAPPING``.
+
+- ``.onnx``: ONNX Runtime on CPU (``onnxruntime``)
+- ``.tflite``: TensorFlow Lite (``tflite_runtime`` or ``tensorflow``)
+- ``.npz``: a linear model over the time-averaged spectrum in plain NumPy;
+  the bundled ``data/test_model.npz`` is one (see ``build_test_model``)
+
+ONNX and TFLite labels are read from a text file with one code per line,
+``<model>.labels.txt`` next to the model unless given explicitly.
+"""
+
+import logging
+import os
+from typing import List, Optional, Protocol
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_MODEL = os.path.join(os.path.dirname(__file__), "data", "test_model.npz")
+
+
+class AudioModel(Protocol):
+    labels: List[str]
+    version: str
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        ...
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def read_labels(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class NumpyLinearModel:
+    """Logistic regression over the standardised, time-averaged log-mel spectrum"""
+
+    def __init__(self, path: str):
+        with np.load(path) as data:
+            self.weights = data["weights"].astype(np.float32)   # (n_mels, n_labels)
+            self.bias = data["bias"].astype(np.float32)         # (n_labels,)
+            self.labels = [str(label) for label in data["labels"]]
+            self.version = str(data["version"])
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        spectrum = features.mean(axis=2)
+        spectrum = (spectrum - spectrum.mean(axis=1, keepdims=True)) / (spectrum.std(axis=1, keepdims=True) + 1e-6)
+        return _sigmoid(spectrum @ self.weights + self.bias)
+
+
+class OnnxModel:
+    def __init__(self, path: str, labels: List[str], logits: bool = False, threads: int = 0):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.labels = labels
+        self.logits = logits
+        self.version = os.path.basename(path)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        scores = self.session.run(None, {self.input_name: features.astype(np.float32, copy=False)})[0]
+        return _sigmoid(scores) if self.logits else scores
+
+
+class TfliteModel:
+    def __init__(self, path: str, labels: List[str], logits: bool = False, threads: Optional[int] = None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=path, num_threads=threads)
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self._batch = None
+        self.labels = labels
+        self.logits = logits
+        self.version = os.path.basename(path)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        if features.shape[0] != self._batch:
+            self.interpreter.resize_tensor_input(self.input_index, list(features.shape))
+            self.interpreter.allocate_tensors()
+            self._batch = features.shape[0]
+        self.interpreter.set_tensor(self.input_index, features.astype(np.float32, copy=False))
+        self.interpreter.invoke()
+        scores = self.interpreter.get_tensor(self.output_index)
+        return _sigmoid(scores) if self.logits else scores
+
+
+def load_model(path: str = BUNDLED_MODEL, labels_path: Optional[str] = None, logits: bool = False,
+               threads: int = 0) -> AudioModel:
+    """
+    Load a model by file extension
+
+    Args:
+        path: .onnx, .tflite or .npz file
+        labels_path: label file for ONNX/TFLite (default: <path>.labels.txt)
+        logits: the model outputs logits, apply a sigmoid
+        threads: intra-op threads for ONNX/TFLite (0 = runtime default)
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npz":
+        model = NumpyLinearModel(path)
+    else:
+        labels = read_labels(labels_path or os.path.splitext(path)[0] + ".labels.txt")
+        if extension == ".onnx":
+            model = OnnxModel(path, labels, logits, threads)
+        elif extension == ".tflite":
+            model = TfliteModel(path, labels, logits, threads or None)
+        else:
+            raise ValueError(f"Unsupported model format: {path}")
+    logger.info(f"Loaded classifier model {model.version} with {len(model.labels)} labels")
+    return model
@@ -0,0 +1,364 @@
+"""
+Streaming identification: classify an upload while it is still arriving.
+
+WAV bytes are decoded as they come in (the RIFF header is parsed
+incrementally and PCM frames are converted chunk by chunk) into a bounded
+ring buffer holding at most one window of samples. Every full window is
+popped, featurised and scored; windows of one chunk are scored together so
+they still share forward passes through the micro-batcher. As soon as a
+known species reaches ``CLASSIFIER_EARLY_EXIT_CONFIDENCE`` the analysis
+stops and the rest of the upload is never read.
+
+FLAC frames cannot be cut at arbitrary byte offsets, so FLAC uploads are
+spooled to a temporary file (in memory up to ``SPOOL_MAX_BYTES``) and then
+decoded block by block; scoring still stops early.
+
+Windows are cut at the source sample rate exactly as in
+``AudioClassifier.featurize``, so without an early exit the result equals
+``AudioClassifier.identify`` on the whole file.
+"""
+
+import asyncio
+import os
+import struct
+import tempfile
+from typing import AsyncIterable, Dict, List, Optional
+
+import numpy as np
+
+from . import audio
+from .engine import AudioClassifier
+
+# 0 disables the early exit
+CLASSIFIER_EARLY_EXIT_CONFIDENCE = float(os.getenv("CLASSIFIER_EARLY_EXIT_CONFIDENCE", "0.9")) or None
+STREAM_CHUNK_BYTES = 64 * 1024
+SPOOL_MAX_BYTES = 1024 * 1024
+# Largest accepted fmt chunk; other chunks before "data" are skipped, not buffered
+MAX_HEADER_CHUNK_BYTES = 64 * 1024
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class SampleRing:
+    """Fixed-capacity FIFO of float32 samples"""
+
+    def __init__(self, capacity: int):
+        self.buffer = np.zeros(capacity, dtype=np.float32)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def capacity(self) -> int:
+        return len(self.buffer)
+
+    def write(self, samples: np.ndarray) -> int:
+        """Append as many samples as fit; returns how many were written"""
+        n = min(len(samples), self.capacity - self.size)
+        end = (self.start + self.size) % self.capacity
+        first = min(n, self.capacity - end)
+        self.buffer[end:end + first] = samples[:first]
+        self.buffer[:n - first] = samples[first:n]
+        self.size += n
+        return n
+
+    def pop(self, n: int) -> np.ndarray:
+        """Remove and return the oldest ``n`` samples (fewer if not available)"""
+        n = min(n, self.size)
+        first = min(n, self.capacity - self.start)
+        out = np.concatenate([self.buffer[self.start:self.start + first], self.buffer[:n - first]])
+        self.start = (self.start + n) % self.capacity
+        self.size -= n
+        return out
+
+
+class WavStreamDecoder:
+    """Incremental RIFF/WAVE parser yielding mono float32 samples per fed chunk"""
+
+    def __init__(self):
+        self.rate: Optional[int] = None
+        self.channels = 0
+        self.width = 0
+        self.is_float = False
+        self._header = bytearray()
+        self._checked_riff = False
+        self._skip = 0
+        self._data_left: Optional[int] = None
+        self._in_data = False
+        self._partial = b""
+
+    @property
+    def ready(self) -> bool:
+        return self._in_data
+
+    def feed(self, chunk: bytes) -> np.ndarray:
+        """
+        Samples decoded from ``chunk`` (possibly none)
+
+        Raises:
+            UnsupportedAudio: not a PCM or float WAV stream
+        """
+        if not self._in_data:
+            chunk = self._parse_header(chunk)
+            if not self._in_data:
+                return np.empty(0, dtype=np.float32)
+        if self._data_left is not None:
+            chunk = chunk[:self._data_left]
+            self._data_left -= len(chunk)
+
+        raw = self._partial + chunk
+        frame = self.channels * self.width
+        usable = len(raw) - len(raw) % frame
+        self._partial = raw[usable:]
+        samples = audio.pcm_samples(raw[:usable], self.width, self.is_float)
+        return samples.reshape(-1, self.channels).mean(axis=1)
+
+    def _parse_header(self, chunk: bytes) -> bytes:
+        """Consume header bytes; returns what is left of ``chunk`` once the data chunk starts"""
+        if self._skip:
+            skipped = min(self._skip, len(chunk))
+            self._skip -= skipped
+            chunk = chunk[skipped:]
+        self._header += chunk
+
+        if not self._checked_riff:
+            if len(self._header) < 12:
+                return b""
+            if self._header[:4] != b"RIFF" or self._header[8:12] != b"WAVE":
+                raise audio.UnsupportedAudio("audio must be WAV or FLAC")
+            del self._header[:12]
+            self._checked_riff = True
+
+        while not self._skip and len(self._header) >= 8:
+            chunk_id, size = struct.unpack("<4sI", self._header[:8])
+            padded = size + (size & 1)
+            if chunk_id == b"data":
+                if self.rate is None:
+                    raise audio.UnsupportedAudio("WAV data chunk before fmt chunk")
+                # Streaming writers leave the size at 0 or 0xFFFFFFFF
+                self._data_left = size if 0 < size < 0xFFFFFFFF else None
+                self._in_data = True
+                rest = bytes(self._header[8:])
+                self._header.clear()
+                return rest
+            if chunk_id == b"fmt ":
+                if size > MAX_HEADER_CHUNK_BYTES:
+                    raise audio.UnsupportedAudio("WAV fmt chunk is too large")
+                if len(self._header) < 8 + padded:
+                    return b""
+                self._parse_fmt(bytes(self._header[8:8 + size]))
+                del self._header[:8 + padded]
+            elif len(self._header) >= 8 + padded:
+                del self._header[:8 + padded]
+            else:
+                # Metadata (LIST, cover art...) is skipped without being buffered
+                self._skip = 8 + padded - len(self._header)
+                self._header.clear()
+        return b""
+
+    def _parse_fmt(self, fmt: bytes) -> None:
+        if len(fmt) < 16:
+            raise audio.UnsupportedAudio("truncated WAV fmt chunk")
+        tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+        if tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            tag = struct.unpack("<H", fmt[24:26])[0]
+        width = bits // 8
+        if tag == WAVE_FORMAT_PCM and width in (1, 2, 3, 4):
+            self.is_float = False
+        elif tag == WAVE_FORMAT_IEEE_FLOAT and width in (4, 8):
+            self.is_float = True
+        else:
+            raise audio.UnsupportedAudio(f"unsupported WAV encoding (format {tag:#06x}, {bits} bits)")
+        if channels < 1 or rate <= 0:
+            raise audio.UnsupportedAudio("invalid WAV fmt chunk")
+        self.channels, self.rate, self.width = channels, rate, width
+
+
+class StreamingIdentification:
+    """
+    Identification of one upload fed chunk by chunk
+
+    ``feed`` returns False once the result is settled (early exit); the caller
+    then stops reading and awaits ``finish``.
+    """
+
+    def __init__(self, classifier: AudioClassifier,
+                 early_exit_confidence: Optional[float] = CLASSIFIER_EARLY_EXIT_CONFIDENCE):
+        self.classifier = classifier
+        self.early_exit_confidence = early_exit_confidence
+        self.bytes_read = 0
+        self.samples_read = 0
+        self.stopped_early = False
+        self._head = b""
+        self._wav: Optional[WavStreamDecoder] = None
+        self._spool: Optional[tempfile.SpooledTemporaryFile] = None
+        self._rate: Optional[int] = None
+        self._window = 0
+        self._ring: Optional[SampleRing] = None
+        self._pending: List[np.ndarray] = []
+        self._scores: List[np.ndarray] = []
+        self._windows_scored = 0
+        self._windows_skipped = 0
+
+    async def feed(self, chunk: bytes) -> bool:
+        """
+        Process the next bytes of the upload
+
+        Returns:
+            Whether more bytes are wanted
+
+        Raises:
+            UnsupportedAudio: the upload is not WAV/FLAC audio
+        """
+        if self.stopped_early or not chunk:
+            return not self.stopped_early
+        self.bytes_read += len(chunk)
+
+        if self._wav is None and self._spool is None:
+            self._head += chunk
+            if len(self._head) < 12:
+                return True
+            chunk, self._head = self._head, b""
+            if chunk[:4] == b"fLaC":
+                self._spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+            else:
+                self._wav = WavStreamDecoder()
+
+        if self._spool is not None:
+            await asyncio.to_thread(self._spool.write, chunk)
+            return True
+
+        samples = self._wav.feed(chunk)
+        if not self._wav.ready:
+            return True
+        if self._ring is None:
+            self._set_rate(self._wav.rate)
+        await self._consume(samples)
+        return not self.stopped_early
+
+    async def finish(self) -> Dict:
+        """
+        Score the trailing partial window and summarise
+
+        Returns:
+            ``AudioClassifier.summarize`` output plus ``stopped_early`` and ``bytes_read``
+
+        Raises:
+            UnsupportedAudio: the upload is not WAV/FLAC audio or holds no samples
+        """
+        try:
+            if self._spool is not None:
+                await self._decode_spooled()
+            elif self._wav is None:
+                if not self._head:
+                    raise audio.EmptyAudio("empty upload")
+                raise audio.UnsupportedAudio("audio must be WAV or FLAC")
+            elif not self._wav.ready:
+                raise audio.UnsupportedAudio("truncated WAV header")
+        finally:
+            if self._spool is not None:
+                self._spool.close()
+
+        if not self.stopped_early and self._ring is not None:
+            rest = len(self._ring)
+            if audio.keep_partial(rest, self._rate, self._windows_scored + len(self._pending)):
+                window = np.zeros(self._window, dtype=np.float32)
+                window[:rest] = self._ring.pop(rest)
+                self._pending.append(window)
+            await self._score_pending()
+
+        if self.samples_read == 0:
+            raise audio.UnsupportedAudio("audio contains no samples")
+        if not self._scores:
+            raise audio.UnsupportedAudio("audio is too short")
+
+        result = self.classifier.summarize(np.concatenate(self._scores), self.samples_read / self._rate,
+                                           self._windows_skipped)
+        result["stopped_early"] = self.stopped_early
+        result["bytes_read"] = self.bytes_read
+        return result
+
+    def _set_rate(self, rate: int) -> None:
+        self._rate = rate
+        self._window = audio.window_length(rate)
+        self._ring = SampleRing(self._window)
+
+    async def _consume(self, samples: np.ndarray) -> None:
+        """Push samples through the ring, scoring at most ``batch_size`` windows at a time"""
+        step = self._window * self.classifier.batch_size
+        for start in range(0, len(samples), step):
+            part = samples[start:start + step]
+            self.samples_read += len(part)
+            while len(part):
+                written = self._ring.write(part)
+                part = part[written:]
+                if len(self._ring) == self._window:
+                    self._pending.append(self._ring.pop(self._window))
+            await self._score_pending()
+            if self.stopped_early:
+                return
+
+    async def _score_pending(self) -> None:
+        if not self._pending:
+            return
+        windows, self._pending = np.stack(self._pending), []
+        features, keep = await asyncio.to_thread(self.classifier.prepare, windows, self._rate)
+        scores = self.classifier.expand(await self.classifier.score(features), keep)
+        self._windows_skipped += int((~keep).sum())
+        self._scores.append(scores)
+        self._windows_scored += len(scores)
+        if self.early_exit_confidence is not None:
+            known = np.where(self.classifier.known, scores, 0.0)
+            self.stopped_early = bool((known >= self.early_exit_confidence).any())
+
+    async def _decode_spooled(self) -> None:
+        try:
+            import soundfile
+        except ImportError:
+            raise audio.UnsupportedAudio("FLAC decoding needs the 'soundfile' package")
+        self._spool.seek(0)
+        try:
+            f = await asyncio.to_thread(soundfile.SoundFile, self._spool)
+        except RuntimeError as e:
+            raise audio.UnsupportedAudio(f"cannot decode audio: {e}")
+        with f:
+            self._set_rate(f.samplerate)
+            frames = self._window * self.classifier.batch_size
+            while not self.stopped_early:
+                try:
+                    block = await asyncio.to_thread(f.read, frames, dtype="float32", always_2d=True)
+                except RuntimeError as e:
+                    raise audio.UnsupportedAudio(f"cannot decode audio: {e}")
+                if not len(block):
+                    break
+                await self._consume(block.mean(axis=1))
+
+
+async def identify_stream(classifier: AudioClassifier, chunks: AsyncIterable[bytes],
+                          early_exit_confidence: Optional[float] = CLASSIFIER_EARLY_EXIT_CONFIDENCE) -> Dict:
+    """
+    Identify the species in an audio upload as it arrives
+
+    Args:
+        classifier: the loaded classifier
+        chunks: the upload's bytes, in order
+        early_exit_confidence: stop once a known species scores this high (None: read everything)
+
+    Raises:
+        UnsupportedAudio: the upload is not WAV/FLAC audio
+    """
+    identification = StreamingIdentification(classifier, early_exit_confidence)
+    async for chunk in chunks:
+        if not await identification.feed(chunk):
+            break
+    return await identification.finish()
+
+
+async def read_upload(upload, chunk_size: int = STREAM_CHUNK_BYTES):
+    """Chunks of anything with ``async read(n)`` (``UploadFile``)"""
+    while chunk := await upload.read(chunk_size):
+        yield chunk
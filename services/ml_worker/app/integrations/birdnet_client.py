@@ -1,10 +1,12 @@
-import httpx
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import asyncio
 
 from ..services.achievements_client import AchievementsServiceClient, SightingsServiceClient
+from ..services.concurrency import ConcurrencyLimit, achievements_limit
+from ..services.detection_batches import hashed_user_id, submit_detections
+from ..services.http import ServiceHTTPClient
 from ..models.species_mapping import get_species_info
 
 logger = logging.getLogger(__name__)
@@ -15,26 +17,29 @@ class BirdNetServiceClient:
     def __init__(self, base_url: str, timeout: float = 30.0):
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
-        self.session = None
+        self.http = ServiceHTTPClient("birdnet_api", self.base_url, timeout)
+    
+    async def start(self):
+        """Open the pooled connection to the BirdNet API"""
+        await self.http.start()
+    
+    async def close(self):
+        await self.http.close()
     
     async def __aenter__(self):
-        self.session = httpx.AsyncClient(timeout=self.timeout)
+        await self.start()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.aclose()
+        await self.close()
     
     async def health_check(self) -> bool:
         """Check if BirdNet API service is healthy"""
         
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            try:
-                response = await client.get(f"{self.base_url}/health")
-                return response.status_code == 200
-            except Exception as e:
-                logger.error(f"BirdNet API health check failed: {e}")
-                return False
+        healthy = await self.http.healthy()
+        if not healthy:
+            logger.error("BirdNet API health check failed")
+        return healthy
     
     async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -47,22 +52,21 @@ class BirdNetServiceClient:
             Session data dictionary or None if not found
         """
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(f"{self.base_url}/sessions/{session_id}")
-                
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    logger.warning(f"Session {session_id} not found in BirdNet API")
-                    return None
-                else:
-                    logger.error(f"BirdNet API returned {response.status_code} for session {session_id}")
-                    return None
-                    
-            except Exception as e:
-                logger.error(f"Failed to get session {session_id} from BirdNet API: {e}")
+        try:
+            response = await self.http.get(f"/sessions/{session_id}")
+            
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404:
+                logger.warning(f"Session {session_id} not found in BirdNet API")
                 return None
+            else:
+                logger.error(f"BirdNet API returned {response.status_code} for session {session_id}")
+                return None
+                
+        except Exception as e:
+            logger.error(f"Failed to get session {session_id} from BirdNet API: {e}")
+            return None
     
     async def get_recent_sessions(self, limit: int = 10, hours_back: int = 24) -> List[Dict[str, Any]]:
         """
@@ -76,25 +80,24 @@ class BirdNetServiceClient:
             List of session dictionaries
         """
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                params = {
-                    "limit": limit,
-                    "hours_back": hours_back
-                }
-                
-                response = await client.get(f"{self.base_url}/sessions/recent", params=params)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("sessions", [])
-                else:
-                    logger.error(f"BirdNet API returned {response.status_code} for recent sessions")
-                    return []
-                    
-            except Exception as e:
-                logger.error(f"Failed to get recent sessions from BirdNet API: {e}")
+        try:
+            params = {
+                "limit": limit,
+                "hours_back": hours_back
+            }
+            
+            response = await self.http.get("/sessions/recent", params=params)
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("sessions", [])
+            else:
+                logger.error(f"BirdNet API returned {response.status_code} for recent sessions")
                 return []
+                
+        except Exception as e:
+            logger.error(f"Failed to get recent sessions from BirdNet API: {e}")
+            return []
     
     async def get_session_detections(self, session_id: str) -> List[Dict[str, Any]]:
         """
@@ -107,20 +110,19 @@ class BirdNetServiceClient:
             List of detection dictionaries
         """
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(f"{self.base_url}/sessions/{session_id}/detections")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("detections", [])
-                else:
-                    logger.error(f"BirdNet API returned {response.status_code} for session {session_id} detections")
-                    return []
-                    
-            except Exception as e:
-                logger.error(f"Failed to get detections for session {session_id}: {e}")
+        try:
+            response = await self.http.get(f"/sessions/{session_id}/detections")
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("detections", [])
+            else:
+                logger.error(f"BirdNet API returned {response.status_code} for session {session_id} detections")
                 return []
+                
+        except Exception as e:
+            logger.error(f"Failed to get detections for session {session_id}: {e}")
+            return []
     
     async def get_user_sessions(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
@@ -134,29 +136,31 @@ class BirdNetServiceClient:
             List of session dictionaries
         """
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                params = {"limit": limit}
-                response = await client.get(f"{self.base_url}/users/{user_id}/sessions", params=params)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("sessions", [])
-                else:
-                    logger.error(f"BirdNet API returned {response.status_code} for user {user_id} sessions")
-                    return []
-                    
-            except Exception as e:
-                logger.error(f"Failed to get sessions for user {user_id}: {e}")
+        try:
+            params = {"limit": limit}
+            response = await self.http.get(f"/users/{user_id}/sessions", params=params)
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("sessions", [])
+            else:
+                logger.error(f"BirdNet API returned {response.status_code} for user {user_id} sessions")
                 return []
+                
+        except Exception as e:
+            logger.error(f"Failed to get sessions for user {user_id}: {e}")
+            return []
 
 
 class BirdNetToWingedIntegrator:
     """Integrates BirdNet session data with Winged achievements and sightings"""
     
-    def __init__(self, achievements_client: AchievementsServiceClient, sightings_client: SightingsServiceClient):
+    def __init__(self, achievements_client: AchievementsServiceClient, sightings_client: SightingsServiceClient,
+                 session_limit: ConcurrencyLimit = achievements_limit):
         self.achievements_client = achievements_client
         self.sightings_client = sightings_client
+        # Sessions are processed concurrently, bounded by the achievements limit
+        self.session_limit = session_limit
     
     async def process_birdnet_session(self, session_data: Dict[str, Any], default_user_id: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -191,55 +195,38 @@ class BirdNetToWingedIntegrator:
                 "error": "Could not map BirdNet user to Winged user"
             }
         
-        # Process detections
-        sightings_created = []
-        achievements_triggered = []
-        errors = []
+        # One sighting and one achievement payload per detection with a species
+        kept = [d for d in detections if d.get("species_code")]
+        batch = await submit_detections(
+            self.sightings_client,
+            self.achievements_client,
+            [self._sighting_payload(d, winged_user_id, session_data) for d in kept],
+            [self._achievement_payload(d, winged_user_id, session_data) for d in kept]
+        )
         
-        for detection in detections:
-            try:
-                # Create sighting
-                sighting_result = await self._create_sighting_from_detection(
-                    detection, winged_user_id, session_data
-                )
-                
-                if sighting_result:
-                    sightings_created.append(sighting_result)
-                    
-                    # Process achievements for this detection
-                    achievement_result = await self._process_achievements_for_detection(
-                        detection, winged_user_id, session_data
-                    )
-                    
-                    if achievement_result:
-                        achievements_triggered.extend(achievement_result)
-                
-            except Exception as e:
-                logger.error(f"Error processing detection in session {session_id}: {e}")
-                errors.append(str(e))
+        for error in batch["errors"]:
+            logger.error(f"Error processing detection in session {session_id}: {error}")
         
         return {
             "session_id": session_id,
             "success": True,
             "winged_user_id": winged_user_id,
             "birdnet_user_id": birdnet_user_id,
-            "sightings_created": len(sightings_created),
-            "achievements_triggered": len(achievements_triggered),
+            "sightings_created": len(batch["created"]),
+            "achievements_triggered": len(batch["achievements_triggered"]),
             "unique_species_detected": len(set(d.get("species_code", "") for d in detections)),
-            "errors": errors
+            "errors": batch["errors"]
         }
     
-    async def _create_sighting_from_detection(self, detection: Dict[str, Any], user_id: int, session_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Create a Winged sighting from a BirdNet detection"""
+    def _sighting_payload(self, detection: Dict[str, Any], user_id: int, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Winged sighting for a BirdNet detection"""
         
-        species_code = detection.get("species_code")
-        if not species_code:
-            return None
+        species_code = detection["species_code"]
         
         # Get enhanced species information
         species_info = get_species_info(species_code)
         
-        sighting_data = {
+        return {
             "user_id": user_id,
             "species_code": species_code,
             "species_name": species_info.get("common_name", detection.get("species_name", "Unknown")),
@@ -256,22 +243,21 @@ class BirdNetToWingedIntegrator:
                 "source": "birdnet_api"
             }
         }
-        
-        return await self.sightings_client.create_sighting(sighting_data)
     
-    async def _process_achievements_for_detection(self, detection: Dict[str, Any], user_id: int, session_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Process achievements for a BirdNet detection"""
+    def _achievement_payload(self, detection: Dict[str, Any], user_id: int, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Achievements detection for a BirdNet detection"""
         
-        species_code = detection.get("species_code")
-        if not species_code:
-            return []
+        species_code = detection["species_code"]
         
         # Get species information for achievement processing
         species_info = get_species_info(species_code)
         
-        achievement_data = {
+        return {
             "user_id": user_id,
             "species_detected": species_code,
+            # The batch endpoint keys detections by name and time, like the sighting
+            "species_name": species_info.get("common_name", detection.get("species_name", "Unknown")),
+            "detection_time": detection.get("timestamp") or session_data.get("created_at", datetime.utcnow().isoformat()),
             "confidence": detection.get("confidence", 0.0),
             "location": {
                 "latitude": detection.get("latitude") or session_data.get("latitude"),
@@ -286,8 +272,6 @@ class BirdNetToWingedIntegrator:
                 "session_id": session_data.get("session_id")
             }
         }
-        
-        return await self.achievements_client.process_species_detection(achievement_data)
     
     def _map_birdnet_user_to_winged(self, birdnet_user_id: Optional[str], default_user_id: Optional[int]) -> Optional[int]:
         """
@@ -315,8 +299,8 @@ class BirdNetToWingedIntegrator:
                 # If not numeric, use hash-based mapping or default
                 if default_user_id:
                     return default_user_id
-                # Use a simple hash-based mapping as fallback
-                return hash(birdnet_user_id) % 10000 + 1
+                # Stable hash-based mapping as fallback
+                return hashed_user_id(birdnet_user_id)
         
         return default_user_id
     
@@ -337,25 +321,28 @@ class BirdNetToWingedIntegrator:
         total_achievements = 0
         total_errors = 0
         
-        for session in sessions:
-            try:
-                result = await self.process_birdnet_session(session, default_user_id)
-                results.append(result)
-                
-                if result.get("success"):
-                    total_sightings += result.get("sightings_created", 0)
-                    total_achievements += result.get("achievements_triggered", 0)
-                
-                total_errors += len(result.get("errors", []))
-                
-            except Exception as e:
-                logger.error(f"Failed to process session {session.get('session_id', 'unknown')}: {e}")
+        outcomes = await self.session_limit.map(
+            lambda session: self.process_birdnet_session(session, default_user_id), sessions
+        )
+        
+        for session, result in zip(sessions, outcomes):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to process session {session.get('session_id', 'unknown')}: {result}")
                 results.append({
                     "session_id": session.get("session_id", "unknown"),
                     "success": False,
-                    "error": str(e)
+                    "error": str(result)
                 })
                 total_errors += 1
+                continue
+            
+            results.append(result)
+            
+            if result.get("success"):
+                total_sightings += result.get("sightings_created", 0)
+                total_achievements += result.get("achievements_triggered", 0)
+            
+            total_errors += len(result.get("errors", []))
         
         return {
             "sessions_processed": len(sessions),
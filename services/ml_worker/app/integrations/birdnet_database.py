@@ -6,10 +6,28 @@ from datetime import datetime, timedelta
 import asyncio
 
 from ..services.achievements_client import AchievementsServiceClient, SightingsServiceClient
+from ..services.detection_batches import hashed_user_id, submit_detections
 from ..models.species_mapping import get_species_info
 
 logger = logging.getLogger(__name__)
 
+# Sessions and detections Winged has not synced yet
+UNPROCESSED = {"$or": [
+    {"winged_processed": {"$exists": False}},
+    {"winged_processed": False}
+]}
+
+# Indexes behind the sync queries: unprocessed and per-user session listings,
+# per-session detection lookups and the species statistics window
+SESSION_INDEXES = [
+    pymongo.IndexModel([("winged_processed", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)]),
+    pymongo.IndexModel([("user_id", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING)]),
+]
+DETECTION_INDEXES = [
+    pymongo.IndexModel([("session_id", pymongo.ASCENDING), ("species_code", pymongo.ASCENDING)]),
+    pymongo.IndexModel([("recorded_at", pymongo.ASCENDING)]),
+]
+
 class BirdNetDatabaseClient:
     """Client for direct MongoDB database access to BirdNet data"""
     
@@ -38,6 +56,21 @@ class BirdNetDatabaseClient:
         except Exception as e:
             logger.error(f"Failed to connect to BirdNet MongoDB: {e}")
             raise
+        
+        await self.ensure_indexes()
+    
+    async def ensure_indexes(self):
+        """
+        Create the compound indexes the sync queries rely on
+        
+        Creating an existing index is a no-op. A user without the createIndex
+        privilege only gets a warning: the queries still work, just slower.
+        """
+        try:
+            await self.sessions_collection.create_indexes(SESSION_INDEXES)
+            await self.detections_collection.create_indexes(DETECTION_INDEXES)
+        except Exception as e:
+            logger.warning(f"Could not create BirdNet MongoDB indexes: {e}")
     
     async def disconnect(self):
         """Disconnect from MongoDB"""
@@ -67,7 +100,7 @@ class BirdNetDatabaseClient:
             List of session documents
         """
         
-        if not self.sessions_collection:
+        if self.sessions_collection is None:
             raise RuntimeError("Not connected to database")
         
         try:
@@ -101,7 +134,7 @@ class BirdNetDatabaseClient:
             Dictionary with session and detections data
         """
         
-        if not self.sessions_collection or not self.detections_collection:
+        if self.sessions_collection is None or self.detections_collection is None:
             raise RuntimeError("Not connected to database")
         
         try:
@@ -146,7 +179,7 @@ class BirdNetDatabaseClient:
             List of session documents
         """
         
-        if not self.sessions_collection:
+        if self.sessions_collection is None:
             raise RuntimeError("Not connected to database")
         
         try:
@@ -178,7 +211,7 @@ class BirdNetDatabaseClient:
             winged_data: Optional data about the Winged processing
         """
         
-        if not self.sessions_collection:
+        if self.sessions_collection is None:
             raise RuntimeError("Not connected to database")
         
         try:
@@ -202,6 +235,41 @@ class BirdNetDatabaseClient:
             
         except Exception as e:
             logger.error(f"Error marking session {session_id} as processed: {e}")
+    
+    async def get_unprocessed_detections(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get a session's detections that Winged has not synced yet
+        
+        Args:
+            session_id: The session ID
+            
+        Returns:
+            List of detection documents; ``_id`` is left as stored so they
+            can be passed to ``mark_detections_processed``
+        """
+        
+        if self.detections_collection is None:
+            raise RuntimeError("Not connected to database")
+        
+        cursor = self.detections_collection.find({"session_id": session_id, **UNPROCESSED})
+        return await cursor.to_list(length=None)
+    
+    async def mark_detections_processed(self, detection_ids: List[Any]):
+        """
+        Mark detections as synced to Winged
+        
+        Args:
+            detection_ids: ``_id`` values of the detections
+        """
+        
+        if self.detections_collection is None:
+            raise RuntimeError("Not connected to database")
+        
+        if detection_ids:
+            await self.detections_collection.update_many(
+                {"_id": {"$in": detection_ids}},
+                {"$set": {"winged_processed": True}}
+            )
 
 
 class BirdNetDataSyncer:
@@ -223,42 +291,41 @@ class BirdNetDataSyncer:
             List of unprocessed session documents
         """
         
-        if not self.db_client.sessions_collection:
+        if self.db_client.sessions_collection is None:
             raise RuntimeError("Database not connected")
         
+        # One round trip: detection count and unique species are joined in
+        pipeline = [
+            {"$match": UNPROCESSED},
+            {"$sort": {"created_at": 1}},  # Oldest first
+            {"$limit": limit},
+            {"$lookup": {
+                "from": self.db_client.detections_collection_name,
+                "let": {"session_id": "$session_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$session_id", "$$session_id"]}}},
+                    {"$group": {
+                        "_id": None,
+                        "total_detections": {"$sum": 1},
+                        "species": {"$addToSet": {"$ifNull": ["$species_code", None]}}
+                    }}
+                ],
+                "as": "detection_summary"
+            }},
+            {"$addFields": {
+                "total_detections": {"$ifNull": [{"$arrayElemAt": ["$detection_summary.total_detections", 0]}, 0]},
+                "unique_species": {"$size": {"$ifNull": [{"$arrayElemAt": ["$detection_summary.species", 0]}, []]}}
+            }},
+            {"$project": {"detection_summary": 0}}
+        ]
+        
         try:
-            # Find sessions that haven't been processed by Winged
-            cursor = self.db_client.sessions_collection.find(
-                {"$or": [
-                    {"winged_processed": {"$exists": False}},
-                    {"winged_processed": False}
-                ]}
-            ).sort("created_at", 1).limit(limit)  # Oldest first
-            
-            sessions = await cursor.to_list(length=limit)
+            sessions = await self.db_client.sessions_collection.aggregate(pipeline).to_list(length=limit)
             
-            # Convert ObjectIds and add summary statistics
+            # Convert ObjectIds for JSON serialization
             for session in sessions:
                 if "_id" in session:
                     session["_id"] = str(session["_id"])
-                
-                # Add detection count for this session
-                session_id = session.get("session_id")
-                if session_id:
-                    detection_count = await self.db_client.detections_collection.count_documents(
-                        {"session_id": session_id}
-                    )
-                    session["total_detections"] = detection_count
-                    
-                    # Get unique species count
-                    species_pipeline = [
-                        {"$match": {"session_id": session_id}},
-                        {"$group": {"_id": "$species_code"}},
-                        {"$count": "unique_species"}
-                    ]
-                    
-                    species_result = await self.db_client.detections_collection.aggregate(species_pipeline).to_list(1)
-                    session["unique_species"] = species_result[0]["unique_species"] if species_result else 0
             
             return sessions
             
@@ -269,16 +336,11 @@ class BirdNetDataSyncer:
     async def get_unprocessed_sessions_count(self) -> int:
         """Get count of unprocessed sessions"""
         
-        if not self.db_client.sessions_collection:
+        if self.db_client.sessions_collection is None:
             return 0
         
         try:
-            count = await self.db_client.sessions_collection.count_documents(
-                {"$or": [
-                    {"winged_processed": {"$exists": False}},
-                    {"winged_processed": False}
-                ]}
-            )
+            count = await self.db_client.sessions_collection.count_documents(UNPROCESSED)
             return count
             
         except Exception as e:
@@ -326,6 +388,7 @@ class BirdNetDataSyncer:
                         sessions_processed += 1
                         total_sightings += result["sightings_created"]
                         species_detected.update(result["species_detected"])
+                        errors.extend({"session_id": session["session_id"], "error": error} for error in result["errors"])
                         
                         # Mark session as processed
                         await self.db_client.mark_session_processed(
@@ -337,6 +400,8 @@ class BirdNetDataSyncer:
                             }
                         )
                     else:
+                        # Partly synced sessions stay unprocessed and are picked up again
+                        total_sightings += result.get("sightings_created", 0)
                         errors.append({
                             "session_id": session["session_id"],
                             "error": result["error"]
@@ -409,6 +474,7 @@ class BirdNetDataSyncer:
                         sessions_processed += 1
                         total_sightings += result["sightings_created"]
                         species_detected.update(result["species_detected"])
+                        errors.extend(result["errors"])
                         
                         # Mark as processed
                         await self.db_client.mark_session_processed(
@@ -420,6 +486,7 @@ class BirdNetDataSyncer:
                             }
                         )
                     else:
+                        total_sightings += result.get("sightings_created", 0)
                         errors.append(result["error"])
                 
                 except Exception as e:
@@ -444,30 +511,57 @@ class BirdNetDataSyncer:
                 "error": str(e)
             }
     
+    async def sync_session(self, session: Dict[str, Any], min_confidence: float = 0.7, default_user_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Sync a session's new detections and mark the session processed
+        
+        Detections synced before are skipped, so this also picks up detections
+        added to a session that was already processed.
+        
+        Args:
+            session: Session document
+            min_confidence: Minimum confidence threshold for detections
+            default_user_id: Default Winged user ID for unmapped BirdNet users
+            
+        Returns:
+            Dictionary with the session's processing results
+        """
+        
+        result = await self._process_single_session(session, min_confidence, default_user_id)
+        
+        if result["success"]:
+            await self.db_client.mark_session_processed(
+                session["session_id"],
+                {
+                    "sightings_created": result["sightings_created"],
+                    "species_detected": result["species_detected"],
+                    "winged_user_id": result["winged_user_id"]
+                }
+            )
+        
+        return result
+    
     async def _process_single_session(self, session: Dict[str, Any], min_confidence: float, default_user_id: Optional[int]) -> Dict[str, Any]:
-        """Process a single session"""
+        """
+        Process a single session
+        
+        Only detections that are done are flagged ``winged_processed``: those
+        whose sighting was created or refused as invalid, and those filtered
+        out on purpose. Detections that failed because a service was down
+        stay unflagged for the next pass, and the session is not reported as
+        successful while any of them remain (``retry`` is set).
+        """
         
         session_id = session.get("session_id")
         if not session_id:
             return {"success": False, "error": "No session_id"}
         
-        # Get session detections
-        session_data = await self.db_client.get_session_with_detections(session_id)
+        # Get the session's detections that have not been synced yet
+        detections = await self.db_client.get_unprocessed_detections(session_id)
         
-        if not session_data or not session_data.get("detections"):
+        if not detections:
             return {"success": False, "error": "No detections found"}
         
-        detections = session_data["detections"]
-        
-        # Filter detections by confidence
-        high_confidence_detections = [
-            d for d in detections 
-            if d.get("confidence", 0) >= min_confidence
-        ]
-        
-        if not high_confidence_detections:
-            return {"success": False, "error": "No high-confidence detections"}
-        
         # Determine Winged user ID
         birdnet_user_id = session.get("user_id")
         winged_user_id = self._map_user_id(birdnet_user_id, default_user_id)
@@ -475,42 +569,53 @@ class BirdNetDataSyncer:
         if not winged_user_id:
             return {"success": False, "error": "Could not map user ID"}
         
-        # Create sightings and process achievements
-        sightings_created = 0
-        species_detected = set()
+        # Low-confidence detections and detections without a species are skipped on purpose
+        kept = [d for d in detections if d.get("confidence", 0) >= min_confidence and d.get("species_code")]
+        kept_ids = {id(d) for d in kept}
+        done = [d["_id"] for d in detections if id(d) not in kept_ids]
         
-        for detection in high_confidence_detections:
-            species_code = detection.get("species_code")
-            if not species_code:
-                continue
-            
-            # Create sighting
-            sighting_result = await self._create_sighting_from_detection(detection, winged_user_id, session)
-            if sighting_result:
-                sightings_created += 1
-                species_detected.add(species_code)
-                
-                # Process achievement
-                await self._process_achievement_for_detection(detection, winged_user_id, session)
+        if not kept:
+            await self.db_client.mark_detections_processed(done)
+            return {"success": False, "error": "No high-confidence detections"}
         
-        return {
-            "success": True,
+        # One batch of sightings and one of achievements for the whole session
+        batch = await submit_detections(
+            self.sightings_client,
+            self.achievements_client,
+            [self._sighting_payload(d, winged_user_id, session) for d in kept],
+            [self._achievement_payload(d, winged_user_id, session) for d in kept]
+        )
+        
+        for error in batch["errors"]:
+            logger.error(f"Error processing detection in session {session_id}: {error}")
+        
+        # Replayed change events and later syncs skip these detections. A
+        # created sighting is final even if its achievements failed: sending
+        # it again would duplicate the sighting.
+        done.extend(kept[i]["_id"] for i in batch["created"] + batch["rejected"])
+        await self.db_client.mark_detections_processed(done)
+        
+        unsynced = len(kept) - len(batch["created"]) - len(batch["rejected"])
+        result = {
+            "success": unsynced == 0,
             "session_id": session_id,
             "winged_user_id": winged_user_id,
-            "sightings_created": sightings_created,
-            "species_detected": list(species_detected)
+            "sightings_created": len(batch["created"]),
+            "species_detected": list({kept[i]["species_code"] for i in batch["created"]}),
+            "errors": batch["errors"]
         }
+        if unsynced:
+            result["error"] = f"{unsynced} detections not synced; retried on the next pass"
+            result["retry"] = True
+        return result
     
-    async def _create_sighting_from_detection(self, detection: Dict[str, Any], user_id: int, session: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Create a sighting from a detection"""
-        
-        species_code = detection.get("species_code")
-        if not species_code:
-            return None
+    def _sighting_payload(self, detection: Dict[str, Any], user_id: int, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Sighting for a detection"""
         
+        species_code = detection["species_code"]
         species_info = get_species_info(species_code)
         
-        sighting_data = {
+        return {
             "user_id": user_id,
             "species_code": species_code,
             "species_name": species_info.get("common_name", detection.get("species_name", "Unknown")),
@@ -527,21 +632,18 @@ class BirdNetDataSyncer:
                 "source": "birdnet_database"
             }
         }
-        
-        return await self.sightings_client.create_sighting(sighting_data)
     
-    async def _process_achievement_for_detection(self, detection: Dict[str, Any], user_id: int, session: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Process achievements for a detection"""
-        
-        species_code = detection.get("species_code")
-        if not species_code:
-            return []
+    def _achievement_payload(self, detection: Dict[str, Any], user_id: int, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Achievements detection for a detection"""
         
+        species_code = detection["species_code"]
         species_info = get_species_info(species_code)
         
-        achievement_data = {
+        return {
             "user_id": user_id,
             "species_detected": species_code,
+            "species_name": species_info.get("common_name", detection.get("species_name", "Unknown")),
+            "detection_time": detection.get("recorded_at") or session.get("created_at", datetime.utcnow().isoformat()),
             "confidence": detection.get("confidence", 0.0),
             "location": {
                 "latitude": detection.get("latitude") or session.get("latitude"),
@@ -556,8 +658,6 @@ class BirdNetDataSyncer:
                 "session_id": session.get("session_id")
             }
         }
-        
-        return await self.achievements_client.process_species_detection(achievement_data)
     
     def _map_user_id(self, birdnet_user_id: Optional[str], default_user_id: Optional[int]) -> Optional[int]:
         """Map BirdNet user ID to Winged user ID"""
@@ -570,8 +670,8 @@ class BirdNetDataSyncer:
             try:
                 return int(birdnet_user_id)
             except ValueError:
-                # Use hash-based mapping
-                return hash(birdnet_user_id) % 10000 + 1
+                # Stable hash-based mapping
+                return hashed_user_id(birdnet_user_id)
         
         return None
     
@@ -586,7 +686,7 @@ class BirdNetDataSyncer:
             Dictionary with species statistics
         """
         
-        if not self.db_client.detections_collection:
+        if self.db_client.detections_collection is None:
             return {"error": "Database not connected"}
         
         try:
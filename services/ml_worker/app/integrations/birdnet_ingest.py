@@ -0,0 +1,235 @@
+"""
+Background ingestion of new BirdNet data.
+
+``BirdNetIngestor`` tails inserts into the sessions and detections
+collections through one MongoDB change stream. Events only name a session:
+once a session has been quiet for ``BIRDNET_INGEST_SETTLE_S`` (or has been
+pending for ``BIRDNET_INGEST_MAX_WAIT_S``), ``BirdNetDataSyncer.sync_session``
+sends its not-yet-synced detections to sightings and achievements. Detections
+are flagged as they are synced, so replayed events and late detections on an
+already processed session are handled without duplicates. Detections that
+could not be synced (sightings down) stay unflagged and their session stays
+pending, so the resume token never moves past them.
+
+The resume token of the last handled event is stored in
+``BIRDNET_INGEST_STATE_COLLECTION``, and a restart resumes from there.
+Without change streams (a standalone mongod), after the token has fallen off
+the oplog, or while the stream errors, the loop polls ``winged_processed``
+flags with ``sync_unprocessed_sessions`` and retries the stream after each
+poll.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from .birdnet_database import BirdNetDataSyncer
+
+logger = logging.getLogger(__name__)
+
+BIRDNET_INGEST = os.getenv("BIRDNET_INGEST", "1") == "1"
+BIRDNET_INGEST_SETTLE_S = float(os.getenv("BIRDNET_INGEST_SETTLE_S", "2"))
+BIRDNET_INGEST_MAX_WAIT_S = float(os.getenv("BIRDNET_INGEST_MAX_WAIT_S", "10"))
+BIRDNET_INGEST_POLL_S = float(os.getenv("BIRDNET_INGEST_POLL_S", "30"))
+BIRDNET_INGEST_POLL_LIMIT = int(os.getenv("BIRDNET_INGEST_POLL_LIMIT", "50"))
+BIRDNET_INGEST_MIN_CONFIDENCE = float(os.getenv("BIRDNET_INGEST_MIN_CONFIDENCE", "0.7"))
+BIRDNET_INGEST_STATE_COLLECTION = os.getenv("BIRDNET_INGEST_STATE_COLLECTION", "winged_ingest_state")
+
+STATE_ID = "birdnet_change_stream"
+# Standalone mongod, or a server without $changeStream
+CHANGE_STREAMS_UNAVAILABLE = {40573, 40324}
+# The stored resume token can no longer be used
+RESUME_FAILED = {260, 280, 286}
+
+
+class BirdNetIngestor:
+    """Syncs new BirdNet sessions and detections as they are written"""
+
+    def __init__(self, syncer: BirdNetDataSyncer, settle_s: float = BIRDNET_INGEST_SETTLE_S,
+                 max_wait_s: float = BIRDNET_INGEST_MAX_WAIT_S, poll_s: float = BIRDNET_INGEST_POLL_S,
+                 poll_limit: int = BIRDNET_INGEST_POLL_LIMIT, min_confidence: float = BIRDNET_INGEST_MIN_CONFIDENCE,
+                 state_collection: str = BIRDNET_INGEST_STATE_COLLECTION):
+        self.syncer = syncer
+        self.db_client = syncer.db_client
+        self.settle_s = settle_s
+        self.max_wait_s = max_wait_s
+        self.poll_s = poll_s
+        self.poll_limit = poll_limit
+        self.min_confidence = min_confidence
+        self.state_collection = state_collection
+        # session_id -> (first event, last event) monotonic times
+        self.pending: Dict[str, Tuple[float, float]] = {}
+        # (resume token, session_id) of every buffered event, in stream order
+        self.events: Deque[Tuple[Any, Optional[str]]] = deque()
+        self.saved_token = None
+        self.mode = "stopped"  # change_stream | polling | stopped
+        self.counters = Counter()
+        self.last_error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Cancel the loop; buffered events are replayed from the stored token"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.mode = "stopped"
+
+    async def run(self):
+        while True:
+            retry_now = False
+            try:
+                await self.watch()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in RESUME_FAILED:
+                    # Events since the token are gone; the poll below catches up
+                    logger.warning(f"BirdNet change stream cannot resume ({e}); starting over")
+                    await self.save_token(None)
+                    retry_now = True
+                elif e.code in CHANGE_STREAMS_UNAVAILABLE:
+                    if self.mode != "polling":
+                        logger.warning("BirdNet MongoDB has no change streams; polling winged_processed flags")
+                else:
+                    logger.error(f"BirdNet change stream failed: {e}")
+                self.last_error = str(e)
+            except Exception as e:
+                logger.error(f"BirdNet change stream failed: {e}")
+                self.last_error = str(e)
+
+            self.pending.clear()
+            self.events.clear()
+            self.mode = "polling"
+            await self.poll_once()
+            if not retry_now:
+                await asyncio.sleep(self.poll_s)
+
+    async def watch(self):
+        """Consume the change stream until it fails"""
+        token = await self.load_token()
+        pipeline = [
+            {"$match": {
+                "operationType": "insert",
+                "ns.coll": {"$in": [self.db_client.sessions_collection_name, self.db_client.detections_collection_name]}
+            }},
+            {"$project": {"fullDocument.session_id": 1}}
+        ]
+        max_await_ms = max(100, int(self.settle_s * 500))
+
+        # The stream is open once inside the block, so the catch-up poll misses nothing
+        async with self.db_client.db.watch(pipeline, resume_after=token, max_await_time_ms=max_await_ms) as stream:
+            self.mode = "change_stream"
+            logger.info("Tailing BirdNet sessions and detections" + (" from stored token" if token else ""))
+            if token is None:
+                await self.poll_once()
+
+            flushed_at = time.monotonic()
+            while True:
+                change = await stream.try_next()
+                if change is not None:
+                    self.handle(change)
+                now = time.monotonic()
+                # Flush when the stream goes quiet, and at least every settle period under load
+                if change is None or now - flushed_at >= self.settle_s:
+                    await self.flush(now)
+                    flushed_at = now
+                    if not self.events and stream.resume_token is not None:
+                        # Nothing buffered: the stream's own token skips idle stretches
+                        await self.save_token(stream.resume_token)
+
+    def handle(self, change: Dict[str, Any]):
+        """Buffer one insert event under its session"""
+        session_id = (change.get("fullDocument") or {}).get("session_id")
+        now = time.monotonic()
+        if session_id:
+            first, _ = self.pending.get(session_id, (now, now))
+            self.pending[session_id] = (first, now)
+        self.events.append((change["_id"], session_id))
+        self.counters["events"] += 1
+
+    async def flush(self, now: float):
+        """Sync sessions that have settled, then store the token of the handled events"""
+        due = [session_id for session_id, (first, last) in self.pending.items()
+               if now - last >= self.settle_s or now - first >= self.max_wait_s]
+
+        for session_id in due:
+            session = await self.db_client.sessions_collection.find_one({"session_id": session_id})
+            if session is None:
+                # Detections written before their session; the session insert brings it back
+                del self.pending[session_id]
+                self.counters["sessions_not_found"] += 1
+                continue
+            try:
+                result = await self.syncer.sync_session(session, self.min_confidence)
+            except Exception as e:
+                # Left pending: retried after another settle period
+                logger.error(f"Error ingesting session {session_id}: {e}")
+                self.pending[session_id] = (now, now)
+                self.last_error = str(e)
+                self.counters["errors"] += 1
+                continue
+            self.counters["sightings_created"] += result.get("sightings_created", 0)
+            self.counters["errors"] += len(result.get("errors", []))
+            if result.get("retry"):
+                # Some detections did not reach sightings; they are still unflagged
+                logger.warning(f"Session {session_id} partly synced: {result['error']}")
+                self.pending[session_id] = (now, now)
+                self.last_error = result["error"]
+                continue
+            del self.pending[session_id]
+            self.counters["sessions_synced" if result["success"] else "sessions_skipped"] += 1
+
+        token = None
+        while self.events and self.events[0][1] not in self.pending:
+            token, _ = self.events.popleft()
+        if token is not None:
+            await self.save_token(token)
+
+    async def poll_once(self):
+        try:
+            result = await self.syncer.sync_unprocessed_sessions(limit=self.poll_limit, min_confidence=self.min_confidence)
+        except Exception as e:
+            logger.error(f"Error polling BirdNet sessions: {e}")
+            self.last_error = str(e)
+            return
+        self.counters["polls"] += 1
+        self.counters["sessions_synced"] += result.get("sessions_processed", 0)
+        self.counters["sightings_created"] += result.get("total_sightings_created", 0)
+
+    async def load_token(self):
+        state = await self.db_client.db[self.state_collection].find_one({"_id": STATE_ID})
+        self.saved_token = state.get("resume_token") if state else None
+        return self.saved_token
+
+    async def save_token(self, token):
+        if token == self.saved_token:
+            return
+        await self.db_client.db[self.state_collection].update_one(
+            {"_id": STATE_ID},
+            {"$set": {"resume_token": token, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self.saved_token = token
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "pending_sessions": len(self.pending),
+            "resumable": self.saved_token is not None,
+            "last_error": self.last_error,
+            **self.counters,
+        }
@@ -1,11 +1,12 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 import numpy as np
+import asyncio
+import hashlib
 import logging
 import os
 import tempfile
 from typing import Optional, List, Dict, Any
-import httpx
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -13,7 +14,13 @@ from pydantic import BaseModel
 from .services.achievements_client import AchievementsServiceClient, SightingsServiceClient
 from .integrations.birdnet_client import BirdNetServiceClient, BirdNetToWingedIntegrator
 from .integrations.birdnet_database import BirdNetDatabaseClient, BirdNetDataSyncer
+from .integrations.birdnet_ingest import BIRDNET_INGEST, BirdNetIngestor
 from .models.species_mapping import SPECIES_MAPPING, get_species_info
+from .classifier.audio import EmptyAudio, UnsupportedAudio
+from .classifier.cache import ContentDigest, ResultCache, sha256_upload
+from .classifier.engine import CLASSIFIER_MODEL, AudioClassifier, load_classifier
+from .classifier.stream import STREAM_CHUNK_BYTES, identify_stream, read_upload
+from .services.concurrency import achievements_limit, birdnet_limit
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -54,6 +61,12 @@ class BirdIdentificationResponse(BaseModel):
     scientific_name: Optional[str] = None
     achievements_triggered: List[str] = []
     sighting_created: bool = False
+    windows_analyzed: int = 0
+    windows_skipped: int = 0
+    stopped_early: bool = False
+    cached: bool = False
+    model_version: Optional[str] = None
+    detections: List[Dict[str, Any]] = []
 
 class HealthResponse(BaseModel):
     status: str
@@ -61,6 +74,7 @@ class HealthResponse(BaseModel):
     version: str
     timestamp: str
     dependencies: Dict[str, str]
+    circuit_breakers: Dict[str, Dict[str, Any]] = {}
 
 class BirdNetSessionRequest(BaseModel):
     session_id: str
@@ -82,19 +96,36 @@ achievements_client = None
 sightings_client = None
 birdnet_client = None
 database_client = None
+ingestor: Optional[BirdNetIngestor] = None
 integrator = None
+classifier: Optional[AudioClassifier] = None
+result_cache = ResultCache()
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize service clients on startup"""
-    global achievements_client, sightings_client, birdnet_client, database_client, integrator
+    global achievements_client, sightings_client, birdnet_client, database_client, ingestor, integrator, classifier
     
     logger.info("Initializing ML Worker Service...")
     
-    # Initialize HTTP clients
+    # Load the in-process audio classifier; without a configured model the
+    # identification endpoints answer 503 instead of guessing with the test model
+    if CLASSIFIER_MODEL:
+        try:
+            classifier = load_classifier()
+            await classifier.start()
+            await result_cache.open()
+        except Exception as e:
+            logger.error(f"Failed to load audio classifier: {e}")
+    else:
+        logger.warning("CLASSIFIER_MODEL is not set; audio identification is disabled")
+    
+    # Initialize HTTP clients (one pooled, kept-alive connection set per upstream)
     achievements_client = AchievementsServiceClient(base_url=ACHIEVEMENTS_URL)
     sightings_client = SightingsServiceClient(base_url=SIGHTINGS_URL)
     birdnet_client = BirdNetServiceClient(base_url=BIRDNET_API_URL)
+    for client in (achievements_client, sightings_client, birdnet_client):
+        await client.start()
     
     # Initialize database client if MongoDB URL is provided
     if MONGODB_URL:
@@ -106,6 +137,11 @@ async def startup_event():
         )
         await database_client.connect()
         logger.info("BirdNet database client initialized")
+        
+        # Tail new sessions and detections (falls back to flag polling)
+        if BIRDNET_INGEST:
+            ingestor = BirdNetIngestor(BirdNetDataSyncer(database_client, achievements_client, sightings_client))
+            await ingestor.start()
     else:
         logger.warning("MongoDB URL not provided - database integration disabled")
     
@@ -122,71 +158,44 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     global database_client
     
+    if ingestor:
+        await ingestor.stop()
+    
+    if classifier:
+        await classifier.stop()
+    await result_cache.close()
+    
+    for client in (achievements_client, sightings_client, birdnet_client):
+        if client:
+            await client.close()
+    
     if database_client:
         await database_client.disconnect()
     
     logger.info("ML Worker Service shutdown complete")
 
-def simulate_bird_identification(audio_data: bytes) -> Dict[str, Any]:
-    """
-    Simulate bird identification using a mock ML model
-    In production, this would use actual BirdNet or similar ML model
-    """
-    
-    # Mock species detection - in production this would be real ML inference
-    mock_species = [
-        ("RUBHUM", "Ruby-throated Hummingbird", 0.85),
-        ("AMECRO", "American Crow", 0.78),
-        ("NORCAD", "Northern Cardinal", 0.92),
-        ("BLUJAY", "Blue Jay", 0.71),
-        ("AMEGFI", "American Goldfinch", 0.88),
-        ("HOUFIN", "House Finch", 0.76),
-        ("MOUWAR", "Mourning Warbler", 0.83),
-        ("REHWOO", "Red-headed Woodpecker", 0.79)
-    ]
-    
-    # Simulate processing based on audio characteristics
-    np.random.seed(len(audio_data) % 1000)
-    species_code, common_name, base_confidence = np.random.choice(
-        len(mock_species), p=[0.15, 0.12, 0.18, 0.1, 0.15, 0.1, 0.12, 0.08]
-    )[mock_species]
-    
-    # Add some randomness to confidence
-    confidence = max(0.5, min(0.99, base_confidence + np.random.normal(0, 0.05)))
-    
-    return {
-        "species_code": species_code,
-        "common_name": common_name,
-        "confidence": confidence
-    }
-
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
     
     dependencies = {}
     
-    # Check achievements service
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{ACHIEVEMENTS_URL}/health")
-            dependencies["achievements"] = "healthy" if response.status_code == 200 else "unhealthy"
-    except Exception:
-        dependencies["achievements"] = "unavailable"
+    circuit_breakers = {}
     
-    # Check sightings service
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{SIGHTINGS_URL}/health")
-            dependencies["sightings"] = "healthy" if response.status_code == 200 else "unhealthy"
-    except Exception:
-        dependencies["sightings"] = "unavailable"
+    # Check achievements and sightings services over their pooled clients
+    for name, client in (("achievements", achievements_client), ("sightings", sightings_client)):
+        if client:
+            dependencies[name] = "healthy" if await client.health_check() else "unavailable"
+            circuit_breakers[name] = client.http.status()
+        else:
+            dependencies[name] = "not_configured"
     
     # Check BirdNet API
     try:
         if birdnet_client:
             health_status = await birdnet_client.health_check()
             dependencies["birdnet_api"] = "healthy" if health_status else "unhealthy"
+            circuit_breakers["birdnet_api"] = birdnet_client.http.status()
         else:
             dependencies["birdnet_api"] = "not_configured"
     except Exception:
@@ -207,9 +216,86 @@ async def health_check():
         service="ml_worker",
         version="1.0.0",
         timestamp=datetime.utcnow().isoformat(),
-        dependencies=dependencies
+        dependencies=dependencies,
+        circuit_breakers=circuit_breakers
     )
 
+async def _identify_chunks(chunks) -> Dict[str, Any]:
+    """Classify a streamed upload, mapping undecodable audio to 400"""
+    
+    if not classifier:
+        raise HTTPException(status_code=503, detail="Audio classifier not loaded")
+    
+    # Decode and score while the bytes arrive; stops reading once a species is certain
+    try:
+        return await identify_stream(classifier, chunks)
+    except EmptyAudio:
+        raise HTTPException(status_code=400, detail="Empty audio file")
+    except UnsupportedAudio as e:
+        raise HTTPException(status_code=400, detail=f"Unsupported audio: {e}")
+
+async def _respond_to_identification(identification: Dict[str, Any], cached: bool, user_id: Optional[int],
+                                     latitude: Optional[float], longitude: Optional[float]) -> BirdIdentificationResponse:
+    """Build the response and record the sighting and achievements for ``user_id``
+    
+    Runs once per request, for cache hits as well as fresh identifications.
+    """
+    
+    response = BirdIdentificationResponse(
+        species=identification["common_name"] or "No bird detected",
+        confidence=identification["confidence"],
+        species_code=identification["species_code"],
+        common_name=identification["common_name"],
+        scientific_name=identification["scientific_name"],
+        achievements_triggered=[],
+        sighting_created=False,
+        windows_analyzed=identification["windows"],
+        windows_skipped=identification["windows_skipped"],
+        stopped_early=identification["stopped_early"],
+        cached=cached,
+        model_version=identification["model_version"],
+        detections=identification["detections"]
+    )
+    
+    # Record a sighting and process achievements only when a species was identified
+    # (some window reached CLASSIFIER_MIN_CONFIDENCE); silence and noise record nothing
+    if user_id and identification["species_code"] and achievements_client and sightings_client:
+        try:
+            # Create sighting first
+            sighting_data = {
+                "user_id": user_id,
+                "species_code": identification["species_code"],
+                "species_name": identification["scientific_name"],
+                "common_name": identification["common_name"],
+                "confidence": identification["confidence"],
+                "latitude": latitude,
+                "longitude": longitude,
+                "recorded_at": datetime.utcnow().isoformat()
+            }
+            
+            sighting_result = await sightings_client.create_sighting(sighting_data)
+            response.sighting_created = bool(sighting_result)
+            
+            # Process achievements
+            achievement_data = {
+                "user_id": user_id,
+                "species_detected": identification["species_code"],
+                "confidence": identification["confidence"],
+                "location": {
+                    "latitude": latitude,
+                    "longitude": longitude
+                } if latitude and longitude else None
+            }
+            
+            achievements = await achievements_client.process_species_detection(achievement_data)
+            if achievements:
+                response.achievements_triggered = [ach.get("name", "Unknown") for ach in achievements]
+            
+        except Exception as e:
+            logger.warning(f"Failed to process achievements for user {user_id}: {e}")
+    
+    return response
+
 @app.post("/identify-bird", response_model=BirdIdentificationResponse)
 async def identify_bird(
     audio: UploadFile = File(...),
@@ -225,69 +311,98 @@ async def identify_bird(
         raise HTTPException(status_code=400, detail="File must be an audio file")
     
     try:
-        # Read audio data
-        audio_data = await audio.read()
-        
-        if len(audio_data) == 0:
+        first = await audio.read(STREAM_CHUNK_BYTES)
+        if not first:
             raise HTTPException(status_code=400, detail="Empty audio file")
+        await audio.seek(0)
+        head = hashlib.sha256(first).hexdigest()
+        use_cache = classifier is not None and result_cache.enabled
+        
+        # Retried and resubmitted clips are answered from the cache without decoding.
+        # Only an upload whose first chunk matches a cached one is hashed whole first.
+        identification = None
+        if use_cache and result_cache.has_head(head, classifier.model.version, latitude, longitude):
+            sha256, _ = await sha256_upload(audio)
+            identification = result_cache.get(result_cache.key(sha256, classifier.model.version,
+                                                               latitude, longitude, head))
+        cached = identification is not None
+        
+        if not cached:
+            # Read the upload in chunks instead of loading it whole, hashing it in the same pass
+            digest = ContentDigest()
+            
+            async def hashed_upload():
+                async for chunk in read_upload(audio):
+                    digest.update(chunk)
+                    yield chunk
+            
+            identification = await _identify_chunks(hashed_upload())
+            if use_cache:
+                # After an early exit the rest is hashed without decoding
+                async for chunk in read_upload(audio):
+                    digest.update(chunk)
+                cache_key = result_cache.key(digest.sha256, classifier.model.version, latitude, longitude, digest.head)
+                await result_cache.put(cache_key, identification)
         
-        # Perform bird identification
-        identification = simulate_bird_identification(audio_data)
+        return await _respond_to_identification(identification, cached, user_id, latitude, longitude)
         
-        # Get species information
-        species_info = get_species_info(identification["species_code"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in bird identification: {e}")
+        raise HTTPException(status_code=500, detail=f"Identification failed: {str(e)}")
+
+@app.post("/identify-bird/stream", response_model=BirdIdentificationResponse)
+async def identify_bird_stream(
+    request: Request,
+    user_id: Optional[int] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None
+):
+    """
+    Identify bird from a raw audio request body (audio/wav or audio/flac) as it is uploaded
+    
+    Unlike the multipart endpoint, nothing is spooled before analysis starts:
+    windows are classified while the body arrives and the rest of the body is
+    not read once a species passes CLASSIFIER_EARLY_EXIT_CONFIDENCE.
+    """
+    
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith('audio/'):
+        raise HTTPException(status_code=400, detail="Body must be audio (Content-Type audio/*)")
+    
+    try:
+        digest = ContentDigest()
         
-        response = BirdIdentificationResponse(
-            species=identification["common_name"],
-            confidence=identification["confidence"],
-            species_code=identification["species_code"],
-            common_name=species_info.get("common_name", identification["common_name"]),
-            scientific_name=species_info.get("scientific_name", "Unknown"),
-            achievements_triggered=[],
-            sighting_created=False
-        )
+        async def hashed_body():
+            async for chunk in request.stream():
+                digest.update(chunk)
+                yield chunk
         
-        # Process achievements if user_id is provided
-        if user_id and achievements_client and sightings_client:
-            try:
-                # Create sighting first
-                sighting_data = {
-                    "user_id": user_id,
-                    "species_code": identification["species_code"],
-                    "species_name": identification["common_name"],
-                    "confidence": identification["confidence"],
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "recorded_at": datetime.utcnow().isoformat()
-                }
-                
-                sighting_result = await sightings_client.create_sighting(sighting_data)
-                response.sighting_created = bool(sighting_result)
-                
-                # Process achievements
-                achievement_data = {
-                    "user_id": user_id,
-                    "species_detected": identification["species_code"],
-                    "confidence": identification["confidence"],
-                    "location": {
-                        "latitude": latitude,
-                        "longitude": longitude
-                    } if latitude and longitude else None
-                }
-                
-                achievements = await achievements_client.process_species_detection(achievement_data)
-                if achievements:
-                    response.achievements_triggered = [ach.get("name", "Unknown") for ach in achievements]
-                
-            except Exception as e:
-                logger.warning(f"Failed to process achievements for user {user_id}: {e}")
+        identification = await _identify_chunks(hashed_body())
         
-        return response
+        # Only a fully read body has a content hash; early exits are not cached
+        if not identification["stopped_early"] and result_cache.enabled:
+            cache_key = result_cache.key(digest.sha256, classifier.model.version, latitude, longitude, digest.head)
+            await result_cache.put(cache_key, identification)
         
+        return await _respond_to_identification(identification, False, user_id, latitude, longitude)
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in bird identification: {e}")
+        logger.error(f"Error in streaming bird identification: {e}")
         raise HTTPException(status_code=500, detail=f"Identification failed: {str(e)}")
 
+@app.get("/classifier/stats")
+async def classifier_stats():
+    """Model info plus batch size and queue wait histograms of the inference micro-batcher"""
+    
+    if not classifier:
+        raise HTTPException(status_code=503, detail="Audio classifier not loaded")
+    
+    return {**classifier.stats(), "cache": result_cache.stats()}
+
 @app.post("/birdnet/analyze-audio", response_model=BirdIdentificationResponse)
 async def analyze_audio_with_birdnet(
     audio: UploadFile = File(...),
@@ -306,18 +421,18 @@ async def analyze_audio_with_birdnet(
         raise HTTPException(status_code=400, detail="File must be an audio file")
     
     try:
-        # Read audio data
-        audio_data = await audio.read()
-        
-        if len(audio_data) == 0:
-            raise HTTPException(status_code=400, detail="Empty audio file")
-        
-        # Save audio to temporary file for BirdNET analysis
+        # Copy the upload to a temporary file for BirdNET analysis, chunk by chunk
+        size = 0
         with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_file.write(audio_data)
             temp_file_path = temp_file.name
+            async for chunk in read_upload(audio, STREAM_CHUNK_BYTES):
+                temp_file.write(chunk)
+                size += len(chunk)
         
         try:
+            if size == 0:
+                raise HTTPException(status_code=400, detail="Empty audio file")
+            
             # Create a session for processing via BirdNET microservice
             import uuid
             session_id = str(uuid.uuid4())
@@ -469,14 +584,16 @@ async def sync_recent_birdnet_sessions(limit: int = 10, hours_back: int = 24):
         # Get recent sessions
         sessions = await birdnet_client.get_recent_sessions(limit=limit, hours_back=hours_back)
         
+        # Sessions are processed concurrently, bounded by the achievements limit
+        outcomes = await integrator.session_limit.map(integrator.process_birdnet_session, sessions)
+        
         results = []
-        for session in sessions:
-            try:
-                result = await integrator.process_birdnet_session(session)
+        for session, result in zip(sessions, outcomes):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to process session {session.get('session_id', 'unknown')}: {result}")
+                results.append({"session_id": session.get("session_id"), "error": str(result)})
+            else:
                 results.append(result)
-            except Exception as e:
-                logger.error(f"Failed to process session {session.get('session_id', 'unknown')}: {e}")
-                results.append({"session_id": session.get("session_id"), "error": str(e)})
         
         return {
             "sessions_processed": len(results),
@@ -504,47 +621,52 @@ async def sync_user_detections_to_achievements(
         # Get recent sessions (since we don't have user mapping yet, get all recent)
         sessions = await birdnet_client.get_recent_sessions(limit=50, hours_back=hours_back)
         
+        async def process_detection(session_id: str, detection: Dict[str, Any]) -> Dict[str, Any]:
+            confidence = detection.get('confidence', 0.0)
+            
+            # Process detection for achievements
+            detection_data = {
+                "user_id": user_id,
+                "species_name": detection.get('species_name', 'Unknown'),
+                "confidence": confidence,
+                "location": {"latitude": 0.0, "longitude": 0.0},  # Default location
+                "detection_time": detection.get('detected_at', datetime.now().isoformat())
+            }
+            
+            # Send to achievements service
+            achievements = await achievements_client.process_species_detection(detection_data)
+            
+            return {
+                "session_id": session_id,
+                "species": detection.get('species_name'),
+                "confidence": confidence,
+                "achievements": achievements or []
+            }
+        
+        async def process_session(session_id: str) -> List[Any]:
+            # Get detections for this session (BirdNET limit), then fan out to achievements (achievements limit)
+            detections = await birdnet_limit.run(birdnet_client.get_session_detections, session_id)
+            detections = [d for d in detections if d.get('confidence', 0.0) >= min_confidence]
+            outcomes = await achievements_limit.map(lambda detection: process_detection(session_id, detection), detections)
+            for detection, outcome in zip(detections, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Failed to process detection {detection.get('species_name', 'Unknown')}: {outcome}")
+            return [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+        
+        session_ids = [session.get('session_id') for session in sessions if session.get('session_id')]
+        session_outcomes = await asyncio.gather(*(process_session(session_id) for session_id in session_ids),
+                                                return_exceptions=True)
+        
         processed_detections = []
         achievements_triggered = []
-        
-        for session in sessions:
-            session_id = session.get('session_id')
-            if not session_id:
+        for session_id, outcome in zip(session_ids, session_outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Failed to fetch detections for session {session_id}: {outcome}")
                 continue
-                
-            # Get detections for this session
-            detections = await birdnet_client.get_session_detections(session_id)
-            
-            for detection in detections:
-                confidence = detection.get('confidence', 0.0)
-                if confidence < min_confidence:
-                    continue
-                
-                try:
-                    # Process detection for achievements
-                    detection_data = {
-                        "user_id": user_id,
-                        "species_name": detection.get('species_name', 'Unknown'),
-                        "confidence": confidence,
-                        "location": {"latitude": 0.0, "longitude": 0.0},  # Default location
-                        "detection_time": detection.get('detected_at', datetime.now().isoformat())
-                    }
-                    
-                    # Send to achievements service
-                    achievements = await achievements_client.process_species_detection(detection_data)
-                    
-                    if achievements:
-                        achievements_triggered.extend(achievements)
-                    
-                    processed_detections.append({
-                        "session_id": session_id,
-                        "species": detection.get('species_name'),
-                        "confidence": confidence,
-                        "achievements": len(achievements) if achievements else 0
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process detection {detection.get('species_name', 'Unknown')}: {e}")
+            for processed in outcome:
+                achievements_triggered.extend(processed["achievements"])
+                processed["achievements"] = len(processed["achievements"])
+                processed_detections.append(processed)
         
         return {
             "user_id": user_id,
@@ -578,7 +700,8 @@ async def database_health():
         "mongodb_url": MONGODB_URL if MONGODB_URL else None,
         "database_name": MONGODB_DATABASE,
         "sessions_collection": SESSIONS_COLLECTION,
-        "detections_collection": DETECTIONS_COLLECTION
+        "detections_collection": DETECTIONS_COLLECTION,
+        "ingestion": ingestor.status() if ingestor else None
     }
 
 @app.get("/database/statistics")
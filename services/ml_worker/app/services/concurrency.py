@@ -0,0 +1,43 @@
+"""
+Shared caps on concurrent calls to upstream services.
+
+Sync endpoints fan out over sessions and detections. Each upstream has one
+process-wide ``ConcurrencyLimit``, so the number of in-flight calls stays
+bounded even when several syncs run at once. Limits are never nested in
+themselves: a task holding the BirdNET limit may wait for the achievements
+limit, but never for the BirdNET limit again.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Iterable, List
+
+BIRDNET_CONCURRENCY = int(os.getenv("BIRDNET_CONCURRENCY", "8"))
+ACHIEVEMENTS_CONCURRENCY = int(os.getenv("ACHIEVEMENTS_CONCURRENCY", "4"))
+
+
+class ConcurrencyLimit:
+    """At most ``limit`` calls to one upstream in flight"""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+
+    async def run(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        async with self.semaphore:
+            return await fn(*args, **kwargs)
+
+    async def map(self, fn: Callable[[Any], Awaitable[Any]], items: Iterable[Any]) -> List[Any]:
+        """
+        ``fn(item)`` for every item, at most ``limit`` at a time
+
+        Returns:
+            Results in item order; an item whose call raised has the exception
+            in its place, so callers aggregate per-item errors
+        """
+        return await asyncio.gather(*(self.run(fn, item) for item in items), return_exceptions=True)
+
+
+birdnet_limit = ConcurrencyLimit("birdnet_api", BIRDNET_CONCURRENCY)
+achievements_limit = ConcurrencyLimit("achievements", ACHIEVEMENTS_CONCURRENCY)
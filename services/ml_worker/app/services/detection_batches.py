@@ -0,0 +1,86 @@
+"""
+Batched hand-off of a session's detections to sightings and achievements.
+
+The syncers build one sighting and one achievement payload per kept
+detection, then send them with ``POST /sightings/batch`` and
+``POST /species/detect/batch`` instead of two calls per detection. A session
+larger than ``SYNC_BATCH_SIZE`` is sent in chunks. Both endpoints answer per
+item, so a rejected detection is reported by its index in the session and
+does not fail the rest.
+"""
+
+import hashlib
+import os
+from typing import Any, Dict, List
+
+from .achievements_client import AchievementsServiceClient, SightingsServiceClient
+
+# The sightings batch endpoint accepts at most 1000 items
+SYNC_BATCH_SIZE = min(int(os.getenv("SYNC_BATCH_SIZE", "500")), 1000)
+
+
+def hashed_user_id(birdnet_user_id: str, buckets: int = 10000) -> int:
+    """Winged user id for a non-numeric BirdNet user id, the same in every process"""
+    # hash() of a str is salted per process, so it would remap users on restart
+    digest = hashlib.sha256(birdnet_user_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % buckets + 1
+
+
+def _item_errors(errors: List[Dict[str, Any]]) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e.get('loc', []))}: {e.get('msg')}" for e in errors) or "invalid"
+
+
+async def submit_detections(sightings_client: SightingsServiceClient, achievements_client: AchievementsServiceClient,
+                            sightings: List[Dict[str, Any]], achievements: List[Dict[str, Any]],
+                            batch_size: int = SYNC_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Create sightings in batches, then process achievements for the ones created
+
+    Args:
+        sightings: sighting payloads, one per detection
+        achievements: achievement payloads in the same order as ``sightings``
+        batch_size: items per upstream call
+
+    Returns:
+        Dictionary with:
+            - created: indices of the detections whose sighting was created
+            - rejected: indices whose sighting was refused as invalid (a retry
+              would be refused again)
+            - achievements_triggered: achievements unlocked across all batches
+            - errors: one message per failed detection, prefixed with its index
+    """
+    created: List[int] = []
+    rejected: List[int] = []
+    triggered: List[Dict[str, Any]] = []
+    errors: List[str] = []
+
+    for start in range(0, len(sightings), batch_size):
+        chunk = range(start, min(start + batch_size, len(sightings)))
+        response = await sightings_client.create_sightings_batch([sightings[i] for i in chunk])
+        if "results" not in response:
+            errors.extend(f"detection {i}: sighting not created ({response.get('error')})" for i in chunk)
+            continue
+
+        chunk_created = []
+        for item in response["results"]:
+            index = chunk[item["index"]]
+            if item.get("status") == "invalid":
+                rejected.append(index)
+                errors.append(f"detection {index}: sighting rejected ({_item_errors(item.get('errors', []))})")
+            else:
+                chunk_created.append(index)
+        created.extend(chunk_created)
+        if not chunk_created:
+            continue
+
+        response = await achievements_client.process_species_detection_batch([achievements[i] for i in chunk_created])
+        processed = response.get("processed_detections") if response.get("success") else None
+        if processed is None:
+            errors.extend(f"detection {i}: achievements not processed ({response.get('error') or response.get('message')})"
+                          for i in chunk_created)
+            continue
+        triggered.extend(response.get("triggered_achievements", []))
+        errors.extend(f"detection {index}: achievements failed ({item.get('error')})"
+                      for index, item in zip(chunk_created, processed) if not item.get("success", True))
+
+    return {"created": created, "rejected": rejected, "achievements_triggered": triggered, "errors": errors}
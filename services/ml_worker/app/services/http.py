@@ -0,0 +1,198 @@
+"""
+Long-lived HTTP clients for the upstream services.
+
+Each upstream (achievements, sightings, BirdNet API) gets one pooled
+``httpx.AsyncClient``, opened in the startup hook and closed at shutdown,
+so session sync reuses kept-alive connections instead of paying TCP setup
+on every call.
+
+Calls go through ``ServiceHTTPClient.request``:
+
+- transient failures (transport errors, 502/503/504) are retried with full
+  jitter backoff; non-idempotent requests are only retried when the request
+  was never sent (connection and pool errors);
+- a ``CircuitBreaker`` per upstream opens after ``failure_threshold``
+  consecutive failures and fails calls fast with ``CircuitOpen`` until
+  ``reset_timeout_s`` has passed, then lets one probe through. Its state is
+  shown in ``GET /health``.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", "30"))
+HTTP_CONNECT_TIMEOUT_S = float(os.getenv("HTTP_CONNECT_TIMEOUT_S", "3"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_BASE_S = float(os.getenv("HTTP_BACKOFF_BASE_S", "0.1"))
+HTTP_BACKOFF_MAX_S = float(os.getenv("HTTP_BACKOFF_MAX_S", "2"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_S = float(os.getenv("BREAKER_RESET_S", "30"))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+# The request never reached the server, so even a POST can be resent
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpen(Exception):
+    """The upstream's circuit breaker is open; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open (one probe) -> closed"""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_timeout_s: float = BREAKER_RESET_S):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if now - self.opened_at >= self.reset_timeout_s:
+            # One probe per reset period (again if the last probe never reported back)
+            self.state = "half_open"
+            self.opened_at = now
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected_calls": self.rejected,
+            "retry_in_s": round(max(0.0, self.reset_timeout_s - (time.monotonic() - self.opened_at)), 1)
+            if self.state == "open" else None,
+        }
+
+
+class ServiceHTTPClient:
+    """One pooled connection set to an upstream service, with retries and a circuit breaker"""
+
+    def __init__(self, name: str, base_url: str, timeout: float = 10.0, retries: int = HTTP_RETRIES,
+                 breaker: Optional[CircuitBreaker] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self.transport = transport
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, HTTP_CONNECT_TIMEOUT_S)),
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+                ),
+                transport=self.transport,
+            )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def request(self, method: str, path: str, timeout: Optional[float] = None,
+                      idempotent: Optional[bool] = None, retries: Optional[int] = None, use_breaker: bool = True,
+                      **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transient failures
+
+        Args:
+            method: HTTP method
+            path: path relative to the service base URL
+            timeout: per-call timeout in seconds (default: the client's)
+            idempotent: whether 5xx responses and read errors may be retried
+                (default: by method)
+            retries: maximum retries (default: the client's)
+            use_breaker: go through the circuit breaker (health probes do not)
+            **kwargs: passed to ``httpx.AsyncClient.request``
+
+        Raises:
+            CircuitOpen: the breaker is open
+            httpx.HTTPError: the last attempt failed
+        """
+        if use_breaker and not self.breaker.allow():
+            raise CircuitOpen(f"{self.name} circuit is open")
+        if self.client is None:
+            # Scripts and tests that skip the startup hook
+            await self.start()
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        if retries is None:
+            retries = self.retries
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                retryable = isinstance(e, NOT_SENT_ERRORS) or (idempotent and isinstance(e, httpx.TransportError))
+                if not retryable or attempt >= retries:
+                    if use_breaker:
+                        self.breaker.record_failure()
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or not idempotent or attempt >= retries:
+                    if use_breaker:
+                        if response.status_code >= 500:
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.record_success()
+                    return response
+
+            # Full jitter: spreads the retries of concurrent calls
+            attempt += 1
+            await asyncio.sleep(random.uniform(0, min(HTTP_BACKOFF_MAX_S, HTTP_BACKOFF_BASE_S * 2 ** attempt)))
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def healthy(self, timeout: float = 5.0) -> bool:
+        """One unretried ``GET /health`` that bypasses the breaker"""
+        try:
+            response = await self.request("GET", "/health", timeout=timeout, retries=0, use_breaker=False)
+        except httpx.HTTPError:
+            return False
+        return response.status_code == 200
+
+    def status(self) -> Dict[str, Any]:
+        return {"base_url": self.base_url, **self.breaker.snapshot()}
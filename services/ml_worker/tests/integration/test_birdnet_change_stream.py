@@ -0,0 +1,100 @@
+"""
+Integration tests for change-stream ingestion
+
+Run against a local single-node replica set:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 &
+    mongosh --eval 'rs.initiate()'
+    BIRDNET_TEST_REPLSET_URL=mongodb://localhost:27017/?replicaSet=rs0 python -m pytest tests/integration
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.integrations.birdnet_database import BirdNetDatabaseClient, BirdNetDataSyncer
+from app.integrations.birdnet_ingest import BirdNetIngestor
+
+REPLSET_URL = os.getenv("BIRDNET_TEST_REPLSET_URL")
+
+pytestmark = pytest.mark.skipif(not REPLSET_URL, reason="BIRDNET_TEST_REPLSET_URL is not set")
+
+
+class _Sightings:
+    def __init__(self):
+        self.created = []
+
+    async def create_sightings_batch(self, sightings):
+        self.created.extend(s["species_code"] for s in sightings)
+        return {"success": True, "results": [{"index": i, "id": i, "status": "pending_achievements"}
+                                             for i in range(len(sightings))]}
+
+
+class _Achievements:
+    async def process_species_detection_batch(self, detections):
+        return {"success": True, "triggered_achievements": [],
+                "processed_detections": [{"success": True}] * len(detections)}
+
+
+async def _wait_for(condition, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+class TestChangeStreamIngestion:
+    """Test cases for tailing inserts and resuming after a restart"""
+
+    def test_new_and_late_detections_are_synced_and_resumed(self):
+        async def scenario():
+            client = BirdNetDatabaseClient(REPLSET_URL, f"birdnet_test_{uuid.uuid4().hex[:8]}")
+            await client.connect()
+            sightings = _Sightings()
+
+            def ingestor():
+                syncer = BirdNetDataSyncer(client, _Achievements(), sightings)
+                return BirdNetIngestor(syncer, settle_s=0.2, poll_s=60)
+
+            try:
+                first = ingestor()
+                await first.start()
+                await _wait_for(lambda: first.mode == "change_stream")
+
+                await client.sessions_collection.insert_one(
+                    {"session_id": "s1", "user_id": "7", "created_at": datetime.utcnow(), "latitude": 4.6}
+                )
+                await client.detections_collection.insert_many([
+                    {"session_id": "s1", "species_code": "DOWWOO", "confidence": 0.9},
+                    {"session_id": "s1", "species_code": "AMEROB", "confidence": 0.8},
+                ])
+                await _wait_for(lambda: len(sightings.created) == 2)
+                await _wait_for(lambda: first.saved_token is not None and not first.events)
+                await first.stop()
+
+                # Written while the worker is down: the stored token replays them
+                await client.detections_collection.insert_one(
+                    {"session_id": "s1", "species_code": "BLAJAY", "confidence": 0.95}
+                )
+                second = ingestor()
+                await second.start()
+                await _wait_for(lambda: len(sightings.created) == 3)
+                await second.stop()
+
+                session = await client.sessions_collection.find_one({"session_id": "s1"})
+                unsynced = await client.get_unprocessed_detections("s1")
+                return sightings.created, session["winged_processed"], unsynced, second.status()
+            finally:
+                await client.client.drop_database(client.database_name)
+                await client.disconnect()
+
+        created, processed, unsynced, status = asyncio.run(scenario())
+
+        assert sorted(created[:2]) == ["AMEROB", "DOWWOO"]
+        assert created[2] == "BLAJAY"
+        assert processed is True
+        assert unsynced == []
+        assert status.get("polls", 0) == 0
@@ -0,0 +1,85 @@
+"""
+Integration tests for the BirdNet MongoDB queries
+
+Run against a local mongod:
+
+    BIRDNET_TEST_MONGODB_URL=mongodb://localhost:27017 python -m pytest tests/integration
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.integrations.birdnet_database import BirdNetDatabaseClient, BirdNetDataSyncer
+
+MONGODB_URL = os.getenv("BIRDNET_TEST_MONGODB_URL")
+
+pytestmark = pytest.mark.skipif(not MONGODB_URL, reason="BIRDNET_TEST_MONGODB_URL is not set")
+
+
+def _run(scenario):
+    """Run ``scenario(client)`` against a throwaway database"""
+
+    async def wrapper():
+        client = BirdNetDatabaseClient(MONGODB_URL, f"birdnet_test_{uuid.uuid4().hex[:8]}")
+        await client.connect()
+        try:
+            return await scenario(client)
+        finally:
+            await client.client.drop_database(client.database_name)
+            await client.disconnect()
+
+    return asyncio.run(wrapper())
+
+
+class TestUnprocessedSessions:
+    """Test cases for the unprocessed-session aggregation"""
+
+    def test_sessions_carry_detection_counts_oldest_first(self):
+        start = datetime(2024, 5, 1)
+
+        async def scenario(client):
+            await client.sessions_collection.insert_many([
+                {"session_id": "a", "created_at": start + timedelta(hours=2)},
+                {"session_id": "b", "created_at": start, "winged_processed": False},
+                {"session_id": "c", "created_at": start + timedelta(hours=1)},
+                {"session_id": "done", "created_at": start, "winged_processed": True},
+            ])
+            await client.detections_collection.insert_many([
+                {"session_id": "a", "species_code": "DOWWOO"},
+                {"session_id": "a", "species_code": "DOWWOO"},
+                {"session_id": "a", "species_code": "AMEROB"},
+                {"session_id": "b", "species_code": "BLAJAY"},
+                {"session_id": "done", "species_code": "BLAJAY"},
+            ])
+            syncer = BirdNetDataSyncer(client, None, None)
+            sessions = await syncer.get_unprocessed_sessions(limit=10)
+            limited = await syncer.get_unprocessed_sessions(limit=2)
+            count = await syncer.get_unprocessed_sessions_count()
+            return sessions, limited, count
+
+        sessions, limited, count = _run(scenario)
+
+        assert [(s["session_id"], s["total_detections"], s["unique_species"]) for s in sessions] == [
+            ("b", 1, 1), ("c", 0, 0), ("a", 3, 2),
+        ]
+        assert all(isinstance(s["_id"], str) and "detection_summary" not in s for s in sessions)
+        assert [s["session_id"] for s in limited] == ["b", "c"]
+        assert count == 3
+
+    def test_connect_creates_the_compound_indexes(self):
+        async def scenario(client):
+            await client.ensure_indexes()  # Idempotent
+            sessions = await client.sessions_collection.index_information()
+            detections = await client.detections_collection.index_information()
+            return [i["key"] for i in sessions.values()], [i["key"] for i in detections.values()]
+
+        session_keys, detection_keys = _run(scenario)
+
+        assert [("winged_processed", 1), ("created_at", 1)] in session_keys
+        assert [("user_id", 1), ("created_at", -1)] in session_keys
+        assert [("session_id", 1), ("species_code", 1)] in detection_keys
+        assert [("recorded_at", 1)] in detection_keys
@@ -0,0 +1,186 @@
+"""
+Unit tests for the in-process audio classifier
+"""
+
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from app.classifier import audio
+from app.classifier.build_test_model import characteristic_frequencies
+from app.classifier.engine import AudioClassifier, load_classifier
+from app.classifier.models import NumpyLinearModel, BUNDLED_MODEL, load_model
+
+
+def _wav(samples, rate, width=2, channels=1):
+    data = np.repeat(np.clip(samples, -1, 1)[:, None], channels, axis=1)
+    if width == 2:
+        raw = (data * 32767).astype("<i2").tobytes()
+    else:
+        raw = (data * 2147483647).astype("<i4").tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(raw)
+    return buffer.getvalue()
+
+
+def _tone(freq, seconds, rate=44100, noise=0.05, seed=0):
+    t = np.arange(int(rate * seconds)) / rate
+    return 0.3 * np.sin(2 * np.pi * freq * t) + noise * np.random.default_rng(seed).standard_normal(len(t))
+
+
+class TestAudioFeatures:
+    """Test cases for decoding, windowing and log-mel features"""
+
+    def test_decode_wav_variants(self):
+        samples = _tone(1000, 0.5, noise=0)
+        mono, rate = audio.decode(_wav(samples, 22050))
+        stereo32, _ = audio.decode(_wav(samples, 22050, width=4, channels=2))
+
+        assert rate == 22050
+        assert np.allclose(mono, samples, atol=1e-4)
+        assert np.allclose(stereo32, samples, atol=1e-6)
+
+    def test_decode_flac(self):
+        soundfile = pytest.importorskip("soundfile")
+        samples = _tone(2000, 1.0, noise=0)
+        buffer = io.BytesIO()
+        soundfile.write(buffer, samples, 48000, format="FLAC")
+
+        decoded, rate = audio.decode(buffer.getvalue())
+
+        assert rate == 48000
+        assert np.allclose(decoded, samples, atol=1e-3)
+
+    def test_rejects_other_formats(self):
+        with pytest.raises(audio.UnsupportedAudio):
+            audio.decode(b"ID3\x04 not a wav file")
+
+    def test_resample_keeps_frequency(self):
+        resampled = audio.resample(_tone(3000, 1.0, rate=44100, noise=0), 44100)
+        spectrum = np.abs(np.fft.rfft(resampled))
+
+        assert len(resampled) == audio.SAMPLE_RATE
+        assert np.fft.rfftfreq(len(resampled), 1 / audio.SAMPLE_RATE)[spectrum.argmax()] == pytest.approx(3000, abs=2)
+
+    def test_windows_pad_the_last_partial_window(self):
+        rate = audio.SAMPLE_RATE
+        assert audio.split_windows(np.ones(int(rate * 7.5))).shape == (3, audio.WINDOW_SAMPLES)
+        assert audio.split_windows(np.ones(int(rate * 6.5))).shape == (2, audio.WINDOW_SAMPLES)
+        assert audio.split_windows(np.ones(int(rate * 0.5))).shape == (1, audio.WINDOW_SAMPLES)
+
+    def test_log_mel_peaks_at_tone(self):
+        windows = audio.split_windows(audio.resample(_tone(4000, 3.0, noise=0.01), 44100))
+
+        features = audio.log_mel(windows)
+
+        assert features.shape == (1, audio.N_MELS, audio.N_FRAMES)
+        peak = audio.mel_center_frequencies()[features[0].mean(axis=1).argmax()]
+        assert peak == pytest.approx(4000, rel=0.08)
+
+
+class TestAudioClassifier:
+    """Test cases for classification with the bundled test model"""
+
+    def test_identifies_species_of_characteristic_tone(self):
+        classifier = load_classifier(BUNDLED_MODEL)
+        code, freq = sorted(characteristic_frequencies().items())[5]
+
+        result = classifier.classify(_wav(_tone(freq, 7.5), 44100))
+
+        assert result["species_code"] == code
+        assert result["scientific_name"] != "Unknown"
+        assert result["confidence"] > 0.9
+        assert result["windows"] == 3
+        assert [d["species_code"] for d in result["detections"]] == [code] * 3
+        assert result["detections"][-1]["end_s"] == pytest.approx(7.5)
+
+    def test_noise_has_no_detections(self):
+        classifier = load_classifier(BUNDLED_MODEL)
+
+        result = classifier.classify(_wav(0.1 * np.random.default_rng(1).standard_normal(44100 * 3), 44100))
+
+        assert result["species_code"] is None
+        assert result["common_name"] is None
+        assert result["confidence"] == 0.0
+        assert result["detections"] == []
+
+    def test_silence_identifies_nothing(self):
+        classifier = load_classifier(BUNDLED_MODEL)
+
+        result = classifier.classify(_wav(np.zeros(44100 * 9), 44100))
+
+        assert result["windows"] == 3
+        assert (result["species_code"], result["scientific_name"], result["confidence"]) == (None, None, 0.0)
+
+    def test_a_model_must_be_configured(self, monkeypatch):
+        from app.classifier import engine
+        monkeypatch.setattr(engine, "CLASSIFIER_MODEL", "")
+
+        with pytest.raises(RuntimeError, match="CLASSIFIER_MODEL"):
+            load_classifier()
+
+    def test_batches_are_bounded(self):
+        """Long clips are scored in batches of batch_size windows"""
+        model = NumpyLinearModel(BUNDLED_MODEL)
+        sizes = []
+        predict = model.predict
+        model.predict = lambda features: sizes.append(len(features)) or predict(features)
+        classifier = AudioClassifier(model, batch_size=4)
+
+        classifier.classify(_wav(_tone(2000, 30.0, rate=16000), 16000))
+
+        assert sizes == [4, 4, 2]
+
+    def test_labels_outside_species_mapping_are_ignored(self):
+        model = NumpyLinearModel(BUNDLED_MODEL)
+        model.labels = ["NOTABIRD"] + model.labels[1:]
+        freq = characteristic_frequencies()[sorted(characteristic_frequencies())[0]]
+
+        result = AudioClassifier(model).classify(_wav(_tone(freq, 3.0), 44100))
+
+        assert result["species_code"] != "NOTABIRD"
+
+    def test_onnx_backend(self, tmp_path):
+        """An ONNX model with the same interface gives the same scores"""
+        onnx = pytest.importorskip("onnx")
+        pytest.importorskip("onnxruntime")
+        from onnx import TensorProto, helper, numpy_helper
+
+        reference = NumpyLinearModel(BUNDLED_MODEL)
+        graph = helper.make_graph(
+            [
+                helper.make_node("ReduceMean", ["features"], ["spectrum"], axes=[2], keepdims=0),
+                helper.make_node("ReduceMean", ["spectrum"], ["mean"], axes=[1], keepdims=1),
+                helper.make_node("Sub", ["spectrum", "mean"], ["centered"]),
+                helper.make_node("Mul", ["centered", "centered"], ["squared"]),
+                helper.make_node("ReduceMean", ["squared"], ["variance"], axes=[1], keepdims=1),
+                helper.make_node("Sqrt", ["variance"], ["std"]),
+                helper.make_node("Add", ["std", "eps"], ["std_eps"]),
+                helper.make_node("Div", ["centered", "std_eps"], ["z"]),
+                helper.make_node("MatMul", ["z", "weights"], ["projected"]),
+                helper.make_node("Add", ["projected", "bias"], ["logits"]),
+            ],
+            "linear",
+            [helper.make_tensor_value_info("features", TensorProto.FLOAT, [None, audio.N_MELS, None])],
+            [helper.make_tensor_value_info("logits", TensorProto.FLOAT, [None, len(reference.labels)])],
+            [
+                numpy_helper.from_array(reference.weights, "weights"),
+                numpy_helper.from_array(reference.bias, "bias"),
+                numpy_helper.from_array(np.array(1e-6, dtype=np.float32), "eps"),
+            ],
+        )
+        path = tmp_path / "linear.onnx"
+        onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)], ir_version=8), str(path))
+        (tmp_path / "linear.labels.txt").write_text("\n".join(reference.labels))
+
+        model = load_model(str(path), logits=True)
+        features = audio.log_mel(audio.split_windows(audio.resample(_tone(3000, 6.0), 44100)))
+
+        assert model.labels == reference.labels
+        assert np.allclose(model.predict(features), reference.predict(features), atol=1e-4)
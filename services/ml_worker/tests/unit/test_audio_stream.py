@@ -0,0 +1,141 @@
+"""
+Unit tests for streaming identification with early exit
+"""
+
+import asyncio
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from app.classifier import audio
+from app.classifier.build_test_model import characteristic_frequencies
+from app.classifier.engine import AudioClassifier
+from app.classifier.models import NumpyLinearModel, BUNDLED_MODEL
+from app.classifier.stream import SampleRing, WavStreamDecoder, identify_stream
+
+
+def _wav(samples, rate, channels=1):
+    data = np.repeat(np.clip(samples, -1, 1)[:, None], channels, axis=1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((data * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def _tone(freq, seconds, rate=44100, noise=0.05, seed=0):
+    t = np.arange(int(rate * seconds)) / rate
+    return 0.3 * np.sin(2 * np.pi * freq * t) + noise * np.random.default_rng(seed).standard_normal(len(t))
+
+
+async def _chunks(data, size, consumed=None):
+    for start in range(0, len(data), size):
+        if consumed is not None:
+            consumed.append(start + size)
+        yield data[start:start + size]
+
+
+def _counting_classifier():
+    model = NumpyLinearModel(BUNDLED_MODEL)
+    calls = []
+    predict = model.predict
+    model.predict = lambda features: calls.append(len(features)) or predict(features)
+    return AudioClassifier(model, batch_size=4), calls
+
+
+class TestStreamDecoding:
+    """Test cases for the ring buffer and the incremental WAV parser"""
+
+    def test_ring_wraps_around(self):
+        ring = SampleRing(5)
+
+        assert ring.write(np.arange(4, dtype=np.float32)) == 4
+        assert list(ring.pop(3)) == [0, 1, 2]
+        assert ring.write(np.arange(10, 20, dtype=np.float32)) == 4
+        assert list(ring.pop(10)) == [3, 10, 11, 12, 13]
+        assert len(ring) == 0
+
+    def test_wav_decoded_byte_by_byte_matches_whole_file(self):
+        samples = _tone(1500, 0.2, rate=16000)
+        data = _wav(samples, 16000, channels=2)
+        decoder = WavStreamDecoder()
+
+        decoded = np.concatenate([decoder.feed(data[i:i + 7]) for i in range(0, len(data), 7)])
+
+        assert decoder.rate == 16000
+        assert np.allclose(decoded, audio.decode(data)[0])
+
+    def test_metadata_chunks_are_skipped(self):
+        plain = _wav(_tone(1500, 0.1, rate=8000), 8000)
+        junk = b"LIST" + struct.pack("<I", 1001) + b"x" * 1001 + b"\0"
+        data = plain[:36] + junk + plain[36:]
+        decoder = WavStreamDecoder()
+
+        decoded = np.concatenate([decoder.feed(data[i:i + 100]) for i in range(0, len(data), 100)])
+
+        assert np.allclose(decoded, audio.decode(plain)[0])
+
+    def test_rejects_compressed_wav(self):
+        header = b"RIFF\0\0\0\0WAVEfmt " + struct.pack("<IHHIIHH", 16, 2, 1, 8000, 4000, 1, 4)
+
+        with pytest.raises(audio.UnsupportedAudio):
+            WavStreamDecoder().feed(header)
+
+
+class TestStreamingIdentification:
+    """Test cases for classifying uploads while they arrive"""
+
+    def test_matches_whole_file_without_early_exit(self):
+        classifier, _ = _counting_classifier()
+        code, freq = sorted(characteristic_frequencies().items())[3]
+        data = _wav(_tone(freq, 10.5), 44100)
+
+        streamed = asyncio.run(identify_stream(classifier, _chunks(data, 65536), early_exit_confidence=None))
+        whole = asyncio.run(classifier.identify(data))
+
+        assert streamed["species_code"] == whole["species_code"] == code
+        assert streamed["windows"] == whole["windows"] == 4
+        assert streamed["confidence"] == pytest.approx(whole["confidence"], abs=1e-5)
+        assert streamed["stopped_early"] is False
+        assert streamed["bytes_read"] == len(data)
+
+    def test_stops_reading_once_confident(self):
+        classifier, calls = _counting_classifier()
+        code, freq = sorted(characteristic_frequencies().items())[7]
+        data = _wav(_tone(freq, 60.0), 44100)
+        consumed = []
+
+        result = asyncio.run(identify_stream(classifier, _chunks(data, 65536, consumed), early_exit_confidence=0.9))
+
+        assert result["species_code"] == code
+        assert result["stopped_early"] is True
+        assert result["windows"] == 1
+        assert sum(calls) == 1
+        assert consumed[-1] < len(data) / 10
+
+    def test_flac_upload(self):
+        soundfile = pytest.importorskip("soundfile")
+        classifier, _ = _counting_classifier()
+        code, freq = sorted(characteristic_frequencies().items())[1]
+        buffer = io.BytesIO()
+        soundfile.write(buffer, _tone(freq, 9.0, rate=48000), 48000, format="FLAC")
+
+        result = asyncio.run(identify_stream(classifier, _chunks(buffer.getvalue(), 4096)))
+
+        assert result["species_code"] == code
+        assert result["stopped_early"] is True
+
+    def test_empty_and_invalid_uploads(self):
+        classifier, _ = _counting_classifier()
+
+        with pytest.raises(audio.EmptyAudio):
+            asyncio.run(identify_stream(classifier, _chunks(b"", 10)))
+        with pytest.raises(audio.UnsupportedAudio):
+            asyncio.run(identify_stream(classifier, _chunks(b"ID3\x04 not a wav file at all", 4)))
+        with pytest.raises(audio.UnsupportedAudio):
+            asyncio.run(identify_stream(classifier, _chunks(_wav(np.zeros(0), 8000), 10)))
@@ -0,0 +1,149 @@
+"""
+Unit tests for change-stream ingestion (tests/integration runs it against a replica set)
+"""
+
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+from app.integrations.birdnet_ingest import BirdNetIngestor
+
+
+class _StateCollection:
+    def __init__(self):
+        self.doc = None
+
+    async def find_one(self, query):
+        return self.doc
+
+    async def update_one(self, query, update, upsert=False):
+        self.doc = {"_id": query["_id"], **update["$set"]}
+
+
+class _Sessions:
+    def __init__(self, session_ids):
+        self.session_ids = set(session_ids)
+
+    async def find_one(self, query):
+        return {"session_id": query["session_id"]} if query["session_id"] in self.session_ids else None
+
+
+class _Database:
+    """Fake database without change streams, like a standalone mongod"""
+
+    def __init__(self):
+        self.state = _StateCollection()
+
+    def __getitem__(self, name):
+        return self.state
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+class _DatabaseClient:
+    sessions_collection_name = "sessions"
+    detections_collection_name = "detections"
+
+    def __init__(self, session_ids=()):
+        self.db = _Database()
+        self.sessions_collection = _Sessions(session_ids)
+
+
+class _Syncer:
+    def __init__(self, db_client, fail=()):
+        self.db_client = db_client
+        self.fail = set(fail)
+        self.synced = []
+        self.polls = 0
+        self.results = {}
+
+    async def sync_session(self, session, min_confidence=0.7, default_user_id=None):
+        if session["session_id"] in self.fail:
+            raise RuntimeError("sightings down")
+        self.synced.append(session["session_id"])
+        return self.results.get(session["session_id"], {"success": True, "sightings_created": 2, "errors": []})
+
+    async def sync_unprocessed_sessions(self, limit=50, min_confidence=0.7, default_user_id=None):
+        self.polls += 1
+        return {"sessions_processed": 1, "total_sightings_created": 3}
+
+
+def _event(n, session_id):
+    return {"_id": {"_data": f"token{n}"}, "fullDocument": {"session_id": session_id}}
+
+
+class TestFlush:
+    """Test cases for settling sessions and committing resume tokens"""
+
+    def test_settled_sessions_sync_once_and_the_token_stops_at_pending_work(self):
+        db_client = _DatabaseClient(session_ids={"a", "b"})
+        syncer = _Syncer(db_client, fail={"b"})
+        ingestor = BirdNetIngestor(syncer, settle_s=1, max_wait_s=10)
+
+        for n, session_id in enumerate(["a", "a", "b", "a"]):
+            ingestor.handle(_event(n, session_id))
+        pending_at = {session_id: times[1] for session_id, times in ingestor.pending.items()}
+
+        asyncio.run(ingestor.flush(pending_at["a"] + 0.5))
+        assert syncer.synced == [] and db_client.db.state.doc is None
+
+        asyncio.run(ingestor.flush(pending_at["a"] + 1))
+
+        assert syncer.synced == ["a"]
+        assert list(ingestor.pending) == ["b"]
+        # Event 3 is handled, but event 2 (session b) is not, so a restart replays from event 1
+        assert db_client.db.state.doc["resume_token"] == {"_data": "token1"}
+        assert ingestor.status()["sightings_created"] == 2
+        assert ingestor.status()["errors"] == 1
+
+    def test_partly_synced_session_stays_pending(self):
+        db_client = _DatabaseClient(session_ids={"a"})
+        syncer = _Syncer(db_client)
+        syncer.results = {"a": {"success": False, "retry": True, "sightings_created": 0,
+                                "error": "1 detections not synced; retried on the next pass",
+                                "errors": ["detection 0: sighting not created (connection refused)"]}}
+        ingestor = BirdNetIngestor(syncer, settle_s=0)
+
+        ingestor.handle(_event(0, "a"))
+        asyncio.run(ingestor.flush(float("inf")))
+
+        assert list(ingestor.pending) == ["a"]
+        assert db_client.db.state.doc is None
+        assert ingestor.status()["errors"] == 1
+        assert "not synced" in ingestor.status()["last_error"]
+
+    def test_detections_without_a_session_are_dropped_until_it_arrives(self):
+        db_client = _DatabaseClient()
+        ingestor = BirdNetIngestor(_Syncer(db_client), settle_s=0)
+
+        ingestor.handle(_event(0, "orphan"))
+        asyncio.run(ingestor.flush(float("inf")))
+
+        assert ingestor.pending == {}
+        assert ingestor.status()["sessions_not_found"] == 1
+        assert db_client.db.state.doc["resume_token"] == {"_data": "token0"}
+
+
+class TestFallback:
+    """Test cases for running without change streams"""
+
+    def test_standalone_mongod_falls_back_to_flag_polling(self):
+        db_client = _DatabaseClient()
+        syncer = _Syncer(db_client)
+        ingestor = BirdNetIngestor(syncer, poll_s=0.01)
+
+        async def scenario():
+            await ingestor.start()
+            await asyncio.sleep(0.1)
+            status = ingestor.status()
+            await ingestor.stop()
+            return status
+
+        status = asyncio.run(scenario())
+
+        assert status["mode"] == "polling"
+        assert syncer.polls >= 2
+        assert status["sessions_synced"] == syncer.polls
+        assert "replica sets" in status["last_error"]
+        assert ingestor.status()["mode"] == "stopped"
@@ -0,0 +1,74 @@
+"""
+Unit tests for the BirdNet MongoDB query shapes (semantics are covered in tests/integration)
+"""
+
+import asyncio
+
+from app.integrations.birdnet_database import BirdNetDatabaseClient, BirdNetDataSyncer
+
+
+class _Cursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return self.documents
+
+
+class _Collection:
+    """Fake collection that records every call"""
+
+    def __init__(self, documents=(), fail_indexes=False):
+        self.documents = list(documents)
+        self.fail_indexes = fail_indexes
+        self.calls = []
+
+    def aggregate(self, pipeline):
+        self.calls.append(("aggregate", pipeline))
+        return _Cursor(self.documents)
+
+    async def count_documents(self, query):
+        self.calls.append(("count_documents", query))
+        return 0
+
+    async def create_indexes(self, indexes):
+        self.calls.append(("create_indexes", [i.document["key"] for i in indexes]))
+        if self.fail_indexes:
+            raise PermissionError("not authorized to create indexes")
+
+
+def _client(sessions, detections):
+    client = BirdNetDatabaseClient("mongodb://unused", "birdnet")
+    client.sessions_collection, client.detections_collection = sessions, detections
+    return client
+
+
+class TestUnprocessedSessions:
+    """Test cases for fetching unprocessed sessions in one round trip"""
+
+    def test_one_aggregation_regardless_of_session_count(self):
+        sessions = _Collection([{"_id": i, "session_id": f"s{i}", "total_detections": 1, "unique_species": 1}
+                                for i in range(20)])
+        detections = _Collection()
+        syncer = BirdNetDataSyncer(_client(sessions, detections), None, None)
+
+        result = asyncio.run(syncer.get_unprocessed_sessions(limit=20))
+
+        assert len(result) == 20 and result[0]["_id"] == "0"
+        assert [name for name, _ in sessions.calls] == ["aggregate"]
+        assert detections.calls == []
+        lookup = next(stage["$lookup"] for stage in sessions.calls[0][1] if "$lookup" in stage)
+        assert lookup["from"] == "detections"
+
+
+class TestIndexes:
+    """Test cases for index management"""
+
+    def test_indexes_are_created_and_failures_only_warn(self):
+        sessions, detections = _Collection(), _Collection(fail_indexes=True)
+
+        asyncio.run(_client(sessions, detections).ensure_indexes())
+
+        assert sessions.calls == [("create_indexes", [{"winged_processed": 1, "created_at": 1},
+                                                      {"user_id": 1, "created_at": -1}])]
+        assert detections.calls == [("create_indexes", [{"session_id": 1, "species_code": 1}, {"recorded_at": 1}])]
@@ -0,0 +1,142 @@
+"""
+Unit tests for batched sighting and achievement hand-off
+"""
+
+import asyncio
+
+from app.integrations.birdnet_database import BirdNetDataSyncer
+from app.services.detection_batches import hashed_user_id, submit_detections
+
+
+class _Sightings:
+    """Fake sightings client that rejects sightings without coordinates"""
+
+    def __init__(self, down=False):
+        self.batches = []
+        self.down = down
+
+    async def create_sightings_batch(self, sightings):
+        self.batches.append(sightings)
+        if self.down:
+            return {"success": False, "error": "connection refused"}
+        results = [{"index": i, "status": "invalid", "errors": [{"loc": ["latitude"], "msg": "Field required"}]}
+                   if s.get("latitude") is None else {"index": i, "id": 100 + i, "status": "pending_achievements"}
+                   for i, s in enumerate(sightings)]
+        return {"success": True, "created": sum(1 for r in results if "id" in r), "results": results}
+
+
+class _Achievements:
+    """Fake achievements client; detections of ``fail_species`` fail individually"""
+
+    def __init__(self, fail_species=None):
+        self.batches = []
+        self.fail_species = fail_species
+
+    async def process_species_detection_batch(self, detections):
+        self.batches.append(detections)
+        processed = [{"success": False, "error": "boom"} if d["species_detected"] == self.fail_species
+                     else {"success": True} for d in detections]
+        return {"success": True, "triggered_achievements": [{"title": "First bird"}],
+                "processed_detections": processed}
+
+
+class _Database:
+    def __init__(self, detections):
+        self.detections = [dict(d, _id=i) for i, d in enumerate(detections)]
+        self.marked = []
+
+    async def get_unprocessed_detections(self, session_id):
+        return [d for d in self.detections if d["_id"] not in self.marked]
+
+    async def mark_detections_processed(self, detection_ids):
+        self.marked.extend(detection_ids)
+
+
+def _payloads(n, without_location=()):
+    sightings = [{"species_code": f"SP{i}", "latitude": None if i in without_location else 4.6} for i in range(n)]
+    return sightings, [{"species_detected": s["species_code"]} for s in sightings]
+
+
+class TestSubmitDetections:
+    """Test cases for per-item results across chunked batches"""
+
+    def test_chunks_map_item_errors_back_to_detection_indices(self):
+        sightings_client, achievements_client = _Sightings(), _Achievements(fail_species="SP4")
+        sightings, achievements = _payloads(5, without_location={1})
+
+        result = asyncio.run(submit_detections(sightings_client, achievements_client, sightings, achievements,
+                                               batch_size=3))
+
+        assert [len(b) for b in sightings_client.batches] == [3, 2]
+        assert [[d["species_detected"] for d in b] for b in achievements_client.batches] == [["SP0", "SP2"], ["SP3", "SP4"]]
+        assert result["created"] == [0, 2, 3, 4]
+        assert len(result["achievements_triggered"]) == 2
+        assert result["errors"] == [
+            "detection 1: sighting rejected (latitude: Field required)",
+            "detection 4: achievements failed (boom)",
+        ]
+
+    def test_failed_sightings_batch_is_reported_per_item(self):
+        achievements_client = _Achievements()
+        sightings, achievements = _payloads(2)
+
+        result = asyncio.run(submit_detections(_Sightings(down=True), achievements_client, sightings, achievements))
+
+        assert result["created"] == []
+        assert result["errors"] == ["detection 0: sighting not created (connection refused)",
+                                    "detection 1: sighting not created (connection refused)"]
+        assert achievements_client.batches == []
+
+
+class TestDataSyncerSession:
+    """Test cases for one session through the database syncer"""
+
+    def test_session_is_filtered_then_sent_as_one_batch(self):
+        detections = [
+            {"species_code": "DOWWOO", "confidence": 0.9, "latitude": 4.6, "longitude": -74.1},
+            {"species_code": "AMEROB", "confidence": 0.4, "latitude": 4.6, "longitude": -74.1},
+            {"confidence": 0.95},
+            {"species_code": "BLAJAY", "confidence": 0.8},
+        ]
+        sightings_client, achievements_client = _Sightings(), _Achievements()
+        database = _Database(detections)
+        syncer = BirdNetDataSyncer(database, achievements_client, sightings_client)
+
+        result = asyncio.run(syncer._process_single_session({"session_id": "s1", "user_id": "7"}, 0.7, None))
+        replay = asyncio.run(syncer._process_single_session({"session_id": "s1", "user_id": "7"}, 0.7, None))
+
+        assert [[s["species_code"] for s in b] for b in sightings_client.batches] == [["DOWWOO", "BLAJAY"]]
+        assert len(achievements_client.batches) == 1
+        assert result["success"] is True
+        assert result["sightings_created"] == 1
+        assert result["species_detected"] == ["DOWWOO"]
+        assert result["errors"] == ["detection 1: sighting rejected (latitude: Field required)"]
+        assert sorted(database.marked) == [0, 1, 2, 3]
+        assert replay == {"success": False, "error": "No detections found"}
+
+    def test_detections_are_left_unflagged_while_sightings_is_down(self):
+        detections = [
+            {"species_code": "DOWWOO", "confidence": 0.9, "latitude": 4.6, "longitude": -74.1},
+            {"species_code": "AMEROB", "confidence": 0.4, "latitude": 4.6, "longitude": -74.1},
+        ]
+        sightings_client = _Sightings(down=True)
+        database = _Database(detections)
+        syncer = BirdNetDataSyncer(database, _Achievements(), sightings_client)
+
+        outage = asyncio.run(syncer._process_single_session({"session_id": "s1", "user_id": "7"}, 0.7, None))
+        sightings_client.down = False
+        recovered = asyncio.run(syncer._process_single_session({"session_id": "s1", "user_id": "7"}, 0.7, None))
+
+        assert outage["success"] is False and outage["retry"] is True
+        assert outage["sightings_created"] == 0
+        assert [[s["species_code"] for s in b] for b in sightings_client.batches] == [["DOWWOO"], ["DOWWOO"]]
+        assert recovered["success"] is True and recovered["sightings_created"] == 1
+        assert sorted(database.marked) == [0, 1]
+
+    def test_non_numeric_users_map_to_the_same_id_in_every_process(self):
+        syncer = BirdNetDataSyncer(_Database([]), _Achievements(), _Sightings())
+
+        assert syncer._map_user_id("alice@example.org", None) == hashed_user_id("alice@example.org")
+        # sha256 is not salted per process like hash()
+        assert hashed_user_id("alice@example.org") == 3361
+        assert syncer._map_user_id("42", None) == 42
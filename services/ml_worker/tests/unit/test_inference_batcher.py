@@ -0,0 +1,170 @@
+"""
+Unit tests for the inference micro-batcher
+"""
+
+import asyncio
+import io
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from app.classifier.batcher import Histogram, MicroBatcher
+from app.classifier.engine import load_classifier
+from app.classifier.models import BUNDLED_MODEL
+
+
+class _RecordingModel:
+    """Sums each window and remembers the batch sizes it was called with"""
+
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+
+    def __call__(self, features):
+        self.calls.append(len(features))
+        self.threads.add(threading.get_ident())
+        return features.reshape(len(features), -1).sum(axis=1, keepdims=True)
+
+
+def _windows(values):
+    return np.array(values, dtype=np.float32).reshape(-1, 1, 1)
+
+
+def _tone_wav(freq, seconds=6.0, rate=44100):
+    t = np.arange(int(rate * seconds)) / rate
+    samples = 0.3 * np.sin(2 * np.pi * freq * t) + 0.05 * np.random.default_rng(0).standard_normal(len(t))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+async def _with_batcher(batcher, coro):
+    await batcher.start()
+    try:
+        return await coro
+    finally:
+        await batcher.stop()
+
+
+class TestMicroBatcher:
+    """Test cases for MicroBatcher"""
+
+    def test_concurrent_requests_share_one_forward_pass(self):
+        model = _RecordingModel()
+        batcher = MicroBatcher(model, max_batch=32, max_wait_ms=50)
+
+        async def requests():
+            return await asyncio.gather(*(batcher.predict(_windows([i, i + 0.5])) for i in range(4)))
+
+        results = asyncio.run(_with_batcher(batcher, requests()))
+
+        assert model.calls == [8]
+        assert [r[:, 0].tolist() for r in results] == [[i, i + 0.5] for i in range(4)]
+        assert batcher.batch_sizes.count == 1
+        assert batcher.queue_wait_ms.count == 4
+        assert threading.get_ident() not in model.threads
+
+    def test_batches_never_exceed_max_batch(self):
+        model = _RecordingModel()
+        batcher = MicroBatcher(model, max_batch=4, max_wait_ms=20)
+
+        async def requests():
+            return await asyncio.gather(batcher.predict(_windows(range(10))), batcher.predict(_windows([100, 101, 102])))
+
+        long, short = asyncio.run(_with_batcher(batcher, requests()))
+
+        assert max(model.calls) <= 4
+        assert sum(model.calls) == 13
+        assert long[:, 0].tolist() == list(range(10))
+        assert short[:, 0].tolist() == [100, 101, 102]
+
+    def test_lone_request_waits_at_most_max_wait(self):
+        model = _RecordingModel()
+        batcher = MicroBatcher(model, max_batch=32, max_wait_ms=20)
+
+        async def request():
+            started = time.perf_counter()
+            await batcher.predict(_windows([1]))
+            return time.perf_counter() - started
+
+        assert asyncio.run(_with_batcher(batcher, request())) < 0.5
+        assert model.calls == [1]
+
+    def test_model_errors_reach_every_request(self):
+        def failing(features):
+            raise RuntimeError("boom")
+
+        batcher = MicroBatcher(failing, max_batch=8, max_wait_ms=20)
+
+        async def requests():
+            return await asyncio.gather(batcher.predict(_windows([1])), batcher.predict(_windows([2])),
+                                        return_exceptions=True)
+
+        results = asyncio.run(_with_batcher(batcher, requests()))
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_stop_fails_queued_and_in_flight_requests(self):
+        """Requests left behind by stop() get an error instead of hanging"""
+        release = threading.Event()
+
+        def slow(features):
+            release.wait(1)
+            return features.reshape(len(features), -1).sum(axis=1, keepdims=True)
+
+        batcher = MicroBatcher(slow, max_batch=1, max_wait_ms=0)
+
+        async def run():
+            await batcher.start()
+            requests = [asyncio.ensure_future(batcher.predict(_windows([i]))) for i in range(3)]
+            await asyncio.sleep(0.05)
+            stopping = asyncio.ensure_future(batcher.stop())
+            await asyncio.sleep(0.05)
+            release.set()
+            await stopping
+            return await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), 1)
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            asyncio.run(batcher.predict(_windows([1])))
+
+    def test_histogram_snapshot(self):
+        histogram = Histogram([1, 10])
+        for value in (0.5, 3, 3, 50):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+
+        assert [b["count"] for b in snapshot["buckets"]] == [1, 3, 4]
+        assert snapshot["mean"] == pytest.approx(14.125)
+
+
+class TestBatchedClassifier:
+    """Test cases for AudioClassifier.identify with batching enabled"""
+
+    def test_batched_and_unbatched_results_match(self):
+        classifier = load_classifier(BUNDLED_MODEL)
+        clips = [_tone_wav(f) for f in (1500, 3000, 6000)]
+        expected = [classifier.classify(clip) for clip in clips]
+
+        async def run():
+            await classifier.start()
+            try:
+                return await asyncio.gather(*(classifier.identify(clip) for clip in clips)), classifier.stats()
+            finally:
+                await classifier.stop()
+
+        results, stats = asyncio.run(run())
+
+        assert [r["species_code"] for r in results] == [e["species_code"] for e in expected]
+        assert [r["confidence"] for r in results] == pytest.approx([e["confidence"] for e in expected], abs=1e-5)
+        assert stats["batching"]["batch_size"]["sum"] == 6
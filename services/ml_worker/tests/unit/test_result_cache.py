@@ -0,0 +1,182 @@
+"""
+Unit tests for the content-hash identification cache
+"""
+
+import asyncio
+import io
+import wave
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.classifier.build_test_model import characteristic_frequencies
+from app.classifier.cache import ResultCache, location_bucket
+from app.classifier.engine import load_classifier
+from app.classifier.models import BUNDLED_MODEL
+from app.classifier.stream import STREAM_CHUNK_BYTES
+
+
+def _wav(seconds=4.0, rate=22050, amplitude=0.3):
+    freq = characteristic_frequencies()[sorted(characteristic_frequencies())[2]]
+    t = np.arange(int(rate * seconds)) / rate
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((amplitude * np.sin(2 * np.pi * freq * t) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+class _Recorder:
+    def __init__(self):
+        self.sightings = []
+        self.detections = []
+
+    async def create_sighting(self, data):
+        self.sightings.append(data)
+        return {"id": len(self.sightings)}
+
+    async def process_species_detection(self, data):
+        self.detections.append(data)
+        return [{"name": "First bird"}]
+
+
+class TestResultCache:
+    """Test cases for the LRU and its persistence"""
+
+    def test_location_buckets(self):
+        assert location_bucket(None, -74.8) == "-"
+        assert location_bucket(10.96, -74.81, 0.1) == location_bucket(10.94, -74.89, 0.1)
+        assert location_bucket(10.96, -74.81, 0.1) != location_bucket(11.01, -74.81, 0.1)
+
+    def test_lru_eviction_and_copies(self):
+        async def scenario():
+            cache = ResultCache(max_entries=2, path=None)
+            for name in ("a", "b"):
+                await cache.put(name, {"species_code": name, "detections": []})
+            cache.get("a")["detections"].append("mutated")
+            await cache.put("c", {"species_code": "c", "detections": []})
+            return cache
+
+        cache = asyncio.run(scenario())
+
+        assert list(cache.entries) == ["a", "c"]
+        assert cache.entries["a"]["detections"] == []
+        assert cache.stats()["hits"] == 1
+
+    def test_persisted_entries_survive_a_restart(self, tmp_path):
+        path = str(tmp_path / "cache" / "results.sqlite")
+
+        async def first_run():
+            cache = ResultCache(max_entries=2, path=path)
+            await cache.open()
+            for name in ("a", "b", "c"):
+                await cache.put(name, {"species_code": name})
+            await cache.close()
+
+        async def second_run():
+            cache = ResultCache(max_entries=2, path=path)
+            await cache.open()
+            result = cache.get("c"), cache.get("a")
+            await cache.close()
+            return result
+
+        asyncio.run(first_run())
+
+        assert asyncio.run(second_run()) == ({"species_code": "c"}, None)
+
+
+class TestCachedIdentification:
+    """Test cases for cache hits on /identify-bird"""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        recorder = _Recorder()
+        monkeypatch.setattr(main, "classifier", load_classifier(BUNDLED_MODEL))
+        monkeypatch.setattr(main, "result_cache", ResultCache(max_entries=8, path=None))
+        monkeypatch.setattr(main, "sightings_client", recorder)
+        monkeypatch.setattr(main, "achievements_client", recorder)
+        return TestClient(main.app), recorder
+
+    def test_resubmitted_clip_is_served_from_cache_with_side_effects(self, service, monkeypatch):
+        client, recorder = service
+        clip = _wav()
+        params = {"user_id": 7, "latitude": 10.96, "longitude": -74.8}
+
+        first = client.post("/identify-bird", params=params, files={"audio": ("a.wav", clip, "audio/wav")})
+
+        async def no_inference(*args, **kwargs):
+            raise AssertionError("cache hit must not decode")
+        monkeypatch.setattr(main, "identify_stream", no_inference)
+        second = client.post("/identify-bird", params=params, files={"audio": ("b.wav", clip, "audio/wav")})
+
+        assert first.status_code == second.status_code == 200
+        assert first.json()["cached"] is False and second.json()["cached"] is True
+        assert second.json()["species_code"] == first.json()["species_code"]
+        assert second.json()["achievements_triggered"] == ["First bird"]
+        assert len(recorder.sightings) == len(recorder.detections) == 2
+
+    def test_clip_sharing_only_the_first_chunk_is_classified(self, service):
+        """A matching head only triggers the full hash; the hit needs the whole content"""
+        client, _ = service
+        clip = _wav(seconds=6.0)
+        edited = clip[:-4] + bytes(4)
+        assert len(clip) > 2 * STREAM_CHUNK_BYTES
+
+        client.post("/identify-bird", files={"audio": ("a.wav", clip, "audio/wav")})
+        second = client.post("/identify-bird", files={"audio": ("b.wav", edited, "audio/wav")})
+        third = client.post("/identify-bird", files={"audio": ("c.wav", edited, "audio/wav")})
+
+        assert [second.json()["cached"], third.json()["cached"]] == [False, True]
+        assert main.result_cache.stats()["entries"] == 2
+
+    def test_streamed_clip_is_cached_for_multipart_resubmissions(self, service):
+        client, _ = service
+        clip = _wav(amplitude=0.0)  # read to the end, so the stream endpoint caches it
+
+        client.post("/identify-bird/stream", content=clip, headers={"content-type": "audio/wav"})
+        resubmitted = client.post("/identify-bird", files={"audio": ("a.wav", clip, "audio/wav")})
+
+        assert resubmitted.json()["cached"] is True
+
+    def test_identification_is_unavailable_without_a_configured_model(self, monkeypatch):
+        recorder = _Recorder()
+        monkeypatch.setattr(main, "classifier", None)
+        monkeypatch.setattr(main, "sightings_client", recorder)
+        monkeypatch.setattr(main, "achievements_client", recorder)
+
+        response = TestClient(main.app).post("/identify-bird", params={"user_id": 7},
+                                             files={"audio": ("a.wav", _wav(), "audio/wav")})
+
+        assert response.status_code == 503
+        assert recorder.sightings == [] and recorder.detections == []
+
+    def test_location_bucket_is_part_of_the_key(self, service):
+        client, _ = service
+        clip = _wav()
+
+        client.post("/identify-bird", params={"latitude": 10.96, "longitude": -74.8},
+                    files={"audio": ("a.wav", clip, "audio/wav")})
+        elsewhere = client.post("/identify-bird", params={"latitude": 4.6, "longitude": -74.08},
+                                files={"audio": ("a.wav", clip, "audio/wav")})
+
+        assert elsewhere.json()["cached"] is False
+        assert main.result_cache.stats()["entries"] == 2
+
+    def test_no_sighting_or_achievements_without_a_detection(self, service):
+        client, recorder = service
+        silence = _wav(amplitude=0.0)
+        params = {"user_id": 7, "latitude": 10.96, "longitude": -74.8}
+
+        responses = [client.post("/identify-bird", params=params, files={"audio": ("s.wav", silence, "audio/wav")})
+                     for _ in range(2)]
+
+        assert [r.status_code for r in responses] == [200, 200]
+        assert [r.json()["cached"] for r in responses] == [False, True]
+        assert responses[0].json()["species_code"] is None
+        assert responses[0].json()["species"] == "No bird detected"
+        assert responses[0].json()["sighting_created"] is False
+        assert recorder.sightings == recorder.detections == []
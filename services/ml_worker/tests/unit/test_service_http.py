@@ -0,0 +1,124 @@
+"""
+Unit tests for the pooled upstream HTTP clients
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import http
+from app.services.achievements_client import SightingsServiceClient
+from app.services.http import CircuitBreaker, CircuitOpen, ServiceHTTPClient
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(http, "HTTP_BACKOFF_BASE_S", 0.0)
+
+
+def _client(responses, **kwargs):
+    """Client whose transport answers with ``responses`` in order (exceptions are raised)"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        response = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return httpx.Response(response, json={})
+
+    return ServiceHTTPClient("test", "http://upstream", transport=httpx.MockTransport(handler), **kwargs), calls
+
+
+class TestServiceHTTPClient:
+    """Test cases for retries and connection reuse"""
+
+    def test_idempotent_calls_are_retried(self):
+        client, calls = _client([503, 502, 200])
+
+        response = asyncio.run(client.get("/sessions/recent"))
+
+        assert response.status_code == 200
+        assert len(calls) == 3
+        assert client.breaker.state == "closed"
+
+    def test_posts_are_only_retried_when_never_sent(self):
+        client, calls = _client([503])
+        assert asyncio.run(client.post("/sightings", json={})).status_code == 503
+        assert len(calls) == 1
+
+        client, calls = _client([httpx.ReadTimeout("slow"), 201])
+        with pytest.raises(httpx.ReadTimeout):
+            asyncio.run(client.post("/sightings", json={}))
+        assert len(calls) == 1
+
+        client, calls = _client([httpx.ConnectError("refused"), 201])
+        assert asyncio.run(client.post("/sightings", json={})).status_code == 201
+        assert len(calls) == 2
+
+    def test_one_connection_pool_is_reused(self):
+        client, _ = _client([200])
+
+        async def scenario():
+            await client.start()
+            pool = client.client
+            await client.get("/a")
+            await client.get("/b")
+            same = client.client is pool
+            await client.close()
+            return same
+
+        assert asyncio.run(scenario()) is True
+        assert client.client is None
+
+    def test_service_clients_keep_their_error_handling(self):
+        sightings = SightingsServiceClient("http://sightings")
+        sightings.http, _ = _client([500])
+
+        assert asyncio.run(sightings.create_sighting({"user_id": 1})) is None
+
+
+class TestCircuitBreaker:
+    """Test cases for failing fast on a broken upstream"""
+
+    def test_opens_after_consecutive_failures_and_recovers(self, monkeypatch):
+        now = [0.0]
+        monkeypatch.setattr(http.time, "monotonic", lambda: now[0])
+        client, calls = _client([500, 500, 200], retries=0,
+                                breaker=CircuitBreaker(failure_threshold=2, reset_timeout_s=30))
+
+        asyncio.run(client.get("/a"))
+        asyncio.run(client.get("/a"))
+        with pytest.raises(CircuitOpen):
+            asyncio.run(client.get("/a"))
+        assert len(calls) == 2
+        assert client.status()["state"] == "open"
+
+        now[0] = 31.0
+        assert asyncio.run(client.get("/a")).status_code == 200
+        assert client.status() == {
+            "base_url": "http://upstream", "state": "closed", "consecutive_failures": 0,
+            "rejected_calls": 1, "retry_in_s": None,
+        }
+
+    def test_failed_probe_reopens(self, monkeypatch):
+        now = [0.0]
+        monkeypatch.setattr(http.time, "monotonic", lambda: now[0])
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=10)
+
+        breaker.record_failure()
+        now[0] = 10.0
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.record_failure()
+
+        assert breaker.snapshot()["state"] == "open"
+        assert breaker.snapshot()["retry_in_s"] == 10.0
+
+    def test_health_probes_bypass_the_breaker(self):
+        client, calls = _client([200], breaker=CircuitBreaker(failure_threshold=1))
+        client.breaker.record_failure()
+
+        assert asyncio.run(client.healthy()) is True
+        assert client.breaker.state == "open"
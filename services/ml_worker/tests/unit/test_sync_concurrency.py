@@ -0,0 +1,90 @@
+"""
+Unit tests for bounded-concurrency session sync
+"""
+
+import asyncio
+
+from app.integrations.birdnet_client import BirdNetToWingedIntegrator
+from app.services.concurrency import ConcurrencyLimit
+
+
+class _Upstream:
+    """Fake sightings/achievements client that records how many calls overlap"""
+
+    def __init__(self, fail_species=None):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_species = fail_species
+
+    async def _call(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+    async def create_sightings_batch(self, sightings):
+        await self._call()
+        results = [{"index": i, "status": "invalid", "errors": [{"loc": ["species_code"], "msg": "unknown species"}]}
+                   if s["species_code"] == self.fail_species else {"index": i, "id": i + 1, "status": "pending_achievements"}
+                   for i, s in enumerate(sightings)]
+        return {"success": True, "results": results}
+
+    async def process_species_detection_batch(self, detections):
+        await self._call()
+        return {"success": True, "triggered_achievements": [{"title": "First bird"}] * len(detections),
+                "processed_detections": [{"success": True}] * len(detections)}
+
+
+def _session(i, species="DOWWOO"):
+    return {"session_id": f"s{i}", "user_id": str(i + 1), "detections": [{"species_code": species, "confidence": 0.9}]}
+
+
+class TestConcurrencyLimit:
+    """Test cases for the semaphore-bounded map"""
+
+    def test_map_keeps_order_bounds_concurrency_and_returns_errors(self):
+        limit = ConcurrencyLimit("test", 3)
+        running = {"now": 0, "max": 0}
+
+        async def work(i):
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01 * (10 - i))
+            running["now"] -= 1
+            if i == 4:
+                raise ValueError("four")
+            return i * i
+
+        results = asyncio.run(limit.map(work, range(10)))
+
+        assert running["max"] == 3
+        assert [r for r in results if not isinstance(r, Exception)] == [i * i for i in range(10) if i != 4]
+        assert isinstance(results[4], ValueError)
+
+
+class TestProcessMultipleSessions:
+    """Test cases for concurrent session processing in the integrator"""
+
+    def test_sessions_run_concurrently_within_the_limit(self):
+        upstream = _Upstream()
+        integrator = BirdNetToWingedIntegrator(upstream, upstream, session_limit=ConcurrencyLimit("achievements", 4))
+
+        result = asyncio.run(integrator.process_multiple_sessions([_session(i) for i in range(12)]))
+
+        assert result["sessions_processed"] == 12
+        assert result["successful_sessions"] == 12
+        assert result["total_sightings_created"] == result["total_achievements_triggered"] == 12
+        assert [r["session_id"] for r in result["results"]] == [f"s{i}" for i in range(12)]
+        assert 1 < upstream.max_in_flight <= 4
+
+    def test_per_item_errors_are_aggregated(self):
+        upstream = _Upstream(fail_species="BADBIR")
+        integrator = BirdNetToWingedIntegrator(upstream, upstream, session_limit=ConcurrencyLimit("achievements", 4))
+        sessions = [_session(0), _session(1, species="BADBIR"), {"session_id": "s2", "detections": []}]
+
+        result = asyncio.run(integrator.process_multiple_sessions(sessions))
+
+        assert result["successful_sessions"] == 2
+        assert result["total_errors"] == 1
+        assert result["results"][1]["errors"] == ["detection 0: sighting rejected (species_code: unknown species)"]
+        assert result["results"][2]["error"] == "No detections in session"
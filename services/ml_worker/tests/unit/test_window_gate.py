@@ -0,0 +1,112 @@
+"""
+Unit tests for the silence and noise gate
+"""
+
+import io
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.classifier import audio
+from app.classifier.build_test_model import characteristic_frequencies
+from app.classifier.engine import AudioClassifier, window_features
+from app.classifier.gate import WindowGate
+from app.classifier.models import NumpyLinearModel, BUNDLED_MODEL
+
+RATE = 32000
+
+
+def _wav(samples, rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def _tone(freq, seconds=audio.WINDOW_S, amplitude=0.3, noise=0.02, seed=0):
+    t = np.arange(int(RATE * seconds)) / RATE
+    rng = np.random.default_rng(seed)
+    return (amplitude * np.sin(2 * np.pi * freq * t) + noise * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def _wind(seconds=audio.WINDOW_S, seed=0):
+    """White noise low-passed around 100 Hz"""
+    n = int(RATE * seconds)
+    spectrum = np.fft.rfft(np.random.default_rng(seed).standard_normal(n))
+    spectrum /= 1 + (np.fft.rfftfreq(n, 1 / RATE) / 100) ** 4
+    wind = np.fft.irfft(spectrum, n)
+    return (0.5 * wind / np.abs(wind).max()).astype(np.float32)
+
+
+class TestWindowGate:
+    """Test cases for gating windows before inference"""
+
+    def test_sample_checks(self):
+        gate = WindowGate()
+        windows = np.stack([
+            _tone(2000),
+            np.zeros(audio.WINDOW_SAMPLES, dtype=np.float32) + 1e-5,
+            np.clip(_tone(2000, amplitude=3.0), -1, 1),
+            _wind(),
+            _wind() + _tone(2500, amplitude=0.2, noise=0),
+            _tone(400, amplitude=0.05),
+        ])
+
+        keep = gate.check_samples(windows, RATE)
+
+        assert keep.tolist() == [True, False, False, False, True, True]
+        assert gate.stats()["skipped_by_reason"] == {"silent": 1, "clipped": 1, "wind": 1}
+
+    def test_counters_add_up_across_threads(self):
+        """Executor threads gating at the same time lose no counts"""
+        gate = WindowGate()
+        silence = np.zeros((3, 1024), dtype=np.float32)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: gate.check_samples(silence, RATE), range(400)))
+
+        assert gate.stats()["windows_checked"] == 1200
+        assert gate.stats()["skipped_by_reason"]["silent"] == 1200
+
+    def test_broadband_noise_is_skipped_but_short_calls_are_kept(self):
+        gate = WindowGate()
+        noise = 0.1 * np.random.default_rng(1).standard_normal(audio.WINDOW_SAMPLES).astype(np.float32)
+        call = noise.copy()
+        call[40000:49600] += _tone(4000, seconds=0.3, noise=0)
+
+        keep = gate.check_features(window_features(np.stack([noise, call, _tone(2000)]), RATE))
+
+        assert keep.tolist() == [False, True, True]
+        assert gate.stats()["windows_skipped"] == 1
+
+    def test_skipped_windows_are_not_scored(self):
+        model = NumpyLinearModel(BUNDLED_MODEL)
+        sizes = []
+        predict = model.predict
+        model.predict = lambda features: sizes.append(len(features)) or predict(features)
+        classifier = AudioClassifier(model, gate=WindowGate())
+        code, freq = sorted(characteristic_frequencies().items())[4]
+        clip = np.concatenate([np.zeros(RATE * 6, dtype=np.float32), _tone(freq, 3.0), _wind(3.0)])
+
+        result = classifier.classify(_wav(clip, RATE))
+
+        assert sizes == [1]
+        assert result["windows"] == 4
+        assert result["windows_skipped"] == 3
+        assert result["species_code"] == code
+        assert [d["start_s"] for d in result["detections"]] == [6.0]
+
+    def test_fully_gated_clip_identifies_nothing(self):
+        classifier = AudioClassifier(NumpyLinearModel(BUNDLED_MODEL), gate=WindowGate())
+        clip = np.concatenate([np.zeros(RATE * 6, dtype=np.float32), _wind(3.0)])
+
+        result = classifier.classify(_wav(clip, RATE))
+
+        assert result["windows_skipped"] == 3
+        assert result["species_code"] is None
+        assert result["confidence"] == 0.0
+        assert result["detections"] == []
@@ -0,0 +1,181 @@
+from datetime import datetime
+from typing import Union
+
+import httpx
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+
+from app.models import loader
+from app.models.loader import get_graph
+from app.models.schemas import (
+    RouteBatchRequest,
+    RouteBatchResponse,
+    RouteOptimizeRequest,
+    RouteResponse,
+    RouteUpdateRequest,
+    RouteUpdateResponse,
+    SuggestedRoute,
+    SuggestedRoutesResponse,
+)
+from app.services import suggested_routes
+from app.services.batch_planner import PlanTask, fetch_all_cells, get_pool, plan_batch, summarize
+from app.services.isochrone import get_isochrone
+from app.services.maps_client import fetch_cells
+from app.services.route_optimizer import WALKING_SPEED_M_PER_MIN, select_hotspots, solve_route
+from app.services.route_sessions import route_sessions, update_session
+
+router = APIRouter()
+
+# Start points further than this from any walkable street are rejected
+MAX_START_SNAP_M = 500.0
+
+
+def route_budget(req: Union[RouteOptimizeRequest, RouteBatchRequest]):
+    """Return (budget, stop cost) in walking metres for a request"""
+    budget = float("inf")
+    stop_m = 0.0
+    if req.max_minutes is not None:
+        budget = req.max_minutes * WALKING_SPEED_M_PER_MIN
+        stop_m = req.stop_minutes * WALKING_SPEED_M_PER_MIN
+    if req.max_distance_m is not None:
+        budget = min(budget, req.max_distance_m)
+    return budget, stop_m
+
+
+@router.post("/routes/optimize", response_model=RouteResponse)
+async def optimize_route(req: RouteOptimizeRequest):
+    """
+    Ruta a pie que maximiza el número esperado de especies objetivo
+    dentro del presupuesto de tiempo/distancia.
+    """
+    graph = get_graph()
+
+    start_node, snap_dist = graph.snap(req.lat, req.lon)
+    if snap_dist > MAX_START_SNAP_M:
+        raise HTTPException(status_code=422, detail="Start point is outside the walking network")
+
+    try:
+        cells = await fetch_cells(req.lat, req.lon, req.datetime or datetime.now().isoformat())
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=503, detail=f"Maps service unavailable: {e}")
+
+    hotspots = select_hotspots(graph, cells, req.target_species)
+    budget_m, stop_m = route_budget(req)
+
+    # CPU-bound: keep it off the event loop
+    planned = await run_in_threadpool(
+        solve_route,
+        graph,
+        hotspots,
+        start_node,
+        budget_m,
+        stop_m=stop_m,
+        closed=req.return_to_start,
+        compute_ms=req.max_compute_ms,
+    )
+
+    # Keep the solved problem so position updates can repair the route
+    session = route_sessions.create(graph, planned, req.lat, req.lon, budget_m, stop_m, req.return_to_start)
+    return dict(planned.response, route_id=session.id)
+
+
+@router.post("/routes/batch", response_model=RouteBatchResponse)
+async def batch_routes(req: RouteBatchRequest):
+    """
+    Rutas para varios puntos de inicio a la vez (p. ej. un grupo escolar).
+    Se resuelven en paralelo en el pool de procesos; los errores se reportan por origen.
+    """
+    get_graph()
+
+    datetime_iso = req.datetime or datetime.now().isoformat()
+    cells = await fetch_all_cells([(o.lat, o.lon) for o in req.origins], datetime_iso)
+    budget_m, stop_m = route_budget(req)
+
+    results, tasks = [], []
+    for i, (origin, origin_cells) in enumerate(zip(req.origins, cells)):
+        key = origin.id or str(i)
+        if origin_cells is None:
+            results.append({"id": key, "lat": origin.lat, "lon": origin.lon,
+                            "route": None, "error": "Maps service unavailable"})
+            continue
+        tasks.append(PlanTask(
+            key=key, lat=origin.lat, lon=origin.lon, cells=origin_cells,
+            budget_m=budget_m, stop_m=stop_m, closed=req.return_to_start,
+            target_species=req.target_species, compute_ms=req.max_compute_ms,
+            max_snap_m=MAX_START_SNAP_M,
+        ))
+    results.extend(await plan_batch(get_pool(loader.GRAPH_DIR), tasks))
+
+    order = {origin.id or str(i): i for i, origin in enumerate(req.origins)}
+    results.sort(key=lambda r: order[r["id"]])
+    return {**summarize(results), "routes": results}
+
+
+@router.get("/routes/suggested", response_model=SuggestedRoutesResponse)
+def list_suggested_routes():
+    """
+    Rutas sugeridas por barrio, precalculadas cada noche.
+    """
+    data = suggested_routes.suggested_routes
+    if data is None:
+        raise HTTPException(status_code=404, detail="Suggested routes have not been computed yet")
+
+    zones = []
+    for z in data["zones"]:
+        route = z["route"] or {}
+        zones.append({
+            "zone": z["zone"], "lat": z["lat"], "lon": z["lon"],
+            "distance_m": route.get("distance_m"),
+            "duration_minutes": route.get("duration_minutes"),
+            "expected_species": route.get("expected_species"),
+        })
+    return {"generated_at": data["generated_at"], "datetime": data["datetime"],
+            "max_minutes": data["max_minutes"], "zones": zones}
+
+
+@router.get("/routes/suggested/{zone}", response_model=SuggestedRoute)
+def get_suggested_route(zone: str):
+    """
+    Ruta sugerida precalculada para un barrio.
+    """
+    entry = suggested_routes.find_zone(zone)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="No suggested route for this zone")
+    return {**entry, "generated_at": suggested_routes.suggested_routes["generated_at"]}
+
+
+@router.post("/routes/{route_id}/update", response_model=RouteUpdateResponse)
+def update_route(route_id: str, req: RouteUpdateRequest):
+    """
+    Actualiza una ruta en curso con la posición actual y las especies ya vistas.
+    Repara la ruta existente en lugar de recalcularla desde cero.
+    """
+    graph = get_graph()
+    session = route_sessions.get(route_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Route not found or expired")
+
+    with session.lock:
+        return update_session(graph, session, req.lat, req.lon, req.species_seen, req.max_compute_ms)
+
+
+@router.get("/isochrone")
+def isochrone(
+    response: Response,
+    lat: float,
+    lon: float,
+    minutes: int = Query(..., ge=1, le=180),
+):
+    """
+    Polígono (GeoJSON) alcanzable a pie desde lat/lon en `minutes` minutos.
+    Cacheado por nodo de inicio y presupuesto.
+    """
+    graph = get_graph()
+
+    start_node, snap_dist = graph.snap(lat, lon)
+    if snap_dist > MAX_START_SNAP_M:
+        raise HTTPException(status_code=422, detail="Start point is outside the walking network")
+
+    feature, cached = get_isochrone(graph, start_node, minutes)
+    response.headers["X-Cache"] = "HIT" if cached else "MISS"
+    return feature
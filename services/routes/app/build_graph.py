@@ -0,0 +1,163 @@
+"""
+Offline builder for the routes service walking graph.
+
+Reads a local OSM extract of the study area with OSMnx, keeps the walkable
+ways, precomputes ALT landmark distances, and writes the compact array
+representation loaded by :class:`app.models.walking_graph.WalkingGraph`::
+
+    python -m app.build_graph --osm data/barranquilla.osm --out app/data/graph
+
+OSMnx is only needed here, not in the running service.
+"""
+
+import argparse
+import logging
+import time
+from typing import Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from app.models.walking_graph import WalkingGraph
+from app.services.shortest_path import select_landmarks
+
+logger = logging.getLogger(__name__)
+
+# Highway values that are never walkable (same spirit as OSMnx's "walk" filter)
+EXCLUDED_HIGHWAYS = {
+    "motorway", "motorway_link", "trunk", "trunk_link",
+    "bus_guideway", "escape", "raceway", "construction", "proposed", "abandoned",
+}
+
+
+def _is_walkable(data: dict) -> bool:
+    highway = data.get("highway")
+    values = highway if isinstance(highway, list) else [highway]
+    if not any(values) or all(v in EXCLUDED_HIGHWAYS for v in values):
+        return False
+    if data.get("foot") == "no" or data.get("access") in ("private", "no"):
+        return False
+    return True
+
+
+def load_osm_edges(osm_path: str) -> Tuple[np.ndarray, ...]:
+    """Parse an ``.osm`` XML extract into flat node/edge arrays.
+
+    Returns ``(osm_ids, lat, lon, u, v, length)`` where ``u``/``v`` index into
+    the node arrays.
+    """
+    try:
+        import osmnx as ox
+    except ImportError as e:
+        raise RuntimeError("osmnx is required to build the walking graph (pip install osmnx)") from e
+
+    G = ox.graph_from_xml(osm_path, simplify=True, retain_all=True)
+
+    osm_ids = np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes())
+    position = {osm_id: i for i, osm_id in enumerate(osm_ids)}
+    lat = np.array([G.nodes[n]["y"] for n in osm_ids], dtype=np.float64)
+    lon = np.array([G.nodes[n]["x"] for n in osm_ids], dtype=np.float64)
+
+    u, v, length = [], [], []
+    for a, b, data in G.edges(data=True):
+        if not _is_walkable(data):
+            continue
+        u.append(position[a])
+        v.append(position[b])
+        length.append(data.get("length", 0.0))
+
+    return (
+        osm_ids, lat, lon,
+        np.asarray(u, dtype=np.int64),
+        np.asarray(v, dtype=np.int64),
+        np.asarray(length, dtype=np.float64),
+    )
+
+
+def build_walking_graph(osm_ids, lat, lon, u, v, length, largest_component: bool = True) -> WalkingGraph:
+    """Build an undirected CSR :class:`WalkingGraph` from an edge list.
+
+    Self loops are dropped, parallel edges collapse to the shortest one and,
+    by default, only the largest connected component is kept so that
+    snapping never lands on an isolated island of footpaths.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    osm_ids = np.asarray(osm_ids, dtype=np.int64)
+    u = np.asarray(u, dtype=np.int64)
+    v = np.asarray(v, dtype=np.int64)
+    length = np.asarray(length, dtype=np.float64)
+
+    keep = u != v
+    u, v, length = u[keep], v[keep], length[keep]
+
+    # Walking is undirected: store every segment in both directions
+    src = np.concatenate([u, v])
+    dst = np.concatenate([v, u])
+    w = np.concatenate([length, length])
+
+    # Sort by (src, dst, length) and keep the first (= shortest) of duplicates
+    order = np.lexsort((w, dst, src))
+    src, dst, w = src[order], dst[order], w[order]
+    first = np.ones(len(src), dtype=bool)
+    first[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    src, dst, w = src[first], dst[first], w[first]
+
+    n = len(lat)
+    if largest_component and n:
+        adjacency = coo_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+        _, labels = connected_components(adjacency, directed=False)
+        main_label = np.bincount(labels).argmax()
+        nodes = np.flatnonzero(labels == main_label)
+    else:
+        nodes = np.arange(n)
+
+    # Renumber the kept nodes 0..m-1 and drop arcs touching removed ones
+    remap = np.full(n, -1, dtype=np.int64)
+    remap[nodes] = np.arange(len(nodes))
+    src, dst = remap[src], remap[dst]
+    keep = (src >= 0) & (dst >= 0)
+    src, dst, w = src[keep], dst[keep], w[keep]
+
+    m = len(nodes)
+    indptr = np.zeros(m + 1, dtype=np.int32)
+    np.cumsum(np.bincount(src, minlength=m), out=indptr[1:])
+
+    return WalkingGraph(
+        node_lat=lat[nodes],
+        node_lon=lon[nodes],
+        indptr=indptr,
+        indices=dst.astype(np.int32),
+        lengths=w.astype(np.float32),
+        osm_ids=osm_ids[nodes],
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the routes service walking graph from an OSM extract")
+    parser.add_argument("--osm", required=True, help="Path to the .osm XML extract of the study area")
+    parser.add_argument("--out", default="app/data/graph", help="Output directory for the .npy artifacts")
+    parser.add_argument("--landmarks", type=int, default=16, help="Number of ALT landmarks to precompute (0 to skip)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.time()
+
+    logger.info("Reading %s", args.osm)
+    graph = build_walking_graph(*load_osm_edges(args.osm))
+    if args.landmarks > 0:
+        logger.info("Precomputing %d ALT landmarks", args.landmarks)
+        graph.landmarks, graph.landmark_dist = select_landmarks(graph, args.landmarks)
+    graph.meta["source"] = args.osm
+    graph.meta["built_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    graph.save(args.out)
+
+    logger.info(
+        "Walking graph written to %s: %d nodes, %d arcs in %.1fs",
+        args.out, graph.n_nodes, graph.n_edges, time.time() - start,
+    )
+
+
+if __name__ == "__main__":
+    main()
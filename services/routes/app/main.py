@@ -1,7 +1,66 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-app = FastAPI(title="Routes Service")
+from app.api.routes import router as api_router
+from app.models import loader
+from app.services import maps_client, suggested_routes
+from app.services.batch_planner import get_pool, shutdown_pool
+from app.services.isochrone import isochrone_cache
+from app.services.route_sessions import route_sessions
+
+logging.basicConfig(level=logging.INFO)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loader.load_graph()
+    # Cached results and sessions refer to node ids of the previous graph
+    isochrone_cache.clear()
+    route_sessions.clear()
+    suggested_routes.load(loader.GRAPH_DIR)
+    maps_client.open_client()
+
+    refresh = None
+    if loader.graph is not None and suggested_routes.SUGGESTED_AT:
+        refresh = asyncio.create_task(
+            suggested_routes.nightly_refresh(lambda: get_pool(loader.GRAPH_DIR), loader.GRAPH_DIR)
+        )
+    try:
+        yield
+    finally:
+        if refresh is not None:
+            refresh.cancel()
+        shutdown_pool()
+        await maps_client.close_client()
+
+
+app = FastAPI(title="Routes Service", lifespan=lifespan)
+
+# Incluir las rutas de la API
+app.include_router(api_router)
+
 
 @app.get("/")
 def read_root():
-    return {"message": "Routes service is running"}
\ No newline at end of file
+    return {"message": "Routes service is running"}
+
+
+@app.get("/health")
+def health_check():
+    return {"status": "healthy", "graph_loaded": loader.graph is not None}
+
+
+@app.get("/graph")
+def graph_info():
+    """Summary of the loaded walking graph"""
+    g = loader.get_graph()
+    return {
+        "nodes": g.n_nodes,
+        "arcs": g.n_edges,
+        "landmarks": 0 if g.landmarks is None else len(g.landmarks),
+        "origin": {"lat": g.origin[0], "lon": g.origin[1]},
+        "built_at": g.meta.get("built_at"),
+    }
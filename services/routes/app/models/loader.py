@@ -0,0 +1,42 @@
+import logging
+import os
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.models.walking_graph import WalkingGraph
+
+logger = logging.getLogger(__name__)
+
+# Directory with the artifacts written by `python -m app.build_graph`
+GRAPH_DIR = os.getenv("ROUTES_GRAPH_DIR", "app/data/graph")
+
+# Se carga 1 sola vez al iniciar el servidor (memory-mapped, solo lectura)
+graph: Optional[WalkingGraph] = None
+
+
+def load_graph() -> Optional[WalkingGraph]:
+    """Memory-map the walking graph built offline by app.build_graph"""
+    global graph
+
+    start = time.time()
+    try:
+        graph = WalkingGraph.load(GRAPH_DIR)
+    except FileNotFoundError:
+        logger.warning(f"Walking graph not found in {GRAPH_DIR} - run `python -m app.build_graph` first")
+        graph = None
+        return None
+
+    logger.info(
+        f"Walking graph loaded: {graph.n_nodes} nodes, {graph.n_edges} arcs "
+        f"in {(time.time() - start) * 1000:.1f} ms"
+    )
+    return graph
+
+
+def get_graph() -> WalkingGraph:
+    """FastAPI dependency returning the loaded graph (503 if missing)"""
+    if graph is None:
+        raise HTTPException(status_code=503, detail="Walking graph not loaded")
+    return graph
@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+
+"""Schemas para requests y responses de la API"""
+
+
+class Point(BaseModel):
+    lat: float
+    lon: float
+
+
+"""Schemas para /routes/optimize"""
+
+
+class RouteOptimizeRequest(BaseModel):
+    lat: float
+    lon: float
+    datetime: Optional[str] = None          # ISO; defaults to now (used by the maps model)
+    max_minutes: Optional[float] = Field(default=None, gt=0)
+    max_distance_m: Optional[float] = Field(default=None, gt=0)
+    target_species: List[str] = []          # scientific names; empty = all species
+    stop_minutes: float = Field(default=0.0, ge=0)   # time spent watching at each hotspot
+    return_to_start: bool = True
+    max_compute_ms: Optional[int] = Field(default=None, gt=0, le=5000)
+
+    @model_validator(mode="after")
+    def check_budget(self):
+        if self.max_minutes is None and self.max_distance_m is None:
+            raise ValueError("Either max_minutes or max_distance_m is required")
+        return self
+
+
+class RouteStop(BaseModel):
+    lat: float
+    lon: float
+    species_probabilities: Dict[str, float]
+
+
+class SolverStats(BaseModel):
+    compute_ms: float
+    candidates: int
+    iterations: int
+    timed_out: bool
+
+
+class RouteResponse(BaseModel):
+    route_id: Optional[str] = None          # session id for /routes/{id}/update
+    distance_m: float
+    duration_minutes: float
+    expected_species: float
+    species_probabilities: Dict[str, float]
+    stops: List[RouteStop]
+    path: List[Point]
+    solver: SolverStats
+
+
+"""Schemas para /routes/{route_id}/update"""
+
+
+class RouteUpdateRequest(BaseModel):
+    lat: float
+    lon: float
+    species_seen: List[str] = []
+    max_compute_ms: Optional[int] = Field(default=None, gt=0, le=2000)
+
+
+class RouteUpdateResponse(BaseModel):
+    route_id: str
+    status: str                             # on_route | rerouted | completed
+    distance_m: float                       # remaining walk
+    duration_minutes: float
+    expected_species: float
+    species_probabilities: Dict[str, float]
+    stops: List[RouteStop]                  # remaining stops
+    path: List[Point]                       # remaining path from the current position
+    visited_stops: int
+    species_seen: List[str]
+    remaining_budget_m: float
+    compute_ms: float
+
+
+"""Schemas para /routes/batch"""
+
+
+class BatchOrigin(BaseModel):
+    id: Optional[str] = None                # defaults to the position in the list
+    lat: float
+    lon: float
+
+
+class RouteBatchRequest(BaseModel):
+    origins: List[BatchOrigin] = Field(..., min_length=1, max_length=200)
+    datetime: Optional[str] = None
+    max_minutes: Optional[float] = Field(default=None, gt=0)
+    max_distance_m: Optional[float] = Field(default=None, gt=0)
+    target_species: List[str] = []
+    stop_minutes: float = Field(default=0.0, ge=0)
+    return_to_start: bool = True
+    max_compute_ms: Optional[int] = Field(default=None, gt=0, le=5000)
+
+    @model_validator(mode="after")
+    def check_budget(self):
+        if self.max_minutes is None and self.max_distance_m is None:
+            raise ValueError("Either max_minutes or max_distance_m is required")
+        return self
+
+
+class BatchRouteResult(BaseModel):
+    id: str
+    lat: float
+    lon: float
+    route: Optional[RouteResponse] = None
+    error: Optional[str] = None
+
+
+class RouteBatchResponse(BaseModel):
+    requested: int
+    planned: int
+    failed: int
+    routes: List[BatchRouteResult]
+
+
+"""Schemas para /routes/suggested"""
+
+
+class SuggestedRouteSummary(BaseModel):
+    zone: str
+    lat: float
+    lon: float
+    distance_m: Optional[float] = None
+    duration_minutes: Optional[float] = None
+    expected_species: Optional[float] = None
+
+
+class SuggestedRoutesResponse(BaseModel):
+    generated_at: str
+    datetime: str
+    max_minutes: float
+    zones: List[SuggestedRouteSummary]
+
+
+class SuggestedRoute(BaseModel):
+    zone: str
+    lat: float
+    lon: float
+    generated_at: str
+    route: Optional[RouteResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,170 @@
+"""
+Array-backed walking graph used by the routes service.
+
+The graph is stored as a handful of flat NumPy arrays (CSR adjacency) that are
+written once by ``app.build_graph`` and memory-mapped at startup, so loading
+the study area takes milliseconds and the pages are shared between workers.
+"""
+
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_M = 6371008.8
+
+# Files that make up a serialized graph (one .npy per array + meta.json)
+GRAPH_ARRAYS = ("node_lat", "node_lon", "osm_ids", "indptr", "indices", "lengths")
+# Preprocessing for fast point-to-point queries (see app.services.shortest_path)
+OPTIONAL_ARRAYS = ("landmarks", "landmark_dist")
+META_FILE = "meta.json"
+
+
+def project(lat, lon, origin: Tuple[float, float]) -> np.ndarray:
+    """Project lat/lon (degrees) to local planar metres around ``origin``.
+
+    An equirectangular projection is accurate to well under a metre at the
+    scale of a city, which is all we need for nearest-node snapping.
+    """
+    lat0, lon0 = origin
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    k = np.pi / 180.0 * EARTH_RADIUS_M
+    x = (lon - lon0) * k * np.cos(np.radians(lat0))
+    y = (lat - lat0) * k
+    return np.stack([x, y], axis=-1)
+
+
+class WalkingGraph:
+    """Undirected walking network in CSR form.
+
+    Node ``i`` has neighbours ``indices[indptr[i]:indptr[i + 1]]`` reached over
+    edges of ``lengths[indptr[i]:indptr[i + 1]]`` metres. Every edge is stored
+    in both directions.
+    """
+
+    def __init__(
+        self,
+        node_lat: np.ndarray,
+        node_lon: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        lengths: np.ndarray,
+        osm_ids: Optional[np.ndarray] = None,
+        meta: Optional[dict] = None,
+        landmarks: Optional[np.ndarray] = None,
+        landmark_dist: Optional[np.ndarray] = None,
+    ):
+        if len(indptr) != len(node_lat) + 1:
+            raise ValueError("indptr must have n_nodes + 1 entries")
+        if len(indices) != len(lengths):
+            raise ValueError("indices and lengths must have the same size")
+
+        self.node_lat = node_lat
+        self.node_lon = node_lon
+        self.indptr = indptr
+        self.indices = indices
+        self.lengths = lengths
+        self.osm_ids = osm_ids if osm_ids is not None else np.arange(len(node_lat), dtype=np.int64)
+        self.meta = dict(meta or {})
+        # ALT preprocessing: landmark node ids and an (n_nodes, n_landmarks)
+        # table of walking distances from every landmark to every node
+        self.landmarks = landmarks
+        self.landmark_dist = landmark_dist
+
+        origin = self.meta.get("origin")
+        if origin is None:
+            origin = (float(np.mean(node_lat)), float(np.mean(node_lon))) if len(node_lat) else (0.0, 0.0)
+            self.meta["origin"] = list(origin)
+        self.origin = (float(origin[0]), float(origin[1]))
+
+        # The KD-tree is rebuilt from the mapped coordinates on load; for a
+        # city-sized graph this takes a few milliseconds.
+        self.xy = project(self.node_lat, self.node_lon, self.origin)
+        self._tree = cKDTree(self.xy)
+        self._csr = None
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_lat)
+
+    @property
+    def n_edges(self) -> int:
+        """Number of directed arcs (each street segment counts twice)."""
+        return len(self.indices)
+
+    def neighbors(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(neighbour ids, edge lengths)`` for ``node``."""
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return self.indices[start:end], self.lengths[start:end]
+
+    def path_length(self, path) -> float:
+        """Length in metres of a node path (consecutive nodes must be adjacent)."""
+        total = 0.0
+        for a, b in zip(path[:-1], path[1:]):
+            start, end = self.indptr[a], self.indptr[a + 1]
+            # Neighbour lists are sorted by app.build_graph
+            total += float(self.lengths[start + np.searchsorted(self.indices[start:end], b)])
+        return total
+
+    def snap(self, lat: float, lon: float) -> Tuple[int, float]:
+        """Return the nearest node to a coordinate and its distance in metres."""
+        dist, idx = self._tree.query(project(lat, lon, self.origin))
+        return int(idx), float(dist)
+
+    def snap_many(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized :meth:`snap` for arrays of coordinates."""
+        dist, idx = self._tree.query(project(lats, lons, self.origin))
+        return np.asarray(idx, dtype=np.int64), np.asarray(dist)
+
+    def coords(self, nodes) -> np.ndarray:
+        """Return an ``(n, 2)`` array of ``(lat, lon)`` for the given nodes."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return np.stack([self.node_lat[nodes], self.node_lon[nodes]], axis=-1)
+
+    def to_csr(self) -> csr_matrix:
+        """Sparse adjacency matrix for ``scipy.sparse.csgraph`` routines.
+
+        Built lazily without copying the (possibly memory-mapped) arrays.
+        """
+        if self._csr is None:
+            self._csr = csr_matrix(
+                (self.lengths, self.indices, self.indptr),
+                shape=(self.n_nodes, self.n_nodes),
+                copy=False,
+            )
+        return self._csr
+
+    def save(self, directory: str) -> None:
+        """Write the graph as one ``.npy`` per array plus ``meta.json``."""
+        os.makedirs(directory, exist_ok=True)
+        for name in GRAPH_ARRAYS + OPTIONAL_ARRAYS:
+            array = getattr(self, name)
+            if array is not None:
+                np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+        meta = dict(self.meta, n_nodes=self.n_nodes, n_edges=self.n_edges)
+        with open(os.path.join(directory, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "WalkingGraph":
+        """Load a graph written by :meth:`save`.
+
+        With ``mmap=True`` (the default) arrays are opened read-only with
+        ``np.load(mmap_mode="r")`` so nothing is copied into the heap.
+        """
+        mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+            for name in GRAPH_ARRAYS
+        }
+        for name in OPTIONAL_ARRAYS:
+            path = os.path.join(directory, f"{name}.npy")
+            if os.path.exists(path):
+                arrays[name] = np.load(path, mmap_mode=mode)
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        return cls(meta=meta, **arrays)
@@ -0,0 +1,85 @@
+"""
+Plan routes for many start points at once, outside the API.
+
+Suggested routes for every zone (written to the graph directory and served
+by ``GET /routes/suggested``)::
+
+    python -m app.precompute_routes --graph app/data/graph
+
+Routes for arbitrary origins from a CSV with ``id,lat,lon`` columns::
+
+    python -m app.precompute_routes --origins group.csv --minutes 90 --out group_routes.json
+
+Work is spread over ``--workers`` processes that memory-map the same graph.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+
+from app.models.loader import GRAPH_DIR
+from app.services import suggested_routes
+from app.services.batch_planner import BATCH_WORKERS, PlanTask, create_pool, fetch_all_cells, plan_batch, summarize
+from app.services.route_optimizer import WALKING_SPEED_M_PER_MIN
+
+logger = logging.getLogger(__name__)
+
+
+def read_origins(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [{"id": row["id"], "lat": float(row["lat"]), "lon": float(row["lon"])} for row in csv.DictReader(f)]
+
+
+async def plan_origins(executor, origins, datetime_iso: str, minutes: float, stop_minutes: float) -> dict:
+    cells = await fetch_all_cells([(o["lat"], o["lon"]) for o in origins], datetime_iso)
+    tasks = [
+        PlanTask(key=o["id"], lat=o["lat"], lon=o["lon"], cells=c,
+                 budget_m=minutes * WALKING_SPEED_M_PER_MIN,
+                 stop_m=stop_minutes * WALKING_SPEED_M_PER_MIN)
+        for o, c in zip(origins, cells) if c is not None
+    ]
+    results = await plan_batch(executor, tasks)
+    failed = [o for o, c in zip(origins, cells) if c is None]
+    results += [{**o, "route": None, "error": "Maps service unavailable"} for o in failed]
+    return {"datetime": datetime_iso, "max_minutes": minutes, **summarize(results), "routes": results}
+
+
+async def run(args) -> None:
+    datetime_iso = args.datetime or suggested_routes.next_morning().isoformat()
+
+    with create_pool(args.graph, args.workers) as executor:
+        if args.origins:
+            data = await plan_origins(executor, read_origins(args.origins), datetime_iso,
+                                      args.minutes, args.stop_minutes)
+            out = args.out or "routes.json"
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        else:
+            zones = suggested_routes.load_zones(args.zones)
+            data = await suggested_routes.precompute(executor, zones, datetime_iso, args.minutes)
+            out = suggested_routes.save(data, args.graph)
+
+    logger.info("%d/%d routes planned, written to %s", data["planned"], data["requested"], out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan walking routes for many start points in parallel")
+    parser.add_argument("--graph", default=GRAPH_DIR, help="Directory with the walking graph artifacts")
+    parser.add_argument("--zones", default=suggested_routes.ZONES_FILE, help="GeoJSON with the zones to plan suggested routes for")
+    parser.add_argument("--origins", help="CSV with id,lat,lon columns (instead of the zones)")
+    parser.add_argument("--out", help="Output JSON for --origins (zones are written to the graph directory)")
+    parser.add_argument("--datetime", help="ISO date/time passed to the maps model (default: tomorrow 06:00)")
+    parser.add_argument("--minutes", type=float, default=suggested_routes.SUGGESTED_MINUTES, help="Walking budget per route")
+    parser.add_argument("--stop-minutes", type=float, default=suggested_routes.SUGGESTED_STOP_MINUTES,
+                        help="Minutes spent at each stop (--origins only)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Planner processes")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
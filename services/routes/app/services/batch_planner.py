@@ -0,0 +1,140 @@
+"""
+Batch route planning over a process pool.
+
+The orienteering solver is CPU-bound and holds the GIL, so planning many
+routes at once (a school group, the nightly suggested routes per zone) is
+spread over worker processes instead of threads. Every worker memory-maps
+the same read-only graph artifacts on startup, so the arrays live once in
+the page cache no matter how many workers run; only the KD-tree and the
+per-request matrices are private to each process.
+
+Maps requests are I/O and stay in the caller: the cells of every origin are
+fetched first and shipped to the workers together with the route options.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+
+from app.models.walking_graph import WalkingGraph
+from app.services.maps_client import Cell, fetch_cells
+from app.services.route_optimizer import plan_route, select_hotspots
+
+logger = logging.getLogger(__name__)
+
+BATCH_WORKERS = int(os.getenv("ROUTES_BATCH_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+MAPS_CONCURRENCY = int(os.getenv("ROUTES_MAPS_CONCURRENCY", "8"))
+
+# Graph of the current worker process (set by the pool initializer)
+_worker_graph: Optional[WalkingGraph] = None
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass
+class PlanTask:
+    key: str                      # caller-defined id (origin id, zone name)
+    lat: float
+    lon: float
+    cells: List[Cell]
+    budget_m: float
+    stop_m: float = 0.0
+    closed: bool = True
+    target_species: Sequence[str] = ()
+    compute_ms: Optional[int] = None
+    max_snap_m: float = 500.0
+
+
+def _init_worker(graph_dir: str) -> None:
+    """Pool initializer: map the graph artifacts once per worker"""
+    global _worker_graph
+    _worker_graph = WalkingGraph.load(graph_dir, mmap=True)
+
+
+def run_task(task: PlanTask, graph: Optional[WalkingGraph] = None) -> dict:
+    """Plan one route; errors are reported per task instead of failing the batch"""
+    graph = graph if graph is not None else _worker_graph
+    result = {"id": task.key, "lat": task.lat, "lon": task.lon, "route": None, "error": None}
+
+    try:
+        start_node, snap_dist = graph.snap(task.lat, task.lon)
+        if snap_dist > task.max_snap_m:
+            result["error"] = "Start point is outside the walking network"
+            return result
+
+        hotspots = select_hotspots(graph, task.cells, task.target_species)
+        result["route"] = plan_route(graph, hotspots, start_node, task.budget_m,
+                                     stop_m=task.stop_m, closed=task.closed, compute_ms=task.compute_ms)
+    except Exception as e:
+        logger.exception(f"Planning failed for {task.key}")
+        result["route"] = None
+        result["error"] = f"Planning failed: {e}"
+    return result
+
+
+def create_pool(graph_dir: str, workers: int = BATCH_WORKERS) -> ProcessPoolExecutor:
+    """Process pool whose workers memory-map the graph in ``graph_dir``"""
+    # spawn: never fork a process that already runs the event loop and threadpool
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(graph_dir,),
+    )
+
+
+def get_pool(graph_dir: str) -> ProcessPoolExecutor:
+    """Shared pool of the API process, started on first use"""
+    global _pool
+    if _pool is None:
+        _pool = create_pool(graph_dir)
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def fetch_all_cells(points: Sequence[tuple], datetime_iso: str,
+                          concurrency: int = MAPS_CONCURRENCY) -> List[Optional[List[Cell]]]:
+    """Maps cells for every ``(lat, lon)``, at most ``concurrency`` requests in flight (None on failure)"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(lat: float, lon: float) -> Optional[List[Cell]]:
+        async with semaphore:
+            try:
+                return await fetch_cells(lat, lon, datetime_iso)
+            except httpx.HTTPError as e:
+                logger.warning(f"Maps request failed for ({lat}, {lon}): {e}")
+                return None
+
+    return await asyncio.gather(*(fetch(lat, lon) for lat, lon in points))
+
+
+async def plan_batch(executor: Executor, tasks: Sequence[PlanTask]) -> List[dict]:
+    """Run the tasks on ``executor`` and return the results in input order"""
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(loop.run_in_executor(executor, run_task, task) for task in tasks),
+                                   return_exceptions=True)
+    logger.info(f"Planned {len(tasks)} routes in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    # run_task reports its own errors; what is left here is the pool failing (a worker died)
+    return [
+        {"id": task.key, "lat": task.lat, "lon": task.lon, "route": None, "error": f"Planning failed: {result}"}
+        if isinstance(result, BaseException) else result
+        for task, result in zip(tasks, results)
+    ]
+
+
+def summarize(results: Sequence[dict]) -> Dict[str, int]:
+    planned = sum(1 for r in results if r["route"] is not None)
+    return {"requested": len(results), "planned": planned, "failed": len(results) - planned}
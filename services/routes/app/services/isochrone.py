@@ -0,0 +1,100 @@
+"""
+Walking isochrones: the area reachable on foot within a time budget.
+
+A bounded Dijkstra (cut off at ``minutes * walking speed``) collects the
+reachable nodes and a concave hull around them gives the polygon. Results
+depend only on the snapped start node and the budget, so they are cached
+under that key; nearby requests share entries.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import MultiPoint, mapping
+from scipy.sparse.csgraph import dijkstra
+
+from app.models.walking_graph import WalkingGraph
+from app.services.route_optimizer import WALKING_SPEED_M_PER_MIN
+
+ISOCHRONE_CACHE_SIZE = int(os.getenv("ISOCHRONE_CACHE_SIZE", "1024"))
+# 0 = tightest hull, 1 = convex hull
+HULL_RATIO = float(os.getenv("ISOCHRONE_HULL_RATIO", "0.3"))
+# Buffer (degrees, ~20 m) so the polygon covers the streets on its border
+HULL_BUFFER_DEG = 0.0002
+
+
+class LRUCache:
+    """Small thread-safe LRU cache (endpoints run in the threadpool)"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[dict]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: dict) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+isochrone_cache = LRUCache(ISOCHRONE_CACHE_SIZE)
+
+
+def compute_isochrone(graph: WalkingGraph, node: int, minutes: int) -> dict:
+    """GeoJSON Feature with the polygon reachable from ``node`` in ``minutes``"""
+    budget_m = minutes * WALKING_SPEED_M_PER_MIN
+    dist = dijkstra(graph.to_csr(), indices=int(node), limit=budget_m)
+    reachable = np.flatnonzero(np.isfinite(dist))
+
+    points = MultiPoint(list(zip(graph.node_lon[reachable], graph.node_lat[reachable])))
+    hull = shapely.concave_hull(points, ratio=HULL_RATIO)
+    polygon = hull.buffer(HULL_BUFFER_DEG)
+
+    return {
+        "type": "Feature",
+        "geometry": mapping(polygon),
+        "properties": {
+            "minutes": minutes,
+            "distance_m": budget_m,
+            "start": {"lat": float(graph.node_lat[node]), "lon": float(graph.node_lon[node])},
+            "reachable_nodes": int(len(reachable)),
+        },
+    }
+
+
+def get_isochrone(graph: WalkingGraph, node: int, minutes: int) -> Tuple[dict, bool]:
+    """Cached isochrone keyed by (snapped start node, minutes); returns (feature, cache hit)"""
+    key = (node, minutes)
+
+    feature = isochrone_cache.get(key)
+    if feature is not None:
+        return feature, True
+
+    feature = compute_isochrone(graph, node, minutes)
+    isochrone_cache.put(key, feature)
+    return feature, False
@@ -0,0 +1,84 @@
+"""
+Client for the maps service species distribution model.
+
+The maps service answers ``/distribution-zone`` with, per species, the grid
+cells (square polygons) where the model predicts a relevant probability. The
+route optimizer needs the transposed view: for every cell, the probability of
+each species there.
+
+Requests share one pooled client, opened and closed with the app, so route
+planning and batches reuse keep-alive connections to the maps service.
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+MAPS_URL = os.getenv("MAPS_URL", "http://maps:8004")
+MAPS_TIMEOUT = float(os.getenv("MAPS_TIMEOUT", "30"))
+MAPS_MAX_CONNECTIONS = int(os.getenv("MAPS_MAX_CONNECTIONS", "16"))
+
+# Shared client of the API process (set by open_client on startup)
+_client: Optional[httpx.AsyncClient] = None
+
+Cell = Tuple[float, float, Dict[str, float]]
+
+
+def cells_from_distribution(body: dict) -> List[Cell]:
+    """Turn a ``/distribution-zone`` response into ``(lat, lon, {species: p})`` cells"""
+    cells: Dict[Tuple[float, float], Dict[str, float]] = {}
+    for distribution in body.get("species_distributions", []):
+        species = distribution.get("species")
+        for area in distribution.get("areas", []):
+            polygon = area.get("polygon") or []
+            if not polygon:
+                continue
+            lat = sum(p["lat"] for p in polygon) / len(polygon)
+            lon = sum(p["lon"] for p in polygon) / len(polygon)
+            key = (round(lat, 6), round(lon, 6))
+            cells.setdefault(key, {})[species] = float(area.get("probability", 0.0))
+
+    return [(lat, lon, probs) for (lat, lon), probs in cells.items()]
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=MAPS_URL,
+        timeout=MAPS_TIMEOUT,
+        limits=httpx.Limits(max_connections=MAPS_MAX_CONNECTIONS, max_keepalive_connections=MAPS_MAX_CONNECTIONS),
+    )
+
+
+def open_client() -> None:
+    """Create the shared client; call from the running event loop"""
+    global _client
+    if _client is None:
+        _client = _new_client()
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_cells(lat: float, lon: float, datetime_iso: str, grid_size: float = 0.001) -> List[Cell]:
+    """Ask the maps service for the per-cell species probabilities around a point"""
+    payload = {"lat": lat, "lon": lon, "datetime": datetime_iso, "grid_size": grid_size}
+    if _client is not None:
+        resp = await _client.post("/distribution-zone", json=payload)
+    else:
+        # Outside the app (scripts, tests) a one-off client is enough
+        async with _new_client() as client:
+            resp = await client.post("/distribution-zone", json=payload)
+    resp.raise_for_status()
+    body = resp.json()
+
+    cells = cells_from_distribution(body)
+    logger.info(f"Maps returned {len(cells)} cells for zone {body.get('zone')!r}")
+    return cells
@@ -0,0 +1,388 @@
+"""
+Species-weighted route optimizer.
+
+Choosing which hotspots to visit within a walking budget is an orienteering
+(prize-collecting) problem. Rewards come from the maps model: each hotspot
+has a probability per species and the route is scored by the expected number
+of distinct target species seen, ``sum_s 1 - prod_i (1 - p_is)``.
+
+The solver works on a small precomputed distance matrix between the start
+and the candidate hotspots:
+
+1. greedy insertion by marginal reward / extra metres,
+2. 2-opt to shorten the tour and free budget,
+3. drop-and-refill local search until the compute deadline,
+
+and always returns the best feasible route found so far.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.walking_graph import WalkingGraph
+from app.services.shortest_path import AltRouter
+
+WALKING_SPEED_M_PER_MIN = float(os.getenv("WALKING_SPEED_M_PER_MIN", "75"))  # ~4.5 km/h
+DEFAULT_COMPUTE_MS = int(os.getenv("ROUTES_SOLVER_BUDGET_MS", "500"))
+MAX_CANDIDATES = int(os.getenv("ROUTES_MAX_CANDIDATES", "40"))
+MAX_SNAP_DISTANCE_M = 150.0
+
+
+@dataclass
+class Hotspot:
+    node: int
+    lat: float
+    lon: float
+    probabilities: Dict[str, float]
+
+
+@dataclass
+class Solution:
+    route: List[int]          # indices into the hotspot list, in visiting order
+    length: float             # metres, including stop costs
+    reward: float             # expected number of distinct species
+    iterations: int
+    timed_out: bool
+
+
+def select_hotspots(
+    graph: WalkingGraph,
+    cells: Iterable[Tuple[float, float, Dict[str, float]]],
+    target_species: Sequence[str] = (),
+    max_candidates: int = MAX_CANDIDATES,
+) -> List[Hotspot]:
+    """Snap model cells to the graph and keep the most rewarding ones.
+
+    Cells that snap to the same node are merged (max probability per
+    species); cells far from any walkable street are discarded.
+    """
+    targets = {s.lower() for s in target_species}
+    relevant = []
+    for lat, lon, probs in cells:
+        probs = {sp: p for sp, p in probs.items() if p > 0 and (not targets or sp.lower() in targets)}
+        if probs:
+            relevant.append((lat, lon, probs))
+    if not relevant:
+        return []
+
+    nodes, dists = graph.snap_many([c[0] for c in relevant], [c[1] for c in relevant])
+
+    by_node: Dict[int, Dict[str, float]] = {}
+    for (_, _, probs), node, dist in zip(relevant, nodes, dists):
+        if dist > MAX_SNAP_DISTANCE_M:
+            continue
+        merged = by_node.setdefault(int(node), {})
+        for species, p in probs.items():
+            merged[species] = max(merged.get(species, 0.0), p)
+
+    hotspots = [
+        Hotspot(node, float(graph.node_lat[node]), float(graph.node_lon[node]), probs)
+        for node, probs in by_node.items()
+    ]
+    hotspots.sort(key=lambda h: sum(h.probabilities.values()), reverse=True)
+    return hotspots[:max_candidates]
+
+
+def _sequence(route: List[int], end: Optional[int]) -> List[int]:
+    return [0] + route + ([end] if end is not None else [])
+
+
+def _length(D: np.ndarray, route: List[int], stop_cost: float, end: Optional[int]) -> float:
+    seq = np.asarray(_sequence(route, end))
+    return float(D[seq[:-1], seq[1:]].sum()) + stop_cost * len(route)
+
+
+def _reward(P: np.ndarray, route: List[int]) -> float:
+    if not route:
+        return 0.0
+    miss = np.prod(1.0 - P[np.asarray(route) - 1], axis=0)
+    return float(np.sum(1.0 - miss))
+
+
+def _greedy_insert(D, P, route, budget, stop_cost, end, banned=()) -> Tuple[List[int], float]:
+    """Insert hotspots by best marginal reward per extra metre until the budget is used"""
+    route = list(route)
+    length = _length(D, route, stop_cost, end)
+    k = P.shape[0]
+
+    while True:
+        visited = set(route) | set(banned)
+        cand = np.array([j for j in range(1, k + 1) if j not in visited], dtype=np.int64)
+        if cand.size == 0:
+            break
+
+        # Extra length of inserting each candidate between every consecutive pair
+        seq = np.asarray(_sequence(route, end))
+        a, b = seq[:-1], seq[1:]
+        with np.errstate(invalid="ignore"):  # inf - inf for legs out of reach
+            delta = D[np.ix_(a, cand)] + D[np.ix_(b, cand)] - D[a, b][:, None]
+        if end is None:
+            delta = np.vstack([delta, D[seq[-1], cand][None, :]])
+        delta = np.nan_to_num(delta, nan=np.inf)
+
+        pos = np.argmin(delta, axis=0)
+        extra = delta[pos, np.arange(cand.size)] + stop_cost
+
+        miss = np.prod(1.0 - P[np.asarray(route, dtype=np.int64) - 1], axis=0)
+        gain = (P[cand - 1] * miss).sum(axis=1)
+
+        feasible = (length + extra <= budget) & (gain > 1e-9)
+        if not feasible.any():
+            break
+        ratio = np.where(feasible, gain / (extra + 1.0), -np.inf)
+        best = int(np.argmax(ratio))
+
+        route.insert(int(pos[best]), int(cand[best]))
+        length += float(extra[best])
+
+    return route, length
+
+
+def _repair(D, P, route, budget, stop_cost, end) -> List[int]:
+    """Make a (warm-start) route feasible again.
+
+    Stops that no longer add reward are removed, then the stop with the
+    lowest reward lost per metre saved is dropped until the route fits the
+    budget.
+    """
+    route = [j for j in route if P[j - 1].sum() > 1e-9]
+    while route and _length(D, route, stop_cost, end) > budget:
+        base_length, base_reward = _length(D, route, stop_cost, end), _reward(P, route)
+        scores = []
+        for i in range(len(route)):
+            rest = route[:i] + route[i + 1:]
+            saved = base_length - _length(D, rest, stop_cost, end)
+            lost = base_reward - _reward(P, rest)
+            scores.append(lost / max(saved, 1e-6))
+        route.pop(int(np.argmin(scores)))
+    return route
+
+
+def _two_opt(D, route, end, deadline) -> List[int]:
+    """Classic 2-opt on the visiting order (start fixed, end fixed or free)"""
+    closed = end is not None
+    seq = _sequence(route, end)
+    n = len(seq)
+    j_end = n - 1 if closed else n
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, j_end):
+                a, b, c = seq[i - 1], seq[i], seq[j]
+                if j + 1 < n:
+                    d = seq[j + 1]
+                    delta = D[a, c] + D[b, d] - D[a, b] - D[c, d]
+                else:
+                    delta = D[a, c] - D[a, b]
+                if delta < -1e-6:
+                    seq[i:j + 1] = seq[i:j + 1][::-1]
+                    improved = True
+
+    return seq[1:-1] if closed else seq[1:]
+
+
+def solve_orienteering(
+    D: np.ndarray,
+    P: np.ndarray,
+    budget: float,
+    stop_cost: float = 0.0,
+    closed: bool = True,
+    deadline: Optional[float] = None,
+    initial_route: Sequence[int] = (),
+    max_stale: int = 30,
+    seed: int = 0,
+    end: int = 0,
+) -> Solution:
+    """Heuristic orienteering solver over a distance matrix.
+
+    ``D`` is square with row/column 0 the start and rows ``1..k`` the
+    hotspots described by ``P`` (``(k, n_species)``). Closed routes finish at
+    matrix index ``end`` (the start by default). ``deadline`` is a
+    ``time.perf_counter()`` value; the greedy construction always completes,
+    the improvement phase stops at the deadline (or after ``max_stale``
+    iterations without improvement). ``initial_route`` (hotspot indices)
+    warm-starts the search and is repaired if it no longer fits.
+    """
+    if deadline is None:
+        deadline = time.perf_counter() + DEFAULT_COMPUTE_MS / 1000.0
+    end = end if closed else None
+
+    route = _repair(D, P, [j + 1 for j in initial_route], budget, stop_cost, end)
+    route, length = _greedy_insert(D, P, route, budget, stop_cost, end)
+    route = _two_opt(D, route, end, deadline)
+    route, length = _greedy_insert(D, P, route, budget, stop_cost, end)
+
+    best_route, best_length, best_reward = route, length, _reward(P, route)
+    rng = np.random.default_rng(seed)
+    iterations, stale = 0, 0
+
+    while best_route and stale < max_stale and time.perf_counter() < deadline:
+        iterations += 1
+
+        # Perturb: drop 1-2 stops, reorder, refill without them, then with them
+        current = list(best_route)
+        n_drop = min(len(current), 1 + int(rng.integers(2)))
+        dropped = [current.pop(i) for i in sorted(rng.choice(len(current), n_drop, replace=False), reverse=True)]
+        current = _two_opt(D, current, end, deadline)
+        current, _ = _greedy_insert(D, P, current, budget, stop_cost, end, banned=dropped)
+        current, length = _greedy_insert(D, P, current, budget, stop_cost, end)
+        reward = _reward(P, current)
+
+        if reward > best_reward + 1e-9 or (reward > best_reward - 1e-9 and length < best_length - 1e-6):
+            best_route, best_length, best_reward = current, length, reward
+            stale = 0
+        else:
+            stale += 1
+
+    return Solution(
+        route=[j - 1 for j in best_route],
+        length=best_length,
+        reward=best_reward,
+        iterations=iterations,
+        timed_out=time.perf_counter() >= deadline,
+    )
+
+
+@dataclass
+class RoutingProblem:
+    """Distance matrix and rewards between the start (index 0) and the hotspots"""
+    hotspots: List[Hotspot]
+    nodes: np.ndarray         # graph node of every matrix index
+    D: np.ndarray
+    P: np.ndarray
+    species: List[str]
+
+
+@dataclass
+class PlannedRoute:
+    problem: RoutingProblem
+    solution: Solution
+    path: List[int]           # graph nodes from the start to the end of the route
+    response: dict            # shaped like RouteResponse
+
+
+def build_problem(
+    graph: WalkingGraph,
+    router: AltRouter,
+    hotspots: List[Hotspot],
+    start_node: int,
+    budget_m: float,
+    closed: bool = True,
+    deadline: Optional[float] = None,
+) -> RoutingProblem:
+    """Distance matrix between the start and the reachable hotspots.
+
+    Past ``deadline`` no further rows are computed and the hotspots without
+    one are dropped; candidates are ordered nearest first so the ones kept
+    are those most likely to fit the budget.
+    """
+    # On a closed tour no leg can be longer than half the budget. Landmark
+    # bounds discard hotspots that are certainly out of reach before any
+    # search runs.
+    limit = budget_m / 2 if closed else budget_m
+    if hotspots:
+        bound = router.lower_bound(start_node, [h.node for h in hotspots])
+        hotspots = [hotspots[i] for i in np.argsort(bound, kind="stable") if bound[i] <= limit]
+
+    # One landmark-guided one-to-many search per row; it stops once every
+    # hotspot is settled instead of exploring the whole ball of radius limit
+    nodes = np.array([start_node] + [h.node for h in hotspots], dtype=np.int64)
+    rows = []
+    for node in nodes:
+        rows.append(router.distances(node, nodes, max_dist=limit))
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    k = len(rows)
+    hotspots, nodes = hotspots[:k - 1], nodes[:k]
+    D = np.vstack(rows)[:, :k]
+
+    species = sorted({sp for h in hotspots for sp in h.probabilities})
+    P = np.array([[h.probabilities.get(sp, 0.0) for sp in species] for h in hotspots]).reshape(len(hotspots), len(species))
+
+    return RoutingProblem(hotspots=hotspots, nodes=nodes, D=D, P=P, species=species)
+
+
+def expand_path(router: AltRouter, nodes: Sequence[int], legs: Optional[Sequence[float]] = None) -> List[int]:
+    """Join consecutive waypoints with ALT point-to-point queries.
+
+    ``legs`` are the known leg lengths (from the distance matrix); each query
+    is then cut off just past its leg instead of searching unbounded.
+    """
+    path = [int(nodes[0])]
+    for i, (a, b) in enumerate(zip(nodes[:-1], nodes[1:])):
+        max_dist = legs[i] * (1 + 1e-9) + 1e-6 if legs is not None else np.inf
+        dist, leg = router.shortest_path(a, b, max_dist=max_dist)
+        if not np.isfinite(dist):
+            dist, leg = router.shortest_path(a, b)
+        path.extend(leg[1:])
+    return path
+
+
+def describe_route(graph: WalkingGraph, hotspots: List[Hotspot], P: np.ndarray, species: List[str],
+                   route: List[int], path: List[int], length: float, stop_m: float) -> dict:
+    """Response fields shared by new and re-routed routes"""
+    walked = length - stop_m * len(route)
+    miss = np.prod(1.0 - P[route], axis=0) if route else np.ones(len(species))
+    return {
+        "distance_m": round(walked, 1),
+        "duration_minutes": round(length / WALKING_SPEED_M_PER_MIN, 1),
+        "expected_species": round(float(np.sum(1.0 - miss)), 3),
+        "species_probabilities": {sp: round(float(1.0 - m), 3) for sp, m in zip(species, miss) if m < 1.0},
+        "stops": [
+            {"lat": hotspots[j].lat, "lon": hotspots[j].lon, "species_probabilities": hotspots[j].probabilities}
+            for j in route
+        ],
+        "path": [{"lat": float(lat), "lon": float(lon)} for lat, lon in graph.coords(path)],
+    }
+
+
+def solve_route(
+    graph: WalkingGraph,
+    hotspots: List[Hotspot],
+    start_node: int,
+    budget_m: float,
+    stop_m: float = 0.0,
+    closed: bool = True,
+    compute_ms: Optional[int] = None,
+) -> PlannedRoute:
+    """Solve the orienteering problem on the walking graph."""
+    t0 = time.perf_counter()
+    deadline = t0 + (compute_ms or DEFAULT_COMPUTE_MS) / 1000.0
+
+    router = AltRouter(graph)
+    # The matrix may use half the budget; the solver always gets the rest
+    matrix_deadline = t0 + (deadline - t0) / 2
+    problem = build_problem(graph, router, hotspots, start_node, budget_m, closed, deadline=matrix_deadline)
+    solution = solve_orienteering(problem.D, problem.P, budget_m, stop_cost=stop_m, closed=closed, deadline=deadline)
+
+    order = [0] + [j + 1 for j in solution.route] + ([0] if closed else [])
+    path = expand_path(router, problem.nodes[order], problem.D[order[:-1], order[1:]])
+
+    response = describe_route(graph, problem.hotspots, problem.P, problem.species,
+                              solution.route, path, solution.length, stop_m)
+    response["solver"] = {
+        "compute_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "candidates": len(problem.hotspots),
+        "iterations": solution.iterations,
+        "timed_out": solution.timed_out,
+    }
+    return PlannedRoute(problem=problem, solution=solution, path=path, response=response)
+
+
+def plan_route(
+    graph: WalkingGraph,
+    hotspots: List[Hotspot],
+    start_node: int,
+    budget_m: float,
+    stop_m: float = 0.0,
+    closed: bool = True,
+    compute_ms: Optional[int] = None,
+) -> dict:
+    """Solve the orienteering problem and return a dict shaped like ``RouteResponse``"""
+    return solve_route(graph, hotspots, start_node, budget_m, stop_m, closed, compute_ms).response
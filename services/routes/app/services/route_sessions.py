@@ -0,0 +1,222 @@
+"""
+Live route sessions: incremental re-routing while the user walks.
+
+``POST /routes/optimize`` stores the solved problem (candidate hotspots,
+their distance matrix and rewards) under a route id. Position updates then
+repair that route instead of recomputing it:
+
+* on-route updates with nothing new only trim the remaining path (no search)
+  as long as it still fits the remaining budget;
+* species already seen lose their reward, reached stops are marked visited;
+* when something changed or the walker left the route, one bounded search
+  from the current node gives the new first row of the matrix (the rest is
+  reused) and the solver is warm-started from the remaining visiting order
+  with a short deadline.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Set
+
+import numpy as np
+
+from app.models.walking_graph import WalkingGraph, project
+from app.services.route_optimizer import (
+    PlannedRoute,
+    RoutingProblem,
+    describe_route,
+    expand_path,
+    solve_orienteering,
+)
+from app.services.shortest_path import AltRouter
+
+ROUTE_SESSION_TTL_S = int(os.getenv("ROUTE_SESSION_TTL_S", str(4 * 3600)))
+MAX_ROUTE_SESSIONS = int(os.getenv("MAX_ROUTE_SESSIONS", "10000"))
+REROUTE_COMPUTE_MS = int(os.getenv("ROUTES_REROUTE_BUDGET_MS", "100"))
+ARRIVAL_RADIUS_M = 40.0     # a stop counts as visited within this distance
+OFF_ROUTE_M = 60.0          # further than this from the planned path triggers a re-route
+
+
+@dataclass
+class RouteSession:
+    id: str
+    problem: RoutingProblem
+    P: np.ndarray                 # current rewards (seen species / visited stops zeroed)
+    budget_m: float
+    stop_m: float
+    closed: bool
+    route: List[int]              # remaining stops (hotspot indices) in visiting order
+    path: List[int]               # remaining planned graph nodes
+    position: np.ndarray          # last reported position, projected metres
+    walked_m: float = 0.0
+    visited: List[int] = field(default_factory=list)
+    species_seen: Set[str] = field(default_factory=set)
+    updated_at: float = field(default_factory=time.time)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def remaining_budget_m(self) -> float:
+        return self.budget_m - self.walked_m - self.stop_m * len(self.visited)
+
+
+class RouteSessionStore:
+    """In-process session registry with TTL and a size bound (oldest evicted first)"""
+
+    def __init__(self, ttl_s: int = ROUTE_SESSION_TTL_S, max_sessions: int = MAX_ROUTE_SESSIONS):
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, graph: WalkingGraph, planned: PlannedRoute, lat: float, lon: float,
+               budget_m: float, stop_m: float, closed: bool) -> RouteSession:
+        session = RouteSession(
+            id=uuid.uuid4().hex,
+            problem=planned.problem,
+            P=planned.problem.P.copy(),
+            budget_m=budget_m,
+            stop_m=stop_m,
+            closed=closed,
+            route=list(planned.solution.route),
+            path=list(planned.path),
+            position=project(lat, lon, graph.origin),
+        )
+        with self._lock:
+            self._expire()
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, route_id: str) -> Optional[RouteSession]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(route_id)
+            if session is not None:
+                self._sessions.move_to_end(route_id)
+            return session
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_s
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.updated_at >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+route_sessions = RouteSessionStore()
+
+
+def _reroute_matrix(router: AltRouter, session: RouteSession, node: int) -> np.ndarray:
+    """Matrix for re-solving from ``node``: index 0 = current node, 1..k = hotspots, k+1 = original start.
+
+    Only the first row is new (one bounded ALT search); distances between
+    hotspots and back to the start are reused from the original problem.
+    """
+    problem = session.problem
+    k = len(problem.hotspots)
+    targets = np.append(problem.nodes[1:], problem.nodes[0])
+    row = router.distances(node, targets, max_dist=max(session.remaining_budget_m, 0.0))
+
+    D = np.empty((k + 2, k + 2))
+    D[1:k + 1, 1:k + 1] = problem.D[1:, 1:]
+    D[1:k + 1, k + 1] = D[k + 1, 1:k + 1] = problem.D[1:, 0]
+    D[k + 1, k + 1] = 0.0
+    D[0, 1:] = D[1:, 0] = row
+    D[0, 0] = 0.0
+    return D
+
+
+def update_session(graph: WalkingGraph, session: RouteSession, lat: float, lon: float,
+                   species_seen: Sequence[str] = (), compute_ms: Optional[int] = None) -> dict:
+    """Apply a position update and repair the remaining route"""
+    t0 = time.perf_counter()
+    problem = session.problem
+    position = project(lat, lon, graph.origin)
+    node, _ = graph.snap(lat, lon)
+
+    session.walked_m += float(np.linalg.norm(position - session.position))
+    session.position = position
+    session.updated_at = time.time()
+    changed = False
+
+    # Species already seen are no longer worth a detour
+    index = {sp.lower(): i for i, sp in enumerate(problem.species)}
+    already_seen = {sp.lower() for sp in session.species_seen}
+    for species in species_seen:
+        if species.lower() in index and species.lower() not in already_seen:
+            session.P[:, index[species.lower()]] = 0.0
+            changed = True
+        session.species_seen.add(species)
+
+    # Stops within reach count as visited
+    for j in list(session.route):
+        if np.linalg.norm(graph.xy[problem.hotspots[j].node] - position) <= ARRIVAL_RADIUS_M:
+            session.route.remove(j)
+            session.visited.append(j)
+            session.P[j] = 0.0
+            changed = True
+
+    # Position along the remaining planned path. The path is trimmed to the
+    # last match, so every node in it is at or after the walker's progress;
+    # the nearest one (not the first) keeps loops that pass the same spot
+    # twice from rewinding to the earlier pass.
+    offsets = np.linalg.norm(graph.xy[np.asarray(session.path, dtype=np.int64)] - position, axis=1)
+    near = np.flatnonzero(offsets <= OFF_ROUTE_M)
+
+    reroute = changed or not near.size
+    if not reroute:
+        remaining = session.path[int(near[np.argmin(offsets[near])]):]
+        # Still on the planned path: re-route only if it no longer fits the budget
+        if graph.path_length(remaining) + session.stop_m * len(session.route) > session.remaining_budget_m + OFF_ROUTE_M:
+            reroute = True
+        else:
+            session.path = remaining
+            status = "on_route"
+
+    if reroute:
+        router = AltRouter(graph)
+        D = _reroute_matrix(router, session, node)
+        k = len(problem.hotspots)
+        deadline = t0 + (compute_ms or REROUTE_COMPUTE_MS) / 1000.0
+        solution = solve_orienteering(
+            D, session.P, session.remaining_budget_m, stop_cost=session.stop_m,
+            closed=session.closed, end=k + 1, deadline=deadline,
+            initial_route=session.route, max_stale=10,
+        )
+        session.route = solution.route
+
+        waypoints = [node] + [problem.hotspots[j].node for j in session.route]
+        if session.closed:
+            waypoints.append(int(problem.nodes[0]))
+        session.path = expand_path(router, waypoints)
+        status = "rerouted"
+
+    home = graph.xy[problem.nodes[0]]
+    if not session.route and (not session.closed or np.linalg.norm(home - position) <= ARRIVAL_RADIUS_M):
+        status = "completed"
+
+    remaining_walk = graph.path_length(session.path)
+    response = describe_route(graph, problem.hotspots, session.P, problem.species, session.route,
+                              session.path, remaining_walk + session.stop_m * len(session.route), session.stop_m)
+    response.update({
+        "route_id": session.id,
+        "status": status,
+        "visited_stops": len(session.visited),
+        "species_seen": sorted(session.species_seen),
+        "remaining_budget_m": round(session.remaining_budget_m, 1),
+        "compute_ms": round((time.perf_counter() - t0) * 1000, 1),
+    })
+    return response
@@ -0,0 +1,179 @@
+"""
+Point-to-point shortest paths with ALT (A*, Landmarks, Triangle inequality).
+
+A few landmark nodes are chosen offline by ``app.build_graph`` and the walking
+distance from each landmark to every node is stored next to the graph. For
+any nodes ``v`` and ``t`` the triangle inequality gives the lower bound::
+
+    d(v, t) >= max_l |d(l, v) - d(l, t)|
+
+which is a consistent A* heuristic. Queries then settle a narrow corridor
+between source and target instead of the whole Dijkstra ball, and the same
+bounds let the route optimizer discard hotspots without searching at all.
+One-to-many rows (the route optimizer's distance matrix) use the minimum of
+the bounds over all targets, which is still consistent, and stop once every
+target is settled.
+"""
+
+import heapq
+from typing import List, Tuple
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+from app.models.walking_graph import WalkingGraph
+
+# Landmarks used per query (the ones giving the best bound for s -> t)
+ACTIVE_LANDMARKS = 4
+
+
+def select_landmarks(graph: WalkingGraph, n_landmarks: int = 16, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick landmarks by farthest-point selection and compute their distances.
+
+    Returns ``(landmarks, landmark_dist)`` with ``landmark_dist`` shaped
+    ``(n_nodes, n_landmarks)`` (float32, node-major so one node's bounds are
+    contiguous). Run offline; it costs one full Dijkstra per landmark.
+    """
+    n_landmarks = min(n_landmarks, graph.n_nodes)
+    csr = graph.to_csr()
+    rng = np.random.default_rng(seed)
+
+    # Start from the node farthest from a random one, then keep adding the
+    # node farthest from all landmarks chosen so far (good peripheral spread)
+    first = dijkstra(csr, indices=int(rng.integers(graph.n_nodes)))
+    current = int(np.argmax(np.where(np.isfinite(first), first, -1)))
+
+    landmarks = []
+    dist = np.empty((n_landmarks, graph.n_nodes), dtype=np.float64)
+    closest = np.full(graph.n_nodes, np.inf)
+    for i in range(n_landmarks):
+        landmarks.append(current)
+        dist[i] = dijkstra(csr, indices=current)
+        closest = np.minimum(closest, dist[i])
+        current = int(np.argmax(np.where(np.isfinite(closest), closest, -1)))
+
+    return np.asarray(landmarks, dtype=np.int32), np.ascontiguousarray(dist.T, dtype=np.float32)
+
+
+class AltRouter:
+    """ALT point-to-point queries over a :class:`WalkingGraph`.
+
+    Falls back to plain Dijkstra order (zero heuristic) when the graph was
+    built without landmarks.
+    """
+
+    def __init__(self, graph: WalkingGraph):
+        self.graph = graph
+        self.table = graph.landmark_dist
+
+    def lower_bound(self, source: int, targets) -> np.ndarray:
+        """Landmark lower bounds on the walking distance ``source -> targets``"""
+        targets = np.asarray(targets, dtype=np.int64)
+        if self.table is None:
+            return np.zeros(targets.shape)
+        return np.abs(self.table[targets] - self.table[source]).max(axis=-1).astype(np.float64)
+
+    def shortest_path(self, source: int, target: int, max_dist: float = np.inf) -> Tuple[float, List[int]]:
+        """Return ``(distance, node path)``; ``(inf, [])`` if unreachable within ``max_dist``"""
+        source, target = int(source), int(target)
+        if source == target:
+            return 0.0, [source]
+
+        graph, table = self.graph, self.table
+        if table is not None:
+            # Only the landmarks that bound this pair best are worth evaluating
+            gap = np.abs(table[source] - table[target])
+            active = np.argsort(gap)[-ACTIVE_LANDMARKS:]
+            target_row = table[target, active]
+            h0 = float(gap[active].max())
+        else:
+            h0 = 0.0
+
+        if h0 > max_dist:
+            return np.inf, []
+
+        dist = {source: 0.0}
+        parent = {source: source}
+        settled = set()
+        heap = [(h0, 0.0, source)]
+
+        while heap:
+            f, d, u = heapq.heappop(heap)
+            if f > max_dist:
+                return np.inf, []
+            if u == target:
+                break
+            if u in settled:
+                continue
+            settled.add(u)
+
+            neighbours, lengths = graph.neighbors(u)
+            if table is not None:
+                h = np.abs(table[neighbours[:, None], active] - target_row).max(axis=1).tolist()
+            else:
+                h = [0.0] * len(neighbours)
+
+            for v, w, hv in zip(neighbours.tolist(), lengths.tolist(), h):
+                dv = d + w
+                if dv < dist.get(v, np.inf):
+                    dist[v] = dv
+                    parent[v] = u
+                    heapq.heappush(heap, (dv + hv, dv, v))
+        else:
+            return np.inf, []
+
+        path = [target]
+        while path[-1] != source:
+            path.append(parent[path[-1]])
+        return dist[target], path[::-1]
+
+    def distance(self, source: int, target: int, max_dist: float = np.inf) -> float:
+        return self.shortest_path(source, target, max_dist)[0]
+
+    def distances(self, source: int, targets, max_dist: float = np.inf) -> np.ndarray:
+        """Distances ``source -> targets`` from one search; ``inf`` beyond ``max_dist``"""
+        source = int(source)
+        targets = np.asarray(targets, dtype=np.int64)
+        result = np.full(len(targets), np.inf)
+        if len(targets) == 0:
+            return result
+
+        remaining = {}
+        for i, t in enumerate(targets.tolist()):
+            remaining.setdefault(t, []).append(i)
+
+        graph, table = self.graph, self.table
+        # Bound towards the nearest target; fixed for the whole search so it stays consistent
+        target_rows = table[targets] if table is not None else None
+        h0 = float(np.abs(target_rows - table[source]).max(axis=1).min()) if table is not None else 0.0
+
+        dist = {source: 0.0}
+        settled = set()
+        heap = [(h0, 0.0, source)]
+
+        while heap:
+            f, d, u = heapq.heappop(heap)
+            # Every target still open is at least f away
+            if f > max_dist:
+                break
+            if u in settled:
+                continue
+            settled.add(u)
+            if u in remaining:
+                result[remaining.pop(u)] = d
+                if not remaining:
+                    break
+
+            neighbours, lengths = graph.neighbors(u)
+            if table is not None:
+                h = np.abs(table[neighbours][:, None, :] - target_rows[None]).max(axis=2).min(axis=1).tolist()
+            else:
+                h = [0.0] * len(neighbours)
+
+            for v, w, hv in zip(neighbours.tolist(), lengths.tolist(), h):
+                dv = d + w
+                if dv < dist.get(v, np.inf):
+                    dist[v] = dv
+                    heapq.heappush(heap, (dv + hv, dv, v))
+
+        return result
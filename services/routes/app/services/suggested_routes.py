@@ -0,0 +1,148 @@
+"""
+Suggested routes per neighbourhood, precomputed off-peak.
+
+One route is planned from a representative point of every zone in
+``barriosbaq.geojson`` (the same zones the maps model uses) for the next
+morning. The result is written next to the graph artifacts and served as-is
+during the day, so peak traffic never pays for these solves.
+
+The precomputation runs nightly inside the service (``ROUTES_SUGGESTED_AT``)
+or on demand with ``python -m app.precompute_routes``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from shapely.geometry import shape
+
+from app.services.batch_planner import PlanTask, fetch_all_cells, plan_batch, summarize
+from app.services.route_optimizer import WALKING_SPEED_M_PER_MIN
+
+logger = logging.getLogger(__name__)
+
+# One zones file for the whole repo, owned by the sightings service; the
+# Docker image gets it through the "zones" build context
+ZONES_FILE = os.getenv("ROUTES_ZONES_FILE", os.path.join(
+    os.path.dirname(__file__), "..", "..", "..", "sightings", "app", "data", "barriosbaq.geojson"))
+SUGGESTED_ROUTES_FILE = "suggested_routes.json"   # inside the graph directory
+SUGGESTED_MINUTES = float(os.getenv("ROUTES_SUGGESTED_MINUTES", "60"))
+SUGGESTED_STOP_MINUTES = 5.0
+SUGGESTED_COMPUTE_MS = 2000                       # off-peak: let the solver search longer
+SUGGESTED_START_HOUR = 6                          # plan for the next morning
+# Local time of the nightly refresh ("HH:MM"); empty disables it
+SUGGESTED_AT = os.getenv("ROUTES_SUGGESTED_AT", "03:00")
+
+# Loaded at startup and replaced after every refresh
+suggested_routes: Optional[dict] = None
+
+
+def load_zones(path: str = ZONES_FILE) -> List[dict]:
+    """``{"zone", "lat", "lon"}`` for every zone; the point is guaranteed inside the polygon"""
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    zones = []
+    for i, feature in enumerate(collection.get("features", [])):
+        if not feature.get("geometry"):
+            continue
+        point = shape(feature["geometry"]).representative_point()
+        name = (feature.get("properties") or {}).get("name") or f"zone-{i}"
+        zones.append({"zone": name, "lat": point.y, "lon": point.x})
+    return zones
+
+
+def next_morning(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.now()
+    return (now + timedelta(days=1)).replace(hour=SUGGESTED_START_HOUR, minute=0, second=0, microsecond=0)
+
+
+async def precompute(executor: Executor, zones: List[dict], datetime_iso: str,
+                     minutes: float = SUGGESTED_MINUTES) -> dict:
+    """Plan the suggested route of every zone on ``executor``"""
+    t0 = time.time()
+    cells = await fetch_all_cells([(z["lat"], z["lon"]) for z in zones], datetime_iso)
+
+    tasks, results = [], []
+    for zone, zone_cells in zip(zones, cells):
+        if zone_cells is None:
+            results.append({"id": zone["zone"], "lat": zone["lat"], "lon": zone["lon"],
+                            "route": None, "error": "Maps service unavailable"})
+            continue
+        tasks.append(PlanTask(
+            key=zone["zone"], lat=zone["lat"], lon=zone["lon"], cells=zone_cells,
+            budget_m=minutes * WALKING_SPEED_M_PER_MIN,
+            stop_m=SUGGESTED_STOP_MINUTES * WALKING_SPEED_M_PER_MIN,
+            compute_ms=SUGGESTED_COMPUTE_MS,
+        ))
+    results.extend(await plan_batch(executor, tasks))
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "datetime": datetime_iso,
+        "max_minutes": minutes,
+        "compute_s": round(time.time() - t0, 1),
+        **summarize(results),
+        "zones": [
+            {"zone": r["id"], "lat": r["lat"], "lon": r["lon"], "route": r["route"], "error": r["error"]}
+            for r in results
+        ],
+    }
+
+
+def save(data: dict, graph_dir: str) -> str:
+    """Write atomically so the serving process never reads a partial file"""
+    path = os.path.join(graph_dir, SUGGESTED_ROUTES_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+    return path
+
+
+def load(graph_dir: str) -> Optional[dict]:
+    global suggested_routes
+    path = os.path.join(graph_dir, SUGGESTED_ROUTES_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            suggested_routes = json.load(f)
+    except FileNotFoundError:
+        logger.info(f"No suggested routes in {graph_dir} yet")
+        suggested_routes = None
+    return suggested_routes
+
+
+def find_zone(zone: str) -> Optional[dict]:
+    if suggested_routes is None:
+        return None
+    wanted = zone.strip().lower()
+    return next((z for z in suggested_routes["zones"] if z["zone"].lower() == wanted), None)
+
+
+def seconds_until(at: str, now: Optional[datetime] = None) -> float:
+    """Seconds until the next local ``HH:MM``"""
+    now = now or datetime.now()
+    hour, minute = (int(x) for x in at.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def nightly_refresh(get_executor, graph_dir: str, at: str = SUGGESTED_AT) -> None:
+    """Background task: recompute and swap the suggested routes every night at ``at``"""
+    global suggested_routes
+    while True:
+        await asyncio.sleep(seconds_until(at))
+        try:
+            data = await precompute(get_executor(), load_zones(), next_morning().isoformat())
+            save(data, graph_dir)
+            suggested_routes = data
+            logger.info(f"Suggested routes refreshed: {data['planned']}/{data['requested']} zones")
+        except Exception:
+            logger.exception("Nightly suggested routes refresh failed")
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from app.build_graph import build_walking_graph
+from app.services.shortest_path import select_landmarks
+
+# ~100 m between grid nodes around Barranquilla
+GRID_ORIGIN = (10.98, -74.80)
+GRID_STEP = 0.0009
+
+
+def make_grid_graph(rows: int = 10, cols: int = 10):
+    """Grid-shaped street network: rows x cols nodes joined to their 4 neighbours"""
+    ids = np.arange(rows * cols).reshape(rows, cols)
+    lat = GRID_ORIGIN[0] + GRID_STEP * np.repeat(np.arange(rows), cols)
+    lon = GRID_ORIGIN[1] + GRID_STEP * np.tile(np.arange(cols), rows)
+
+    u = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    v = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    length = np.full(len(u), 100.0)
+    graph = build_walking_graph(ids.ravel() + 1000, lat, lon, u, v, length)
+    graph.landmarks, graph.landmark_dist = select_landmarks(graph, 4)
+    return graph
+
+
+@pytest.fixture
+def grid_graph():
+    """Walking graph de prueba (grilla 10x10, aristas de 100 m)"""
+    return make_grid_graph()
+
+
+@pytest.fixture
+def graph_dir(tmp_path, grid_graph):
+    """Directorio con los artefactos .npy del grafo de prueba"""
+    grid_graph.save(str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def test_client(monkeypatch, graph_dir):
+    """Cliente de prueba con el grafo de grilla cargado"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.models import loader
+
+    monkeypatch.setattr(loader, "GRAPH_DIR", graph_dir)
+    with TestClient(app) as client:
+        yield client
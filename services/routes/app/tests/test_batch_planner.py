@@ -0,0 +1,133 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from shapely.geometry import Point, shape
+
+from app.services import batch_planner, suggested_routes
+from app.services.batch_planner import PlanTask, create_pool, plan_batch, run_task
+from app.tests.conftest import GRID_ORIGIN, GRID_STEP
+
+CELLS = [
+    (GRID_ORIGIN[0] + 2 * GRID_STEP, GRID_ORIGIN[1] + 2 * GRID_STEP, {"Ardea alba": 0.8}),
+    (GRID_ORIGIN[0] + 5 * GRID_STEP, GRID_ORIGIN[1] + 1 * GRID_STEP, {"Coragyps atratus": 0.6}),
+]
+
+
+def _task(key, row, col, **kwargs):
+    return PlanTask(key=key, lat=GRID_ORIGIN[0] + row * GRID_STEP, lon=GRID_ORIGIN[1] + col * GRID_STEP,
+                    cells=CELLS, budget_m=1500, **kwargs)
+
+
+def test_run_task_reports_errors_per_origin(grid_graph):
+    """Un origen fuera de la red no hace fallar el resto del lote"""
+    ok = run_task(_task("a", 0, 0), grid_graph)
+    far = run_task(PlanTask(key="b", lat=11.5, lon=-74.0, cells=CELLS, budget_m=1500), grid_graph)
+
+    assert ok["error"] is None
+    assert ok["route"]["expected_species"] > 0
+    assert far["route"] is None
+    assert "outside" in far["error"]
+
+
+def test_failing_task_does_not_fail_the_batch(monkeypatch, grid_graph):
+    """Una excepción del optimizador se reporta en su tarea y el resto se planifica"""
+    plan_route = batch_planner.plan_route
+
+    def flaky_plan_route(graph, hotspots, start_node, *args, **kwargs):
+        if start_node == grid_graph.snap(GRID_ORIGIN[0] + 9 * GRID_STEP, GRID_ORIGIN[1] + 9 * GRID_STEP)[0]:
+            raise ValueError("solver exploded")
+        return plan_route(graph, hotspots, start_node, *args, **kwargs)
+
+    monkeypatch.setattr(batch_planner, "plan_route", flaky_plan_route)
+    monkeypatch.setattr(batch_planner, "_worker_graph", grid_graph)
+
+    with ThreadPoolExecutor(2) as executor:
+        results = asyncio.run(plan_batch(executor, [_task("a", 0, 0), _task("b", 9, 9)]))
+
+    assert [r["id"] for r in results] == ["a", "b"]
+    assert results[0]["error"] is None and results[0]["route"] is not None
+    assert results[1]["route"] is None
+    assert "solver exploded" in results[1]["error"]
+    assert batch_planner.summarize(results) == {"requested": 2, "planned": 1, "failed": 1}
+
+
+def test_process_pool_workers_map_the_graph(graph_dir, grid_graph):
+    """Los workers cargan el grafo del disco y dan el mismo resultado que en proceso"""
+    tasks = [_task("a", 0, 0), _task("b", 9, 9), _task("c", 4, 4)]
+
+    with create_pool(graph_dir, workers=2) as pool:
+        results = asyncio.run(plan_batch(pool, tasks))
+
+    assert [r["id"] for r in results] == ["a", "b", "c"]
+    for task, result in zip(tasks, results):
+        expected = run_task(task, grid_graph)["route"]
+        assert result["route"]["distance_m"] == expected["distance_m"]
+        assert result["route"]["expected_species"] == expected["expected_species"]
+
+
+def test_load_zones_points_inside_polygons():
+    """Cada barrio da un punto de inicio dentro de su polígono"""
+    zones = suggested_routes.load_zones()
+    with open(suggested_routes.ZONES_FILE, encoding="utf-8") as f:
+        features = {z["properties"]["name"]: shape(z["geometry"]) for z in json.load(f)["features"]}
+
+    assert len(zones) == len(features)
+    for zone in zones:
+        assert features[zone["zone"]].contains(Point(zone["lon"], zone["lat"]))
+
+
+def test_seconds_until_next_run():
+    now = datetime(2024, 5, 1, 4, 0)
+    assert suggested_routes.seconds_until("03:00", now) == 23 * 3600
+    assert suggested_routes.seconds_until("05:30", now) == 5400
+
+
+def test_precompute_and_serve_suggested_routes(test_client, monkeypatch, grid_graph, graph_dir):
+    """Las rutas sugeridas se precalculan por barrio y luego se sirven sin calcular"""
+    async def fake_fetch_all_cells(points, datetime_iso, concurrency=8):
+        return [CELLS if i else None for i, _ in enumerate(points)]
+
+    monkeypatch.setattr(suggested_routes, "fetch_all_cells", fake_fetch_all_cells)
+    monkeypatch.setattr(batch_planner, "_worker_graph", grid_graph)
+    zones = [{"zone": "Centro", "lat": 10.0, "lon": -74.0},
+             {"zone": "El Prado", "lat": GRID_ORIGIN[0], "lon": GRID_ORIGIN[1]}]
+
+    assert test_client.get("/routes/suggested").status_code == 404
+
+    with ThreadPoolExecutor(2) as executor:
+        data = asyncio.run(suggested_routes.precompute(executor, zones, "2024-05-02T06:00:00"))
+    suggested_routes.save(data, graph_dir)
+    suggested_routes.load(graph_dir)
+
+    assert (data["requested"], data["planned"], data["failed"]) == (2, 1, 1)
+
+    listing = test_client.get("/routes/suggested").json()
+    assert [z["zone"] for z in listing["zones"]] == ["Centro", "El Prado"]
+    assert listing["zones"][1]["expected_species"] > 0
+
+    route = test_client.get("/routes/suggested/el prado").json()
+    assert route["route"]["path"]
+    assert test_client.get("/routes/suggested/Nowhere").status_code == 404
+
+
+def test_batch_endpoint(test_client, monkeypatch):
+    async def fake_fetch_cells(lat, lon, datetime_iso, grid_size=0.001):
+        return CELLS
+
+    monkeypatch.setattr(batch_planner, "fetch_cells", fake_fetch_cells)
+    origins = [
+        {"id": "alumno-1", "lat": GRID_ORIGIN[0], "lon": GRID_ORIGIN[1]},
+        {"lat": GRID_ORIGIN[0] + 9 * GRID_STEP, "lon": GRID_ORIGIN[1] + 9 * GRID_STEP},
+        {"id": "lejos", "lat": 11.5, "lon": -74.0},
+    ]
+
+    resp = test_client.post("/routes/batch", json={"origins": origins, "max_minutes": 20})
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["requested"], body["planned"], body["failed"]) == (3, 2, 1)
+    assert [r["id"] for r in body["routes"]] == ["alumno-1", "1", "lejos"]
+    assert body["routes"][0]["route"]["distance_m"] <= 20 * 75
+    assert body["routes"][2]["error"]
@@ -0,0 +1,49 @@
+import pytest
+from shapely.geometry import Point, shape
+
+from app.services.isochrone import LRUCache, compute_isochrone, isochrone_cache
+from app.tests.conftest import GRID_ORIGIN, GRID_STEP
+
+
+def test_isochrone_covers_reachable_nodes(grid_graph):
+    """10 min a 75 m/min = 750 m: 7 cuadras (Manhattan) desde la esquina"""
+    feature = compute_isochrone(grid_graph, 0, 10)
+    polygon = shape(feature["geometry"])
+
+    assert feature["properties"]["reachable_nodes"] == sum(1 for r in range(10) for c in range(10) if r + c <= 7)
+    assert polygon.contains(Point(GRID_ORIGIN[1] + 3 * GRID_STEP, GRID_ORIGIN[0] + 4 * GRID_STEP))
+    assert not polygon.contains(Point(GRID_ORIGIN[1] + 6 * GRID_STEP, GRID_ORIGIN[0] + 6 * GRID_STEP))
+
+
+def test_lru_cache_evicts_oldest():
+    cache = LRUCache(2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.put("c", {"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_isochrone_endpoint_is_cached_by_snapped_node(test_client):
+    """Dos puntos que se ajustan al mismo nodo comparten la entrada de caché"""
+    params = {"lat": GRID_ORIGIN[0], "lon": GRID_ORIGIN[1], "minutes": 5}
+    first = test_client.get("/isochrone", params=params)
+    params["lat"] += 0.0001
+    second = test_client.get("/isochrone", params=params)
+
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert first.json() == second.json()
+    assert first.json()["geometry"]["type"] == "Polygon"
+    assert len(isochrone_cache) == 1
+
+
+@pytest.mark.parametrize("minutes", [0, 500])
+def test_isochrone_validates_minutes(test_client, minutes):
+    response = test_client.get("/isochrone", params={"lat": GRID_ORIGIN[0], "lon": GRID_ORIGIN[1], "minutes": minutes})
+    assert response.status_code == 422
@@ -0,0 +1,195 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.services import maps_client
+from app.services.maps_client import cells_from_distribution
+from app.services.route_optimizer import build_problem, plan_route, select_hotspots, solve_orienteering
+from app.services.shortest_path import AltRouter
+from app.tests.conftest import GRID_ORIGIN, GRID_STEP
+
+
+def _cell(row, col, probs):
+    return (GRID_ORIGIN[0] + row * GRID_STEP, GRID_ORIGIN[1] + col * GRID_STEP, probs)
+
+
+def test_cells_from_distribution_transposes_species_areas():
+    """Las áreas por especie se agrupan en celdas con probabilidad por especie"""
+    square = [{"lat": 0.0, "lon": 0.0}, {"lat": 0.0, "lon": 0.002},
+              {"lat": 0.002, "lon": 0.002}, {"lat": 0.002, "lon": 0.0}]
+    body = {"species_distributions": [
+        {"species": "Ardea alba", "areas": [{"polygon": square, "probability": 0.4}]},
+        {"species": "Coragyps atratus", "areas": [{"polygon": square, "probability": 0.7}]},
+    ]}
+
+    cells = cells_from_distribution(body)
+
+    assert cells == [(0.001, 0.001, {"Ardea alba": 0.4, "Coragyps atratus": 0.7})]
+
+
+def test_solver_prefers_reward_within_budget():
+    """Con presupuesto limitado se elige el hotspot más valioso alcanzable"""
+    # start, A (close, low reward), B (close, high reward), C (far, highest reward)
+    D = np.array([
+        [0, 100, 150, 900],
+        [100, 0, 120, 900],
+        [150, 120, 0, 900],
+        [900, 900, 900, 0],
+    ], dtype=float)
+    P = np.array([[0.2], [0.6], [0.9]])
+
+    solution = solve_orienteering(D, P, budget=300)
+
+    assert solution.route == [1]
+    assert solution.length <= 300
+    assert solution.reward == pytest.approx(0.6)
+
+
+def test_solver_combines_species_and_respects_stop_cost():
+    """La recompensa es el número esperado de especies distintas"""
+    D = np.full((4, 4), 100.0)
+    np.fill_diagonal(D, 0)
+    P = np.array([[0.9, 0.0], [0.9, 0.0], [0.0, 0.5]])
+
+    # Con paradas de 50 m solo caben dos hotspots (3 tramos + 2 paradas = 400)
+    solution = solve_orienteering(D, P, budget=400, stop_cost=50)
+
+    assert sorted(solution.route) in ([0, 2], [1, 2])
+    assert solution.reward == pytest.approx(1.4)
+
+
+def test_solver_honours_deadline():
+    """Con el plazo vencido devuelve la solución greedy sin iterar"""
+    rng = np.random.default_rng(1)
+    pts = rng.uniform(0, 1000, size=(31, 2))
+    D = np.linalg.norm(pts[:, None] - pts[None], axis=-1)
+    P = rng.uniform(0, 0.5, size=(30, 5))
+
+    solution = solve_orienteering(D, P, budget=3000, deadline=time.perf_counter())
+
+    assert solution.timed_out
+    assert solution.iterations == 0
+    assert solution.route
+    assert solution.length <= 3000
+
+
+def test_plan_route_on_grid(grid_graph):
+    """La ruta cerrada visita hotspots alcanzables y vuelve al inicio"""
+    cells = [
+        _cell(0, 3, {"Ardea alba": 0.8}),
+        _cell(3, 0, {"Coragyps atratus": 0.6}),
+        _cell(9, 9, {"Ramphastos sulfuratus": 0.9}),
+    ]
+    hotspots = select_hotspots(grid_graph, cells)
+    start, _ = grid_graph.snap(*GRID_ORIGIN)
+
+    result = plan_route(grid_graph, hotspots, start, budget_m=1300)
+
+    species = {sp for stop in result["stops"] for sp in stop["species_probabilities"]}
+    assert species == {"Ardea alba", "Coragyps atratus"}
+    assert result["distance_m"] == pytest.approx(1200)
+    assert result["path"][0] == result["path"][-1]
+    assert result["expected_species"] == pytest.approx(1.4)
+
+
+def test_matrix_stops_at_the_deadline_keeping_the_nearest(grid_graph, monkeypatch):
+    """Si vence el plazo a mitad de la matriz se quedan los hotspots más cercanos"""
+    cells = [
+        _cell(6, 6, {"Ramphastos sulfuratus": 0.9}),
+        _cell(0, 1, {"Ardea alba": 0.8}),
+        _cell(3, 3, {"Coragyps atratus": 0.6}),
+    ]
+    hotspots = select_hotspots(grid_graph, cells)
+    start, _ = grid_graph.snap(*GRID_ORIGIN)
+    router = AltRouter(grid_graph)
+    distances = router.distances
+
+    def slow_distances(source, targets, max_dist=np.inf):
+        if source != start:
+            time.sleep(0.05)
+        return distances(source, targets, max_dist=max_dist)
+    monkeypatch.setattr(router, "distances", slow_distances)
+
+    problem = build_problem(grid_graph, router, hotspots, start, budget_m=5000,
+                            deadline=time.perf_counter() + 0.01)
+
+    assert [h.probabilities for h in problem.hotspots] == [{"Ardea alba": 0.8}]
+    assert problem.D.shape == (2, 2)
+    assert problem.D[0, 1] == pytest.approx(100)
+    solution = solve_orienteering(problem.D, problem.P, 5000)
+    assert solution.route == [0]
+
+
+def test_select_hotspots_filters_target_species(grid_graph):
+    cells = [_cell(1, 1, {"Ardea alba": 0.3, "Coragyps atratus": 0.9}), _cell(2, 2, {"Coragyps atratus": 0.5})]
+
+    hotspots = select_hotspots(grid_graph, cells, target_species=["ardea alba"])
+
+    assert len(hotspots) == 1
+    assert hotspots[0].probabilities == {"Ardea alba": 0.3}
+
+
+def test_optimize_endpoint(test_client, monkeypatch):
+    """POST /routes/optimize usa las probabilidades del servicio de mapas"""
+    async def fake_fetch_cells(lat, lon, datetime_iso, grid_size=0.001):
+        return [_cell(0, 2, {"Ardea alba": 0.7}), _cell(2, 0, {"Ardea alba": 0.5})]
+
+    monkeypatch.setattr("app.api.routes.fetch_cells", fake_fetch_cells)
+
+    response = test_client.post("/routes/optimize", json={
+        "lat": GRID_ORIGIN[0], "lon": GRID_ORIGIN[1], "max_minutes": 20, "max_compute_ms": 200,
+    })
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["stops"]) == 2
+    assert data["expected_species"] == pytest.approx(0.85)
+    assert data["distance_m"] <= 20 * 75
+
+
+def test_maps_requests_share_the_app_client(monkeypatch, graph_dir):
+    """Las consultas al servicio de mapas reutilizan un solo cliente abierto con la app"""
+    import httpx
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.models import loader
+
+    d = GRID_STEP / 2
+    square = [{"lat": GRID_ORIGIN[0] + 2 * GRID_STEP + dy, "lon": GRID_ORIGIN[1] + dx}
+              for dy, dx in ((-d, -d), (-d, d), (d, d), (d, -d))]
+    body = {"zone": "grid", "species_distributions": [
+        {"species": "Ardea alba", "areas": [{"polygon": square, "probability": 0.7}]},
+    ]}
+    requests = []
+
+    def maps_service(request):
+        requests.append(request.url.path)
+        return httpx.Response(200, json=body)
+
+    clients = []
+
+    def new_client():
+        clients.append(httpx.AsyncClient(base_url="http://maps", transport=httpx.MockTransport(maps_service)))
+        return clients[-1]
+
+    monkeypatch.setattr(maps_client, "_new_client", new_client)
+    monkeypatch.setattr(loader, "GRAPH_DIR", graph_dir)
+
+    with TestClient(app) as client:
+        for _ in range(2):
+            response = client.post("/routes/optimize", json={
+                "lat": GRID_ORIGIN[0], "lon": GRID_ORIGIN[1], "max_minutes": 20, "max_compute_ms": 100,
+            })
+            assert response.status_code == 200
+            assert len(response.json()["stops"]) == 1
+
+    assert requests == ["/distribution-zone"] * 2
+    assert len(clients) == 1
+    assert clients[0].is_closed
+    assert maps_client._client is None
+
+
+def test_optimize_requires_budget(test_client):
+    response = test_client.post("/routes/optimize", json={"lat": GRID_ORIGIN[0], "lon": GRID_ORIGIN[1]})
+    assert response.status_code == 422
@@ -0,0 +1,102 @@
+import pytest
+
+from app.services.route_optimizer import select_hotspots, solve_route
+from app.services.route_sessions import RouteSessionStore, update_session
+from app.tests.conftest import GRID_ORIGIN, GRID_STEP
+
+
+def _at(row, col):
+    return GRID_ORIGIN[0] + row * GRID_STEP, GRID_ORIGIN[1] + col * GRID_STEP
+
+
+@pytest.fixture
+def session(grid_graph):
+    """Ruta cerrada desde la esquina (0, 0) con tres hotspots"""
+    cells = [
+        (*_at(0, 3), {"Ardea alba": 0.8}),
+        (*_at(3, 3), {"Coragyps atratus": 0.6}),
+        (*_at(3, 0), {"Cathartes aura": 0.5}),
+    ]
+    hotspots = select_hotspots(grid_graph, cells)
+    planned = solve_route(grid_graph, hotspots, 0, budget_m=1300)
+    assert len(planned.solution.route) == 3
+
+    store = RouteSessionStore()
+    return store.create(grid_graph, planned, *_at(0, 0), budget_m=1300, stop_m=0.0, closed=True)
+
+
+def test_on_route_update_only_trims_path(grid_graph, session):
+    """Sin cambios y sobre la ruta no se recalcula nada"""
+    first_leg = session.path[1]
+    lat, lon = grid_graph.coords([first_leg])[0]
+
+    result = update_session(grid_graph, session, lat, lon)
+
+    assert result["status"] == "on_route"
+    assert session.path[0] == first_leg
+    assert len(result["stops"]) == 3
+    assert result["remaining_budget_m"] == pytest.approx(1200, abs=1)
+
+
+def test_path_passing_a_spot_twice_does_not_rewind(grid_graph, session):
+    """En un tramo de ida y vuelta se toma el nodo más cercano, no el primero"""
+    session.path = [3, 2, 1, 0]  # regreso por la fila 0 desde (0, 3)
+    session.position = grid_graph.xy[3]
+
+    result = update_session(grid_graph, session, *_at(0, 1.45))
+
+    assert result["status"] == "on_route"
+    assert session.path == [1, 0]
+
+
+def test_seen_species_drops_stop(grid_graph, session):
+    """Una especie ya vista deja de dar recompensa y su hotspot sale de la ruta"""
+    result = update_session(grid_graph, session, *_at(0, 0), species_seen=["ardea alba"])
+
+    assert result["status"] == "rerouted"
+    species = {sp for stop in result["stops"] for sp in stop["species_probabilities"]}
+    assert species == {"Coragyps atratus", "Cathartes aura"}
+    assert result["species_seen"] == ["ardea alba"]
+
+
+def test_arrival_and_off_route_reroute_from_current_node(grid_graph, session):
+    """Al llegar a un hotspot se marca visitado; la ruta sigue desde la posición actual"""
+    result = update_session(grid_graph, session, *_at(0, 3))
+    assert result["visited_stops"] == 1
+    assert len(result["stops"]) == 2
+    assert result["path"][0] == pytest.approx(dict(zip(("lat", "lon"), _at(0, 3))))
+
+    # Desvío lejos de la ruta planificada
+    result = update_session(grid_graph, session, *_at(1, 6))
+    assert result["status"] == "rerouted"
+    assert result["path"][0] == pytest.approx(dict(zip(("lat", "lon"), _at(1, 6))))
+    assert result["path"][-1] == pytest.approx(dict(zip(("lat", "lon"), _at(0, 0))))
+
+
+def test_exhausted_budget_heads_home(grid_graph, session):
+    """Sin presupuesto restante la ruta se reduce al regreso al inicio"""
+    session.walked_m = 1250
+    result = update_session(grid_graph, session, *_at(0, 1))
+
+    assert result["stops"] == []
+    assert result["path"][-1] == pytest.approx(dict(zip(("lat", "lon"), _at(0, 0))))
+
+    result = update_session(grid_graph, session, *_at(0, 0))
+    assert result["status"] == "completed"
+
+
+def test_update_endpoint(test_client, monkeypatch):
+    async def fake_fetch_cells(lat, lon, datetime_iso, grid_size=0.001):
+        return [(*_at(0, 2), {"Ardea alba": 0.7}), (*_at(2, 0), {"Cathartes aura": 0.5})]
+
+    monkeypatch.setattr("app.api.routes.fetch_cells", fake_fetch_cells)
+    created = test_client.post("/routes/optimize", json={"lat": GRID_ORIGIN[0], "lon": GRID_ORIGIN[1], "max_minutes": 20})
+    route_id = created.json()["route_id"]
+    assert route_id
+
+    lat, lon = _at(0, 2)
+    response = test_client.post(f"/routes/{route_id}/update", json={"lat": lat, "lon": lon})
+
+    assert response.status_code == 200
+    assert response.json()["visited_stops"] == 1
+    assert test_client.post("/routes/unknown/update", json={"lat": lat, "lon": lon}).status_code == 404
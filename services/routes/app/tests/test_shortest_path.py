@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from scipy.sparse.csgraph import dijkstra
+
+from app.build_graph import build_walking_graph
+from app.services.shortest_path import AltRouter, select_landmarks
+
+
+@pytest.fixture
+def random_graph():
+    """Grafo aleatorio con longitudes variables para comparar contra Dijkstra"""
+    rng = np.random.default_rng(7)
+    n = 400
+    lat = 10.98 + rng.uniform(0, 0.02, n)
+    lon = -74.80 + rng.uniform(0, 0.02, n)
+    u = np.concatenate([np.arange(n - 1), rng.integers(0, n, 800)])
+    v = np.concatenate([np.arange(1, n), rng.integers(0, n, 800)])
+    length = rng.uniform(20, 400, len(u))
+    graph = build_walking_graph(np.arange(n), lat, lon, u, v, length)
+    graph.landmarks, graph.landmark_dist = select_landmarks(graph, 8)
+    return graph
+
+
+def test_landmarks_are_spread_and_exact(random_graph):
+    """Las distancias de los landmarks coinciden con Dijkstra completo"""
+    assert len(set(random_graph.landmarks.tolist())) == 8
+    assert random_graph.landmark_dist.shape == (random_graph.n_nodes, 8)
+
+    full = dijkstra(random_graph.to_csr(), indices=int(random_graph.landmarks[3]))
+    np.testing.assert_allclose(random_graph.landmark_dist[:, 3], full, rtol=1e-5)
+
+
+def test_lower_bounds_are_admissible(random_graph):
+    router = AltRouter(random_graph)
+    exact = dijkstra(random_graph.to_csr(), indices=0)
+
+    bounds = router.lower_bound(0, np.arange(random_graph.n_nodes))
+
+    assert np.all(bounds <= exact + 1e-2)
+
+
+@pytest.mark.parametrize("use_landmarks", [True, False])
+def test_alt_matches_dijkstra(random_graph, use_landmarks):
+    """ALT devuelve distancias óptimas y caminos válidos"""
+    if not use_landmarks:
+        random_graph.landmark_dist = None
+    router = AltRouter(random_graph)
+    csr = random_graph.to_csr()
+    rng = np.random.default_rng(3)
+
+    for source, target in rng.integers(0, random_graph.n_nodes, size=(25, 2)):
+        expected = dijkstra(csr, indices=int(source))[target]
+        dist, path = router.shortest_path(source, target)
+
+        assert dist == pytest.approx(expected, rel=1e-5)
+        assert path[0] == source and path[-1] == target
+        walked = sum(csr[a, b] for a, b in zip(path[:-1], path[1:]))
+        assert walked == pytest.approx(expected, rel=1e-5)
+
+
+def test_alt_respects_max_dist(grid_graph):
+    router = AltRouter(grid_graph)
+
+    assert router.distance(0, 99) == pytest.approx(1800)
+    assert router.shortest_path(0, 99, max_dist=1000) == (np.inf, [])
+    assert router.shortest_path(5, 5) == (0.0, [5])
+
+
+@pytest.mark.parametrize("use_landmarks", [True, False])
+def test_one_to_many_matches_bounded_dijkstra(random_graph, use_landmarks):
+    """Una búsqueda por fila da las mismas distancias que Dijkstra acotado"""
+    if not use_landmarks:
+        random_graph.landmark_dist = None
+    router = AltRouter(random_graph)
+    csr = random_graph.to_csr()
+    rng = np.random.default_rng(5)
+    nodes = rng.integers(0, random_graph.n_nodes, 12)
+
+    for limit in (np.inf, 600.0):
+        expected = dijkstra(csr, indices=nodes, limit=limit)[:, nodes]
+        got = np.vstack([router.distances(node, nodes, max_dist=limit) for node in nodes])
+
+        np.testing.assert_array_equal(np.isinf(got), np.isinf(expected))
+        finite = np.isfinite(expected)
+        np.testing.assert_allclose(got[finite], expected[finite], rtol=1e-5)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.build_graph import build_walking_graph
+from app.models.walking_graph import WalkingGraph
+from app.tests.conftest import GRID_ORIGIN, GRID_STEP
+
+
+def test_build_is_symmetric_csr(grid_graph):
+    """Cada arista se guarda en ambos sentidos con su longitud"""
+    assert grid_graph.n_nodes == 100
+    # 2 * (10*9 + 9*10) segmentos
+    assert grid_graph.n_edges == 360
+    csr = grid_graph.to_csr()
+    assert (csr != csr.T).nnz == 0
+    assert grid_graph.indptr.dtype == np.int32
+    assert grid_graph.lengths.dtype == np.float32
+
+
+def test_build_dedupes_and_keeps_largest_component():
+    """Se eliminan lazos, duplicados (se conserva el más corto) e islas"""
+    lat = [10.0, 10.001, 10.002, 10.5, 10.501]
+    lon = [-74.0, -74.0, -74.0, -74.5, -74.5]
+    u = [0, 1, 1, 0, 2, 3]
+    v = [1, 0, 2, 0, 2, 4]
+    length = [120.0, 110.0, 111.0, 5.0, 3.0, 50.0]
+
+    g = build_walking_graph([1, 2, 3, 4, 5], lat, lon, u, v, length)
+
+    assert g.n_nodes == 3
+    assert list(g.osm_ids) == [1, 2, 3]
+    neighbours, lengths = g.neighbors(0)
+    assert list(neighbours) == [1]
+    assert list(lengths) == [110.0]
+
+
+def test_save_and_load_memory_mapped(grid_graph, graph_dir):
+    """Los arreglos se cargan como memmap de solo lectura"""
+    loaded = WalkingGraph.load(graph_dir)
+
+    assert isinstance(loaded.indices, np.memmap)
+    assert loaded.n_nodes == grid_graph.n_nodes
+    assert loaded.origin == pytest.approx(grid_graph.origin)
+    np.testing.assert_array_equal(loaded.indptr, grid_graph.indptr)
+    with pytest.raises(ValueError):
+        loaded.lengths[0] = 1.0
+
+
+def test_snap_to_nearest_node(grid_graph):
+    """El KD-tree devuelve el nodo más cercano y la distancia en metros"""
+    node, dist = grid_graph.snap(GRID_ORIGIN[0] + 2 * GRID_STEP, GRID_ORIGIN[1] + 3 * GRID_STEP + 0.0001)
+    assert node == 23
+    assert 5 < dist < 20
+
+    nodes, _ = grid_graph.snap_many(
+        [GRID_ORIGIN[0], GRID_ORIGIN[0] + 9 * GRID_STEP],
+        [GRID_ORIGIN[1], GRID_ORIGIN[1] + 9 * GRID_STEP],
+    )
+    assert list(nodes) == [0, 99]
+
+
+def test_health_and_graph_info(test_client):
+    """El servicio carga el grafo al iniciar"""
+    assert test_client.get("/health").json() == {"status": "healthy", "graph_loaded": True}
+
+    info = test_client.get("/graph").json()
+    assert info["nodes"] == 100
+    assert info["arcs"] == 360
@@ -0,0 +1,197 @@
+"""
+Columnar export of sightings for model retraining.
+
+Sightings in a time window are read from the store in bounded chunks and
+written as Parquet (one row group per chunk) or as an Arrow IPC stream, so
+neither side ever holds the whole export in memory. Besides the stored
+fields, the feature columns of the maps model are available with the same
+layout ``prediction_service.py`` builds at inference time: ``lat_bin``,
+``lon_bin``, ``elevation`` and the day/month cyclical encodings.
+
+Served by ``GET /export/sightings`` and usable from the command line::
+
+    python -m app.export --from 2024-05-01 --to 2024-05-16 --out sightings.parquet
+    python -m app.export --format arrow --columns species_name,lat_bin,lon_bin --out sightings.arrow
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.zones import default_index
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+# Lat/lon bin size in degrees for lat_bin/lon_bin (0 keeps the raw coordinates)
+EXPORT_BIN_DEG = float(os.getenv("EXPORT_BIN_DEG", "0.001"))
+# Constant used by the maps model until real elevation data is available
+ELEVATION = 10
+
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+STORED_COLUMNS = ["id", "user_id", "species_name", "common_name", "timestamp", "latitude", "longitude"]
+FEATURE_COLUMNS = ["lat_bin", "lon_bin", "elevation", "day_sin", "day_cos", "month_sin", "month_cos"]
+COLUMNS = STORED_COLUMNS + ["zone"] + FEATURE_COLUMNS
+# Label plus model features, in the order the maps model was trained on
+TRAINING_COLUMNS = ["species_name"] + FEATURE_COLUMNS
+
+
+def parse_columns(value: Optional[str]) -> List[str]:
+    """Comma-separated projection; raises ValueError on unknown or repeated names"""
+    if not value:
+        return list(TRAINING_COLUMNS)
+    columns = [c.strip() for c in value.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown columns {unknown}; available: {COLUMNS}")
+    if len(set(columns)) != len(columns):
+        raise ValueError("columns must not repeat")
+    return columns
+
+
+def arrow_schema(columns: Sequence[str]):
+    import pyarrow as pa
+
+    types = {
+        "id": pa.int64(),
+        "user_id": pa.int32(),
+        "species_name": pa.string(),
+        "common_name": pa.string(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "latitude": pa.float64(),
+        "longitude": pa.float64(),
+        "zone": pa.string(),
+        "elevation": pa.float64(),
+    }
+    return pa.schema([(c, types.get(c, pa.float64())) for c in columns])
+
+
+def _binned(values: np.ndarray, bin_deg: float) -> np.ndarray:
+    return np.round(values / bin_deg) * bin_deg if bin_deg > 0 else values
+
+
+def to_record_batch(rows: List[dict], schema, bin_deg: float = EXPORT_BIN_DEG):
+    """Project ``rows`` onto ``schema``, computing the feature columns vectorised.
+
+    Sightings without a location get nulls in the location-derived columns.
+    """
+    import pyarrow as pa
+
+    columns = schema.names
+    lat = np.array([np.nan if r.get("latitude") is None else r["latitude"] for r in rows], dtype=np.float64)
+    lon = np.array([np.nan if r.get("longitude") is None else r["longitude"] for r in rows], dtype=np.float64)
+    missing = np.isnan(lat) | np.isnan(lon)
+    day = np.array([r["timestamp"].day for r in rows], dtype=np.float64)
+    month = np.array([r["timestamp"].month for r in rows], dtype=np.float64)
+
+    computed = {
+        "zone": lambda: pa.array([default_index().zone_for(r.get("latitude"), r.get("longitude")) for r in rows]),
+        "lat_bin": lambda: pa.array(_binned(lat, bin_deg), mask=missing),
+        "lon_bin": lambda: pa.array(_binned(lon, bin_deg), mask=missing),
+        "elevation": lambda: pa.array(np.full(len(rows), ELEVATION, dtype=np.float64), mask=missing),
+        "day_sin": lambda: pa.array(np.sin(2 * np.pi * day / 31)),
+        "day_cos": lambda: pa.array(np.cos(2 * np.pi * day / 31)),
+        "month_sin": lambda: pa.array(np.sin(2 * np.pi * month / 12)),
+        "month_cos": lambda: pa.array(np.cos(2 * np.pi * month / 12)),
+    }
+    arrays = [
+        computed[c]() if c in computed else pa.array([r.get(c) for r in rows], type=schema.field(c).type)
+        for c in columns
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are taken after every batch"""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._size = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._size
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+async def stream_export(store, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        columns: Sequence[str] = TRAINING_COLUMNS, fmt: str = "parquet",
+                        chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Encoded export, yielded piece by piece as the store's chunks come in"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {sorted(FORMATS)}")
+    schema = arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd") if fmt == "parquet" else pa.ipc.new_stream(sink, schema)
+    rows = 0
+    try:
+        async for chunk in store.iter_range(start, end, chunk_size):
+            writer.write_batch(to_record_batch(chunk, schema))
+            rows += len(chunk)
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+    logger.info(f"Exported {rows} sightings as {fmt}")
+
+
+async def run(args) -> None:
+    from app.storage import create_store
+
+    columns = parse_columns(args.columns)
+    store = create_store(args.database_url)
+    await store.connect()
+    try:
+        with open(args.out, "wb") as f:
+            async for data in stream_export(store, args.start, args.end, columns, args.format, args.chunk_size):
+                f.write(data)
+    finally:
+        await store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export sightings as Parquet or Arrow IPC")
+    parser.add_argument("--from", dest="start", type=datetime.fromisoformat, help="Start of the window (inclusive)")
+    parser.add_argument("--to", dest="end", type=datetime.fromisoformat, help="End of the window (exclusive)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--columns", help=f"Comma-separated projection (default: {','.join(TRAINING_COLUMNS)})")
+    parser.add_argument("--out", required=True, help="Output file")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows read per cursor fetch")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", ""), help="Sightings database")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
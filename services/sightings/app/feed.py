@@ -0,0 +1,146 @@
+"""
+Pub/sub of newly created sightings, served as Server-Sent Events.
+
+``announce`` is called after every successful insert and goes through the
+store, so every replica hears it: Postgres ``NOTIFY`` on ``FEED_CHANNEL``
+(received on each replica's ``LISTEN`` connection), or a direct call for
+the in-memory store. Each replica then ``publish``es locally without
+blocking: each subscriber has its own bounded queue, and a subscriber that
+falls behind loses its oldest items (it is told how many in a ``dropped``
+event) instead of slowing down writers or other subscribers.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import AsyncIterator, Optional, Sequence, Set
+
+from app.geo import BBox, in_bbox
+
+logger = logging.getLogger(__name__)
+
+FEED_CHANNEL = "sightings_feed"
+FEED_QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", "100"))
+# Comment lines sent while idle keep proxies from closing the connection
+FEED_HEARTBEAT_S = float(os.getenv("FEED_HEARTBEAT_S", "15"))
+
+
+class Subscription:
+    """Bounded queue of the sightings matching one client's filter"""
+
+    def __init__(self, bbox: Optional[BBox] = None, species: Sequence[str] = (), maxsize: int = FEED_QUEUE_SIZE):
+        self.bbox = bbox
+        self.species = set(species)
+        self.dropped = 0
+        self._items: deque = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+
+    def matches(self, sighting: dict) -> bool:
+        if self.species and sighting["species_name"] not in self.species:
+            return False
+        if self.bbox is not None:
+            lat, lon = sighting.get("latitude"), sighting.get("longitude")
+            if lat is None or lon is None or not in_bbox(lat, lon, self.bbox):
+                return False
+        return True
+
+    def put(self, sighting: dict) -> None:
+        if len(self._items) == self._items.maxlen:
+            self.dropped += 1  # the deque discards the oldest item
+        self._items.append(sighting)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next sighting, or None if none arrived within ``timeout``"""
+        if not self._items:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._items.popleft()
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class SightingFeed:
+    def __init__(self, store=None):
+        self.store = store
+        self._subscribers: Set[Subscription] = set()
+
+    async def start(self) -> None:
+        if self.store is not None:
+            await self.store.listen(FEED_CHANNEL, self._receive)
+
+    async def stop(self) -> None:
+        if self.store is not None:
+            await self.store.unlisten(FEED_CHANNEL, self._receive)
+
+    def subscribe(self, bbox: Optional[BBox] = None, species: Sequence[str] = (),
+                  maxsize: int = FEED_QUEUE_SIZE) -> Subscription:
+        subscription = Subscription(bbox, species, maxsize)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def announce(self, sightings: Sequence[dict]) -> None:
+        """Publish ``sightings`` on every replica; without a store only on this one.
+
+        The sightings are already stored, so a failed notification is only
+        logged: live clients miss them, the request does not fail.
+        """
+        if self.store is None:
+            for sighting in sightings:
+                self.publish(sighting)
+            return
+        try:
+            await self.store.notify(FEED_CHANNEL, [json.dumps(s, separators=(",", ":")) for s in sightings])
+        except Exception:
+            logger.exception(f"Could not announce {len(sightings)} sightings on the live feed")
+
+    def publish(self, sighting: dict) -> None:
+        """Hand ``sighting`` to the matching subscribers of this process"""
+        for subscription in self._subscribers:
+            if subscription.matches(sighting):
+                subscription.put(sighting)
+
+    def _receive(self, payload: str) -> None:
+        self.publish(json.loads(payload))
+
+
+def sse_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def sse_stream(feed: SightingFeed, subscription: Subscription, is_disconnected=None,
+                     heartbeat_s: float = FEED_HEARTBEAT_S) -> AsyncIterator[str]:
+    """SSE frames for ``subscription`` until the client goes away"""
+    try:
+        yield "retry: 3000\n: subscribed\n\n"
+        while True:
+            sighting = await subscription.get(timeout=heartbeat_s)
+            dropped = subscription.take_dropped()
+            if dropped:
+                yield sse_event("dropped", {"count": dropped})
+            if sighting is None:
+                if is_disconnected is not None and await is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            yield sse_event("sighting", sighting, event_id=sighting["id"])
+    finally:
+        feed.unsubscribe(subscription)
@@ -0,0 +1,86 @@
+"""
+Geometry helpers and the in-memory spatial index for sightings.
+
+The in-memory store buckets sightings into a fixed lat/lon grid (the same
+idea as a geohash prefix): a window query only visits the cells overlapping
+the window instead of every sighting. Postgres uses a PostGIS GiST index for
+the same queries.
+"""
+
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+EARTH_RADIUS_M = 6_371_000.0
+# ~1.1 km cells around Barranquilla
+GRID_CELL_DEG = 0.01
+# Windows larger than this many cells are answered from the time index instead
+MAX_GRID_CELLS = 10_000
+
+# (min_lon, min_lat, max_lon, max_lat), the usual bbox order
+BBox = Tuple[float, float, float, float]
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def bbox_around(lat: float, lon: float, radius_m: float) -> BBox:
+    """Smallest lat/lon box containing the circle"""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlon = math.degrees(radius_m / (EARTH_RADIUS_M * max(math.cos(math.radians(lat)), 1e-6)))
+    return (lon - dlon, max(lat - dlat, -90.0), lon + dlon, min(lat + dlat, 90.0))
+
+
+def in_bbox(lat: float, lon: float, bbox: BBox) -> bool:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+
+def parse_bbox(value: str) -> BBox:
+    """``"min_lon,min_lat,max_lon,max_lat"``; raises ValueError"""
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox needs 4 comma-separated numbers")
+    min_lon, min_lat, max_lon, max_lat = parts
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("bbox min values must not exceed max values")
+    if not (-180 <= min_lon and max_lon <= 180 and -90 <= min_lat and max_lat <= 90):
+        raise ValueError("bbox out of range")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+class GridIndex:
+    """Sighting ids bucketed by ``GRID_CELL_DEG`` lat/lon cells"""
+
+    def __init__(self, cell_deg: float = GRID_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def add(self, sighting_id: int, lat: float, lon: float) -> None:
+        self._cells.setdefault(self._cell(lat, lon), []).append(sighting_id)
+
+    def n_cells(self, bbox: BBox) -> int:
+        (r0, c0), (r1, c1) = self._cell(bbox[1], bbox[0]), self._cell(bbox[3], bbox[2])
+        return (r1 - r0 + 1) * (c1 - c0 + 1)
+
+    def candidates(self, bbox: BBox) -> Optional[Iterator[int]]:
+        """Ids in the cells overlapping ``bbox`` (None when the window is too large to enumerate)"""
+        if self.n_cells(bbox) > MAX_GRID_CELLS:
+            return None
+        (r0, c0), (r1, c1) = self._cell(bbox[1], bbox[0]), self._cell(bbox[3], bbox[2])
+        return (
+            sighting_id
+            for r in range(r0, r1 + 1)
+            for c in range(c0, c1 + 1)
+            for sighting_id in self._cells.get((r, c), ())
+        )
+
+    def clear(self) -> None:
+        self._cells.clear()
@@ -1,30 +1,81 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
-import time
-import asyncio
-from typing import Dict
-import httpx
+from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import AliasChoices, BaseModel, Field, ValidationError
+from typing import Any, Dict, Optional, List
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+import base64
+import binascii
+import json
 import uvicorn
-import os
 
-app = FastAPI(title="Sightings Service", version="1.0.0")
+from app.export import FORMATS, parse_columns, stream_export
+from app.feed import SightingFeed, sse_stream
+from app.geo import parse_bbox
+from app.outbox import AchievementsDispatcher
+from app.photos import CACHE_CONTROL, VARIANTS, InvalidPhoto, PhotoStore, PhotoTooLarge
+from app.storage import create_store
 
-# Configuration
-ACHIEVEMENTS_URL = os.getenv("ACHIEVEMENTS_URL", "http://achievements:8006")
+# Postgres (asyncpg pool) when DATABASE_URL is set, in-memory otherwise
+store = create_store()
+# Delivers the achievements outbox in the background
+dispatcher = AchievementsDispatcher(store)
+# Fans new sightings out to GET /sightings/stream clients
+feed = SightingFeed(store)
+# Content-addressed photo files; images are processed on a process pool
+photos = PhotoStore()
 
-# Simple in-memory store to simulate persistence for created sightings.
-# Keyed by sighting id -> dict representing the sighting. Protected by an
-# asyncio.Lock to be safe for concurrent requests in the same process.
-_SIGHTINGS_DB: Dict[int, dict] = {}
-_SIGHTINGS_LOCK = asyncio.Lock()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await store.connect()
+    await feed.start()
+    await dispatcher.start()
+    photos.start()
+    try:
+        yield
+    finally:
+        photos.stop()
+        await dispatcher.stop()
+        await feed.stop()
+        await store.close()
+
+app = FastAPI(title="Sightings Service", version="1.0.0", lifespan=lifespan)
 
 class SightingCreate(BaseModel):
     user_id: int
     species_name: str  # Scientific name
     common_name: Optional[str] = None  # Common name
-    timestamp: Optional[datetime] = None
+    # ml_worker clients send the detection time as "recorded_at"
+    timestamp: Optional[datetime] = Field(default=None, validation_alias=AliasChoices("timestamp", "recorded_at"))
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
+
+    def to_record(self, default_timestamp: datetime) -> dict:
+        """Fields persisted by the store"""
+        return {
+            "user_id": self.user_id,
+            "species_name": self.species_name,
+            "common_name": self.common_name,
+            "timestamp": self.timestamp or default_timestamp,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+        }
+
+class SightingBatchRequest(BaseModel):
+    # Items are validated one by one so a bad item does not reject the batch
+    sightings: List[Dict[str, Any]] = Field(..., min_length=1, max_length=1000)
+
+class SightingBatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str  # pending_achievements | invalid
+    errors: List[dict] = []
+
+class SightingBatchResponse(BaseModel):
+    success: bool
+    created: int
+    failed: int
+    results: List[SightingBatchItemResult]
 
 class SightingResponse(BaseModel):
     id: int
@@ -32,9 +83,48 @@ class SightingResponse(BaseModel):
     species_name: str
     common_name: Optional[str] = None
     timestamp: datetime
-    status: str = "processed"
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    status: str = "processed"  # pending_achievements | processed | achievements_failed
     achievements_unlocked: List[dict] = []
 
+def sighting_summary(s: dict) -> dict:
+    """JSON-ready representation used by search results and the live feed"""
+    return {
+        "id": s["id"],
+        "user_id": s["user_id"],
+        "species_name": s["species_name"],
+        "common_name": s.get("common_name"),
+        "timestamp": s["timestamp"].isoformat(),
+        "latitude": s.get("latitude"),
+        "longitude": s.get("longitude"),
+    }
+
+def species_names(values: List[str]) -> List[str]:
+    """Species query values, repeated and/or comma-separated"""
+    return [name.strip() for value in values for name in value.split(",") if name.strip()]
+
+def photo_summary(photo: dict) -> dict:
+    return {
+        "sha256": photo["sha256"],
+        "width": photo["width"],
+        "height": photo["height"],
+        "urls": {variant: f"/photos/{photo['sha256']}/{variant}" for variant in VARIANTS},
+    }
+
+def encode_cursor(sighting: dict) -> str:
+    """Opaque keyset cursor pointing after ``sighting`` in a newest-first listing"""
+    raw = json.dumps([sighting["timestamp"].isoformat(), sighting["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, sighting_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(sighting_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/")
 def read_root():
     return {"message": "Sightings service is running", "version": "1.0.0"}
@@ -45,113 +135,226 @@ def health_check():
 
 @app.post("/sightings", response_model=SightingResponse)
 async def create_sighting(sighting: SightingCreate):
-    """Create a new bird sighting and process achievements"""
+    """Create a new bird sighting; achievements are processed asynchronously"""
     
     # Set timestamp if not provided
     if not sighting.timestamp:
         sighting.timestamp = datetime.utcnow()
     
-    # In a real implementation, this would save to a database and return
-    # an auto-incremented integer ID. For this demo we generate a unique
-    # positive integer using the current time in milliseconds. This keeps
-    # the `id` field as int (compatible with SightingResponse) while being
-    # reasonably unique across rapid calls.
-    sighting_id = int(time.time() * 1000)
-    
-    # Notify achievements service with simplified payload
-    achievements_unlocked = []
+    # Stored together with a pending achievements event; the dispatcher
+    # delivers it in the background and the unlocked achievements show up on
+    # GET /sightings/{id} once status is "processed".
+    sighting_obj = await store.insert(sighting.to_record(sighting.timestamp), enqueue=True)
+    dispatcher.notify()
+    await feed.announce([sighting_summary(sighting_obj)])
+
+    print(f"✅ Sighting created: ID={sighting_obj['id']}, Species={sighting.species_name}")
+    return SightingResponse(**sighting_obj)
+
+@app.post("/sightings/batch", response_model=SightingBatchResponse, status_code=201)
+async def create_sightings_batch(batch: SightingBatchRequest):
+    """Create many sightings with one insert and hand their achievements off together"""
+    now = datetime.utcnow()
+    results: List[dict] = []
+    valid = []
+    for index, item in enumerate(batch.sightings):
+        try:
+            sighting = SightingCreate.model_validate(item)
+        except ValidationError as e:
+            errors = [{"loc": list(err["loc"]), "msg": err["msg"], "type": err["type"]} for err in e.errors()]
+            results.append({"index": index, "status": "invalid", "errors": errors})
+            continue
+        valid.append((index, sighting.to_record(now)))
+
+    # One multi-row insert, returned in input order; the queued events reach
+    # achievements in one dispatch
+    created = await store.insert_many([s for _, s in valid], enqueue=True)
+    if created:
+        dispatcher.notify()
+    await feed.announce([sighting_summary(record) for record in created])
+    results.extend({"index": index, "id": record["id"], "status": record["status"]}
+                   for (index, _), record in zip(valid, created, strict=True))
+    results.sort(key=lambda r: r["index"])
+
+    print(f"✅ Batch stored: {len(created)} created, {len(results) - len(created)} invalid")
+    return {"success": bool(created), "created": len(created), "failed": len(results) - len(created), "results": results}
+
+@app.get("/sightings/search")
+async def search_sightings(
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius: Optional[float] = Query(None, gt=0, le=50_000, description="metres around lat,lon"),
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = Query(None),
+    species: List[str] = Query([], description="Repeat or comma-separate scientific names"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Sightings in a window (bbox or lat/lon/radius), time range and species set, newest first"""
+    near = None
+    if lat is not None or lon is not None or radius is not None:
+        if lat is None or lon is None or radius is None:
+            raise HTTPException(status_code=400, detail="lat, lon and radius must be given together")
+        near = (lat, lon, radius)
+    if bbox is not None and near is not None:
+        raise HTTPException(status_code=400, detail="Use either bbox or lat/lon/radius, not both")
     try:
-        async with httpx.AsyncClient() as client:
-            achievement_data = {
-                "user_id": sighting.user_id,
-                "species_name": sighting.species_name,
-                "common_name": sighting.common_name,
-                "timestamp": sighting.timestamp.isoformat()
-            }
-            
-            print(f"📤 Sending to achievements: {achievement_data}")
-            
-            response = await client.post(
-                f"{ACHIEVEMENTS_URL}/users/{sighting.user_id}/sightings",
-                json=achievement_data,
-                timeout=10.0
-            )
-            
-            print(f"📥 Response from achievements: {response.status_code}")
-            
-            if response.status_code == 200:
-                # The /users/{user_id}/sightings endpoint returns:
-                # {"message": "...", "newly_unlocked_achievements": [...]}
-                try:
-                    body = response.json()
-                    print(f"📦 Response body: {body}")
-                except ValueError:
-                    body = None
-
-                if isinstance(body, dict):
-                    # Extract newly_unlocked_achievements from response
-                    unlocked = body.get("newly_unlocked_achievements", [])
-                    if isinstance(unlocked, list):
-                        achievements_unlocked = unlocked
-                    else:
-                        achievements_unlocked = []
-                else:
-                    achievements_unlocked = []
-            else:
-                print(f"❌ Failed to process achievements: {response.status_code} - {response.text}")
-                
-    except Exception as e:
-        print(f"❌ Error communicating with achievements service: {e}")
-        # Don't fail the sighting creation if achievements service is down
-    
-    # Build the sighting object that we'll persist in the in-memory DB and
-    # return to the caller. Keep timestamp as a datetime object so Pydantic
-    # serializes it properly in responses.
-    sighting_obj = {
-        "id": sighting_id,
-        "user_id": sighting.user_id,
-        "species_name": sighting.species_name,
-        "common_name": sighting.common_name,
-        "timestamp": sighting.timestamp,
-        "status": "processed",
-        "achievements_unlocked": achievements_unlocked,
-    }
+        box = parse_bbox(bbox) if bbox is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {e}")
+    if from_ and to and from_ > to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
 
-    # Persist in memory
-    async with _SIGHTINGS_LOCK:
-        _SIGHTINGS_DB[sighting_id] = sighting_obj
+    results = await store.search(bbox=box, near=near, start=from_, end=to, species=species_names(species), limit=limit)
+    return {"sightings": [sighting_summary(s) for s in results], "count": len(results)}
 
-    print(f"✅ Sighting created: ID={sighting_id}, Species={sighting.species_name}")
-    return SightingResponse(**sighting_obj)
+@app.get("/sightings/stream")
+async def stream_sightings(
+    request: Request,
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    species: List[str] = Query([], description="Repeat or comma-separate scientific names"),
+):
+    """Server-Sent Events feed of sightings created from now on that match the filter.
+
+    Each match is a ``sighting`` event; if the client reads too slowly the
+    oldest queued items are dropped and reported in a ``dropped`` event.
+    """
+    try:
+        box = parse_bbox(bbox) if bbox is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {e}")
+
+    subscription = feed.subscribe(bbox=box, species=species_names(species))
+    return StreamingResponse(
+        sse_stream(feed, subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/sightings/{sighting_id}", response_model=SightingResponse)
-def get_sighting(sighting_id: int):
+async def get_sighting(sighting_id: int):
     """Get a specific sighting by ID"""
-    # Lookup in our in-memory store.
-    sighting = _SIGHTINGS_DB.get(sighting_id)
+    sighting = await store.get(sighting_id)
     if not sighting:
         raise HTTPException(status_code=404, detail="Sighting not found")
 
     return SightingResponse(**sighting)
 
+@app.post("/sightings/{sighting_id}/photos", status_code=201)
+async def upload_sighting_photo(sighting_id: int, photo: UploadFile = File(...)):
+    """Attach a photo (JPEG, PNG or WebP) to a sighting.
+
+    The upload is streamed to disk and deduplicated by SHA-256; the web and
+    thumbnail versions (EXIF removed) are rendered off the event loop.
+    """
+    if not await store.get(sighting_id):
+        raise HTTPException(status_code=404, detail="Sighting not found")
+    try:
+        stored = await photos.save(photo)
+    except PhotoTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidPhoto as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        await photo.close()
+
+    record = await store.add_photo(sighting_id, {**stored, "size_bytes": stored["size"]})
+    print(f"📷 Photo {stored['sha256'][:12]} attached to sighting {sighting_id} (duplicate={stored['duplicate']})")
+    return {**photo_summary(record), "duplicate": stored["duplicate"]}
+
+@app.get("/sightings/{sighting_id}/photos")
+async def get_sighting_photos(sighting_id: int):
+    """Photos attached to a sighting, oldest first"""
+    if not await store.get(sighting_id):
+        raise HTTPException(status_code=404, detail="Sighting not found")
+    return {"sighting_id": sighting_id, "photos": [photo_summary(p) for p in await store.list_photos(sighting_id)]}
+
+@app.get("/photos/{sha256}/{variant}")
+async def get_photo(sha256: str, variant: str):
+    """A rendered photo variant; the URL is content-addressed, so it is cached forever"""
+    path = photos.variant_path(sha256, variant)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    return FileResponse(path, media_type="image/jpeg",
+                        headers={"Cache-Control": CACHE_CONTROL, "ETag": f'"{sha256}-{variant}"'})
+
 @app.get("/users/{user_id}/sightings")
-def get_user_sightings(user_id: int, limit: int = 50):
-    """Get sightings for a specific user"""
-    # Collect sightings from the in-memory store for this user.
+async def get_user_sightings(user_id: int, limit: int = Query(50, ge=1, le=200), cursor: Optional[str] = None):
+    """Get sightings for a specific user, newest first.
+
+    Pass the returned ``next_cursor`` as ``cursor`` to get the next page;
+    it is null on the last page.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    # One extra row tells whether there is a next page
+    page = await store.list_by_user(user_id, limit + 1, before)
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+
     results = []
-    for s in _SIGHTINGS_DB.values():
-        if s.get("user_id") == user_id:
-            # Provide a lightweight representation for the listing
-            results.append({
-                "id": s["id"],
-                "species_name": s["species_name"],
-                "common_name": s.get("common_name"),
-                "timestamp": s["timestamp"].isoformat() if isinstance(s["timestamp"], datetime) else s["timestamp"],
-            })
-            if len(results) >= limit:
-                break
-
-    return {"user_id": user_id, "sightings": results, "total": len(results)}
+    for s in page[:limit]:
+        # Provide a lightweight representation for the listing
+        results.append({
+            "id": s["id"],
+            "species_name": s["species_name"],
+            "common_name": s.get("common_name"),
+            "timestamp": s["timestamp"].isoformat(),
+        })
+
+    return {"user_id": user_id, "sightings": results, "total": len(results), "next_cursor": next_cursor}
+
+def _day_range(start: Optional[date], end: Optional[date]) -> None:
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+@app.get("/stats/zones/species")
+async def get_zone_species_stats(
+    zone: Optional[str] = None,
+    species: List[str] = Query([], description="Repeat or comma-separate scientific names"),
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = Query(None),
+    daily: bool = Query(False, description="One row per day instead of totals over the range"),
+):
+    """Sighting counts per zone and species, from the daily rollup"""
+    _day_range(from_, to)
+    rows = await store.zone_species_counts(zone=zone, species=species_names(species), start=from_, end=to, daily=daily)
+    return {"rows": rows, "total": sum(r["count"] for r in rows)}
+
+@app.get("/stats/users/{user_id}/daily")
+async def get_user_daily_stats(user_id: int, from_: Optional[date] = Query(None, alias="from"),
+                               to: Optional[date] = Query(None)):
+    """Sightings of a user per day, from the daily rollup"""
+    _day_range(from_, to)
+    days = await store.user_daily_counts(user_id, start=from_, end=to)
+    return {"user_id": user_id, "days": days, "total": sum(d["count"] for d in days)}
+
+@app.get("/stats/leaderboard")
+async def get_leaderboard(from_: Optional[date] = Query(None, alias="from"), to: Optional[date] = Query(None),
+                          limit: int = Query(10, ge=1, le=100)):
+    """Users with the most sightings in the range, from the daily rollup"""
+    _day_range(from_, to)
+    return {"leaderboard": await store.top_users(start=from_, end=to, limit=limit)}
+
+@app.get("/export/sightings")
+async def export_sightings(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = Query(None, description="Exclusive"),
+    format_: str = Query("parquet", alias="format", pattern="^(parquet|arrow)$"),
+    columns: Optional[str] = Query(None, description="Comma-separated projection; default: label + model features"),
+):
+    """Stream the sightings of a time window as Parquet or Arrow IPC for model retraining"""
+    if from_ and to and from_ >= to:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    try:
+        projection = parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type, extension = FORMATS[format_]
+    return StreamingResponse(
+        stream_export(store, from_, to, projection, format_),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="sightings.{extension}"'},
+    )
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Background delivery of achievements events.
+
+``create_sighting`` stores the sighting together with a pending event and
+responds immediately. The dispatcher here claims due events in batches,
+sends them to the achievements service in one request over a long-lived
+pooled client, stores the unlocked achievements on the sighting (clients
+see them on their next ``GET /sightings/{id}``) and reschedules failures
+with jittered exponential backoff.
+
+Delivery is at least once: a response lost after achievements committed is
+sent again. Each event carries the outbox row's random ``event_key`` as
+``event_id``, and the achievements service processes an ``event_id`` once.
+"""
+
+import asyncio
+import logging
+import os
+import random
+from typing import List, Optional
+
+import httpx
+
+from app.storage import as_utc
+
+logger = logging.getLogger(__name__)
+
+ACHIEVEMENTS_URL = os.getenv("ACHIEVEMENTS_URL", "http://achievements:8006")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+# Events written by other replicas (and retries) are picked up at this interval
+OUTBOX_POLL_INTERVAL_S = float(os.getenv("OUTBOX_POLL_INTERVAL_S", "1.0"))
+# Wait this long after a wake-up so concurrent sightings share one request
+OUTBOX_LINGER_S = float(os.getenv("OUTBOX_LINGER_S", "0.02"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+RETRY_BASE_S = 1.0
+RETRY_MAX_S = 300.0
+# A claimed event is invisible to other dispatchers for this long
+LEASE_S = 60.0
+
+
+def backoff(attempts: int) -> float:
+    """Full-jitter exponential backoff for the ``attempts``-th failure"""
+    return random.uniform(0, min(RETRY_MAX_S, RETRY_BASE_S * 2 ** (attempts - 1)))
+
+
+class AchievementsDispatcher:
+    """Delivers outbox events to ``POST /users/sightings/batch``"""
+
+    def __init__(self, store, base_url: str = ACHIEVEMENTS_URL, batch_size: int = OUTBOX_BATCH_SIZE,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.store = store
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.client = client
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._wake = asyncio.Event()
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(10.0, connect=2.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def notify(self) -> None:
+        """Wake the dispatcher after new events were stored"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=OUTBOX_POLL_INTERVAL_S)
+                await asyncio.sleep(OUTBOX_LINGER_S)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                # Drain full batches back to back
+                while await self.dispatch_once() >= self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Achievements outbox dispatch failed")
+
+    async def dispatch_once(self) -> int:
+        """Claim and send one batch; returns the number of events claimed"""
+        events = await self.store.claim_events(self.batch_size, LEASE_S)
+        if not events:
+            return 0
+
+        payload = {"events": [
+            {
+                "event_id": e["event_key"],
+                "sighting_id": e["sighting_id"],
+                "user_id": e["user_id"],
+                "species_name": e["species_name"],
+                "common_name": e["common_name"],
+                "timestamp": as_utc(e["timestamp"]).isoformat(),
+            }
+            for e in events
+        ]}
+        try:
+            response = await self.client.post("/users/sightings/batch", json=payload)
+            response.raise_for_status()
+            results = response.json()["results"]
+            if len(results) != len(events):
+                raise ValueError(f"expected {len(events)} results, got {len(results)}")
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+            await self._reschedule(events, f"{type(e).__name__}: {e}")
+            return len(events)
+
+        delivered = [
+            (e["event_id"], e["sighting_id"], r.get("newly_unlocked_achievements") or [])
+            for e, r in zip(events, results) if not r.get("error")
+        ]
+        await self.store.complete_events(delivered)
+        rejected = [e for e, r in zip(events, results) if r.get("error")]
+        if rejected:
+            await self._reschedule(rejected, "rejected by achievements service")
+
+        logger.info(f"Delivered {len(delivered)}/{len(events)} achievements events")
+        return len(events)
+
+    async def _reschedule(self, events: List[dict], error: str) -> None:
+        exhausted = [(e["event_id"], e["sighting_id"]) for e in events if e["attempts"] >= OUTBOX_MAX_ATTEMPTS]
+        if exhausted:
+            logger.error(f"Giving up on {len(exhausted)} achievements events: {error}")
+            await self.store.fail_events(exhausted, error)
+
+        # Group by attempt count so each group gets its own backoff
+        retry = {}
+        for e in events:
+            if e["attempts"] < OUTBOX_MAX_ATTEMPTS:
+                retry.setdefault(e["attempts"], []).append(e["event_id"])
+        for attempts, event_ids in retry.items():
+            await self.store.retry_events(event_ids, backoff(attempts), error)
+        if retry:
+            logger.warning(f"Achievements delivery failed, {sum(map(len, retry.values()))} events rescheduled: {error}")
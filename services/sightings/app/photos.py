@@ -0,0 +1,155 @@
+"""
+Content-addressed photo storage for sightings.
+
+Uploads are streamed to a temporary file while their SHA-256 is computed,
+then moved to ``originals/<sha[:2]>/<sha>``; the same picture uploaded twice
+is stored once. Decoding, EXIF removal and resizing run in a process pool so
+the event loop only moves bytes. Two variants are served: ``web`` (longest
+side ``WEB_SIZE``) and ``thumb`` (``THUMB_SIZE``), both JPEG without EXIF.
+Originals are never served because their EXIF may contain the GPS position.
+
+Files are addressed by hash, so their URLs never change content and are
+served with immutable cache headers.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+PHOTOS_DIR = os.getenv("PHOTOS_DIR", "data/photos")
+PHOTO_WORKERS = int(os.getenv("PHOTO_WORKERS", "2"))
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(15 * 1024 * 1024)))
+# Refuse images that would decompress to more pixels than this (decompression bombs)
+PHOTO_MAX_PIXELS = 50_000_000
+CHUNK_BYTES = 1024 * 1024
+
+WEB_SIZE = 1600
+THUMB_SIZE = 320
+VARIANTS = {"web": (WEB_SIZE, 85), "thumb": (THUMB_SIZE, 80)}
+ACCEPTED_FORMATS = {"JPEG", "PNG", "WEBP"}
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class InvalidPhoto(ValueError):
+    """The upload is not an accepted image"""
+
+
+class PhotoTooLarge(ValueError):
+    """The upload exceeds ``PHOTO_MAX_BYTES``"""
+
+
+def _sharded(root: str, kind: str, sha256: str, suffix: str = "") -> str:
+    return os.path.join(root, kind, sha256[:2], sha256 + suffix)
+
+
+def render_variants(root: str, sha256: str) -> dict:
+    """Decode the original and write the EXIF-free variants (runs in a worker process).
+
+    Raises InvalidPhoto if the original is not an accepted image.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = PHOTO_MAX_PIXELS
+    try:
+        with Image.open(_sharded(root, "originals", sha256)) as image:
+            if image.format not in ACCEPTED_FORMATS:
+                raise InvalidPhoto(f"unsupported image format {image.format}")
+            # Apply the EXIF orientation before the metadata is dropped
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGB")
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidPhoto(f"cannot decode image: {e}")
+
+    width, height = image.size
+    for variant, (size, quality) in VARIANTS.items():
+        path = _sharded(root, variant, sha256, ".jpg")
+        if os.path.exists(path):
+            continue
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        # A fresh image carries no EXIF unless it is passed explicitly
+        resized.save(tmp, "JPEG", quality=quality, optimize=True, progressive=True)
+        os.replace(tmp, path)
+    return {"width": width, "height": height}
+
+
+class PhotoStore:
+    """Originals and variants under ``root``, processed on a process pool"""
+
+    def __init__(self, root: str = PHOTOS_DIR, workers: int = PHOTO_WORKERS, max_bytes: int = PHOTO_MAX_BYTES):
+        self.root = root
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        # Workers are spawned lazily on the first upload
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def stop(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def variant_path(self, sha256: str, variant: str) -> Optional[str]:
+        """Path of a rendered variant, or None if the hash or variant is unknown"""
+        if variant not in VARIANTS or not SHA256_RE.match(sha256):
+            return None
+        path = _sharded(self.root, variant, sha256, ".jpg")
+        return path if os.path.exists(path) else None
+
+    async def save(self, upload) -> dict:
+        """Store an uploaded file (anything with ``async read(n)``) and render its variants.
+
+        Returns ``{"sha256", "size", "width", "height", "duplicate"}``.
+        Raises PhotoTooLarge or InvalidPhoto.
+        """
+        tmp_dir = os.path.join(self.root, "tmp")
+        await asyncio.to_thread(os.makedirs, tmp_dir, exist_ok=True)
+        tmp = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+        digest = hashlib.sha256()
+        size = 0
+        f = await asyncio.to_thread(open, tmp, "wb")
+        try:
+            while chunk := await upload.read(CHUNK_BYTES):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise PhotoTooLarge(f"photo exceeds {self.max_bytes} bytes")
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        except BaseException:
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.remove, tmp)
+            raise
+        await asyncio.to_thread(f.close)
+        if size == 0:
+            await asyncio.to_thread(os.remove, tmp)
+            raise InvalidPhoto("empty upload")
+
+        sha256 = digest.hexdigest()
+        original = _sharded(self.root, "originals", sha256)
+        duplicate = await asyncio.to_thread(os.path.exists, original)
+        if duplicate:
+            await asyncio.to_thread(os.remove, tmp)
+        else:
+            await asyncio.to_thread(os.makedirs, os.path.dirname(original), exist_ok=True)
+            await asyncio.to_thread(os.replace, tmp, original)
+
+        loop = asyncio.get_running_loop()
+        try:
+            info = await loop.run_in_executor(self.pool, render_variants, self.root, sha256)
+        except InvalidPhoto:
+            if not duplicate:
+                await asyncio.to_thread(os.remove, original)
+            raise
+        return {"sha256": sha256, "size": size, "duplicate": duplicate, **info}
@@ -0,0 +1,850 @@
+"""
+Storage backends for sightings.
+
+``DATABASE_URL`` selects the backend: a ``postgresql://`` URL uses the
+``sightings`` table of the service database through an asyncpg connection
+pool; without it (local runs, tests) sightings are kept in process memory.
+Both backends hand out ids generated by the store and return sightings as
+plain dicts with timezone-aware UTC timestamps.
+
+Sightings are also counted into daily rollups, per (zone, species, day)
+and per (user, day), in the same write, so the ``/stats`` endpoints read a
+few pre-aggregated rows instead of scanning the history. Days are UTC dates
+and zones come from ``app.zones``.
+
+Each backend also holds the achievements outbox: a sighting and its pending
+achievements event are written together, and the dispatcher
+(``app.outbox``) claims, completes or reschedules events later.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.geo import BBox, GridIndex, bbox_around, haversine_m, in_bbox
+from app.zones import ZoneIndex, default_index
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+
+# Same DDL as database/init/03_sightings_schema.sql, applied on startup so
+# databases created before that script existed get the tables too.
+SCHEMA = """
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+CREATE TABLE IF NOT EXISTS sightings (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    species_name VARCHAR(255) NOT NULL,
+    common_name VARCHAR(255),
+    timestamp TIMESTAMPTZ NOT NULL,
+    status VARCHAR(32) NOT NULL DEFAULT 'processed',
+    achievements_unlocked JSONB NOT NULL DEFAULT '[]'::jsonb,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_sightings_user_timestamp ON sightings (user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_sightings_species ON sightings (species_name);
+
+ALTER TABLE sightings ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE sightings ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+ALTER TABLE sightings ADD COLUMN IF NOT EXISTS location GEOGRAPHY(POINT, 4326)
+    GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography) STORED;
+CREATE INDEX IF NOT EXISTS idx_sightings_location ON sightings USING GIST (location);
+CREATE INDEX IF NOT EXISTS idx_sightings_timestamp ON sightings (timestamp DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS achievements_outbox (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    sighting_id BIGINT NOT NULL REFERENCES sightings (id) ON DELETE CASCADE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    event_key UUID NOT NULL DEFAULT gen_random_uuid()
+);
+ALTER TABLE achievements_outbox ADD COLUMN IF NOT EXISTS event_key UUID NOT NULL DEFAULT gen_random_uuid();
+CREATE INDEX IF NOT EXISTS idx_achievements_outbox_due ON achievements_outbox (next_attempt_at, id);
+
+CREATE TABLE IF NOT EXISTS sightings_daily_zone_species (
+    zone VARCHAR(255) NOT NULL,
+    species_name VARCHAR(255) NOT NULL,
+    day DATE NOT NULL,
+    sightings INTEGER NOT NULL,
+    PRIMARY KEY (zone, species_name, day)
+);
+CREATE INDEX IF NOT EXISTS idx_sightings_daily_zone_species_day ON sightings_daily_zone_species (day);
+
+CREATE TABLE IF NOT EXISTS sightings_daily_user (
+    user_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    sightings INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_sightings_daily_user_day ON sightings_daily_user (day, user_id);
+
+CREATE TABLE IF NOT EXISTS sighting_photos (
+    sighting_id BIGINT NOT NULL REFERENCES sightings (id) ON DELETE CASCADE,
+    sha256 CHAR(64) NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (sighting_id, sha256)
+);
+"""
+
+COLUMNS = "id, user_id, species_name, common_name, timestamp, latitude, longitude, status, achievements_unlocked"
+PHOTO_COLUMNS = "sha256, width, height, size_bytes, created_at"
+
+# Sighting status while its achievements event is in the outbox
+PENDING = "pending_achievements"
+PROCESSED = "processed"
+FAILED = "achievements_failed"
+
+# Keyset position in a user listing: (timestamp, id) of the last item returned
+Position = Tuple[datetime, int]
+# Circle for spatial search: (lat, lon, radius in metres)
+Near = Tuple[float, float, float]
+
+
+def as_utc(value: datetime) -> datetime:
+    """Naive datetimes are taken as UTC; aware ones are converted"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def rollup_counts(sightings: Iterable[dict], zones: ZoneIndex) -> Tuple[Counter, Counter]:
+    """Increments for ``(zone, species, day)`` and ``(user_id, day)``"""
+    by_zone, by_user = Counter(), Counter()
+    for s in sightings:
+        day = as_utc(s["timestamp"]).date()
+        by_zone[(zones.zone_for(s.get("latitude"), s.get("longitude")), s["species_name"], day)] += 1
+        by_user[(s["user_id"], day)] += 1
+    return by_zone, by_user
+
+
+def _in_days(day: date, start: Optional[date], end: Optional[date]) -> bool:
+    return (start is None or day >= start) and (end is None or day <= end)
+
+
+class InMemorySightingStore:
+    """Process-local store (no persistence), indexed by id and by user"""
+
+    def __init__(self, zones: Optional[ZoneIndex] = None):
+        self.zones = zones or default_index()
+        self._sightings: Dict[int, dict] = {}
+        # user_id -> [(timestamp, id)] kept sorted, newest last
+        self._by_user: Dict[int, List[tuple]] = {}
+        # Search indexes: all (timestamp, id) sorted, species -> ids, lat/lon grid
+        self._by_time: List[tuple] = []
+        self._by_species: Dict[str, List[int]] = {}
+        self._grid = GridIndex()
+        # Rollups: (zone, species) -> {day: count}, user_id -> {day: count}
+        self._zone_daily: Dict[Tuple[str, str], Dict[date, int]] = {}
+        self._user_daily: Dict[int, Dict[date, int]] = {}
+        # sighting_id -> {sha256: photo}
+        self._photos: Dict[int, Dict[str, dict]] = {}
+        self._ids = itertools.count(1)
+        # event id -> {"sighting_id", "attempts", "next_attempt_at" (monotonic), "last_error"}
+        self._outbox: "OrderedDict[int, dict]" = OrderedDict()
+        self._event_ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+        # channel -> callbacks; there is only this process to notify
+        self._listeners: Dict[str, List[Callable[[str], None]]] = {}
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def listen(self, channel: str, callback: Callable[[str], None]) -> None:
+        self._listeners.setdefault(channel, []).append(callback)
+
+    async def unlisten(self, channel: str, callback: Callable[[str], None]) -> None:
+        callbacks = self._listeners.get(channel, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    async def notify(self, channel: str, payloads: Sequence[str]) -> None:
+        """Call the listeners on ``channel`` with each payload"""
+        for callback in list(self._listeners.get(channel, [])):
+            for payload in payloads:
+                callback(payload)
+
+    async def insert(self, sighting: dict, enqueue: bool = False) -> dict:
+        """Store a sighting; with ``enqueue`` its achievements event is queued with it"""
+        return (await self.insert_many([sighting], enqueue))[0]
+
+    async def insert_many(self, sightings: List[dict], enqueue: bool = False) -> List[dict]:
+        """Store several sightings at once, returned in input order"""
+        records = []
+        async with self._lock:
+            for sighting in sightings:
+                record = dict(
+                    sighting,
+                    id=next(self._ids),
+                    timestamp=as_utc(sighting["timestamp"]),
+                    latitude=sighting.get("latitude"),
+                    longitude=sighting.get("longitude"),
+                    status=PENDING if enqueue else sighting.get("status", PROCESSED),
+                    achievements_unlocked=sighting.get("achievements_unlocked", []),
+                )
+                self._sightings[record["id"]] = record
+                key = (record["timestamp"], record["id"])
+                insort(self._by_user.setdefault(record["user_id"], []), key)
+                insort(self._by_time, key)
+                self._by_species.setdefault(record["species_name"], []).append(record["id"])
+                if record.get("latitude") is not None and record.get("longitude") is not None:
+                    self._grid.add(record["id"], record["latitude"], record["longitude"])
+                if enqueue:
+                    self._outbox[next(self._event_ids)] = {
+                        "sighting_id": record["id"], "attempts": 0, "next_attempt_at": 0.0, "last_error": None,
+                        "event_key": str(uuid.uuid4()),
+                    }
+                records.append(dict(record))
+            by_zone, by_user = rollup_counts(records, self.zones)
+            for (zone, species, day), n in by_zone.items():
+                days = self._zone_daily.setdefault((zone, species), {})
+                days[day] = days.get(day, 0) + n
+            for (user_id, day), n in by_user.items():
+                days = self._user_daily.setdefault(user_id, {})
+                days[day] = days.get(day, 0) + n
+        return records
+
+    async def get(self, sighting_id: int) -> Optional[dict]:
+        record = self._sightings.get(sighting_id)
+        return dict(record) if record else None
+
+    async def list_by_user(self, user_id: int, limit: int, before: Optional[Position] = None) -> List[dict]:
+        """Newest first, strictly after ``before`` in that order"""
+        keys = self._by_user.get(user_id, [])
+        end = bisect_left(keys, (as_utc(before[0]), before[1])) if before is not None else len(keys)
+        start = max(end - limit, 0)
+        return [dict(self._sightings[sighting_id]) for _, sighting_id in reversed(keys[start:end])]
+
+    async def search(self, bbox: Optional[BBox] = None, near: Optional[Near] = None,
+                     start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     species: Sequence[str] = (), limit: int = 100) -> List[dict]:
+        """Sightings matching every given filter, newest first.
+
+        The most selective available index provides the candidates (grid
+        cells for a window, species lists, else the time index); the other
+        filters are checked on those candidates only.
+        """
+        start = as_utc(start) if start else None
+        end = as_utc(end) if end else None
+        window = bbox_around(*near) if near else bbox
+
+        species = list(dict.fromkeys(species))
+        newest_first = False
+        candidates = None
+        if window is not None:
+            candidates = self._grid.candidates(window)
+        if candidates is None and species:
+            candidates = (i for sp in species for i in self._by_species.get(sp, ()))
+        if candidates is None:
+            # Time index: walk newest first from the end of the window
+            hi = bisect_left(self._by_time, (end, float("inf"))) if end else len(self._by_time)
+            candidates = (self._by_time[k][1] for k in range(hi - 1, -1, -1))
+            newest_first = True
+
+        species_set = set(species)
+        matches = []
+        for sighting_id in candidates:
+            s = self._sightings[sighting_id]
+            if start and s["timestamp"] < start:
+                if newest_first:
+                    break
+                continue
+            if end and s["timestamp"] > end:
+                continue
+            if species_set and s["species_name"] not in species_set:
+                continue
+            if window is not None:
+                lat, lon = s.get("latitude"), s.get("longitude")
+                if lat is None or lon is None or not in_bbox(lat, lon, window):
+                    continue
+                if near and haversine_m(near[0], near[1], lat, lon) > near[2]:
+                    continue
+            matches.append(s)
+            if newest_first and len(matches) >= limit:
+                break
+
+        matches.sort(key=lambda s: (s["timestamp"], s["id"]), reverse=True)
+        return [dict(s) for s in matches[:limit]]
+
+    async def iter_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         chunk_size: int = 5000) -> AsyncIterator[List[dict]]:
+        """Sightings with ``start <= timestamp < end``, oldest first, in chunks of ``chunk_size``"""
+        lo = bisect_left(self._by_time, (as_utc(start),)) if start else 0
+        hi = bisect_left(self._by_time, (as_utc(end),)) if end else len(self._by_time)
+        # Only the keys are copied, so concurrent inserts do not shift the range
+        keys = self._by_time[lo:hi]
+        for i in range(0, len(keys), chunk_size):
+            yield [dict(self._sightings[sighting_id]) for _, sighting_id in keys[i:i + chunk_size]]
+
+    async def zone_species_counts(self, zone: Optional[str] = None, species: Sequence[str] = (),
+                                  start: Optional[date] = None, end: Optional[date] = None,
+                                  daily: bool = False) -> List[dict]:
+        """Sightings per (zone, species[, day]) in the day range, by count descending"""
+        species_set = set(species)
+        rows = []
+        for (z, sp), days in self._zone_daily.items():
+            if (zone is not None and z != zone) or (species_set and sp not in species_set):
+                continue
+            counts = [(day, n) for day, n in days.items() if _in_days(day, start, end)]
+            if daily:
+                rows.extend({"zone": z, "species_name": sp, "day": day, "count": n} for day, n in counts)
+            elif counts:
+                rows.append({"zone": z, "species_name": sp, "count": sum(n for _, n in counts)})
+        if daily:
+            rows.sort(key=lambda r: (r["day"], -r["count"], r["zone"], r["species_name"]))
+        else:
+            rows.sort(key=lambda r: (-r["count"], r["zone"], r["species_name"]))
+        return rows
+
+    async def user_daily_counts(self, user_id: int, start: Optional[date] = None,
+                                end: Optional[date] = None) -> List[dict]:
+        """Sightings of one user per day in the range, oldest first"""
+        days = self._user_daily.get(user_id, {})
+        return [{"day": day, "count": days[day]} for day in sorted(days) if _in_days(day, start, end)]
+
+    async def top_users(self, start: Optional[date] = None, end: Optional[date] = None, limit: int = 10) -> List[dict]:
+        """Users with the most sightings in the day range"""
+        totals = []
+        for user_id, days in self._user_daily.items():
+            n = sum(c for day, c in days.items() if _in_days(day, start, end))
+            if n:
+                totals.append({"user_id": user_id, "count": n})
+        totals.sort(key=lambda r: (-r["count"], r["user_id"]))
+        return totals[:limit]
+
+    async def add_photo(self, sighting_id: int, photo: dict) -> dict:
+        """Attach a stored photo (``sha256, width, height, size_bytes``); attaching it twice is a no-op"""
+        async with self._lock:
+            photos = self._photos.setdefault(sighting_id, {})
+            if photo["sha256"] not in photos:
+                photos[photo["sha256"]] = {
+                    "sha256": photo["sha256"], "width": photo["width"], "height": photo["height"],
+                    "size_bytes": photo["size_bytes"], "created_at": datetime.now(timezone.utc),
+                }
+            return dict(photos[photo["sha256"]])
+
+    async def list_photos(self, sighting_id: int) -> List[dict]:
+        """Photos of a sighting, oldest first"""
+        return [dict(p) for p in self._photos.get(sighting_id, {}).values()]
+
+    async def claim_events(self, limit: int, lease_s: float) -> List[dict]:
+        """Due events, leased for ``lease_s`` so no other dispatcher takes them"""
+        now = time.monotonic()
+        claimed = []
+        async with self._lock:
+            for event_id, event in self._outbox.items():
+                if len(claimed) >= limit:
+                    break
+                if event["next_attempt_at"] > now:
+                    continue
+                event["attempts"] += 1
+                event["next_attempt_at"] = now + lease_s
+                sighting = self._sightings[event["sighting_id"]]
+                claimed.append({
+                    "event_id": event_id,
+                    "event_key": event["event_key"],
+                    "attempts": event["attempts"],
+                    "sighting_id": sighting["id"],
+                    "user_id": sighting["user_id"],
+                    "species_name": sighting["species_name"],
+                    "common_name": sighting.get("common_name"),
+                    "timestamp": sighting["timestamp"],
+                })
+        return claimed
+
+    async def complete_events(self, delivered: List[Tuple[int, int, list]]) -> None:
+        """``(event_id, sighting_id, achievements)``: store the result, drop the event"""
+        async with self._lock:
+            for event_id, sighting_id, achievements in delivered:
+                self._outbox.pop(event_id, None)
+                if sighting_id in self._sightings:
+                    self._sightings[sighting_id].update(status=PROCESSED, achievements_unlocked=achievements)
+
+    async def retry_events(self, event_ids: List[int], delay_s: float, error: str) -> None:
+        async with self._lock:
+            for event_id in event_ids:
+                if event_id in self._outbox:
+                    self._outbox[event_id].update(next_attempt_at=time.monotonic() + delay_s, last_error=error)
+
+    async def fail_events(self, failed: List[Tuple[int, int]], error: str) -> None:
+        """``(event_id, sighting_id)``: give up on delivery"""
+        async with self._lock:
+            for event_id, sighting_id in failed:
+                self._outbox.pop(event_id, None)
+                if sighting_id in self._sightings:
+                    self._sightings[sighting_id]["status"] = FAILED
+
+    async def pending_events(self) -> int:
+        return len(self._outbox)
+
+    async def clear(self) -> None:
+        async with self._lock:
+            self._sightings.clear()
+            self._by_user.clear()
+            self._by_time.clear()
+            self._by_species.clear()
+            self._grid.clear()
+            self._zone_daily.clear()
+            self._user_daily.clear()
+            self._photos.clear()
+            self._outbox.clear()
+
+
+class PostgresSightingStore:
+    """``sightings`` table accessed through an asyncpg connection pool"""
+
+    def __init__(self, dsn: str, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE,
+                 zones: Optional[ZoneIndex] = None):
+        self.dsn = dsn
+        self.zones = zones or default_index()
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+        # LISTEN is per session, so notifications arrive on one dedicated
+        # connection outside the pool; channel -> callbacks
+        self._listen_conn = None
+        self._listeners: Dict[str, List[Callable[[str], None]]] = {}
+        self._closing = False
+        self._relisten_task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        import asyncpg
+
+        self.pool = await asyncpg.create_pool(
+            self.dsn, min_size=self.min_size, max_size=self.max_size, init=self._init_connection,
+        )
+        async with self.pool.acquire() as conn:
+            await conn.execute(SCHEMA)
+
+    @staticmethod
+    async def _init_connection(conn) -> None:
+        await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._listen_conn is not None:
+            await self._listen_conn.close()
+            self._listen_conn = None
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def listen(self, channel: str, callback: Callable[[str], None]) -> None:
+        """Call ``callback(payload)`` for every NOTIFY on ``channel``, whichever replica sent it"""
+        import asyncpg
+
+        if self._listen_conn is None:
+            self._closing = False
+            self._listen_conn = await asyncpg.connect(self.dsn)
+            self._listen_conn.add_termination_listener(self._listen_lost)
+        if channel not in self._listeners:
+            await self._listen_conn.add_listener(channel, self._dispatch)
+        self._listeners.setdefault(channel, []).append(callback)
+
+    async def unlisten(self, channel: str, callback: Callable[[str], None]) -> None:
+        callbacks = self._listeners.get(channel, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks and self._listeners.pop(channel, None) is not None and self._listen_conn is not None:
+            await self._listen_conn.remove_listener(channel, self._dispatch)
+
+    async def notify(self, channel: str, payloads: Sequence[str]) -> None:
+        """NOTIFY ``channel`` once per payload (each at most 8000 bytes)"""
+        if payloads:
+            await self.pool.execute("SELECT pg_notify($1, p) FROM unnest($2::text[]) AS p", channel, list(payloads))
+
+    def _dispatch(self, connection, pid, channel: str, payload: str) -> None:
+        for callback in list(self._listeners.get(channel, [])):
+            callback(payload)
+
+    def _listen_lost(self, connection) -> None:
+        self._listen_conn = None
+        if not self._closing and self._listeners:
+            self._relisten_task = asyncio.get_running_loop().create_task(self._relisten())
+
+    async def _relisten(self, retry_s: float = 1.0) -> None:
+        """Reopen the LISTEN connection; notifications sent meanwhile are lost"""
+        import asyncpg
+
+        while not self._closing and self._listen_conn is None:
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                for channel in self._listeners:
+                    await conn.add_listener(channel, self._dispatch)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+                await asyncio.sleep(retry_s)
+                retry_s = min(retry_s * 2, 30.0)
+                continue
+            conn.add_termination_listener(self._listen_lost)
+            self._listen_conn = conn
+
+    async def insert(self, sighting: dict, enqueue: bool = False) -> dict:
+        """Store a sighting; with ``enqueue`` its achievements event is queued in the same transaction"""
+        return (await self.insert_many([sighting], enqueue))[0]
+
+    async def insert_many(self, sightings: List[dict], enqueue: bool = False) -> List[dict]:
+        """Store several sightings with one multi-row INSERT, returned in input order.
+
+        Neither the order identity values are drawn in nor the order of the
+        RETURNING rows is guaranteed, so ids are drawn per input row first
+        (tagged with its ordinality) and the inserted rows are joined back
+        to their input position through them.
+        """
+        if not sightings:
+            return []
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    f"""
+                    WITH input AS (
+                        SELECT nextval(pg_get_serial_sequence('sightings', 'id')) AS id, t.*
+                        FROM unnest($1::int[], $2::varchar[], $3::varchar[], $4::timestamptz[],
+                                    $5::float8[], $6::float8[], $7::varchar[], $8::jsonb[])
+                            WITH ORDINALITY AS t(user_id, species_name, common_name, timestamp,
+                                                 latitude, longitude, status, achievements_unlocked, ord)
+                    ), inserted AS (
+                        INSERT INTO sightings (id, user_id, species_name, common_name, timestamp,
+                                               latitude, longitude, status, achievements_unlocked)
+                        SELECT id, user_id, species_name, common_name, timestamp,
+                               latitude, longitude, status, achievements_unlocked
+                        FROM input
+                        RETURNING {COLUMNS}
+                    )
+                    SELECT inserted.*, input.ord FROM inserted JOIN input USING (id)
+                    ORDER BY input.ord
+                    """,
+                    [s["user_id"] for s in sightings],
+                    [s["species_name"] for s in sightings],
+                    [s.get("common_name") for s in sightings],
+                    [as_utc(s["timestamp"]) for s in sightings],
+                    [s.get("latitude") for s in sightings],
+                    [s.get("longitude") for s in sightings],
+                    [PENDING if enqueue else s.get("status", PROCESSED) for s in sightings],
+                    [s.get("achievements_unlocked", []) for s in sightings],
+                )
+                records = [None] * len(sightings)
+                for r in rows:
+                    record = dict(r)
+                    records[record.pop("ord") - 1] = record
+                if enqueue:
+                    await conn.execute(
+                        "INSERT INTO achievements_outbox (sighting_id) SELECT unnest($1::bigint[]) ORDER BY 1",
+                        [r["id"] for r in records],
+                    )
+                await self._update_rollups(conn, records)
+        return records
+
+    async def _update_rollups(self, conn, rows) -> None:
+        """Add the new sightings to the daily rollups, inside the insert transaction.
+
+        Keys are upserted in sorted order so concurrent writers lock the
+        shared rollup rows in the same order and cannot deadlock.
+        """
+        by_zone, by_user = rollup_counts(rows, self.zones)
+        zone_keys = sorted(by_zone)
+        await conn.execute(
+            """
+            INSERT INTO sightings_daily_zone_species AS r (zone, species_name, day, sightings)
+            SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::date[], $4::int[])
+            ON CONFLICT (zone, species_name, day) DO UPDATE SET sightings = r.sightings + EXCLUDED.sightings
+            """,
+            [k[0] for k in zone_keys],
+            [k[1] for k in zone_keys],
+            [k[2] for k in zone_keys],
+            [by_zone[k] for k in zone_keys],
+        )
+        user_keys = sorted(by_user)
+        await conn.execute(
+            """
+            INSERT INTO sightings_daily_user AS r (user_id, day, sightings)
+            SELECT * FROM unnest($1::int[], $2::date[], $3::int[])
+            ON CONFLICT (user_id, day) DO UPDATE SET sightings = r.sightings + EXCLUDED.sightings
+            """,
+            [k[0] for k in user_keys],
+            [k[1] for k in user_keys],
+            [by_user[k] for k in user_keys],
+        )
+
+    async def get(self, sighting_id: int) -> Optional[dict]:
+        row = await self.pool.fetchrow(f"SELECT {COLUMNS} FROM sightings WHERE id = $1", sighting_id)
+        return dict(row) if row else None
+
+    async def list_by_user(self, user_id: int, limit: int, before: Optional[Position] = None) -> List[dict]:
+        """Newest first, strictly after ``before`` in that order.
+
+        The row comparison seeks straight into idx_sightings_user_timestamp,
+        so every page costs the same regardless of how deep it is.
+        """
+        if before is None:
+            rows = await self.pool.fetch(
+                f"""
+                SELECT {COLUMNS} FROM sightings
+                WHERE user_id = $1
+                ORDER BY timestamp DESC, id DESC
+                LIMIT $2
+                """,
+                user_id,
+                limit,
+            )
+        else:
+            rows = await self.pool.fetch(
+                f"""
+                SELECT {COLUMNS} FROM sightings
+                WHERE user_id = $1 AND (timestamp, id) < ($2, $3)
+                ORDER BY timestamp DESC, id DESC
+                LIMIT $4
+                """,
+                user_id,
+                as_utc(before[0]),
+                before[1],
+                limit,
+            )
+        return [dict(r) for r in rows]
+
+    async def search(self, bbox: Optional[BBox] = None, near: Optional[Near] = None,
+                     start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     species: Sequence[str] = (), limit: int = 100) -> List[dict]:
+        """Sightings matching every given filter, newest first.
+
+        Window filters use the GiST index on ``location`` (``&&`` for boxes,
+        ``ST_DWithin`` on geography for circles); time and species filters use
+        their btree indexes.
+        """
+        where, args = [], []
+
+        def arg(value) -> str:
+            args.append(value)
+            return f"${len(args)}"
+
+        if bbox is not None:
+            where.append(f"location && ST_MakeEnvelope({arg(bbox[0])}, {arg(bbox[1])}, {arg(bbox[2])}, {arg(bbox[3])}, 4326)::geography")
+        if near is not None:
+            where.append(f"ST_DWithin(location, ST_SetSRID(ST_MakePoint({arg(near[1])}, {arg(near[0])}), 4326)::geography, {arg(near[2])})")
+        if start is not None:
+            where.append(f"timestamp >= {arg(as_utc(start))}")
+        if end is not None:
+            where.append(f"timestamp <= {arg(as_utc(end))}")
+        if species:
+            where.append(f"species_name = ANY({arg(list(species))}::varchar[])")
+
+        query = f"SELECT {COLUMNS} FROM sightings"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += f" ORDER BY timestamp DESC, id DESC LIMIT {arg(limit)}"
+        return [dict(r) for r in await self.pool.fetch(query, *args)]
+
+    async def iter_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         chunk_size: int = 5000) -> AsyncIterator[List[dict]]:
+        """Sightings with ``start <= timestamp < end``, oldest first, in chunks of ``chunk_size``.
+
+        Rows come from a server-side cursor, so only one chunk is held in
+        memory; the connection stays checked out until the iteration ends.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(
+                    f"""
+                    SELECT {COLUMNS} FROM sightings
+                    WHERE ($1::timestamptz IS NULL OR timestamp >= $1) AND ($2::timestamptz IS NULL OR timestamp < $2)
+                    ORDER BY timestamp, id
+                    """,
+                    as_utc(start) if start else None,
+                    as_utc(end) if end else None,
+                )
+                while True:
+                    rows = await cursor.fetch(chunk_size)
+                    if not rows:
+                        break
+                    yield [dict(r) for r in rows]
+
+    async def zone_species_counts(self, zone: Optional[str] = None, species: Sequence[str] = (),
+                                  start: Optional[date] = None, end: Optional[date] = None,
+                                  daily: bool = False) -> List[dict]:
+        """Sightings per (zone, species[, day]) in the day range, by count descending"""
+        where, args = [], []
+
+        def arg(value) -> str:
+            args.append(value)
+            return f"${len(args)}"
+
+        if zone is not None:
+            where.append(f"zone = {arg(zone)}")
+        if species:
+            where.append(f"species_name = ANY({arg(list(species))}::varchar[])")
+        if start is not None:
+            where.append(f"day >= {arg(start)}")
+        if end is not None:
+            where.append(f"day <= {arg(end)}")
+        condition = (" WHERE " + " AND ".join(where)) if where else ""
+
+        if daily:
+            query = f"""
+                SELECT zone, species_name, day, sightings AS count
+                FROM sightings_daily_zone_species{condition}
+                ORDER BY day, count DESC, zone, species_name
+            """
+        else:
+            query = f"""
+                SELECT zone, species_name, sum(sightings)::int AS count
+                FROM sightings_daily_zone_species{condition}
+                GROUP BY zone, species_name
+                ORDER BY count DESC, zone, species_name
+            """
+        return [dict(r) for r in await self.pool.fetch(query, *args)]
+
+    async def user_daily_counts(self, user_id: int, start: Optional[date] = None,
+                                end: Optional[date] = None) -> List[dict]:
+        """Sightings of one user per day in the range, oldest first"""
+        rows = await self.pool.fetch(
+            """
+            SELECT day, sightings AS count FROM sightings_daily_user
+            WHERE user_id = $1 AND ($2::date IS NULL OR day >= $2) AND ($3::date IS NULL OR day <= $3)
+            ORDER BY day
+            """,
+            user_id,
+            start,
+            end,
+        )
+        return [dict(r) for r in rows]
+
+    async def top_users(self, start: Optional[date] = None, end: Optional[date] = None, limit: int = 10) -> List[dict]:
+        """Users with the most sightings in the day range"""
+        rows = await self.pool.fetch(
+            """
+            SELECT user_id, sum(sightings)::int AS count FROM sightings_daily_user
+            WHERE ($1::date IS NULL OR day >= $1) AND ($2::date IS NULL OR day <= $2)
+            GROUP BY user_id
+            ORDER BY count DESC, user_id
+            LIMIT $3
+            """,
+            start,
+            end,
+            limit,
+        )
+        return [dict(r) for r in rows]
+
+    async def add_photo(self, sighting_id: int, photo: dict) -> dict:
+        """Attach a stored photo (``sha256, width, height, size_bytes``); attaching it twice is a no-op"""
+        row = await self.pool.fetchrow(
+            f"""
+            WITH inserted AS (
+                INSERT INTO sighting_photos (sighting_id, sha256, width, height, size_bytes)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (sighting_id, sha256) DO NOTHING
+                RETURNING {PHOTO_COLUMNS}
+            )
+            SELECT {PHOTO_COLUMNS} FROM inserted
+            UNION ALL
+            SELECT {PHOTO_COLUMNS} FROM sighting_photos WHERE sighting_id = $1 AND sha256 = $2
+            LIMIT 1
+            """,
+            sighting_id,
+            photo["sha256"],
+            photo["width"],
+            photo["height"],
+            photo["size_bytes"],
+        )
+        return dict(row)
+
+    async def list_photos(self, sighting_id: int) -> List[dict]:
+        """Photos of a sighting, oldest first"""
+        rows = await self.pool.fetch(
+            f"SELECT {PHOTO_COLUMNS} FROM sighting_photos WHERE sighting_id = $1 ORDER BY created_at, sha256",
+            sighting_id,
+        )
+        return [dict(r) for r in rows]
+
+    async def claim_events(self, limit: int, lease_s: float) -> List[dict]:
+        """Due events, leased for ``lease_s``.
+
+        SKIP LOCKED lets the dispatchers of several replicas claim disjoint
+        batches without waiting on each other.
+        """
+        rows = await self.pool.fetch(
+            """
+            WITH due AS (
+                SELECT id FROM achievements_outbox
+                WHERE next_attempt_at <= now()
+                ORDER BY next_attempt_at, id
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE achievements_outbox o
+            SET attempts = o.attempts + 1,
+                next_attempt_at = now() + make_interval(secs => $2)
+            FROM due, sightings s
+            WHERE o.id = due.id AND s.id = o.sighting_id
+            RETURNING o.id AS event_id, o.event_key::text AS event_key, o.attempts, s.id AS sighting_id,
+                      s.user_id, s.species_name, s.common_name, s.timestamp
+            """,
+            limit,
+            float(lease_s),
+        )
+        return sorted((dict(r) for r in rows), key=lambda e: e["event_id"])
+
+    async def complete_events(self, delivered: List[Tuple[int, int, list]]) -> None:
+        """``(event_id, sighting_id, achievements)``: store the result, drop the event"""
+        if not delivered:
+            return
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(
+                    "UPDATE sightings SET status = $2, achievements_unlocked = $3 WHERE id = $1",
+                    [(sighting_id, PROCESSED, achievements) for _, sighting_id, achievements in delivered],
+                )
+                await conn.execute(
+                    "DELETE FROM achievements_outbox WHERE id = ANY($1::bigint[])",
+                    [event_id for event_id, _, _ in delivered],
+                )
+
+    async def retry_events(self, event_ids: List[int], delay_s: float, error: str) -> None:
+        await self.pool.execute(
+            """
+            UPDATE achievements_outbox
+            SET next_attempt_at = now() + make_interval(secs => $2), last_error = $3
+            WHERE id = ANY($1::bigint[])
+            """,
+            event_ids,
+            float(delay_s),
+            error,
+        )
+
+    async def fail_events(self, failed: List[Tuple[int, int]], error: str) -> None:
+        """``(event_id, sighting_id)``: give up on delivery"""
+        if not failed:
+            return
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "UPDATE sightings SET status = $2 WHERE id = ANY($1::bigint[])",
+                    [sighting_id for _, sighting_id in failed],
+                    FAILED,
+                )
+                await conn.execute(
+                    "DELETE FROM achievements_outbox WHERE id = ANY($1::bigint[])",
+                    [event_id for event_id, _ in failed],
+                )
+
+    async def pending_events(self) -> int:
+        return await self.pool.fetchval("SELECT count(*) FROM achievements_outbox")
+
+
+def create_store(database_url: str = DATABASE_URL):
+    if database_url.startswith(("postgresql://", "postgres://")):
+        return PostgresSightingStore(database_url)
+    return InMemorySightingStore()
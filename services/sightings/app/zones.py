@@ -0,0 +1,87 @@
+"""
+Zone lookup for sightings.
+
+Zones are the neighbourhood polygons of ``barriosbaq.geojson``, the same
+file the maps and routes services use, so rollups per zone line up with the
+zones shown on the map. Sightings outside every polygon (or without a
+location) fall in ``OUTSIDE_ZONES``, the name maps uses for them.
+"""
+
+import json
+import os
+from typing import List, Optional, Sequence, Tuple
+
+ZONES_FILE = os.getenv("SIGHTINGS_ZONES_FILE", os.path.join(os.path.dirname(__file__), "data", "barriosbaq.geojson"))
+OUTSIDE_ZONES = "Fuera de zonas"
+
+Ring = Sequence[Sequence[float]]   # [[lon, lat], ...]
+
+
+def _in_ring(lon: float, lat: float, ring: Ring) -> bool:
+    """Even-odd ray casting"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+class ZoneIndex:
+    """Point-in-polygon lookup over the zone polygons, with a bbox pre-check"""
+
+    def __init__(self, zones: List[Tuple[str, List[List[Ring]]]]):
+        # (name, (min_lon, min_lat, max_lon, max_lat), polygons); a polygon is [shell, *holes]
+        self._zones = []
+        for name, polygons in zones:
+            points = [p for polygon in polygons for p in polygon[0]]
+            bounds = (min(p[0] for p in points), min(p[1] for p in points),
+                      max(p[0] for p in points), max(p[1] for p in points))
+            self._zones.append((name, bounds, polygons))
+
+    @classmethod
+    def from_geojson(cls, path: str = ZONES_FILE) -> "ZoneIndex":
+        with open(path, encoding="utf-8") as f:
+            collection = json.load(f)
+
+        zones = []
+        for i, feature in enumerate(collection.get("features", [])):
+            geometry = feature.get("geometry") or {}
+            if geometry.get("type") == "Polygon":
+                polygons = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiPolygon":
+                polygons = geometry["coordinates"]
+            else:
+                continue
+            name = (feature.get("properties") or {}).get("name") or f"zone-{i}"
+            zones.append((name, polygons))
+        return cls(zones)
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _, _ in self._zones]
+
+    def zone_for(self, lat: Optional[float], lon: Optional[float]) -> str:
+        if lat is None or lon is None:
+            return OUTSIDE_ZONES
+        for name, (min_lon, min_lat, max_lon, max_lat), polygons in self._zones:
+            if not (min_lon <= lon <= max_lon and min_lat <= lat <= max_lat):
+                continue
+            for shell, *holes in polygons:
+                if _in_ring(lon, lat, shell) and not any(_in_ring(lon, lat, hole) for hole in holes):
+                    return name
+        return OUTSIDE_ZONES
+
+
+_default_index: Optional[ZoneIndex] = None
+
+
+def default_index() -> ZoneIndex:
+    """``ZONES_FILE`` loaded once per process"""
+    global _default_index
+    if _default_index is None:
+        _default_index = ZoneIndex.from_geojson()
+    return _default_index
@@ -7,7 +7,7 @@ import asyncio
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, AsyncMock, patch
 
-from ..app.main import app
+from app.main import app
 
 
 @pytest.fixture(scope="session")
@@ -2,11 +2,16 @@
 Integration tests for sightings service
 """
 
+import json
+import time
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock, Mock
 
-from ...app.main import app
+from app import main
+from app.main import app
 
 
 class TestSightingsIntegration:
@@ -18,7 +23,7 @@ class TestSightingsIntegration:
         with TestClient(app) as test_client:
             yield test_client
     
-    def test_full_sighting_creation_flow(self, client):
+    def test_full_sighting_creation_flow(self, monkeypatch):
         """Test complete sighting creation and achievement notification flow"""
         # Mock achievements service response
         mock_achievements = [
@@ -29,47 +34,64 @@ class TestSightingsIntegration:
                 "xp_reward": 100
             }
         ]
+        received = []
         
-        with patch('httpx.AsyncClient') as mock_async_client:
-            # Setup mock response
-            mock_client = AsyncMock()
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_response.json.return_value = mock_achievements
-            mock_client.post.return_value = mock_response
-            mock_async_client.return_value.__aenter__.return_value = mock_client
-            
-            # Test data
-            sighting_data = {
-                "user_id": 1,
-                "species_name": "Turdus ignobilis",
-                "common_name": "Black-billed Thrush",
-                "confidence_score": 0.92,
-                "location_lat": 10.4806,
-                "location_lon": -75.5138,
-                "audio_url": "https://example.com/audio.mp3"
-            }
-            
+        def achievements_service(request):
+            events = json.loads(request.content)["events"]
+            received.extend(events)
+            return httpx.Response(200, json={"results": [
+                {"user_id": e["user_id"], "newly_unlocked_achievements": mock_achievements, "error": None}
+                for e in events
+            ]})
+        
+        # The background dispatcher delivers over this client instead of the network
+        monkeypatch.setattr(main.dispatcher, "client", httpx.AsyncClient(
+            base_url="http://achievements", transport=httpx.MockTransport(achievements_service)
+        ))
+        
+        # Test data
+        sighting_data = {
+            "user_id": 1,
+            "species_name": "Turdus ignobilis",
+            "common_name": "Black-billed Thrush",
+            "latitude": 10.4806,
+            "longitude": -75.5138
+        }
+        
+        with TestClient(app) as client:
             # Make request
             response = client.post("/sightings", json=sighting_data)
             
-            # Verify sighting creation
+            # Verify sighting creation; achievements are not awaited
             assert response.status_code == 200
             data = response.json()
             assert data["id"] is not None
             assert data["species_name"] == "Turdus ignobilis"
-            assert data["achievements_unlocked"] == mock_achievements
+            assert data["status"] == "pending_achievements"
             
-            # Verify achievements service was notified
-            mock_client.post.assert_called_once()
+            # The unlocked achievements show up on the sighting once delivered
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                stored = client.get(f"/sightings/{data['id']}").json()
+                if stored["status"] != "pending_achievements":
+                    break
+                time.sleep(0.02)
+        
+        assert stored["status"] == "processed"
+        assert stored["achievements_unlocked"] == mock_achievements
+        
+        # Verify achievements service was notified once, with the sighting's id
+        assert [e["sighting_id"] for e in received] == [data["id"]]
     
     def test_sighting_retrieval_endpoints(self, client):
         """Test sighting retrieval endpoints"""
+        created = client.post("/sightings", json={"user_id": 1, "species_name": "Ardea alba"}).json()
+        
         # Test get sighting by ID
-        response = client.get("/sightings/123")
+        response = client.get(f"/sightings/{created['id']}")
         assert response.status_code == 200
         data = response.json()
-        assert data["id"] == 123
+        assert data["id"] == created["id"]
         
         # Test get user sightings
         response = client.get("/users/1/sightings")
@@ -141,9 +163,8 @@ class TestSightingsIntegration:
                 "data": {
                     "user_id": 1,
                     "species_name": "A",  # Single character
-                    "confidence_score": 0.0,  # Minimum confidence
-                    "location_lat": -90.0,  # Minimum latitude
-                    "location_lon": -180.0   # Minimum longitude
+                    "latitude": -90.0,  # Minimum latitude
+                    "longitude": -180.0   # Minimum longitude
                 },
                 "should_succeed": True
             },
@@ -151,20 +172,25 @@ class TestSightingsIntegration:
                 "data": {
                     "user_id": 1,
                     "species_name": "Very Long Species Name That Contains Many Words",
-                    "confidence_score": 1.0,  # Maximum confidence
-                    "location_lat": 90.0,   # Maximum latitude
-                    "location_lon": 180.0    # Maximum longitude
+                    "latitude": 90.0,   # Maximum latitude
+                    "longitude": 180.0    # Maximum longitude
                 },
                 "should_succeed": True
             },
             # Invalid cases
             {
                 "data": {
-                    "user_id": 0,  # Invalid user ID
+                    "user_id": 1,
                     "species_name": "Test Bird",
-                    "confidence_score": 0.5,
-                    "location_lat": 0.0,
-                    "location_lon": 0.0
+                    "latitude": 90.5,  # Latitude out of range
+                    "longitude": 0.0
+                },
+                "should_succeed": False
+            },
+            {
+                "data": {
+                    "user_id": "not-a-user",  # Invalid user ID
+                    "species_name": "Test Bird"
                 },
                 "should_succeed": False
             }
@@ -0,0 +1,199 @@
+"""
+Unit tests for the achievements outbox and its dispatcher
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import httpx
+
+from app import outbox
+from app.outbox import AchievementsDispatcher
+from app.storage import FAILED, PENDING, PROCESSED, InMemorySightingStore
+
+
+def _sighting(user_id=1, species="Turdus ignobilis"):
+    return {"user_id": user_id, "species_name": species, "common_name": None, "timestamp": datetime(2024, 5, 1, 6)}
+
+
+def _dispatcher(store, handler):
+    client = httpx.AsyncClient(base_url="http://achievements", transport=httpx.MockTransport(handler))
+    return AchievementsDispatcher(store, client=client)
+
+
+def _unlock_first_sighting(request):
+    events = json.loads(request.content)["events"]
+    return httpx.Response(200, json={"results": [
+        {"user_id": e["user_id"], "newly_unlocked_achievements": [{"achievement_id": 1}], "error": None}
+        for e in events
+    ]})
+
+
+class TestAchievementsOutbox:
+    """Test cases for outbox delivery"""
+
+    def test_events_are_delivered_in_one_batch(self):
+        """Pending sightings are sent together and updated with their achievements"""
+        store = InMemorySightingStore()
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return _unlock_first_sighting(request)
+
+        async def run():
+            created = [await store.insert(_sighting(user_id), enqueue=True) for user_id in (1, 2, 3)]
+            claimed = await _dispatcher(store, handler).dispatch_once()
+            return created, claimed, [await store.get(s["id"]) for s in created]
+
+        created, claimed, stored = asyncio.run(run())
+
+        assert all(s["status"] == PENDING and s["achievements_unlocked"] == [] for s in created)
+        assert claimed == 3
+        assert len(requests) == 1
+        assert requests[0].url.path == "/users/sightings/batch"
+        assert [e["user_id"] for e in json.loads(requests[0].content)["events"]] == [1, 2, 3]
+        assert all(s["status"] == PROCESSED and s["achievements_unlocked"] == [{"achievement_id": 1}] for s in stored)
+        assert asyncio.run(store.pending_events()) == 0
+
+    def test_failed_delivery_is_retried_later(self, monkeypatch):
+        """A failed batch stays in the outbox and is not claimed again before its backoff"""
+        store = InMemorySightingStore()
+        monkeypatch.setattr(outbox, "backoff", lambda attempts: 60.0)
+
+        async def run():
+            sighting = await store.insert(_sighting(), enqueue=True)
+            dispatcher = _dispatcher(store, lambda request: httpx.Response(503))
+            first = await dispatcher.dispatch_once()
+            second = await dispatcher.dispatch_once()
+            return sighting, first, second, await store.get(sighting["id"])
+
+        sighting, first, second, stored = asyncio.run(run())
+
+        assert (first, second) == (1, 0)
+        assert stored["status"] == PENDING
+        assert asyncio.run(store.pending_events()) == 1
+
+    def test_gives_up_after_max_attempts(self, monkeypatch):
+        """After the last attempt the sighting is marked as failed and the event dropped"""
+        store = InMemorySightingStore()
+        monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 2)
+        monkeypatch.setattr(outbox, "backoff", lambda attempts: 0.0)
+
+        async def run():
+            sighting = await store.insert(_sighting(), enqueue=True)
+            dispatcher = _dispatcher(store, lambda request: httpx.Response(500))
+            for _ in range(3):
+                await dispatcher.dispatch_once()
+            return await store.get(sighting["id"])
+
+        stored = asyncio.run(run())
+
+        assert stored["status"] == FAILED
+        assert asyncio.run(store.pending_events()) == 0
+
+    def test_redelivered_event_keeps_its_event_id(self, monkeypatch):
+        """Retries send the same event_id so achievements can drop the duplicate"""
+        store = InMemorySightingStore()
+        monkeypatch.setattr(outbox, "backoff", lambda attempts: 0.0)
+        sent = []
+
+        def handler(request):
+            sent.append(json.loads(request.content)["events"])
+            # The first response is lost after achievements processed the event
+            return httpx.Response(502) if len(sent) == 1 else _unlock_first_sighting(request)
+
+        async def run():
+            sighting = await store.insert(_sighting(), enqueue=True)
+            dispatcher = _dispatcher(store, handler)
+            await dispatcher.dispatch_once()
+            await dispatcher.dispatch_once()
+            return sighting, await store.get(sighting["id"])
+
+        sighting, stored = asyncio.run(run())
+
+        assert len(sent) == 2
+        assert sent[0][0]["sighting_id"] == sighting["id"]
+        assert sent[0][0]["event_id"] and sent[0][0]["event_id"] == sent[1][0]["event_id"]
+        assert stored["status"] == PROCESSED
+
+    def test_rejected_items_are_retried_individually(self, monkeypatch):
+        """Per-item errors only reschedule the rejected events"""
+        store = InMemorySightingStore()
+        monkeypatch.setattr(outbox, "backoff", lambda attempts: 60.0)
+
+        def handler(request):
+            events = json.loads(request.content)["events"]
+            return httpx.Response(200, json={"results": [
+                {"user_id": e["user_id"], "newly_unlocked_achievements": [],
+                 "error": "boom" if e["user_id"] == 2 else None}
+                for e in events
+            ]})
+
+        async def run():
+            ok = await store.insert(_sighting(1), enqueue=True)
+            rejected = await store.insert(_sighting(2), enqueue=True)
+            await _dispatcher(store, handler).dispatch_once()
+            return await store.get(ok["id"]), await store.get(rejected["id"])
+
+        ok, rejected = asyncio.run(run())
+
+        assert ok["status"] == PROCESSED
+        assert rejected["status"] == PENDING
+        assert asyncio.run(store.pending_events()) == 1
+
+    def test_create_sighting_responds_before_achievements(self, client):
+        """POST /sightings returns at once with a pending status"""
+        response = client.post("/sightings", json={"user_id": 7, "species_name": "Ardea alba"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == PENDING
+        assert body["achievements_unlocked"] == []
+        assert client.get(f"/sightings/{body['id']}").json()["status"] in (PENDING, PROCESSED)
+
+
+class TestSightingsBatch:
+    """Test cases for POST /sightings/batch"""
+
+    def test_batch_reports_per_item_results(self, client):
+        """Valid items are stored together; invalid ones are reported by index"""
+        payload = {"sightings": [
+            {"user_id": 1, "species_name": "Ardea alba", "recorded_at": "2024-05-01T06:00:00"},
+            {"user_id": "not-a-user", "species_name": "Ardea alba"},
+            {"user_id": 1, "species_name": "Coragyps atratus"},
+        ]}
+
+        response = client.post("/sightings/batch", json=payload)
+
+        assert response.status_code == 201
+        body = response.json()
+        assert (body["created"], body["failed"]) == (2, 1)
+        assert [r["index"] for r in body["results"]] == [0, 1, 2]
+        assert body["results"][1]["status"] == "invalid"
+        assert body["results"][1]["errors"][0]["loc"] == ["user_id"]
+        first = client.get(f"/sightings/{body['results'][0]['id']}").json()
+        assert first["timestamp"].startswith("2024-05-01T06:00:00")
+        assert body["results"][2]["id"] > body["results"][0]["id"]
+
+    def test_batch_queues_one_event_per_sighting(self):
+        """insert_many queues every created sighting for a single dispatch"""
+        store = InMemorySightingStore()
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return _unlock_first_sighting(request)
+
+        async def run():
+            await store.insert_many([_sighting(user_id) for user_id in range(1, 21)], enqueue=True)
+            await _dispatcher(store, handler).dispatch_once()
+
+        asyncio.run(run())
+
+        assert len(requests) == 1
+        assert len(json.loads(requests[0].content)["events"]) == 20
+
+    def test_empty_batch_is_rejected(self, client):
+        assert client.post("/sightings/batch", json={"sightings": []}).status_code == 422
@@ -0,0 +1,88 @@
+"""
+Unit tests for sighting photo uploads
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from app import main
+from app.photos import CACHE_CONTROL, PhotoStore
+
+
+def _jpeg_with_gps(size=(2000, 1000)):
+    image = Image.new("RGB", size, (30, 120, 60))
+    exif = Image.Exif()
+    exif[0x8825] = {2: (10.0, 57.0, 50.0)}  # GPSInfo: latitude
+    exif[0x0112] = 6  # Orientation: rotate 90° on display
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def photo_client(client, tmp_path, monkeypatch):
+    photos = PhotoStore(root=str(tmp_path), workers=1, max_bytes=1024 * 1024)
+    photos.start()
+    monkeypatch.setattr(main, "photos", photos)
+    yield client
+    photos.stop()
+
+
+def _create_sighting(client):
+    return client.post("/sightings", json={"user_id": 1, "species_name": "Ardea alba"}).json()["id"]
+
+
+def _upload(client, sighting_id, data, name="bird.jpg"):
+    return client.post(f"/sightings/{sighting_id}/photos", files={"photo": (name, data, "image/jpeg")})
+
+
+class TestPhotoUpload:
+    """Test cases for POST /sightings/{id}/photos and GET /photos/..."""
+
+    def test_upload_renders_exif_free_variants(self, photo_client):
+        sighting_id = _create_sighting(photo_client)
+
+        response = _upload(photo_client, sighting_id, _jpeg_with_gps())
+
+        assert response.status_code == 201
+        body = response.json()
+        # Dimensions after applying the EXIF orientation
+        assert (body["width"], body["height"]) == (1000, 2000)
+        assert body["duplicate"] is False
+
+        web = photo_client.get(body["urls"]["web"])
+        assert web.status_code == 200
+        assert web.headers["cache-control"] == CACHE_CONTROL
+        with Image.open(io.BytesIO(web.content)) as image:
+            assert max(image.size) == 1600
+            assert image.size[1] > image.size[0]
+            assert len(image.getexif()) == 0
+        with Image.open(io.BytesIO(photo_client.get(body["urls"]["thumb"]).content)) as image:
+            assert max(image.size) == 320
+
+    def test_same_photo_is_stored_once(self, photo_client, tmp_path):
+        data = _jpeg_with_gps((400, 300))
+        first = _upload(photo_client, _create_sighting(photo_client), data).json()
+        sighting_id = _create_sighting(photo_client)
+        second = _upload(photo_client, sighting_id, data).json()
+
+        assert second["sha256"] == first["sha256"]
+        assert second["duplicate"] is True
+        assert len(list((tmp_path / "originals").rglob("*"))) == 2  # one shard dir, one file
+        listed = photo_client.get(f"/sightings/{sighting_id}/photos").json()["photos"]
+        assert [p["sha256"] for p in listed] == [first["sha256"]]
+
+    def test_rejected_uploads(self, photo_client, tmp_path):
+        sighting_id = _create_sighting(photo_client)
+
+        assert _upload(photo_client, sighting_id, b"not an image").status_code == 422
+        assert _upload(photo_client, sighting_id, b"\0" * (2 * 1024 * 1024)).status_code == 413
+        assert _upload(photo_client, 999999, _jpeg_with_gps((10, 10))).status_code == 404
+        assert [p for p in (tmp_path / "originals").rglob("*") if p.is_file()] == []
+        assert list((tmp_path / "tmp").iterdir()) == []
+
+    def test_unknown_photo(self, photo_client):
+        assert photo_client.get("/photos/../../etc/passwd/web").status_code == 404
+        assert photo_client.get(f"/photos/{'a' * 64}/original").status_code == 404
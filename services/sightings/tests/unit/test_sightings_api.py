@@ -17,20 +17,17 @@ class TestSightingsAPI:
         assert response.status_code == 200
         assert response.json() == {"status": "healthy"}
     
-    def test_create_sighting_success(self, client, sample_sighting_data, mock_achievements_service_success):
-        """Test successful sighting creation"""
-        with patch('httpx.AsyncClient') as mock_async_client:
-            mock_async_client.return_value.__aenter__.return_value = mock_achievements_service_success
-            
-            response = client.post("/sightings", json=sample_sighting_data)
-            
-            assert response.status_code == 200
-            data = response.json()
-            assert data["id"] is not None
-            assert data["user_id"] == sample_sighting_data["user_id"]
-            assert data["species_name"] == sample_sighting_data["species_name"]
-            assert data["confidence_score"] == sample_sighting_data["confidence_score"]
-            assert "achievements_unlocked" in data
+    def test_create_sighting_success(self, client, sample_sighting_data):
+        """Test successful sighting creation; achievements follow asynchronously"""
+        response = client.post("/sightings", json=sample_sighting_data)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["id"] is not None
+        assert data["user_id"] == sample_sighting_data["user_id"]
+        assert data["species_name"] == sample_sighting_data["species_name"]
+        assert data["status"] == "pending_achievements"
+        assert data["achievements_unlocked"] == []
     
     def test_create_sighting_minimal_data(self, client, sample_sighting_minimal, mock_achievements_service_success):
         """Test sighting creation with minimal required data"""
@@ -97,9 +94,9 @@ class TestSightingsAPI:
             assert data["id"] is not None
             assert data["achievements_unlocked"] == []  # No achievements due to timeout
     
-    def test_get_sighting_by_id(self, client):
+    def test_get_sighting_by_id(self, client, sample_sighting_minimal):
         """Test retrieving sighting by ID"""
-        sighting_id = 123
+        sighting_id = client.post("/sightings", json=sample_sighting_minimal).json()["id"]
         
         response = client.get(f"/sightings/{sighting_id}")
         
@@ -110,6 +107,12 @@ class TestSightingsAPI:
         assert "user_id" in data
         assert "timestamp" in data
     
+    def test_get_unknown_sighting(self, client):
+        """Test retrieving a sighting that does not exist"""
+        response = client.get("/sightings/999999999")
+        
+        assert response.status_code == 404
+    
     def test_get_user_sightings(self, client):
         """Test retrieving sightings for a user"""
         user_id = 1
@@ -140,7 +143,7 @@ class TestSightingModels:
     
     def test_sighting_create_model_validation(self):
         """Test SightingCreate model validation"""
-        from ...app.main import SightingCreate
+        from app.main import SightingCreate
         from datetime import datetime
         
         # Valid sighting data
@@ -148,46 +151,48 @@ class TestSightingModels:
             "user_id": 1,
             "species_name": "Turdus ignobilis",
             "common_name": "Black-billed Thrush",
-            "confidence_score": 0.92,
-            "location_lat": 10.4806,
-            "location_lon": -75.5138,
-            "timestamp": datetime.utcnow(),
-            "audio_url": "https://example.com/audio.mp3",
-            "image_url": "https://example.com/image.jpg"
+            "latitude": 10.4806,
+            "longitude": -75.5138,
+            "timestamp": datetime.utcnow()
         }
         
         sighting = SightingCreate(**valid_data)
         assert sighting.user_id == 1
         assert sighting.species_name == "Turdus ignobilis"
-        assert sighting.confidence_score == 0.92
+        assert sighting.latitude == 10.4806
+    
+    def test_sighting_create_recorded_at_alias(self):
+        """Test SightingCreate accepts the ml_worker's recorded_at field"""
+        from app.main import SightingCreate
+        
+        sighting = SightingCreate(user_id=1, species_name="Test Bird", recorded_at="2024-05-01T06:00:00")
+        assert sighting.timestamp == datetime(2024, 5, 1, 6)
     
-    def test_sighting_create_invalid_confidence(self):
-        """Test SightingCreate with invalid confidence score"""
-        from ...app.main import SightingCreate
+    def test_sighting_create_invalid_latitude(self):
+        """Test SightingCreate with a latitude out of range"""
+        from app.main import SightingCreate
         from pydantic import ValidationError
         
         invalid_data = {
             "user_id": 1,
             "species_name": "Test Bird",
-            "confidence_score": 1.5,  # Invalid: > 1.0
-            "location_lat": 10.0,
-            "location_lon": -75.0
+            "latitude": 90.5,  # Invalid: > 90
+            "longitude": -75.0
         }
         
         with pytest.raises(ValidationError):
             SightingCreate(**invalid_data)
     
-    def test_sighting_create_negative_confidence(self):
-        """Test SightingCreate with negative confidence score"""
-        from ...app.main import SightingCreate
+    def test_sighting_create_invalid_longitude(self):
+        """Test SightingCreate with a longitude out of range"""
+        from app.main import SightingCreate
         from pydantic import ValidationError
         
         invalid_data = {
             "user_id": 1,
             "species_name": "Test Bird",
-            "confidence_score": -0.1,  # Invalid: < 0.0
-            "location_lat": 10.0,
-            "location_lon": -75.0
+            "latitude": 10.0,
+            "longitude": -180.1  # Invalid: < -180
         }
         
         with pytest.raises(ValidationError):
@@ -195,7 +200,7 @@ class TestSightingModels:
     
     def test_sighting_response_model(self):
         """Test SightingResponse model"""
-        from ...app.main import SightingResponse
+        from app.main import SightingResponse
         from datetime import datetime
         
         response_data = {
@@ -203,9 +208,8 @@ class TestSightingModels:
             "user_id": 1,
             "species_name": "Turdus ignobilis",
             "common_name": "Black-billed Thrush",
-            "confidence_score": 0.92,
-            "location_lat": 10.4806,
-            "location_lon": -75.5138,
+            "latitude": 10.4806,
+            "longitude": -75.5138,
             "timestamp": datetime.utcnow(),
             "status": "processed"
         }
@@ -214,6 +218,7 @@ class TestSightingModels:
         assert response.id == 123
         assert response.user_id == 1
         assert response.status == "processed"
+        assert response.achievements_unlocked == []
 
 
 class TestSightingBusinessLogic:
@@ -239,30 +244,41 @@ class TestSightingBusinessLogic:
             time_diff = datetime.now(timestamp.tzinfo) - timestamp
             assert time_diff.total_seconds() < 60
     
-    def test_achievements_notification_payload(self, client, sample_sighting_data, mock_achievements_service_success):
+    def test_achievements_notification_payload(self, sample_sighting_data, mock_achievements_service_success):
         """Test that correct data is sent to achievements service"""
-        with patch('httpx.AsyncClient') as mock_async_client:
-            mock_client = mock_achievements_service_success
-            mock_async_client.return_value.__aenter__.return_value = mock_client
-            
-            response = client.post("/sightings", json=sample_sighting_data)
-            
-            assert response.status_code == 200
-            
-            # Verify achievements service was called
-            mock_client.post.assert_called_once()
-            call_args = mock_client.post.call_args
-            
-            # Check URL
-            assert "/species/detect" in call_args[1]["url"]
-            
-            # Check payload
-            payload = call_args[1]["json"]
-            assert payload["user_id"] == sample_sighting_data["user_id"]
-            assert payload["species_name"] == sample_sighting_data["species_name"]
-            assert payload["confidence"] == sample_sighting_data["confidence_score"]
-            assert "location" in payload
-            assert "detection_time" in payload
+        import asyncio
+        from app.main import SightingCreate
+        from app.outbox import AchievementsDispatcher
+        from app.storage import InMemorySightingStore
+        
+        store = InMemorySightingStore()
+        mock_client = mock_achievements_service_success
+        mock_client.post.return_value.json.return_value = {"results": [
+            {"user_id": sample_sighting_data["user_id"], "newly_unlocked_achievements": [], "error": None}
+        ]}
+        sighting = SightingCreate(**sample_sighting_data)
+        
+        async def run():
+            created = await store.insert(sighting.to_record(sighting.timestamp), enqueue=True)
+            await AchievementsDispatcher(store, client=mock_client).dispatch_once()
+            return created
+        
+        created = asyncio.run(run())
+        
+        # Verify achievements service was called once, by the dispatcher
+        mock_client.post.assert_called_once()
+        call_args = mock_client.post.call_args
+        
+        # Check URL
+        assert call_args[0][0] == "/users/sightings/batch"
+        
+        # Check payload
+        [event] = call_args[1]["json"]["events"]
+        assert event["user_id"] == sample_sighting_data["user_id"]
+        assert event["species_name"] == sample_sighting_data["species_name"]
+        assert event["sighting_id"] == created["id"]
+        assert event["event_id"]
+        assert "timestamp" in event
     
     def test_sighting_id_generation(self, client, sample_sighting_minimal, mock_achievements_service_success):
         """Test that sighting ID is generated for new sightings"""
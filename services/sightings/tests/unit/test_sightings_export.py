@@ -0,0 +1,110 @@
+"""
+Unit tests for the columnar sightings export
+"""
+
+import asyncio
+import io
+import math
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app import main
+from app.export import TRAINING_COLUMNS, parse_columns, stream_export
+from app.storage import InMemorySightingStore
+
+START = datetime(2024, 5, 1, 6, 0)
+
+
+def _fill(store, n=25):
+    sightings = [
+        {"user_id": i % 3, "species_name": "Ardea alba", "latitude": 10.96341, "longitude": -74.79642,
+         "timestamp": START + timedelta(hours=i)}
+        for i in range(n)
+    ]
+    sightings.append({"user_id": 9, "species_name": "Coragyps atratus", "timestamp": START + timedelta(hours=n)})
+    asyncio.run(store.insert_many(sightings))
+    return store
+
+
+def _collect(store, **kwargs):
+    async def run():
+        return [data async for data in stream_export(store, **kwargs)]
+
+    return asyncio.run(run())
+
+
+class TestExport:
+    """Test cases for stream_export"""
+
+    def test_parquet_has_one_row_group_per_chunk(self):
+        store = _fill(InMemorySightingStore())
+
+        parts = _collect(store, chunk_size=10)
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(parts)))
+
+        assert len(parts) == 4  # 3 chunks + footer
+        assert parquet.metadata.num_row_groups == 3
+        assert parquet.schema_arrow.names == TRAINING_COLUMNS
+
+    def test_features_match_prediction_layout(self):
+        store = _fill(InMemorySightingStore())
+
+        table = pq.read_table(io.BytesIO(b"".join(_collect(store)))).to_pylist()
+
+        first = table[0]
+        assert first["lat_bin"] == pytest.approx(10.963)
+        assert first["lon_bin"] == pytest.approx(-74.796)
+        assert first["elevation"] == 10
+        assert first["day_sin"] == pytest.approx(math.sin(2 * math.pi * 1 / 31))
+        assert first["month_cos"] == pytest.approx(math.cos(2 * math.pi * 5 / 12))
+        # No location: label and date features only
+        assert table[-1]["species_name"] == "Coragyps atratus"
+        assert table[-1]["lat_bin"] is None
+
+    def test_arrow_stream_window_and_projection(self):
+        store = _fill(InMemorySightingStore())
+
+        parts = _collect(store, start=START + timedelta(hours=5), end=START + timedelta(hours=8),
+                         columns=["id", "timestamp", "zone"], fmt="arrow")
+        table = pa.ipc.open_stream(b"".join(parts)).read_all()
+
+        assert table.column_names == ["id", "timestamp", "zone"]
+        assert table.column("id").to_pylist() == [6, 7, 8]
+        assert set(table.column("zone").to_pylist()) == {"Centro"}
+
+    def test_parse_columns(self):
+        assert parse_columns(None) == TRAINING_COLUMNS
+        assert parse_columns("id, zone") == ["id", "zone"]
+        for bad in ("id,nope", "id,id"):
+            with pytest.raises(ValueError):
+                parse_columns(bad)
+
+
+class TestExportEndpoint:
+    """Test cases for GET /export/sightings"""
+
+    @pytest.fixture
+    def export_client(self, client, monkeypatch):
+        monkeypatch.setattr(main, "store", _fill(InMemorySightingStore()))
+        return client
+
+    def test_export_parquet(self, export_client):
+        response = export_client.get("/export/sightings", params={"from": "2024-05-01T10:00:00"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.apache.parquet"
+        assert pq.read_table(io.BytesIO(response.content)).num_rows == 22
+
+    def test_export_arrow_projection(self, export_client):
+        response = export_client.get("/export/sightings", params={"format": "arrow", "columns": "user_id,species_name"})
+
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.column_names == ["user_id", "species_name"]
+        assert table.num_rows == 26
+
+    def test_invalid_requests(self, export_client):
+        assert export_client.get("/export/sightings", params={"columns": "nope"}).status_code == 400
+        assert export_client.get("/export/sightings", params={"format": "csv"}).status_code == 422
@@ -0,0 +1,104 @@
+"""
+Unit tests for the live sighting feed
+"""
+
+import asyncio
+
+from app import main
+from app.feed import SightingFeed, sse_stream
+from app.storage import InMemorySightingStore
+
+
+def _sighting(sighting_id, species="Ardea alba", lat=10.96, lon=-74.79):
+    return {"id": sighting_id, "user_id": 1, "species_name": species, "timestamp": "2024-05-01T06:00:00+00:00",
+            "latitude": lat, "longitude": lon}
+
+
+class TestSightingFeed:
+    """Test cases for the in-process pub/sub"""
+
+    def test_only_matching_sightings_are_delivered(self):
+        feed = SightingFeed()
+        subscription = feed.subscribe(bbox=(-74.9, 10.9, -74.7, 11.0), species=["Ardea alba"])
+
+        feed.publish(_sighting(1))
+        feed.publish(_sighting(2, species="Coragyps atratus"))
+        feed.publish(_sighting(3, lat=None, lon=None))
+        feed.publish(_sighting(4, lat=4.6, lon=-74.1))
+
+        assert asyncio.run(subscription.get(timeout=0.01))["id"] == 1
+        assert asyncio.run(subscription.get(timeout=0.01)) is None
+
+    def test_slow_subscriber_drops_oldest(self):
+        """A full queue discards its oldest items and counts them"""
+        feed = SightingFeed()
+        slow = feed.subscribe(maxsize=2)
+        fast = feed.subscribe(maxsize=10)
+
+        for sighting_id in range(1, 6):
+            feed.publish(_sighting(sighting_id))
+
+        assert asyncio.run(slow.get(timeout=0))["id"] == 4
+        assert slow.take_dropped() == 3
+        assert asyncio.run(fast.get(timeout=0))["id"] == 1
+
+    def test_announcements_reach_every_feed_on_the_store(self):
+        """Replicas sharing a store (LISTEN/NOTIFY in Postgres) all see each announcement"""
+        store = InMemorySightingStore()
+        here, there = SightingFeed(store), SightingFeed(store)
+
+        async def run():
+            await here.start()
+            await there.start()
+            subscription = there.subscribe()
+            await here.announce([_sighting(1), _sighting(2)])
+            await there.stop()
+            await here.announce([_sighting(3)])
+            return [await subscription.get(timeout=0) for _ in range(3)]
+
+        assert [s and s["id"] for s in asyncio.run(run())] == [1, 2, None]
+
+    def test_sse_frames_and_unsubscribe(self):
+        feed = SightingFeed()
+        subscription = feed.subscribe()
+
+        async def disconnected():
+            return True
+
+        async def run():
+            stream = sse_stream(feed, subscription, disconnected, heartbeat_s=0.01)
+            frames = [await stream.__anext__()]
+            feed.publish(_sighting(7))
+            frames.append(await stream.__anext__())
+            frames.extend([frame async for frame in stream])
+            return frames
+
+        frames = asyncio.run(run())
+
+        assert frames[0].startswith("retry: 3000")
+        assert frames[1].startswith("event: sighting\nid: 7\ndata: {")
+        assert len(frames) == 2  # the disconnect ends the stream
+        assert feed.subscribers == 0
+
+
+class TestStreamEndpoint:
+    """Test cases for GET /sightings/stream and publishing on create"""
+
+    def test_created_sightings_are_published(self, client):
+        subscription = main.feed.subscribe(species=["Pitangus sulphuratus"])
+        try:
+            client.post("/sightings", json={"user_id": 1, "species_name": "Ardea alba"})
+            client.post("/sightings/batch", json={"sightings": [
+                {"user_id": 1, "species_name": "Pitangus sulphuratus", "latitude": 10.96, "longitude": -74.79},
+            ]})
+
+            published = asyncio.run(subscription.get(timeout=0))
+        finally:
+            main.feed.unsubscribe(subscription)
+
+        assert published["species_name"] == "Pitangus sulphuratus"
+        assert published["latitude"] == 10.96
+        assert asyncio.run(subscription.get(timeout=0)) is None
+
+    def test_invalid_bbox(self, client):
+        assert client.get("/sightings/stream", params={"bbox": "1,2"}).status_code == 400
@@ -0,0 +1,142 @@
+"""
+Unit tests for spatial and temporal sighting search
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import main
+from app.geo import GridIndex, bbox_around, haversine_m, parse_bbox
+from app.storage import InMemorySightingStore
+
+START = datetime(2024, 5, 1, 6, 0, tzinfo=timezone.utc)
+# Barranquilla centre, ~1 km north, ~20 km south
+PLACES = {"centro": (10.9639, -74.7964), "norte": (10.9729, -74.7964), "sur": (10.7840, -74.7964)}
+
+
+def _fill(store):
+    async def run():
+        rows = [
+            ("centro", "Ardea alba", 0),
+            ("norte", "Ardea alba", 60),
+            ("sur", "Coragyps atratus", 120),
+            ("centro", "Coragyps atratus", 180),
+        ]
+        for place, species, minutes in rows:
+            lat, lon = PLACES[place]
+            await store.insert({"user_id": 1, "species_name": species, "latitude": lat, "longitude": lon,
+                                "timestamp": START + timedelta(minutes=minutes)})
+        # Sighting without location: only found by non-spatial queries
+        await store.insert({"user_id": 2, "species_name": "Ardea alba", "timestamp": START + timedelta(minutes=240)})
+
+    asyncio.run(run())
+    return store
+
+
+class TestGeo:
+    """Test cases for geometry helpers"""
+
+    def test_bbox_around_contains_circle(self):
+        """The box around a circle contains points at the radius in every direction"""
+        lat, lon = PLACES["centro"]
+        min_lon, min_lat, max_lon, max_lat = bbox_around(lat, lon, 1000)
+
+        assert haversine_m(lat, lon, max_lat, lon) == pytest.approx(1000, rel=1e-3)
+        assert haversine_m(lat, lon, lat, max_lon) == pytest.approx(1000, rel=1e-3)
+
+    def test_parse_bbox_validation(self):
+        assert parse_bbox("-75,10,-74,11") == (-75.0, 10.0, -74.0, 11.0)
+        for bad in ("1,2,3", "-74,10,-75,11", "a,b,c,d", "-200,10,-74,11"):
+            with pytest.raises(ValueError):
+                parse_bbox(bad)
+
+    def test_grid_candidates_only_visit_overlapping_cells(self):
+        grid = GridIndex()
+        grid.add(1, *PLACES["centro"])
+        grid.add(2, *PLACES["sur"])
+
+        assert set(grid.candidates(bbox_around(*PLACES["centro"], 500))) == {1}
+        assert grid.candidates((-180.0, -90.0, 180.0, 90.0)) is None
+
+
+class TestInMemorySearch:
+    """Test cases for InMemorySightingStore.search"""
+
+    def test_radius_search(self):
+        """Only sightings within the radius are returned, newest first"""
+        store = _fill(InMemorySightingStore())
+
+        found = asyncio.run(store.search(near=(*PLACES["centro"], 2000)))
+
+        assert [s["timestamp"] for s in found] == [START + timedelta(minutes=m) for m in (180, 60, 0)]
+
+    def test_bbox_time_and_species(self):
+        """Window, time range and species filters combine"""
+        store = _fill(InMemorySightingStore())
+        box = (-74.9, 10.9, -74.7, 11.0)
+
+        found = asyncio.run(store.search(bbox=box, start=START + timedelta(minutes=30),
+                                         end=START + timedelta(minutes=200), species=["Ardea alba"]))
+
+        assert [(s["species_name"], s["latitude"]) for s in found] == [("Ardea alba", PLACES["norte"][0])]
+
+    def test_time_only_search_uses_limit(self):
+        """Without a window, the newest sightings in the range are returned"""
+        store = _fill(InMemorySightingStore())
+
+        found = asyncio.run(store.search(end=START + timedelta(minutes=200), limit=2))
+
+        assert [s["timestamp"] for s in found] == [START + timedelta(minutes=m) for m in (180, 120)]
+
+    def test_species_only_search(self):
+        store = _fill(InMemorySightingStore())
+
+        found = asyncio.run(store.search(species=["Ardea alba"]))
+
+        assert len(found) == 3
+        assert found[0]["latitude"] is None  # the newest one has no location
+
+
+class TestSearchEndpoint:
+    """Test cases for GET /sightings/search"""
+
+    @pytest.fixture
+    def search_client(self, client, monkeypatch):
+        monkeypatch.setattr(main, "store", _fill(InMemorySightingStore()))
+        return client
+
+    def test_search_by_radius_and_species(self, search_client):
+        lat, lon = PLACES["centro"]
+        response = search_client.get("/sightings/search", params={
+            "lat": lat, "lon": lon, "radius": 2000, "species": "Ardea alba,Coragyps atratus",
+        })
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["count"] == 3
+        assert {s["species_name"] for s in body["sightings"]} == {"Ardea alba", "Coragyps atratus"}
+        assert all(s["latitude"] is not None for s in body["sightings"])
+
+    def test_search_by_bbox_and_time(self, search_client):
+        response = search_client.get("/sightings/search", params={
+            "bbox": "-74.9,10.7,-74.7,11.0", "from": "2024-05-01T07:30:00", "to": "2024-05-01T09:30:00",
+        })
+
+        assert [s["species_name"] for s in response.json()["sightings"]] == ["Coragyps atratus", "Coragyps atratus"]
+
+    def test_invalid_filters(self, search_client):
+        assert search_client.get("/sightings/search", params={"lat": 10.9, "lon": -74.8}).status_code == 400
+        assert search_client.get("/sightings/search", params={"bbox": "1,2,3"}).status_code == 400
+        assert search_client.get("/sightings/search", params={
+            "bbox": "-75,10,-74,11", "lat": 10.9, "lon": -74.8, "radius": 100,
+        }).status_code == 400
+
+    def test_create_keeps_location(self, client):
+        """Latitude and longitude sent on creation are stored and returned"""
+        body = client.post("/sightings", json={
+            "user_id": 3, "species_name": "Ardea alba", "latitude": 10.96, "longitude": -74.79,
+        }).json()
+
+        assert (body["latitude"], body["longitude"]) == (10.96, -74.79)
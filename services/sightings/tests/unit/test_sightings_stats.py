@@ -0,0 +1,118 @@
+"""
+Unit tests for the daily sighting rollups and /stats endpoints
+"""
+
+import asyncio
+from datetime import date, datetime
+
+import pytest
+
+from app import main
+from app.storage import InMemorySightingStore
+from app.zones import OUTSIDE_ZONES, default_index
+
+CENTRO = (10.9639, -74.7964)
+
+
+def _sighting(user_id, species, day, location=CENTRO):
+    lat, lon = location if location else (None, None)
+    return {"user_id": user_id, "species_name": species, "latitude": lat, "longitude": lon,
+            "timestamp": datetime(2024, 5, day, 12)}
+
+
+def _fill(store):
+    async def run():
+        await store.insert(_sighting(1, "Ardea alba", 1))
+        await store.insert_many([
+            _sighting(1, "Ardea alba", 1),
+            _sighting(1, "Coragyps atratus", 2),
+            _sighting(2, "Ardea alba", 2),
+            _sighting(2, "Ardea alba", 3, location=None),
+            _sighting(3, "Ardea alba", 3),
+        ])
+
+    asyncio.run(run())
+    return store
+
+
+class TestZones:
+    """Test cases for the zone lookup"""
+
+    def test_zone_for_point(self):
+        zones = default_index()
+
+        assert zones.zone_for(*CENTRO) == "Centro"
+        assert zones.zone_for(0.0, 0.0) == OUTSIDE_ZONES
+        assert zones.zone_for(None, None) == OUTSIDE_ZONES
+
+
+class TestRollups:
+    """Test cases for incrementally maintained rollups"""
+
+    def test_zone_species_totals(self):
+        store = _fill(InMemorySightingStore())
+
+        rows = asyncio.run(store.zone_species_counts())
+
+        assert rows == [
+            {"zone": "Centro", "species_name": "Ardea alba", "count": 4},
+            {"zone": "Centro", "species_name": "Coragyps atratus", "count": 1},
+            {"zone": OUTSIDE_ZONES, "species_name": "Ardea alba", "count": 1},
+        ]
+
+    def test_zone_species_daily_with_filters(self):
+        store = _fill(InMemorySightingStore())
+
+        rows = asyncio.run(store.zone_species_counts(zone="Centro", species=["Ardea alba"],
+                                                     start=date(2024, 5, 2), daily=True))
+
+        assert [(r["day"], r["count"]) for r in rows] == [(date(2024, 5, 2), 1), (date(2024, 5, 3), 1)]
+
+    def test_user_daily_and_leaderboard(self):
+        store = _fill(InMemorySightingStore())
+
+        days = asyncio.run(store.user_daily_counts(1))
+        top = asyncio.run(store.top_users(start=date(2024, 5, 2), limit=2))
+
+        assert days == [{"day": date(2024, 5, 1), "count": 2}, {"day": date(2024, 5, 2), "count": 1}]
+        assert top == [{"user_id": 2, "count": 2}, {"user_id": 1, "count": 1}]
+
+    def test_days_are_utc(self):
+        """A sighting late in the evening in Colombia counts on the next UTC day"""
+        store = InMemorySightingStore()
+        asyncio.run(store.insert({"user_id": 1, "species_name": "Ardea alba",
+                                  "timestamp": datetime.fromisoformat("2024-05-01T21:00:00-05:00")}))
+
+        assert asyncio.run(store.user_daily_counts(1)) == [{"day": date(2024, 5, 2), "count": 1}]
+
+
+class TestStatsEndpoints:
+    """Test cases for GET /stats/..."""
+
+    @pytest.fixture
+    def stats_client(self, client, monkeypatch):
+        monkeypatch.setattr(main, "store", _fill(InMemorySightingStore()))
+        return client
+
+    def test_zone_species_endpoint(self, stats_client):
+        response = stats_client.get("/stats/zones/species", params={"species": "Ardea alba", "daily": True})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 5
+        assert body["rows"][0] == {"zone": "Centro", "species_name": "Ardea alba", "day": "2024-05-01", "count": 2}
+
+    def test_user_daily_endpoint(self, stats_client):
+        body = stats_client.get("/stats/users/2/daily", params={"from": "2024-05-03"}).json()
+
+        assert body == {"user_id": 2, "days": [{"day": "2024-05-03", "count": 1}], "total": 1}
+
+    def test_leaderboard_endpoint(self, stats_client):
+        body = stats_client.get("/stats/leaderboard").json()
+
+        assert body["leaderboard"][0] == {"user_id": 1, "count": 3}
+
+    def test_inverted_range_is_rejected(self, stats_client):
+        response = stats_client.get("/stats/leaderboard", params={"from": "2024-05-03", "to": "2024-05-01"})
+
+        assert response.status_code == 400
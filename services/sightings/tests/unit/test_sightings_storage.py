@@ -0,0 +1,97 @@
+"""
+Unit tests for the sightings storage backends
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.storage import InMemorySightingStore, PostgresSightingStore, as_utc, create_store
+
+
+def _sighting(user_id, minutes, species="Turdus ignobilis"):
+    return {
+        "user_id": user_id,
+        "species_name": species,
+        "common_name": None,
+        "timestamp": datetime(2024, 5, 1, 6, 0) + timedelta(minutes=minutes),
+        "status": "processed",
+        "achievements_unlocked": [],
+    }
+
+
+class TestInMemorySightingStore:
+    """Test cases for the in-memory backend"""
+
+    def test_ids_are_generated_and_unique_under_concurrency(self):
+        """Concurrent inserts never share an id"""
+        store = InMemorySightingStore()
+
+        async def run():
+            return await asyncio.gather(*(store.insert(_sighting(1, i)) for i in range(50)))
+
+        records = asyncio.run(run())
+
+        assert len({r["id"] for r in records}) == 50
+
+    def test_get_returns_stored_sighting(self):
+        """A stored sighting can be read back by id"""
+        store = InMemorySightingStore()
+        created = asyncio.run(store.insert(_sighting(1, 0)))
+
+        fetched = asyncio.run(store.get(created["id"]))
+
+        assert fetched == created
+        assert fetched["timestamp"].tzinfo == timezone.utc
+        assert asyncio.run(store.get(created["id"] + 1)) is None
+
+    def test_list_by_user_is_newest_first_and_limited(self):
+        """Listing only returns the user's sightings, newest first"""
+        store = InMemorySightingStore()
+
+        async def run():
+            for minutes in (5, 1, 9, 3):
+                await store.insert(_sighting(1, minutes))
+            await store.insert(_sighting(2, 7))
+            return await store.list_by_user(1, 3)
+
+        listed = asyncio.run(run())
+
+        assert [s["timestamp"].minute for s in listed] == [9, 5, 3]
+        assert all(s["user_id"] == 1 for s in listed)
+
+    def test_list_by_user_pages_with_ties(self):
+        """Keyset pages cover every sighting once, even with equal timestamps"""
+        store = InMemorySightingStore()
+
+        async def run():
+            for minutes in (1, 2, 2, 2, 3, 4, 4):
+                await store.insert(_sighting(1, minutes))
+            seen, before = [], None
+            while True:
+                page = await store.list_by_user(1, 2, before)
+                if not page:
+                    return seen
+                seen.extend(page)
+                before = (page[-1]["timestamp"], page[-1]["id"])
+
+        seen = asyncio.run(run())
+
+        assert len({s["id"] for s in seen}) == 7
+        keys = [(s["timestamp"], s["id"]) for s in seen]
+        assert keys == sorted(keys, reverse=True)
+
+
+class TestStoreSelection:
+    """Test cases for backend selection and timestamp normalization"""
+
+    def test_create_store_by_url(self):
+        """A Postgres URL selects the pooled backend, anything else the in-memory one"""
+        assert isinstance(create_store("postgresql://u:p@db:5432/winged_sightings"), PostgresSightingStore)
+        assert isinstance(create_store(""), InMemorySightingStore)
+
+    def test_as_utc(self):
+        """Naive timestamps are UTC; aware ones are converted"""
+        bogota = timezone(timedelta(hours=-5))
+
+        assert as_utc(datetime(2024, 5, 1, 6)) == datetime(2024, 5, 1, 6, tzinfo=timezone.utc)
+        assert as_utc(datetime(2024, 5, 1, 1, tzinfo=bogota)).hour == 6
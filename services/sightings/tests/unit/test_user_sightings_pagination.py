@@ -0,0 +1,58 @@
+"""
+Unit tests for the keyset-paginated user sightings listing
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import main
+from app.storage import InMemorySightingStore
+
+
+@pytest.fixture
+def populated_client(client, monkeypatch):
+    """Client whose store holds 5 sightings of user 1 and 1 of user 2"""
+    store = InMemorySightingStore()
+    monkeypatch.setattr(main, "store", store)
+
+    async def fill():
+        start = datetime(2024, 5, 1, 6, 0)
+        for i, user_id in enumerate([1, 1, 2, 1, 1, 1]):
+            await store.insert({
+                "user_id": user_id,
+                "species_name": f"Species {i}",
+                "timestamp": start + timedelta(minutes=i),
+                "achievements_unlocked": [],
+            })
+
+    asyncio.run(fill())
+    return client
+
+
+class TestUserSightingsPagination:
+    """Test cases for GET /users/{user_id}/sightings pagination"""
+
+    def test_pages_follow_next_cursor(self, populated_client):
+        """Following next_cursor walks all sightings newest first"""
+        first = populated_client.get("/users/1/sightings", params={"limit": 2}).json()
+        second = populated_client.get("/users/1/sightings", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+        third = populated_client.get("/users/1/sightings", params={"limit": 2, "cursor": second["next_cursor"]}).json()
+
+        species = [s["species_name"] for page in (first, second, third) for s in page["sightings"]]
+        assert species == ["Species 5", "Species 4", "Species 3", "Species 1", "Species 0"]
+        assert first["next_cursor"] and second["next_cursor"]
+        assert third["next_cursor"] is None
+
+    def test_exact_last_page_has_no_cursor(self, populated_client):
+        """A page that ends exactly at the last sighting reports no next page"""
+        body = populated_client.get("/users/1/sightings", params={"limit": 5}).json()
+
+        assert body["total"] == 5
+        assert body["next_cursor"] is None
+
+    def test_invalid_cursor_and_limit(self, populated_client):
+        """Malformed cursors and out-of-range limits are rejected"""
+        assert populated_client.get("/users/1/sightings", params={"cursor": "not-a-cursor"}).status_code == 400
+        assert populated_client.get("/users/1/sightings", params={"limit": 0}).status_code == 422